@@ -21,6 +21,8 @@ export interface ConversationListResponse {
   total: number
   page: number
   page_size: number
+  total_is_estimate?: boolean // total 为查询计划估计值
+  next_cursor?: string | null // 下一页游标
 }
 
 /**
@@ -32,6 +34,8 @@ export async function getConversations(params: {
   start_date?: string
   end_date?: string
   session_id?: string
+  cursor?: string
+  count_mode?: 'exact' | 'estimate' | 'auto'
 }): Promise<ConversationListResponse> {
   return client.get('/api/admin/conversations/history', { params })
 }
@@ -0,0 +1,110 @@
+"""add_conversation_stats_rollup_tables
+
+统计报表改为读取小时/每日汇总表，并从已有对话历史回填汇总数据。
+
+Revision ID: 34eb8a2910c0
+Revises: fe2983bca68f
+Create Date: 2026-10-17 10:12:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '34eb8a2910c0'
+down_revision: Union[str, Sequence[str], None] = 'fe2983bca68f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+BACKFILL_SQL = [
+    """
+    INSERT INTO conversation_stats_hourly (stat_hour, conversation_count, confidence_sum, confidence_count)
+    SELECT date_trunc('hour', created_at), count(*), coalesce(sum(confidence_score), 0), count(confidence_score)
+    FROM conversation_history
+    WHERE created_at IS NOT NULL
+    GROUP BY 1
+    """,
+    """
+    INSERT INTO conversation_sessions (session_id, first_seen_at)
+    SELECT session_id, min(created_at)
+    FROM conversation_history
+    WHERE created_at IS NOT NULL
+    GROUP BY session_id
+    """,
+    """
+    INSERT INTO conversation_session_days (stat_date, session_id)
+    SELECT DISTINCT created_at::date, session_id
+    FROM conversation_history
+    WHERE created_at IS NOT NULL
+    """,
+    """
+    INSERT INTO conversation_stats_daily (
+        stat_date, conversation_count, active_sessions, new_sessions, confidence_sum, confidence_count
+    )
+    SELECT d.stat_date, d.conversation_count, d.active_sessions, coalesce(n.new_sessions, 0),
+           d.confidence_sum, d.confidence_count
+    FROM (
+        SELECT created_at::date AS stat_date,
+               count(*) AS conversation_count,
+               count(DISTINCT session_id) AS active_sessions,
+               coalesce(sum(confidence_score), 0) AS confidence_sum,
+               count(confidence_score) AS confidence_count
+        FROM conversation_history
+        WHERE created_at IS NOT NULL
+        GROUP BY 1
+    ) d
+    LEFT JOIN (
+        SELECT first_seen_at::date AS stat_date, count(*) AS new_sessions
+        FROM conversation_sessions
+        GROUP BY 1
+    ) n ON n.stat_date = d.stat_date
+    """,
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('conversation_stats_hourly',
+    sa.Column('stat_hour', sa.DateTime(), nullable=False),
+    sa.Column('conversation_count', sa.Integer(), nullable=False),
+    sa.Column('confidence_sum', sa.Float(), nullable=False),
+    sa.Column('confidence_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('stat_hour')
+    )
+    op.create_table('conversation_stats_daily',
+    sa.Column('stat_date', sa.Date(), nullable=False),
+    sa.Column('conversation_count', sa.Integer(), nullable=False),
+    sa.Column('active_sessions', sa.Integer(), nullable=False),
+    sa.Column('new_sessions', sa.Integer(), nullable=False),
+    sa.Column('confidence_sum', sa.Float(), nullable=False),
+    sa.Column('confidence_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('stat_date')
+    )
+    op.create_table('conversation_sessions',
+    sa.Column('session_id', sa.String(length=64), nullable=False),
+    sa.Column('first_seen_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('session_id')
+    )
+    op.create_table('conversation_session_days',
+    sa.Column('stat_date', sa.Date(), nullable=False),
+    sa.Column('session_id', sa.String(length=64), nullable=False),
+    sa.PrimaryKeyConstraint('stat_date', 'session_id')
+    )
+
+    # 从已有对话历史回填（conversation_history 由 init_admin_db.py 创建，可能不存在）
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql' and sa.inspect(bind).has_table('conversation_history'):
+        for statement in BACKFILL_SQL:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('conversation_session_days')
+    op.drop_table('conversation_sessions')
+    op.drop_table('conversation_stats_daily')
+    op.drop_table('conversation_stats_hourly')
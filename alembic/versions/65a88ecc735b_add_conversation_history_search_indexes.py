@@ -0,0 +1,53 @@
+"""add_conversation_history_search_indexes
+
+对话历史列表的游标分页索引 (created_at, id) 和 session_id 子串搜索的 pg_trgm 索引。
+
+Revision ID: 65a88ecc735b
+Revises: 34eb8a2910c0
+Create Date: 2026-10-17 11:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '65a88ecc735b'
+down_revision: Union[str, Sequence[str], None] = '34eb8a2910c0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_conversation_history() -> bool:
+    # conversation_history 由 init_admin_db.py 创建，可能不存在
+    return sa.inspect(op.get_bind()).has_table('conversation_history')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql' or not _has_conversation_history():
+        return
+
+    # CONCURRENTLY 不能在事务中执行；建索引期间不阻塞对话写入
+    with op.get_context().autocommit_block():
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_conversation_history_created_at_id "
+            "ON conversation_history (created_at, id)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_conversation_history_session_id_trgm "
+            "ON conversation_history USING gin (session_id gin_trgm_ops)"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_conversation_history_session_id_trgm")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_conversation_history_created_at_id")
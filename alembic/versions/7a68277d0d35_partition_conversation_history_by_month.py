@@ -0,0 +1,162 @@
+"""partition_conversation_history_by_month
+
+conversation_history 改为按 created_at 按月范围分区的表，retrieved_docs 改为 JSONB（可用时使用 lz4 压缩）。
+
+已有数据会复制到新表（一次性重写整表，数据量大时请在维护窗口执行）。
+迁移创建从最早数据所在月份到未来 3 个月的分区，之后由 API 进程的分区维护任务预建新分区、删除过期分区。
+
+Revision ID: 7a68277d0d35
+Revises: 65a88ecc735b
+Create Date: 2026-10-17 14:20:00.000000
+
+"""
+from datetime import date, datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a68277d0d35'
+down_revision: Union[str, Sequence[str], None] = '65a88ecc735b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLE = 'conversation_history'
+OLD_TABLE = 'conversation_history_unpartitioned'
+PREMAKE_MONTHS = 3
+COLUMNS = 'id, session_id, user_message, ai_response, retrieved_docs, confidence_score, created_at'
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _create_indexes(table: str) -> None:
+    op.execute(f"CREATE INDEX ix_{table}_session_id ON {table} (session_id)")
+    op.execute(f"CREATE INDEX ix_{table}_created_at ON {table} (created_at)")
+    op.execute(f"CREATE INDEX ix_{table}_created_at_id ON {table} (created_at, id)")
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute(f"CREATE INDEX ix_{table}_session_id_trgm ON {table} USING gin (session_id gin_trgm_ops)")
+
+
+def _rename_primary_key(table: str, new_name: str) -> None:
+    op.execute(f"""
+        DO $$
+        DECLARE pk text;
+        BEGIN
+            SELECT conname INTO pk FROM pg_constraint WHERE conrelid = '{table}'::regclass AND contype = 'p';
+            IF pk IS NOT NULL THEN
+                EXECUTE format('ALTER TABLE {table} RENAME CONSTRAINT %I TO %I', pk, '{new_name}');
+            END IF;
+        END $$;
+    """)
+
+
+def _drop_indexes() -> None:
+    # 表改名后索引仍沿用原名，先删除以便在新表上重建同名索引
+    for suffix in ('session_id', 'created_at', 'created_at_id', 'session_id_trgm'):
+        op.execute(f"DROP INDEX IF EXISTS ix_{TABLE}_{suffix}")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    inspector = sa.inspect(bind)
+    exists = inspector.has_table(TABLE)
+    if exists and bind.execute(sa.text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table))"
+    ), {'table': TABLE}).scalar():
+        return
+
+    current_month = datetime.utcnow().date().replace(day=1)
+    first_month = current_month
+    if exists:
+        op.rename_table(TABLE, OLD_TABLE)
+        _rename_primary_key(OLD_TABLE, f'{OLD_TABLE}_pkey')
+        _drop_indexes()
+        oldest = bind.execute(sa.text(f"SELECT min(created_at) FROM {OLD_TABLE}")).scalar()
+        if oldest is not None:
+            first_month = min(first_month, oldest.date().replace(day=1))
+
+    op.execute(f"""
+        CREATE TABLE {TABLE} (
+            id UUID NOT NULL,
+            session_id VARCHAR(64) NOT NULL,
+            user_message TEXT,
+            ai_response TEXT,
+            retrieved_docs JSONB,
+            confidence_score FLOAT,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    # 大的检索文档 JSONB 走 TOAST 压缩；lz4 需要 PostgreSQL 14+ 且编译时启用，不可用时保持默认 pglz
+    op.execute(f"""
+        DO $$
+        BEGIN
+            EXECUTE 'ALTER TABLE {TABLE} ALTER COLUMN retrieved_docs SET COMPRESSION lz4';
+        EXCEPTION WHEN OTHERS THEN
+            RAISE NOTICE 'lz4 compression unavailable, using default';
+        END $$;
+    """)
+
+    month = first_month
+    last_month = _add_months(current_month, PREMAKE_MONTHS)
+    while month <= last_month:
+        next_month = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE {TABLE}_p{month:%Y%m} PARTITION OF {TABLE} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month.isoformat()}')"
+        )
+        month = next_month
+
+    if exists:
+        op.execute(f"""
+            INSERT INTO {TABLE} ({COLUMNS})
+            SELECT id, session_id, user_message, ai_response, retrieved_docs::jsonb, confidence_score,
+                   coalesce(created_at, now() AT TIME ZONE 'utc')
+            FROM {OLD_TABLE}
+        """)
+        op.drop_table(OLD_TABLE)
+
+    # 导入数据后再建索引（在分区父表上建索引会自动建到每个分区）
+    _create_indexes(TABLE)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql' or not sa.inspect(bind).has_table(TABLE):
+        return
+
+    partitioned = f'{TABLE}_partitioned'
+    op.rename_table(TABLE, partitioned)
+    _rename_primary_key(partitioned, f'{partitioned}_pkey')
+    _drop_indexes()
+
+    op.execute(f"""
+        CREATE TABLE {TABLE} (
+            id UUID NOT NULL PRIMARY KEY,
+            session_id VARCHAR(64) NOT NULL,
+            user_message TEXT,
+            ai_response TEXT,
+            retrieved_docs JSON,
+            confidence_score FLOAT,
+            created_at TIMESTAMP WITHOUT TIME ZONE
+        )
+    """)
+    op.execute(f"""
+        INSERT INTO {TABLE} ({COLUMNS})
+        SELECT id, session_id, user_message, ai_response, retrieved_docs::json, confidence_score, created_at
+        FROM {partitioned}
+    """)
+    # 删除父表会一并删除所有分区
+    op.drop_table(partitioned)
+    _create_indexes(TABLE)
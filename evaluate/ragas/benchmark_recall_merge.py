@@ -0,0 +1,189 @@
+"""
+召回结果合并策略对比（离线）
+
+基于 `evaluate/ragas/testdata.csv` 比较 merge_node 各合并策略的排序质量与耗时：
+- 语料：testdata 中的全部 reference_contexts + FAQ 答案（干扰项）
+- 召回源（离线模拟，无需 Milvus / Embedding API）：
+    - vector: 字符 bigram TF 余弦相似度（0~1，与向量召回的分数尺度一致）
+    - keyword: 字符 bigram BM25（无上界的启发式分数，与关键词 / FAQ 召回的尺度一致）
+- 指标：Hit@K、MRR@K（命中任一 reference_context 即视为相关）、单次合并耗时
+
+运行示例：
+    uv run python evaluate/ragas/benchmark_recall_merge.py --top-k 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import ast
+import csv
+import json
+import math
+import statistics
+import time
+from collections import Counter
+from pathlib import Path
+
+from src.agent.recall.merge import RecallMerger, RRFMerger, WeightedMerger
+from src.agent.recall.schema import RecallHit
+
+TESTDATA_PATH = Path("evaluate/ragas/testdata.csv")
+FAQ_JSONL_PATH = Path("evaluate/ragas/processed/faq.jsonl")
+DEFAULT_WEIGHTS = {"vector": 1.0, "keyword": 0.8}
+
+
+def parse_args() -> argparse.Namespace:
+    """CLI 参数解析。"""
+    parser = argparse.ArgumentParser(description="对比召回结果合并策略的质量与耗时。")
+    parser.add_argument("--testdata", type=Path, default=TESTDATA_PATH, help="测试集 CSV 路径")
+    parser.add_argument("--faq-path", type=Path, default=FAQ_JSONL_PATH, help="FAQ JSONL 路径（干扰项）")
+    parser.add_argument("--top-k", type=int, default=3, help="最终返回结果数")
+    parser.add_argument("--source-top-k", type=int, default=10, help="每个召回源返回的结果数")
+    parser.add_argument("--repeat", type=int, default=200, help="耗时统计的重复次数")
+    return parser.parse_args()
+
+
+def bigrams(text: str) -> list[str]:
+    """字符 bigram（忽略空白，英文小写）。"""
+    chars = [c for c in text.lower() if not c.isspace()]
+    return [a + b for a, b in zip(chars, chars[1:])]
+
+
+def load_dataset(path: Path) -> list[tuple[str, set[str]]]:
+    """读取 (问题, 相关上下文集合) 列表。"""
+    with path.open("r", encoding="utf-8") as handle:
+        return [
+            (row["user_input"], set(ast.literal_eval(row["reference_contexts"])))
+            for row in csv.DictReader(handle)
+        ]
+
+
+def load_corpus(dataset: list[tuple[str, set[str]]], faq_path: Path) -> list[str]:
+    """reference_contexts + FAQ 答案。"""
+    corpus = sorted({context for _, contexts in dataset for context in contexts})
+    if faq_path.exists():
+        with faq_path.open("r", encoding="utf-8") as handle:
+            for line in handle:
+                record = json.loads(line)
+                corpus.append(f"{record['question_zh']}\n{record['answer_zh']}")
+                corpus.append(f"{record['question_en']}\n{record['answer_en']}")
+    return corpus
+
+
+class OfflineSources:
+    """离线模拟的 vector / keyword 召回源。"""
+
+    def __init__(self, corpus: list[str]):
+        self.corpus = corpus
+        self.doc_terms = [Counter(bigrams(doc)) for doc in corpus]
+        self.doc_norms = [math.sqrt(sum(v * v for v in terms.values())) or 1.0 for terms in self.doc_terms]
+        self.doc_lengths = [sum(terms.values()) for terms in self.doc_terms]
+        self.avg_length = sum(self.doc_lengths) / len(self.doc_lengths)
+        document_frequency = Counter(term for terms in self.doc_terms for term in terms)
+        n = len(corpus)
+        self.idf = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in document_frequency.items()
+        }
+
+    def vector(self, query: str, top_k: int) -> list[RecallHit]:
+        terms = Counter(bigrams(query))
+        norm = math.sqrt(sum(v * v for v in terms.values())) or 1.0
+        scores = [
+            sum(count * doc.get(term, 0) for term, count in terms.items()) / (norm * doc_norm)
+            for doc, doc_norm in zip(self.doc_terms, self.doc_norms)
+        ]
+        return self._top_hits("vector", scores, top_k)
+
+    def keyword(self, query: str, top_k: int, k1: float = 1.5, b: float = 0.75) -> list[RecallHit]:
+        terms = set(bigrams(query))
+        scores = []
+        for doc, length in zip(self.doc_terms, self.doc_lengths):
+            score = 0.0
+            for term in terms:
+                tf = doc.get(term, 0)
+                if tf:
+                    score += self.idf[term] * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / self.avg_length))
+            scores.append(score)
+        return self._top_hits("keyword", scores, top_k)
+
+    def _top_hits(self, source: str, scores: list[float], top_k: int) -> list[RecallHit]:
+        ranked = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)[:top_k]
+        return [
+            RecallHit(
+                source=source,
+                score=scores[i],
+                confidence=min(scores[i], 1.0),
+                reason="offline benchmark",
+                # 去重键为内容前100个字符，追加编号避免不同文档前缀相同被误合并
+                content=f"#{i}\n{self.corpus[i]}",
+                metadata={"doc_index": i},
+            )
+            for i in ranked
+            if scores[i] > 0
+        ]
+
+
+def evaluate(
+    merger: RecallMerger,
+    queries: list[tuple[list[RecallHit], set[int]]],
+    top_k: int,
+    repeat: int,
+) -> dict[str, float]:
+    """计算 Hit@K / MRR@K 以及单次合并耗时。"""
+    hit_count = 0
+    reciprocal_ranks = []
+    for hits, relevant in queries:
+        merged = merger.merge(hits, DEFAULT_WEIGHTS)[:top_k]
+        rank = next(
+            (i for i, hit in enumerate(merged, 1) if hit.metadata["doc_index"] in relevant), None
+        )
+        hit_count += rank is not None
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+
+    latencies = []
+    for _ in range(repeat):
+        for hits, _ in queries:
+            start = time.perf_counter()
+            merger.merge(hits, DEFAULT_WEIGHTS)
+            latencies.append((time.perf_counter() - start) * 1_000_000)
+
+    latencies.sort()
+    return {
+        "hit": hit_count / len(queries),
+        "mrr": statistics.mean(reciprocal_ranks),
+        "p50_us": latencies[len(latencies) // 2],
+        "p95_us": latencies[int(len(latencies) * 0.95)],
+    }
+
+
+def main() -> None:
+    args = parse_args()
+    dataset = load_dataset(args.testdata)
+    corpus = load_corpus(dataset, args.faq_path)
+    sources = OfflineSources(corpus)
+    index_of = {doc: i for i, doc in enumerate(corpus)}
+
+    queries = []
+    for question, contexts in dataset:
+        hits = sources.vector(question, args.source_top_k) + sources.keyword(question, args.source_top_k)
+        queries.append((hits, {index_of[context] for context in contexts}))
+
+    strategies: dict[str, RecallMerger] = {
+        "weighted (raw)": WeightedMerger(normalization="none"),
+        "weighted (minmax)": WeightedMerger(normalization="minmax"),
+        "weighted (zscore)": WeightedMerger(normalization="zscore"),
+        "rrf (k=60)": RRFMerger(k=60),
+    }
+
+    print(f"queries={len(queries)}, corpus={len(corpus)}, top_k={args.top_k}, weights={DEFAULT_WEIGHTS}")
+    print(f"{'strategy':<20}{'Hit@K':>8}{'MRR@K':>8}{'p50(us)':>10}{'p95(us)':>10}")
+    for name, merger in strategies.items():
+        result = evaluate(merger, queries, args.top_k, args.repeat)
+        print(
+            f"{name:<20}{result['hit']:>8.3f}{result['mrr']:>8.3f}"
+            f"{result['p50_us']:>10.1f}{result['p95_us']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
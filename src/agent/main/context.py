@@ -0,0 +1,232 @@
+"""
+对话上下文管理
+
+messages 由 add_messages reducer 累积并随 Checkpointer 持久化，长会话中每轮发送给 LLM 的
+token 数和 checkpoint 体积都会持续增长。context 节点在每轮开始时控制上下文规模：
+- 按轮次（一条用户消息及其后的回复）切分消息，token 数由 tiktoken 计算
+- 轮次数超过 CONTEXT_MAX_TURNS 或 token 数超过 CONTEXT_MAX_TOKENS 时，
+  将较早的轮次折叠进滚动摘要（conversation_summary），并从 state 中删除这些消息
+- 折叠后保留约一半的窗口，避免窗口填满后每轮都触发摘要
+- 摘要由 LLM 生成（失败或关闭时使用截断拼接），长度不超过 CONTEXT_SUMMARY_MAX_TOKENS
+"""
+
+import logging
+from typing import Any, Sequence
+
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    HumanMessage,
+    RemoveMessage,
+    SystemMessage,
+)
+
+from src.agent.main.state import AgentState
+from src.core.config import settings
+from src.core.utils import get_encoding
+from src.services.llm_registry import get_llm
+from src.services.token_accounting import (
+    MESSAGE_OVERHEAD_TOKENS,
+    get_token_counter,
+    get_token_metrics,
+)
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = """请将以下客服对话压缩为一段简洁的摘要，供后续对话参考。
+
+要求：
+1. 保留用户的身份信息、需求、订单号等关键事实，以及已给出的结论
+2. 如果已有摘要，将新对话合并进去，不要丢失已有摘要中的关键信息
+3. 不超过 {max_tokens} 个 token，只输出摘要内容
+
+已有摘要：
+{summary}
+
+新对话：
+{dialogue}
+"""
+
+
+def _message_text(message: BaseMessage) -> str:
+    content = message.content
+    return content if isinstance(content, str) else str(content)
+
+
+def count_message_tokens(messages: Sequence[BaseMessage]) -> int:
+    """
+    计算消息列表的token数
+
+    Args:
+        messages: 消息列表
+
+    Returns:
+        token数（含每条消息的格式开销）
+    """
+    if not messages:
+        return 0
+    texts = [_message_text(message) for message in messages]
+    return sum(get_token_counter().count_batch(texts)) + MESSAGE_OVERHEAD_TOKENS * len(texts)
+
+
+def split_turns(messages: Sequence[BaseMessage]) -> list[list[BaseMessage]]:
+    """
+    按轮次切分消息
+
+    每轮以一条用户消息开始，包含其后直到下一条用户消息前的所有消息。
+
+    Args:
+        messages: 消息列表
+
+    Returns:
+        轮次列表
+    """
+    turns: list[list[BaseMessage]] = []
+    for message in messages:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([message])
+        else:
+            turns[-1].append(message)
+    return turns
+
+
+def select_window(turn_tokens: Sequence[int], max_turns: int, max_tokens: int) -> int:
+    """
+    从最新的轮次向前选择窗口
+
+    Args:
+        turn_tokens: 每轮的token数（按时间顺序）
+        max_turns: 最多保留的轮次数
+        max_tokens: 最多保留的token数
+
+    Returns:
+        保留的轮次数（至少保留最新一轮）
+    """
+    kept = 0
+    total = 0
+    for tokens in reversed(turn_tokens):
+        if kept >= max_turns or (kept and total + tokens > max_tokens):
+            break
+        kept += 1
+        total += tokens
+    return max(kept, 1) if turn_tokens else 0
+
+
+def _format_dialogue(messages: Sequence[BaseMessage]) -> str:
+    lines = []
+    for message in messages:
+        if isinstance(message, HumanMessage):
+            role = "用户"
+        elif isinstance(message, AIMessage):
+            role = "助手"
+        else:
+            continue
+        lines.append(f"{role}: {_message_text(message)}")
+    return "\n".join(lines)
+
+
+def _truncate_head(text: str, max_tokens: int) -> str:
+    """保留文本末尾不超过 max_tokens 的部分（较新的内容在末尾）"""
+    encoding = get_encoding()
+    if encoding is None:
+        return text[-max_tokens * 2:]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[-max_tokens:])
+
+
+def fallback_summary(summary: str, messages: Sequence[BaseMessage], max_tokens: int) -> str:
+    """
+    不调用 LLM 的摘要：已有摘要与被折叠对话拼接后截断
+
+    Args:
+        summary: 已有摘要
+        messages: 被折叠的消息
+        max_tokens: 摘要最大token数
+
+    Returns:
+        新摘要
+    """
+    text = "\n".join(part for part in (summary, _format_dialogue(messages)) if part)
+    return _truncate_head(text, max_tokens)
+
+
+async def summarize_messages(summary: str, messages: Sequence[BaseMessage], max_tokens: int) -> str:
+    """
+    将被折叠的消息合并进滚动摘要
+
+    Args:
+        summary: 已有摘要
+        messages: 被折叠的消息
+        max_tokens: 摘要最大token数
+
+    Returns:
+        新摘要（LLM 失败时使用 fallback_summary）
+    """
+    if not settings.context_summary_enabled:
+        return fallback_summary(summary, messages, max_tokens)
+
+    prompt = SUMMARY_PROMPT.format(
+        max_tokens=max_tokens,
+        summary=summary or "（无）",
+        dialogue=_format_dialogue(messages),
+    )
+    try:
+        prompt_messages = [SystemMessage(content=prompt)]
+        response = await get_llm().ainvoke(prompt_messages)
+        get_token_metrics().record(get_token_counter().usage_for(prompt_messages, response))
+        new_summary = _message_text(response).strip()
+        if not new_summary:
+            raise ValueError("empty summary")
+        return _truncate_head(new_summary, max_tokens)
+    except Exception as e:
+        logger.error(f"❌ Conversation summary failed, using truncated dialogue: {e}")
+        return fallback_summary(summary, messages, max_tokens)
+
+
+async def context_node(state: AgentState) -> dict[str, Any]:
+    """
+    上下文管理节点：超出窗口时将较早的轮次折叠进摘要
+
+    Args:
+        state: 当前 Agent 状态
+
+    Returns:
+        更新的状态（删除被折叠的消息，更新 conversation_summary）；未超出窗口时返回空字典
+    """
+    if not settings.context_window_enabled:
+        return {}
+
+    messages = list(state.get("messages", []))
+    turns = split_turns(messages)
+    turn_tokens = [count_message_tokens(turn) for turn in turns]
+    total_tokens = sum(turn_tokens)
+
+    max_turns = settings.context_max_turns
+    max_tokens = settings.context_max_tokens
+    if len(turns) <= max_turns and total_tokens <= max_tokens:
+        return {}
+
+    # 折叠到约一半的窗口，摘要成本分摊到多轮
+    kept = select_window(turn_tokens, max(1, max_turns // 2), max(1, max_tokens // 2))
+    dropped = [message for turn in turns[:len(turns) - kept] for message in turn]
+    if not dropped:
+        return {}
+
+    summary = await summarize_messages(
+        state.get("conversation_summary") or "",
+        dropped,
+        settings.context_summary_max_tokens,
+    )
+    kept_tokens = sum(turn_tokens[len(turns) - kept:])
+
+    logger.info(
+        f"🧹 Context folded: {len(turns) - kept} turns ({total_tokens - kept_tokens} tokens) into summary, "
+        f"kept {kept} turns ({kept_tokens} tokens), summary {get_token_counter().count(summary)} tokens"
+    )
+
+    return {
+        "messages": [RemoveMessage(id=message.id) for message in dropped if message.id],
+        "conversation_summary": summary,
+    }
@@ -9,6 +9,7 @@ import logging
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import END, StateGraph
 
+from src.agent.main.context import context_node
 from src.agent.main.edges import should_continue, should_retrieve
 from src.agent.main.nodes import call_llm_node, retrieve_node, router_node
 from src.agent.main.state import AgentState
@@ -22,7 +23,8 @@ def create_agent_graph() -> StateGraph:
     创建 LangGraph Agent 工作流
 
     工作流程：
-    1. START → router → 判断是否需要检索
+    0. START → context → 超出上下文窗口时将早期对话折叠进摘要
+    1. context → router → 判断是否需要检索
     2. 需要检索 → retrieve → llm → END
     3. 不需要检索 → llm → END
 
@@ -35,12 +37,14 @@ def create_agent_graph() -> StateGraph:
     workflow = StateGraph(AgentState)
 
     # 添加节点
+    workflow.add_node("context", context_node)
     workflow.add_node("router", router_node)
     workflow.add_node("retrieve", retrieve_node)
     workflow.add_node("llm", call_llm_node)
 
     # 设置入口点
-    workflow.set_entry_point("router")
+    workflow.set_entry_point("context")
+    workflow.add_edge("context", "router")
 
     # 添加条件边: router → retrieve 或 llm
     workflow.add_conditional_edges(
@@ -11,10 +11,14 @@ import logging
 from typing import Any
 
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableConfig
 
+from src.agent.main.router import get_query_router
 from src.agent.main.state import AgentState
 from src.core.config import settings
-from src.services.llm_factory import create_llm
+from src.services.llm_registry import get_llm
+from src.services.message_filter import get_message_filter
+from src.services.token_accounting import get_token_counter, get_token_metrics
 
 logger = logging.getLogger(__name__)
 
@@ -31,39 +35,10 @@ def _is_valid_user_query(query: str) -> bool:
     Returns:
         bool: True表示是有效的用户查询，False表示应该被过滤
     """
-    # 检查是否启用消息过滤
-    if not settings.message_filter_enabled:
-        return True
-
-    # 检查长度限制（防止超长指令模板）
-    if len(query) > settings.message_max_length:
-        logger.warning(f"Query too long: {len(query)} chars (max: {settings.message_max_length})")
-        return False
-
-    # 获取配置的指令关键词
-    instruction_keywords = [kw.strip() for kw in settings.instruction_keywords.split(",") if kw.strip()]
-
-    # 检查是否包含指令模板关键词
-    query_lower = query.lower()
-    for keyword in instruction_keywords:
-        if keyword.lower() in query_lower:
-            logger.warning(f"Instruction template detected: {keyword}")
-            return False
-
-    # 检查是否以指令开头
-    instruction_starts = ["You are", "Your role", "Please", "Convert", "Transform"]
-    if query.strip().startswith(tuple(instruction_starts)):
-        logger.warning("Query starts with instruction pattern")
-        return False
-
-    # 检查是否包含过多的技术术语（可能是系统消息）
-    technical_terms = [term.strip() for term in settings.technical_terms.split(",") if term.strip()]
-    technical_count = sum(1 for term in technical_terms if term.lower() in query_lower)
-    if technical_count >= settings.technical_terms_threshold:
-        logger.warning(f"Too many technical terms detected: {technical_count} (threshold: {settings.technical_terms_threshold})")
-        return False
-
-    return True
+    verdict = get_message_filter().check(query, check_source=False)
+    if not verdict.allowed:
+        logger.warning(f"Query filtered: {verdict.reason} {verdict.detail}".rstrip())
+    return verdict.allowed
 
 
 def _get_filter_reason(query: str) -> str:
@@ -76,42 +51,17 @@ def _get_filter_reason(query: str) -> str:
     Returns:
         str: 过滤原因
     """
-    # 检查长度限制
-    if len(query) > settings.message_max_length:
-        return "message_too_long"
-
-    # 获取配置的指令关键词
-    instruction_keywords = [kw.strip() for kw in settings.instruction_keywords.split(",") if kw.strip()]
-
-    # 检查是否包含指令模板关键词
-    query_lower = query.lower()
-    for keyword in instruction_keywords:
-        if keyword.lower() in query_lower:
-            return "instruction_template_detected"
-
-    # 检查是否以指令开头
-    instruction_starts = ["You are", "Your role", "Please", "Convert", "Transform"]
-    if query.strip().startswith(tuple(instruction_starts)):
-        return "instruction_pattern_detected"
-
-    # 检查是否包含过多的技术术语
-    technical_terms = [term.strip() for term in settings.technical_terms.split(",") if term.strip()]
-    technical_count = sum(1 for term in technical_terms if term.lower() in query_lower)
-    if technical_count >= settings.technical_terms_threshold:
-        return "too_many_technical_terms"
-
-    return "unknown"
+    return get_message_filter().check(query, check_source=False).reason or "unknown"
 
 
 async def router_node(state: AgentState) -> dict[str, Any]:
     """
     路由节点：判断是否需要检索知识库
 
-    策略：
-    1. 检查消息中是否包含特定关键词（产品、政策、价格等）
-    2. 检查问题类型（疑问句、指令等）
-    3. 简单打招呼 → 直接回答
-    4. 复杂问题 → 检索知识库
+    由 ROUTER_STRATEGY 选择的路由器决策（见 src/agent/main/router.py）：
+    1. 命中知识关键词（产品、政策、价格等）→ 检索知识库
+    2. 简单打招呼 / 闲聊 → 直接回答
+    3. intent 策略下，意图分类置信时以分类结果为准
 
     Args:
         state: 当前 Agent 状态
@@ -127,40 +77,13 @@ async def router_node(state: AgentState) -> dict[str, Any]:
 
     query = last_message.content
 
-    # 关键词检测（需要检索的关键词）
-    knowledge_keywords = [
-        "产品", "价格", "政策", "如何", "什么", "哪里", "怎么",
-        "退货", "保修", "发货", "配送", "支付", "订单",
-        "功能", "参数", "规格", "优惠", "活动"
-    ]
-
-    # 简单打招呼关键词（不需要检索）
-    greeting_keywords = ["你好", "您好", "hi", "hello", "早上好", "晚上好"]
-
-    # 判断是否为简单打招呼
-    is_greeting = any(kw in query.lower() for kw in greeting_keywords)
-    if is_greeting and len(query) < 20:  # 短消息且是打招呼
-        logger.info("🎯 Router: Direct response (greeting)")
-        return {
-            "next_step": "direct",
-            "tool_calls": [{"node": "router", "decision": "direct", "reason": "greeting"}]
-        }
-
-    # 判断是否需要知识库检索
-    needs_retrieval = any(kw in query for kw in knowledge_keywords)
-
-    if needs_retrieval:
-        logger.info("🎯 Router: Retrieve from knowledge base (keywords matched)")
-        return {
-            "next_step": "retrieve",
-            "tool_calls": [{"node": "router", "decision": "retrieve", "reason": "keywords"}]
-        }
+    decision = get_query_router().route(query)
+    if decision.next_step == "retrieve":
+        logger.info(f"🎯 Router: Retrieve from knowledge base ({decision.reason})")
     else:
-        logger.info("🎯 Router: Direct response (no keywords)")
-        return {
-            "next_step": "direct",
-            "tool_calls": [{"node": "router", "decision": "direct", "reason": "no_keywords"}]
-        }
+        logger.info(f"🎯 Router: Direct response ({decision.reason})")
+
+    return {"next_step": decision.next_step, "tool_calls": [decision.to_tool_call()]}
 
 
 async def retrieve_node(state: AgentState) -> dict[str, Any]:
@@ -191,6 +114,7 @@ async def retrieve_node(state: AgentState) -> dict[str, Any]:
 
     # 使用召回Agent进行多源检索
     from src.agent.recall.graph import invoke_recall_agent
+    from src.agent.recall.merge import original_score
     from src.agent.recall.schema import RecallRequest
     from src.core.utils import generate_trace_id
 
@@ -271,8 +195,8 @@ async def retrieve_node(state: AgentState) -> dict[str, Any]:
 
         formatted_docs.append(doc_text)
 
-    # 计算置信度（使用最高分）
-    confidence = recall_result.hits[0].score if recall_result.hits else 0.0
+    # 计算置信度（使用合并前的最高原始分数，RRF 等融合分数不代表相关度）
+    confidence = max(original_score(hit) for hit in recall_result.hits)
 
     # 记录召回指标
     logger.info(
@@ -303,7 +227,7 @@ async def retrieve_node(state: AgentState) -> dict[str, Any]:
     }
 
 
-async def call_llm_node(state: AgentState) -> dict[str, Any]:
+async def call_llm_node(state: AgentState, config: RunnableConfig | None = None) -> dict[str, Any]:
     """
     LLM 生成节点
 
@@ -315,6 +239,8 @@ async def call_llm_node(state: AgentState) -> dict[str, Any]:
 
     Args:
         state: 当前 Agent 状态
+        config: LangGraph 注入的运行配置（携带 stream_mode="messages" 的回调，
+            用于逐 token 流式输出）
 
     Returns:
         更新的状态（包含新的 AI 消息）
@@ -363,6 +289,14 @@ async def call_llm_node(state: AgentState) -> dict[str, Any]:
 2. 简洁明了地回答问题
 3. 如果问题涉及具体的产品、政策等信息，建议用户查看官网或联系人工客服
 4. 不要编造具体的产品信息或政策细节
+"""
+
+    # 早期对话已由 context 节点折叠为摘要
+    conversation_summary = state.get("conversation_summary")
+    if conversation_summary:
+        system_prompt += f"""
+**此前对话摘要**:
+{conversation_summary}
 """
 
     # 构建消息列表
@@ -373,19 +307,30 @@ async def call_llm_node(state: AgentState) -> dict[str, Any]:
 
     # 调用 LLM
     try:
-        llm = create_llm()
-        response = await llm.ainvoke(messages)
+        # 复用进程级共享 LLM 实例（连接池 keep-alive，避免每轮对话重新握手）
+        llm = get_llm()
+        response = await llm.ainvoke(messages, config=config)
+
+        # 实际发送的 prompt（系统提示词 + RAG 上下文 + 历史消息）与回复的 token 用量
+        usage = get_token_counter().usage_for(messages, response)
+        get_token_metrics().record(usage)
 
-        logger.info(f"🤖 LLM response generated (mode: {'RAG' if retrieved_docs else 'direct'})")
+        logger.info(
+            f"🤖 LLM response generated (mode: {'RAG' if retrieved_docs else 'direct'}, "
+            f"prompt_tokens={usage.prompt_tokens}, completion_tokens={usage.completion_tokens})"
+        )
 
         # 保留 confidence_score（如果之前的节点设置了）
         result = {
             "messages": [response],
+            "token_usage": usage.to_dict(),
             "tool_calls": state.get("tool_calls", []) + [
                 {
                     "node": "call_llm",
                     "mode": "RAG" if retrieved_docs else "direct",
-                    "response_length": len(response.content) if hasattr(response, 'content') else 0
+                    "response_length": len(response.content) if hasattr(response, 'content') else 0,
+                    "prompt_tokens": usage.prompt_tokens,
+                    "completion_tokens": usage.completion_tokens,
                 }
             ]
         }
@@ -407,6 +352,7 @@ async def call_llm_node(state: AgentState) -> dict[str, Any]:
         return {
             "messages": [error_message],
             "error": str(e),
+            "token_usage": None,
             "tool_calls": state.get("tool_calls", []) + [
                 {"node": "call_llm", "error": str(e)}
             ]
@@ -0,0 +1,314 @@
+"""
+查询路由器
+
+router_node 通过路由器判断是否需要检索知识库：
+- lexical: 知识 / 打招呼 / 闲聊关键词编译为一个 Aho-Corasick 自动机，单遍扫描
+- intent: 在 lexical 基础上增加一个轻量意图分类器
+  - 查询向量为字符 n-gram 哈希向量（进程内计算，不请求 Embedding 服务）
+  - 每个意图的中心向量由种子语句在加载时计算一次
+  - 分类只需一次矩阵-向量乘积；相似度达到阈值且明显高于其他意图时使用分类结果，否则使用 lexical 结果
+- 其他名称：通过 register_query_router 注册的自定义路由器
+
+意图种子文件格式（JSON）：
+{
+    "retrieve_intents": ["knowledge"],
+    "intents": {"greeting": ["你好", ...], "chitchat": [...], "knowledge": [...]}
+}
+"""
+
+import json
+import logging
+import re
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable, Literal, Optional
+
+import numpy as np
+
+from src.core.aho_corasick import AhoCorasick
+from src.core.config import settings
+from src.services.embedding_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+RouteStep = Literal["retrieve", "direct"]
+
+# 内置意图种子文件
+DEFAULT_INTENTS_PATH = Path(__file__).with_name("router_intents.json")
+
+# 需要检索的关键词
+DEFAULT_KNOWLEDGE_KEYWORDS = (
+    "产品", "价格", "政策", "如何", "什么", "哪里", "怎么",
+    "退货", "保修", "发货", "配送", "支付", "订单",
+    "功能", "参数", "规格", "优惠", "活动",
+)
+
+# 简单打招呼关键词（不需要检索）
+DEFAULT_GREETING_KEYWORDS = ("你好", "您好", "hi", "hello", "早上好", "晚上好")
+
+# 闲聊关键词（不需要检索）
+DEFAULT_CHITCHAT_KEYWORDS = ("谢谢", "多谢", "再见", "拜拜", "哈哈", "好的", "thanks", "thank you", "bye")
+
+# 打招呼 / 闲聊只对短消息生效
+SMALL_TALK_MAX_LENGTH = 20
+
+# 意图分类结果的最低相似度 / 与第二相似意图的最小差距（否则使用关键词路由结果）
+DEFAULT_INTENT_THRESHOLD = 0.15
+DEFAULT_INTENT_MARGIN = 0.05
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+|[\u4e00-\u9fff]+")
+
+
+@dataclass(frozen=True)
+class RouteDecision:
+    """路由结果"""
+
+    next_step: RouteStep
+    reason: str
+    intent: Optional[str] = None
+    score: Optional[float] = None
+
+    def to_tool_call(self) -> dict[str, Any]:
+        """转换为 tool_calls 记录"""
+        tool_call: dict[str, Any] = {"node": "router", "decision": self.next_step, "reason": self.reason}
+        if self.intent is not None:
+            tool_call["intent"] = self.intent
+            tool_call["score"] = round(self.score or 0.0, 4)
+        return tool_call
+
+
+class QueryRouter(ABC):
+    """路由器基类"""
+
+    @abstractmethod
+    def route(self, query: str) -> RouteDecision:
+        """
+        判断查询是否需要检索知识库
+
+        Args:
+            query: 用户查询
+
+        Returns:
+            路由结果
+        """
+
+
+class LexicalRouter(QueryRouter):
+    """
+    关键词路由器
+
+    判定顺序：
+    1. 命中知识关键词 → 检索
+    2. 短消息命中打招呼 / 闲聊关键词 → 直接回答
+    3. 其他 → 直接回答
+    """
+
+    _KNOWLEDGE = "knowledge"
+    _GREETING = "greeting"
+    _CHITCHAT = "chitchat"
+
+    def __init__(
+        self,
+        knowledge_keywords: Iterable[str] = DEFAULT_KNOWLEDGE_KEYWORDS,
+        greeting_keywords: Iterable[str] = DEFAULT_GREETING_KEYWORDS,
+        chitchat_keywords: Iterable[str] = DEFAULT_CHITCHAT_KEYWORDS,
+        small_talk_max_length: int = SMALL_TALK_MAX_LENGTH,
+    ):
+        self.small_talk_max_length = small_talk_max_length
+
+        # 小写词 -> 所属类别
+        self._categories: dict[str, set[str]] = {}
+        for category, keywords in (
+            (self._KNOWLEDGE, knowledge_keywords),
+            (self._GREETING, greeting_keywords),
+            (self._CHITCHAT, chitchat_keywords),
+        ):
+            for keyword in keywords:
+                if keyword:
+                    self._categories.setdefault(keyword.lower(), set()).add(category)
+
+        self._automaton = AhoCorasick(self._categories.keys())
+
+    def route(self, query: str) -> RouteDecision:
+        matched: set[str] = set()
+        for term in self._automaton.find_all(query.lower()):
+            matched |= self._categories[term]
+
+        if self._KNOWLEDGE in matched:
+            return RouteDecision(next_step="retrieve", reason="keywords")
+
+        if len(query) < self.small_talk_max_length:
+            if self._GREETING in matched:
+                return RouteDecision(next_step="direct", reason="greeting")
+            if self._CHITCHAT in matched:
+                return RouteDecision(next_step="direct", reason="chitchat")
+
+        return RouteDecision(next_step="direct", reason="no_keywords")
+
+
+class IntentClassifier:
+    """
+    基于中心向量的意图分类器
+
+    查询向量：规范化文本中的中文单字 / 双字、英文单词，哈希到固定维度后 L2 归一化。
+    """
+
+    def __init__(self, intents: dict[str, list[str]], dim: int = 1024):
+        self.dim = dim
+        self.intents = [name for name, examples in intents.items() if examples]
+        if not self.intents:
+            raise ValueError("IntentClassifier requires at least one intent with examples")
+
+        centroids = []
+        for name in self.intents:
+            vectors = np.stack([self.embed(example) for example in intents[name]])
+            centroid = vectors.mean(axis=0)
+            norm = np.linalg.norm(centroid)
+            centroids.append(centroid / norm if norm else centroid)
+        self._centroids = np.stack(centroids)
+
+    def _features(self, text: str) -> Iterable[tuple[str, float]]:
+        for run in _TOKEN_PATTERN.findall(normalize_query(text)):
+            if run[0].isascii():
+                yield run, 1.0
+                continue
+            for char in run:
+                yield char, 0.5
+            for i in range(len(run) - 1):
+                yield run[i:i + 2], 1.0
+
+    def embed(self, text: str):
+        """计算查询的哈希向量（L2 归一化）"""
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature, weight in self._features(text):
+            vector[zlib.crc32(feature.encode("utf-8")) % self.dim] += weight
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def classify(self, query: str) -> tuple[str, float, float]:
+        """
+        返回最相似的意图及其余弦相似度
+
+        Args:
+            query: 用户查询
+
+        Returns:
+            (意图名称, 相似度, 第二相似意图的相似度)
+        """
+        scores = self._centroids @ self.embed(query)
+        best = int(scores.argmax())
+        runner_up = float(np.partition(scores, -2)[-2]) if len(scores) > 1 else 0.0
+        return self.intents[best], float(scores[best]), runner_up
+
+
+class IntentRouter(QueryRouter):
+    """关键词 + 意图分类路由器"""
+
+    def __init__(
+        self,
+        classifier: IntentClassifier,
+        retrieve_intents: Iterable[str] = ("knowledge",),
+        threshold: float = DEFAULT_INTENT_THRESHOLD,
+        margin: float = DEFAULT_INTENT_MARGIN,
+        lexical: Optional[LexicalRouter] = None,
+    ):
+        self.classifier = classifier
+        self.retrieve_intents = frozenset(retrieve_intents)
+        self.threshold = threshold
+        self.margin = margin
+        self.lexical = lexical or LexicalRouter()
+
+    def route(self, query: str) -> RouteDecision:
+        intent, score, runner_up = self.classifier.classify(query)
+        if score < self.threshold or score - runner_up < self.margin:
+            return self.lexical.route(query)
+
+        next_step: RouteStep = "retrieve" if intent in self.retrieve_intents else "direct"
+        return RouteDecision(next_step=next_step, reason="intent", intent=intent, score=score)
+
+
+def load_intent_router(path: str | Path, threshold: float) -> QueryRouter:
+    """
+    从意图种子文件构建路由器
+
+    文件无效时回退到 LexicalRouter。
+
+    Args:
+        path: 意图种子文件路径
+        threshold: 使用分类结果的最低相似度
+
+    Returns:
+        路由器实例
+    """
+    try:
+        with open(path, encoding="utf-8") as handle:
+            data = json.load(handle)
+        classifier = IntentClassifier(data.get("intents", {}))
+    except Exception as e:
+        logger.error(f"❌ Failed to load router intents from {path}: {e}")
+        return LexicalRouter()
+
+    logger.info(f"✅ Intent router loaded: {classifier.intents} from {path}")
+    return IntentRouter(
+        classifier,
+        retrieve_intents=data.get("retrieve_intents", ["knowledge"]),
+        threshold=threshold,
+    )
+
+
+_CUSTOM_ROUTERS: dict[str, QueryRouter] = {}
+
+# 全局单例（按配置签名缓存）
+_query_router: Optional[QueryRouter] = None
+_query_router_key: Optional[tuple] = None
+_query_router_lock = threading.Lock()
+
+
+def register_query_router(name: str, router: QueryRouter) -> None:
+    """
+    注册自定义路由器
+
+    ROUTER_STRATEGY 设置为该名称时使用。
+
+    Args:
+        name: 路由器名称
+        router: 路由器实例
+    """
+    global _query_router
+    _CUSTOM_ROUTERS[name] = router
+    _query_router = None
+    logger.info(f"Query router registered: {name}")
+
+
+def _build_query_router(strategy: str) -> QueryRouter:
+    if strategy == "lexical":
+        return LexicalRouter()
+    if strategy == "intent":
+        return load_intent_router(
+            settings.router_intents_path or DEFAULT_INTENTS_PATH,
+            settings.router_intent_threshold,
+        )
+
+    router = _CUSTOM_ROUTERS.get(strategy)
+    if router is None:
+        logger.warning(f"Query router not registered: {strategy}, falling back to lexical")
+        return LexicalRouter()
+    return router
+
+
+def get_query_router() -> QueryRouter:
+    """获取路由器（配置变化时重新构建）"""
+    global _query_router, _query_router_key
+
+    key = (settings.router_strategy, settings.router_intents_path, settings.router_intent_threshold)
+    if _query_router is not None and key == _query_router_key:
+        return _query_router
+
+    with _query_router_lock:
+        if _query_router is None or key != _query_router_key:
+            _query_router = _build_query_router(settings.router_strategy)
+            _query_router_key = key
+        return _query_router
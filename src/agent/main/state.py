@@ -24,6 +24,8 @@ class AgentState(TypedDict):
         next_step: 路由决策结果（"retrieve" 或 "direct"）
         error: 错误信息（如果执行失败）
         confidence_score: 置信度分数（0-1，用于判断是否需要人工介入）
+        conversation_summary: 已折叠出上下文窗口的早期对话摘要
+        token_usage: 本轮 LLM 调用的 token 用量（prompt_tokens / completion_tokens / total_tokens / source）
     """
 
     # 对话消息（使用 add_messages reducer 自动合并历史）
@@ -47,3 +49,8 @@ class AgentState(TypedDict):
     # 置信度分数
     confidence_score: float | None
 
+    # 早期对话的滚动摘要（由 context 节点维护）
+    conversation_summary: str | None
+
+    # 本轮 LLM 调用的 token 用量
+    token_usage: dict | None
@@ -10,7 +10,8 @@ from typing import Any
 from langchain_core.tools import tool
 from pydantic import BaseModel, Field
 
-from src.services.llm_factory import create_embeddings
+from src.services.embedding_cache import CachedEmbeddings
+from src.services.llm_factory import get_shared_embeddings
 from src.services.milvus_service import milvus_service  # noqa: F401 - needed for test mocking
 
 logger = logging.getLogger(__name__)
@@ -47,8 +48,8 @@ async def knowledge_search_tool(query: str, top_k: int = 3) -> str:
         格式化的检索结果字符串
     """
     try:
-        # 生成查询向量
-        embeddings = create_embeddings()
+        # 生成查询向量（带查询向量缓存）
+        embeddings = CachedEmbeddings(get_shared_embeddings())
 
         # 截断查询文本到512 tokens以内（查询通常不需要分块）
         from src.core.utils import truncate_text_to_tokens
@@ -154,7 +155,7 @@ async def search_knowledge_for_agent(query: str, top_k: int = 3) -> list[dict[st
         检索结果列表
     """
     try:
-        embeddings = create_embeddings()
+        embeddings = CachedEmbeddings(get_shared_embeddings())
         # 截断查询文本到512 tokens以内
         from src.core.utils import truncate_text_to_tokens
         truncated_query = truncate_text_to_tokens(query, max_tokens=512)
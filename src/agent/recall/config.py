@@ -4,7 +4,7 @@
 从settings加载召回配置，包括：
 - 召回源配置
 - 权重配置
-- 超时和重试配置
+- 超时和重试配置（含各召回源超时、对冲请求、提前返回）
 - 合并策略配置
 - 降级配置
 - 实验配置
@@ -12,6 +12,7 @@
 
 from typing import Any
 
+from src.agent.recall.sources.registry import list_recall_sources
 from src.core.config import settings
 
 
@@ -29,8 +30,15 @@ def load_recall_config() -> dict[str, Any]:
         "sources": settings.recall_sources,
         "weights": weights,
         "timeout_ms": settings.recall_timeout_ms,
+        "source_timeouts_ms": parse_source_weights(settings.recall_source_timeouts_ms),
         "retry": settings.recall_retry,
+        "hedge_sources": settings.recall_hedge_sources,
+        "hedge_delay_ms": settings.recall_hedge_delay_ms,
+        "early_exit_min_hits": settings.recall_early_exit_min_hits,
+        "early_exit_confidence": settings.recall_early_exit_confidence,
         "merge_strategy": settings.recall_merge_strategy,
+        "score_normalization": settings.recall_score_normalization,
+        "rrf_k": settings.recall_rrf_k,
         "degrade_threshold": settings.recall_degrade_threshold,
         "fallback_enabled": settings.recall_fallback_enabled,
         "experiment_enabled": settings.recall_experiment_enabled,
@@ -81,7 +89,7 @@ def validate_recall_config(config: dict[str, Any]) -> dict[str, bool]:
     results = {}
 
     # 验证召回源
-    valid_sources = ["vector", "faq", "keyword"]
+    valid_sources = list_recall_sources()
     invalid_sources = [s for s in config["sources"] if s not in valid_sources]
     results["sources_valid"] = len(invalid_sources) == 0
     if invalid_sources:
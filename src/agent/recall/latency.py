@@ -0,0 +1,82 @@
+"""
+召回源延迟统计
+
+记录每个召回源最近若干次成功调用的耗时，用于计算对冲请求（hedged request）的触发延迟：
+延迟样本足够时使用近期 p95，样本不足时使用配置的固定延迟。
+"""
+
+import math
+from collections import deque
+from typing import Optional
+
+# 每个召回源保留的最近样本数
+DEFAULT_WINDOW_SIZE = 200
+# 计算 p95 所需的最少样本数
+DEFAULT_MIN_SAMPLES = 20
+
+
+class SourceLatencyTracker:
+    """按召回源记录近期延迟（秒）"""
+
+    def __init__(self, window_size: int = DEFAULT_WINDOW_SIZE, min_samples: int = DEFAULT_MIN_SAMPLES):
+        self.window_size = window_size
+        self.min_samples = min_samples
+        self._samples: dict[str, deque[float]] = {}
+
+    def record(self, source: str, latency: float) -> None:
+        """记录一次成功调用的耗时"""
+        samples = self._samples.get(source)
+        if samples is None:
+            samples = self._samples[source] = deque(maxlen=self.window_size)
+        samples.append(latency)
+
+    def percentile(self, source: str, percentile: float) -> Optional[float]:
+        """
+        计算延迟分位数
+
+        Args:
+            source: 召回源名称
+            percentile: 分位数（0-100）
+
+        Returns:
+            延迟（秒），样本不足返回 None
+        """
+        samples = self._samples.get(source)
+        if not samples or len(samples) < self.min_samples:
+            return None
+
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, max(0, math.ceil(percentile / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+    def hedge_delay(self, source: str, default: float) -> float:
+        """对冲请求延迟：近期 p95，样本不足时使用默认值"""
+        p95 = self.percentile(source, 95)
+        return p95 if p95 is not None else default
+
+    def stats(self) -> dict:
+        """导出各召回源的样本数与 p50 / p95"""
+        return {
+            source: {
+                "samples": len(samples),
+                "p50_ms": round(p50 * 1000, 1) if (p50 := self.percentile(source, 50)) is not None else None,
+                "p95_ms": round(p95 * 1000, 1) if (p95 := self.percentile(source, 95)) is not None else None,
+            }
+            for source, samples in self._samples.items()
+        }
+
+    def clear(self) -> None:
+        """清空样本"""
+        self._samples.clear()
+
+
+# 全局实例（延迟初始化）
+_latency_tracker: Optional[SourceLatencyTracker] = None
+
+
+def get_latency_tracker() -> SourceLatencyTracker:
+    """获取召回源延迟统计（单例模式）"""
+    global _latency_tracker
+    if _latency_tracker is None:
+        _latency_tracker = SourceLatencyTracker()
+    return _latency_tracker
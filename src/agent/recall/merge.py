@@ -0,0 +1,238 @@
+"""
+召回结果合并策略
+
+不同召回源的分数尺度不同（向量召回为余弦相似度，FAQ / 关键词召回为启发式分数），
+直接乘以权重排序效果较差。这里提供：
+- weighted: 按召回源归一化分数（none / minmax / zscore）后乘以权重
+- rrf: Reciprocal Rank Fusion，只依赖各召回源内的排名，与分数尺度无关
+- custom: 通过 register_recall_merger() 注册的自定义合并器
+
+所有合并器都负责去重（按内容前100个字符）并按融合分数降序返回，
+原始分数保存在 metadata["original_score"] 中，供降级判断和置信度使用。
+"""
+
+import logging
+import math
+from abc import ABC, abstractmethod
+from typing import Literal, Optional
+
+from src.agent.recall.schema import RecallHit
+
+logger = logging.getLogger(__name__)
+
+ScoreNormalization = Literal["none", "minmax", "zscore"]
+
+# RRF 平滑常数（Cormack et al. 2009 推荐值）
+DEFAULT_RRF_K = 60
+
+
+def content_key(hit: RecallHit) -> str:
+    """去重键：内容的前100个字符"""
+    return hit.content[:100]
+
+
+def original_score(hit: RecallHit) -> float:
+    """合并前的原始分数（未经过合并的命中直接使用 score）"""
+    return hit.metadata.get("original_score", hit.score)
+
+
+def deduplicate_hits(hits: list[RecallHit]) -> list[RecallHit]:
+    """
+    去重召回结果（保留高分）
+
+    Args:
+        hits: 召回结果列表
+
+    Returns:
+        去重后的结果列表
+    """
+    seen_content: dict[str, RecallHit] = {}
+
+    for hit in hits:
+        key = content_key(hit)
+        if key not in seen_content or hit.score > seen_content[key].score:
+            seen_content[key] = hit
+
+    return list(seen_content.values())
+
+
+def _group_by_source(hits: list[RecallHit]) -> dict[str, list[RecallHit]]:
+    groups: dict[str, list[RecallHit]] = {}
+    for hit in hits:
+        groups.setdefault(hit.source, []).append(hit)
+    return groups
+
+
+def normalize_scores(hits: list[RecallHit], method: ScoreNormalization) -> list[float]:
+    """
+    归一化同一召回源内的分数
+
+    Args:
+        hits: 同一召回源的命中结果
+        method: 归一化方法
+
+    Returns:
+        与 hits 一一对应的归一化分数
+    """
+    scores = [hit.score for hit in hits]
+    if method == "none" or not scores:
+        return scores
+
+    if method == "minmax":
+        low, high = min(scores), max(scores)
+        if high == low:
+            # 只有一个结果或分数相同时无法拉伸，保留原始分数（截断到 [0, 1]）
+            return [min(max(score, 0.0), 1.0) for score in scores]
+        return [(score - low) / (high - low) for score in scores]
+
+    if method == "zscore":
+        mean = sum(scores) / len(scores)
+        std = math.sqrt(sum((score - mean) ** 2 for score in scores) / len(scores))
+        if std == 0:
+            return [min(max(score, 0.0), 1.0) for score in scores]
+        # 映射到 (0, 1)，便于与阈值类配置比较
+        return [1 / (1 + math.exp(-(score - mean) / std)) for score in scores]
+
+    raise ValueError(f"Unsupported score normalization: {method}")
+
+
+class RecallMerger(ABC):
+    """召回结果合并器接口"""
+
+    @abstractmethod
+    def merge(self, hits: list[RecallHit], weights: dict[str, float]) -> list[RecallHit]:
+        """
+        合并多个召回源的结果
+
+        Args:
+            hits: 所有召回源的命中结果
+            weights: 召回源权重
+
+        Returns:
+            去重后按融合分数降序排列的结果
+        """
+        pass
+
+
+class WeightedMerger(RecallMerger):
+    """按召回源归一化分数后加权"""
+
+    def __init__(self, normalization: ScoreNormalization = "none"):
+        self.normalization = normalization
+
+    def merge(self, hits: list[RecallHit], weights: dict[str, float]) -> list[RecallHit]:
+        weighted_hits = []
+
+        for source, source_hits in _group_by_source(hits).items():
+            weight = weights.get(source, 1.0)
+            normalized = normalize_scores(source_hits, self.normalization)
+
+            for hit, score in zip(source_hits, normalized):
+                weighted_hits.append(RecallHit(
+                    source=hit.source,
+                    score=score * weight,
+                    confidence=hit.confidence,
+                    reason=hit.reason,
+                    content=hit.content,
+                    metadata={
+                        **hit.metadata,
+                        "original_score": hit.score,
+                        "weight": weight,
+                    }
+                ))
+
+        return sorted(deduplicate_hits(weighted_hits), key=lambda x: x.score, reverse=True)
+
+
+class RRFMerger(RecallMerger):
+    """
+    Reciprocal Rank Fusion
+
+    融合分数 = Σ weight(source) / (k + rank)，rank 为命中在其召回源内按分数排序的名次（从1开始）。
+    多个召回源命中同一内容时分数累加。
+    """
+
+    def __init__(self, k: int = DEFAULT_RRF_K):
+        self.k = k
+
+    def merge(self, hits: list[RecallHit], weights: dict[str, float]) -> list[RecallHit]:
+        fused: dict[str, float] = {}
+        representative: dict[str, RecallHit] = {}
+        matched_sources: dict[str, list[str]] = {}
+
+        for source, source_hits in _group_by_source(hits).items():
+            weight = weights.get(source, 1.0)
+            ranked = sorted(source_hits, key=lambda x: x.score, reverse=True)
+
+            for rank, hit in enumerate(ranked, 1):
+                key = content_key(hit)
+                fused[key] = fused.get(key, 0.0) + weight / (self.k + rank)
+                matched_sources.setdefault(key, []).append(source)
+                # 代表结果取原始分数最高的命中
+                if key not in representative or hit.score > representative[key].score:
+                    representative[key] = hit
+
+        merged = [
+            RecallHit(
+                source=hit.source,
+                score=fused[key],
+                confidence=hit.confidence,
+                reason=hit.reason,
+                content=hit.content,
+                metadata={
+                    **hit.metadata,
+                    "original_score": hit.score,
+                    "weight": weights.get(hit.source, 1.0),
+                    "rrf_sources": matched_sources[key],
+                }
+            )
+            for key, hit in representative.items()
+        ]
+
+        return sorted(merged, key=lambda x: x.score, reverse=True)
+
+
+# 自定义合并器注册表
+_CUSTOM_MERGERS: dict[str, RecallMerger] = {}
+
+
+def register_recall_merger(name: str, merger: RecallMerger) -> None:
+    """
+    注册自定义合并器
+
+    RECALL_MERGE_STRATEGY=custom 时使用名为 "custom" 的合并器。
+
+    Args:
+        name: 合并器名称
+        merger: 合并器实例
+    """
+    _CUSTOM_MERGERS[name] = merger
+    logger.info(f"Recall merger registered: {name}")
+
+
+def get_recall_merger(
+    strategy: str,
+    normalization: ScoreNormalization = "none",
+    rrf_k: int = DEFAULT_RRF_K,
+) -> RecallMerger:
+    """
+    根据合并策略获取合并器
+
+    Args:
+        strategy: 合并策略（weighted / rrf / custom 或已注册的合并器名称）
+        normalization: weighted 策略的分数归一化方法
+        rrf_k: rrf 策略的平滑常数
+
+    Returns:
+        合并器实例（未知策略回退到 weighted）
+    """
+    if strategy == "rrf":
+        return RRFMerger(k=rrf_k)
+    if strategy == "weighted":
+        return WeightedMerger(normalization=normalization)
+
+    merger: Optional[RecallMerger] = _CUSTOM_MERGERS.get(strategy)
+    if merger is None:
+        logger.warning(f"Recall merger not registered: {strategy}, falling back to weighted")
+        return WeightedMerger(normalization=normalization)
+    return merger
@@ -14,9 +14,14 @@ import logging
 import time
 from typing import Any
 
+from src.agent.recall.config import parse_source_weights
+from src.agent.recall.latency import get_latency_tracker
+from src.agent.recall.merge import DEFAULT_RRF_K, get_recall_merger, original_score
+from src.agent.recall.merge import (  # noqa: F401 - 保持向后兼容
+    deduplicate_hits as _deduplicate_hits,
+)
 from src.agent.recall.schema import RecallHit, RecallRequest, RecallResult
-from src.agent.recall.sources.faq_source import FAQRecallSource
-from src.agent.recall.sources.vector_source import VectorRecallSource
+from src.agent.recall.sources.registry import get_recall_source_registry
 from src.agent.recall.state import RecallState
 from src.core.config import settings
 
@@ -80,8 +85,15 @@ async def prepare_node(state: RecallState) -> dict[str, Any]:
         "sources": experiment_config.get("sources", sources),
         "weights": {**weights, **experiment_config.get("weights", {})},
         "timeout_ms": experiment_config.get("timeout_ms", settings.recall_timeout_ms),
+        "source_timeouts_ms": parse_source_weights(settings.recall_source_timeouts_ms),
         "retry": settings.recall_retry,
+        "hedge_sources": settings.recall_hedge_sources,
+        "hedge_delay_ms": settings.recall_hedge_delay_ms,
+        "early_exit_min_hits": settings.recall_early_exit_min_hits,
+        "early_exit_confidence": settings.recall_early_exit_confidence,
         "merge_strategy": settings.recall_merge_strategy,
+        "score_normalization": settings.recall_score_normalization,
+        "rrf_k": settings.recall_rrf_k,
         "degrade_threshold": settings.recall_degrade_threshold,
         "fallback_enabled": settings.recall_fallback_enabled,
         "experiment_id": experiment_id,
@@ -103,6 +115,12 @@ async def fanout_node(state: RecallState) -> dict[str, Any]:
     """
     并行调用召回源
 
+    使用 asyncio.wait(FIRST_COMPLETED) 按完成顺序收集结果：
+    - 全局截止时间（timeout_ms）内尽量收集，已完成的召回源结果不会因其他源超时而丢弃
+    - 每个召回源有各自的截止时间（source_timeouts_ms，不超过全局截止时间）
+    - hedge_sources 中的召回源超过对冲延迟（近期 p95）仍未返回时并发发起第二次请求，取先返回者
+    - 高置信度命中数达到 early_exit_min_hits 时提前返回，不再等待较慢的召回源
+
     Args:
         state: 召回状态
 
@@ -113,38 +131,116 @@ async def fanout_node(state: RecallState) -> dict[str, Any]:
     config = state["config"]
     sources = config["sources"]
 
-    # 创建召回源实例
-    source_instances = {}
-    if "vector" in sources:
-        source_instances["vector"] = VectorRecallSource()
-    if "faq" in sources:
-        source_instances["faq"] = FAQRecallSource()
-    if "keyword" in sources:
-        from src.agent.recall.sources.keyword_source import KeywordRecallSource
-        source_instances["keyword"] = KeywordRecallSource()
+    # 获取共享的召回源实例（进程内只构建一次）
+    source_instances = get_recall_source_registry().get_many(sources)
+    tracker = get_latency_tracker()
+
+    source_timeouts = config.get("source_timeouts_ms", {})
+    hedge_sources = set(config.get("hedge_sources", []))
+    hedge_delay = config.get("hedge_delay_ms", 300) / 1000
+    early_exit_min_hits = config.get("early_exit_min_hits", 0)
+    early_exit_confidence = config.get("early_exit_confidence", 0.8)
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    global_deadline = start + config["timeout_ms"] / 1000
+
+    # task -> (召回源名称, 发起时间)；对冲请求与原请求对应同一召回源
+    pending: dict[asyncio.Task, tuple[str, float]] = {}
+    deadlines: dict[str, float] = {}
+    hedge_at: dict[str, float] = {}
+    results: dict[str, list[RecallHit]] = {}
 
     # 并行调用召回源
-    tasks = []
     for source_name in sources:
-        if source_name in source_instances:
-            task = asyncio.create_task(
-                _call_recall_source(source_instances[source_name], request, config)
+        if source_name not in source_instances:
+            continue
+        task = asyncio.create_task(
+            _call_recall_source(source_instances[source_name], request, config)
+        )
+        pending[task] = (source_name, start)
+        source_timeout = source_timeouts.get(source_name, config["timeout_ms"]) / 1000
+        deadlines[source_name] = min(global_deadline, start + source_timeout)
+        if source_name in hedge_sources:
+            hedge_at[source_name] = start + tracker.hedge_delay(source_name, hedge_delay)
+
+    try:
+        while pending:
+            now = loop.time()
+
+            # 发起到期的对冲请求
+            for source_name, fire_at in list(hedge_at.items()):
+                if fire_at <= now:
+                    del hedge_at[source_name]
+                    if source_name not in results and now < deadlines[source_name]:
+                        logger.info(f"Fanout node: {source_name} exceeded hedge delay, sending hedged request")
+                        task = asyncio.create_task(source_instances[source_name].acquire(request))
+                        pending[task] = (source_name, now)
+
+            # 取消超过各自截止时间的召回源
+            for task, (source_name, _) in list(pending.items()):
+                if deadlines[source_name] <= now:
+                    task.cancel()
+                    del pending[task]
+                    if source_name not in results:
+                        logger.warning(f"Fanout node: {source_name} timed out")
+                        results[source_name] = []
+
+            if not pending:
+                break
+
+            wake_at = min(
+                [deadlines[source_name] for source_name, _ in pending.values()]
+                + list(hedge_at.values())
+            )
+            done, _ = await asyncio.wait(
+                list(pending), timeout=max(0.0, wake_at - now), return_when=asyncio.FIRST_COMPLETED
             )
-            tasks.append((source_name, task))
 
-    # 等待所有召回源完成
-    results = {}
-    for source_name, task in tasks:
-        try:
-            hits = await asyncio.wait_for(task, timeout=config["timeout_ms"] / 1000)
-            results[source_name] = hits
-            logger.info(f"Fanout node: {source_name} returned {len(hits)} hits")
-        except asyncio.TimeoutError:
-            logger.warning(f"Fanout node: {source_name} timed out")
-            results[source_name] = []
-        except Exception as e:
-            logger.error(f"Fanout node: {source_name} failed: {e}")
-            results[source_name] = []
+            for task in done:
+                if task not in pending:
+                    # 同一召回源的另一个请求已先返回，本请求已被取消
+                    continue
+                source_name, started_at = pending.pop(task)
+                siblings = [t for t, (name, _) in pending.items() if name == source_name]
+
+                try:
+                    hits = task.result()
+                except Exception as e:
+                    if siblings:
+                        logger.warning(f"Fanout node: {source_name} request failed, waiting for hedged request: {e}")
+                        continue
+                    logger.error(f"Fanout node: {source_name} failed: {e}")
+                    hedge_at.pop(source_name, None)
+                    results[source_name] = []
+                    continue
+
+                results[source_name] = hits
+                hedge_at.pop(source_name, None)
+                tracker.record(source_name, loop.time() - started_at)
+                for sibling in siblings:
+                    sibling.cancel()
+                    del pending[sibling]
+                logger.info(f"Fanout node: {source_name} returned {len(hits)} hits")
+
+            # 高置信度命中足够时提前返回
+            if early_exit_min_hits > 0 and pending:
+                confident_hits = sum(
+                    1
+                    for hits in results.values()
+                    for hit in hits
+                    if hit.confidence >= early_exit_confidence
+                )
+                if confident_hits >= early_exit_min_hits:
+                    skipped = sorted({source_name for source_name, _ in pending.values()})
+                    logger.info(
+                        f"Fanout node: {confident_hits} high-confidence hits collected, "
+                        f"early exit without waiting for {skipped}"
+                    )
+                    break
+    finally:
+        for task in pending:
+            task.cancel()
 
     # 只返回hits，其他字段自动保留
     all_hits = []
@@ -169,29 +265,13 @@ async def merge_node(state: RecallState) -> dict[str, Any]:
     request = state["request"]
     weights = config.get("weights", {})
 
-    # 应用权重
-    weighted_hits = []
-    for hit in hits:
-        weight = weights.get(hit.source, 1.0)
-        weighted_hit = RecallHit(
-            source=hit.source,
-            score=hit.score * weight,
-            confidence=hit.confidence,
-            reason=hit.reason,
-            content=hit.content,
-            metadata={
-                **hit.metadata,
-                "original_score": hit.score,
-                "weight": weight,
-            }
-        )
-        weighted_hits.append(weighted_hit)
-
-    # 去重（按内容哈希）
-    deduplicated_hits = _deduplicate_hits(weighted_hits)
-
-    # 排序
-    sorted_hits = sorted(deduplicated_hits, key=lambda x: x.score, reverse=True)
+    # 按合并策略融合（含去重和排序）
+    merger = get_recall_merger(
+        config.get("merge_strategy", "weighted"),
+        normalization=config.get("score_normalization", "none"),
+        rrf_k=config.get("rrf_k", DEFAULT_RRF_K),
+    )
+    sorted_hits = merger.merge(hits, weights)
 
     # 限制返回数量
     top_hits = sorted_hits[:request.top_k]
@@ -217,10 +297,10 @@ async def fallback_node(state: RecallState) -> dict[str, Any]:
     hits = state["hits"]
     config = state["config"]
 
-    # 检查是否需要降级
+    # 检查是否需要降级（使用合并前的原始分数，融合分数与阈值不在同一尺度）
     needs_fallback = (
         len(hits) == 0 or
-        (hits and hits[0].score < config["degrade_threshold"])
+        max(original_score(hit) for hit in hits) < config["degrade_threshold"]
     )
 
     if needs_fallback and config["fallback_enabled"]:
@@ -327,29 +407,3 @@ async def _call_recall_source(source, request: RecallRequest, config: dict[str,
             else:
                 logger.error(f"Recall source {source.source_name} failed after {retry_count + 1} attempts: {e}")
                 raise
-
-
-def _deduplicate_hits(hits: list[RecallHit]) -> list[RecallHit]:
-    """
-    去重召回结果（保留高分）
-
-    Args:
-        hits: 召回结果列表
-
-    Returns:
-        去重后的结果列表
-    """
-    seen_content = {}
-
-    for hit in hits:
-        # 使用内容的前100个字符作为去重键
-        content_key = hit.content[:100]
-
-        if content_key not in seen_content:
-            seen_content[content_key] = hit
-        else:
-            # 保留分数更高的
-            if hit.score > seen_content[content_key].score:
-                seen_content[content_key] = hit
-
-    return list(seen_content.values())
@@ -25,6 +25,14 @@ class RecallSource(ABC):
         """
         pass
 
+    async def warmup(self) -> None:
+        """
+        预热召回源（应用启动时调用）
+
+        子类可覆盖以提前建立连接、加载规则等，默认不做任何事。
+        """
+        return None
+
     @property
     @abstractmethod
     def source_name(self) -> str:
@@ -1,59 +1,80 @@
 """
 FAQ召回源适配器
 
-实现FAQ数据访问的召回源，支持关键词匹配和向量检索。
+基于 FAQ collection（/api/admin/faq/upload/import 导入的数据）召回：
+- 倒排索引词法匹配（进程内，启动时构建，导入 / 删除后增量更新，其他进程变更后重建）
+- FAQRepository.search 向量检索
+- 问题精确匹配时直接返回，不请求 Embedding / Milvus
+- 两路结果按 FAQ 合并，分数 = 向量分数 × (1 - w) + 词法分数 × w（w = faq_recall_lexical_weight）
 """
 
+import asyncio
 import logging
-from typing import Any
+from typing import Any, Optional
 
 from src.agent.recall.schema import RecallHit, RecallRequest
 from src.agent.recall.sources.base import RecallSource
+from src.core.config import settings
+from src.services.embedding_cache import CachedEmbeddings
+from src.services.faq_index import get_faq_index
+from src.services.llm_factory import get_shared_embeddings
 
 logger = logging.getLogger(__name__)
 
+# 最低匹配分数
+MIN_SCORE = 0.3
+
 
 class FAQRecallSource(RecallSource):
     """FAQ召回源适配器"""
 
     def __init__(self):
-        # FAQ数据存储（实际项目中可能从数据库或文件加载）
-        self._faq_data = [
-            {
-                "id": "faq_001",
-                "question": "你们的退货政策是什么？",
-                "answer": "我们提供30天无理由退货服务，商品需保持原包装和标签完整。",
-                "category": "退货政策",
-                "keywords": ["退货", "退款", "退换", "30天", "无理由"]
-            },
-            {
-                "id": "faq_002",
-                "question": "如何联系客服？",
-                "answer": "您可以通过在线客服、电话400-123-4567或邮件support@example.com联系我们。",
-                "category": "联系方式",
-                "keywords": ["客服", "联系", "电话", "邮箱", "在线"]
-            },
-            {
-                "id": "faq_003",
-                "question": "配送时间需要多久？",
-                "answer": "标准配送3-5个工作日，加急配送1-2个工作日，偏远地区可能需要额外1-2天。",
-                "category": "配送",
-                "keywords": ["配送", "发货", "快递", "时间", "工作日"]
-            },
-            {
-                "id": "faq_004",
-                "question": "支持哪些支付方式？",
-                "answer": "我们支持支付宝、微信支付、银行卡支付和货到付款等多种支付方式。",
-                "category": "支付",
-                "keywords": ["支付", "支付宝", "微信", "银行卡", "货到付款"]
-            }
-        ]
+        self._embeddings = None
+        self._index_lock = asyncio.Lock()
 
     @property
     def source_name(self) -> str:
         """召回源名称"""
         return "faq"
 
+    def _get_embeddings(self) -> CachedEmbeddings:
+        """获取embeddings实例（带查询向量缓存，实例内复用）"""
+        if self._embeddings is None:
+            self._embeddings = CachedEmbeddings(get_shared_embeddings())
+        return self._embeddings
+
+    def _get_repository(self):
+        """获取 FAQ Repository（Milvus 未初始化时抛出 RuntimeError）"""
+        from src.repositories import get_faq_repository
+
+        return get_faq_repository()
+
+    async def _ensure_index(self) -> None:
+        """倒排索引未构建、或其他进程（如 worker 导入 FAQ）变更了 FAQ 时从 FAQ collection 构建"""
+        index = get_faq_index()
+        if index.ready:
+            seen = index.shared_generation.seen
+            if not await index.shared_generation.changed():
+                return
+            logger.info("🔄 FAQ changed in another process, rebuilding FAQ index")
+            async with self._index_lock:
+                try:
+                    await index.build(self._get_repository())
+                except Exception:
+                    # 重建失败时继续使用旧索引，下次召回重试
+                    index.shared_generation.seen = seen
+                    raise
+            return
+
+        async with self._index_lock:
+            if index.ready:
+                return
+            await index.build(self._get_repository())
+
+    async def warmup(self) -> None:
+        """应用启动时构建倒排索引"""
+        await self._ensure_index()
+
     async def acquire(self, request: RecallRequest) -> list[RecallHit]:
         """
         执行FAQ召回
@@ -65,29 +86,73 @@ class FAQRecallSource(RecallSource):
             召回命中结果列表
         """
         try:
-            query = request.query.lower()
+            query = request.query.strip()
+            if not query:
+                return []
+
+            try:
+                await self._ensure_index()
+            except Exception as e:
+                logger.warning(f"FAQ recall: index unavailable, using vector search only: {e}")
+
+            lexical_matches = get_faq_index().search(query, top_k=request.top_k * 2)
+
+            # 精确匹配：直接返回，不请求 Embedding / Milvus
+            exact_matches = [match for match in lexical_matches if match.exact]
+            if exact_matches:
+                hits = [
+                    self._build_hit(
+                        faq_id=match.faq.faq_id,
+                        text=match.faq.text,
+                        metadata=match.faq.metadata,
+                        score=1.0,
+                        lexical_score=1.0,
+                        vector_score=None,
+                        match_type="exact",
+                    )
+                    for match in exact_matches[:request.top_k]
+                ]
+                logger.info(f"FAQ recall: exact match for '{request.query}' ({len(hits)} results)")
+                return hits
+
+            candidates: dict[str, dict[str, Any]] = {}
+            for match in lexical_matches:
+                candidates[match.faq.faq_id] = {
+                    "text": match.faq.text,
+                    "metadata": match.faq.metadata,
+                    "lexical": match.score,
+                    "vector": None,
+                }
+
+            for faq in await self._vector_search(query, request.top_k):
+                faq_id = faq.id or faq.text[:100]
+                candidate = candidates.setdefault(
+                    faq_id,
+                    {"text": faq.text, "metadata": faq.metadata, "lexical": 0.0, "vector": None},
+                )
+                candidate["vector"] = faq.score
+
+            lexical_weight = settings.faq_recall_lexical_weight
             hits = []
-
-            # 关键词匹配策略
-            for faq in self._faq_data:
-                score = self._calculate_faq_score(query, faq)
-
-                if score > 0.3:  # 设置最低匹配阈值
-                    hit = RecallHit(
-                        source=self.source_name,
+            for faq_id, candidate in candidates.items():
+                if candidate["vector"] is None:
+                    # 向量检索未返回该FAQ（或不可用）时只使用词法分数
+                    score = candidate["lexical"]
+                    match_type = "keyword"
+                else:
+                    score = candidate["vector"] * (1 - lexical_weight) + candidate["lexical"] * lexical_weight
+                    match_type = "hybrid" if candidate["lexical"] > 0 else "vector"
+
+                if score > MIN_SCORE:
+                    hits.append(self._build_hit(
+                        faq_id=faq_id,
+                        text=candidate["text"],
+                        metadata=candidate["metadata"],
                         score=score,
-                        confidence=min(score * 1.2, 1.0),  # 稍微提高置信度
-                        reason=f"FAQ关键词匹配 (匹配度: {score:.3f})",
-                        content=f"Q: {faq['question']}\nA: {faq['answer']}",
-                        metadata={
-                            "faq_id": faq["id"],
-                            "question": faq["question"],
-                            "answer": faq["answer"],
-                            "category": faq["category"],
-                            "match_type": "keyword"
-                        }
-                    )
-                    hits.append(hit)
+                        lexical_score=candidate["lexical"],
+                        vector_score=candidate["vector"],
+                        match_type=match_type,
+                    ))
 
             # 按分数排序
             hits.sort(key=lambda x: x.score, reverse=True)
@@ -107,37 +172,43 @@ class FAQRecallSource(RecallSource):
             logger.error(f"FAQ recall failed for '{request.query}': {e}")
             return []
 
-    def _calculate_faq_score(self, query: str, faq: dict[str, Any]) -> float:
-        """
-        计算FAQ匹配分数
-
-        Args:
-            query: 查询文本
-            faq: FAQ数据
-
-        Returns:
-            匹配分数 (0-1)
-        """
-        score = 0.0
-
-        # 1. 问题匹配（权重最高）
-        question = faq["question"].lower()
-        if any(word in question for word in query.split()):
-            score += 0.4
-
-        # 2. 关键词匹配
-        keywords = faq["keywords"]
-        matched_keywords = sum(1 for keyword in keywords if keyword in query)
-        if matched_keywords > 0:
-            score += (matched_keywords / len(keywords)) * 0.4
-
-        # 3. 答案内容匹配
-        answer = faq["answer"].lower()
-        if any(word in answer for word in query.split()):
-            score += 0.2
-
-        # 4. 完全匹配奖励
-        if query in question or any(keyword in query for keyword in keywords):
-            score += 0.2
+    async def _vector_search(self, query: str, top_k: int) -> list:
+        """向量检索 FAQ collection（失败时返回空列表，只使用词法结果）"""
+        try:
+            repository = self._get_repository()
+            query_embedding = await self._get_embeddings().aembed_query(query)
+            return await repository.search(query_embedding=query_embedding, top_k=top_k)
+        except Exception as e:
+            logger.warning(f"FAQ recall: vector search unavailable: {e}")
+            return []
 
-        return min(score, 1.0)
+    def _build_hit(
+        self,
+        faq_id: str,
+        text: str,
+        metadata: dict[str, Any],
+        score: float,
+        lexical_score: float,
+        vector_score: Optional[float],
+        match_type: str,
+    ) -> RecallHit:
+        question = metadata.get("question", "")
+        answer = metadata.get("answer", "")
+        content = f"Q: {question}\nA: {answer}" if question and answer else text
+
+        return RecallHit(
+            source=self.source_name,
+            score=score,
+            confidence=score,
+            reason=f"FAQ匹配 ({match_type}, 匹配度: {score:.3f})",
+            content=content,
+            metadata={
+                "faq_id": faq_id,
+                "question": question,
+                "answer": answer,
+                "category": metadata.get("category", ""),
+                "match_type": match_type,
+                "lexical_score": lexical_score,
+                "vector_score": vector_score,
+            }
+        )
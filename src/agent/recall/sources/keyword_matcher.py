@@ -0,0 +1,146 @@
+"""
+关键词规则匹配器
+
+将所有规则的关键词和同义词在加载时编译为一个 Aho-Corasick 自动机：
+- 每次查询只扫描一遍查询文本，耗时与查询长度和命中数相关，与规则数量无关
+- 同一位置重叠的词（如"技术支持"与"支持"）都会被识别
+- 匹配不区分大小写
+
+规则文件格式（JSON）：
+{
+    "synonyms": {"价格": ["费用", "价钱"]},
+    "rules": [
+        {"id": "rule_001", "keywords": ["价格", "多少钱"], "content": "...", "category": "价格咨询", "priority": 0.9}
+    ]
+}
+"""
+
+import json
+import logging
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from src.core.aho_corasick import AhoCorasick
+
+logger = logging.getLogger(__name__)
+
+# 内置规则文件
+DEFAULT_RULES_PATH = Path(__file__).with_name("keyword_rules.json")
+
+# 旧格式 patterns 中可折叠为关键词的纯文本多选（如 "价格|费用"）
+_LITERAL_ALTERNATION = re.compile(r"^[^\\.^$*+?{}\[\]()]+$")
+
+
+@dataclass
+class KeywordRule:
+    """关键词规则"""
+
+    id: str
+    keywords: list[str]
+    content: str
+    category: str = ""
+    priority: float = 0.5
+
+
+class KeywordRuleSet:
+    """
+    编译后的关键词规则集
+
+    评分规则：
+    - 关键词覆盖率 × 0.4
+    - 命中任一关键词 +0.3
+    - 同义词命中的关键词占比 × 0.2
+    - 以上乘以规则优先级，命中任一关键词再 +0.1
+    """
+
+    def __init__(self, rules: list[dict[str, Any]], synonyms: dict[str, list[str]] | None = None):
+        synonyms = {key.lower(): [s.lower() for s in values] for key, values in (synonyms or {}).items()}
+
+        self.rules: list[KeywordRule] = []
+        # 词 -> [(规则下标, 关键词下标, 是否同义词)]
+        self._term_index: dict[str, list[tuple[int, int, bool]]] = {}
+
+        for rule in rules:
+            keywords = list(dict.fromkeys(k.lower() for k in rule.get("keywords", []) if k))
+            for pattern in rule.get("patterns", []):
+                # 兼容旧格式：纯文本多选折叠为关键词，正则不再逐条执行
+                if _LITERAL_ALTERNATION.match(pattern):
+                    keywords.extend(k.lower() for k in pattern.split("|") if k and k.lower() not in keywords)
+                else:
+                    logger.warning(f"Keyword rule {rule.get('id')}: regex pattern ignored: {pattern}")
+            if not keywords:
+                continue
+
+            rule_index = len(self.rules)
+            self.rules.append(KeywordRule(
+                id=str(rule.get("id", rule_index)),
+                keywords=keywords,
+                content=rule.get("content", ""),
+                category=rule.get("category", ""),
+                priority=float(rule.get("priority", 0.5)),
+            ))
+
+            for keyword_index, keyword in enumerate(keywords):
+                self._term_index.setdefault(keyword, []).append((rule_index, keyword_index, False))
+                for synonym in synonyms.get(keyword, []):
+                    self._term_index.setdefault(synonym, []).append((rule_index, keyword_index, True))
+
+        self._automaton = AhoCorasick(self._term_index.keys())
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    @property
+    def term_count(self) -> int:
+        return len(self._term_index)
+
+    def score(self, query: str) -> list[tuple[KeywordRule, float]]:
+        """
+        单遍扫描查询并计算命中规则的分数
+
+        Args:
+            query: 查询文本
+
+        Returns:
+            [(规则, 分数)]，只包含至少命中一个关键词或同义词的规则
+        """
+        # 规则下标 -> (直接命中的关键词下标, 同义词命中的关键词下标)
+        matched: dict[int, tuple[set[int], set[int]]] = {}
+        for term in self._automaton.find_all(query.lower()):
+            for rule_index, keyword_index, is_synonym in self._term_index[term]:
+                direct, via_synonym = matched.setdefault(rule_index, (set(), set()))
+                (via_synonym if is_synonym else direct).add(keyword_index)
+
+        results = []
+        for rule_index, (direct, via_synonym) in matched.items():
+            rule = self.rules[rule_index]
+            total = len(rule.keywords)
+
+            score = 0.0
+            if direct:
+                score += len(direct) / total * 0.4 + 0.3
+            if via_synonym:
+                score += len(via_synonym) / total * 0.2
+            score *= rule.priority
+            if direct:
+                score += 0.1
+
+            results.append((rule, min(score, 1.0)))
+        return results
+
+
+def load_keyword_rules(path: str | Path) -> KeywordRuleSet:
+    """
+    从 JSON 文件加载并编译规则
+
+    Args:
+        path: 规则文件路径
+
+    Returns:
+        编译后的规则集
+    """
+    with open(path, encoding="utf-8") as handle:
+        data = json.load(handle)
+    return KeywordRuleSet(data.get("rules", []), data.get("synonyms", {}))
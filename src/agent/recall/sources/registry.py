@@ -0,0 +1,127 @@
+"""
+召回源注册表
+
+召回源按名称注册工厂，进程内每个召回源只构建一次并在请求间共享：
+- 内置召回源：vector / faq / keyword
+- 自定义召回源通过 register_recall_source() 注册，无需修改 fanout_node
+- 应用启动时调用 warmup() 预建实例并预热 Embedding 客户端
+"""
+
+import logging
+from typing import Callable, Optional
+
+from src.agent.recall.sources.base import RecallSource
+from src.agent.recall.sources.faq_source import FAQRecallSource
+from src.agent.recall.sources.keyword_source import KeywordRecallSource
+from src.agent.recall.sources.vector_source import VectorRecallSource
+
+logger = logging.getLogger(__name__)
+
+RecallSourceFactory = Callable[[], RecallSource]
+
+# 召回源工厂注册表
+_SOURCE_FACTORIES: dict[str, RecallSourceFactory] = {
+    "vector": VectorRecallSource,
+    "faq": FAQRecallSource,
+    "keyword": KeywordRecallSource,
+}
+
+
+def register_recall_source(name: str, factory: RecallSourceFactory) -> None:
+    """
+    注册召回源
+
+    Args:
+        name: 召回源名称（与 RECALL_SOURCES 配置中的名称对应）
+        factory: 无参工厂（通常为召回源类本身）
+    """
+    _SOURCE_FACTORIES[name] = factory
+    # 已创建的同名实例需要按新工厂重建
+    if _recall_source_registry is not None:
+        _recall_source_registry.discard(name)
+    logger.info(f"Recall source registered: {name}")
+
+
+def list_recall_sources() -> list[str]:
+    """列出所有已注册的召回源名称"""
+    return list(_SOURCE_FACTORIES.keys())
+
+
+class RecallSourceRegistry:
+    """
+    召回源实例注册表
+
+    按名称缓存召回源实例，规则表、Embedding 客户端等只初始化一次。
+    """
+
+    def __init__(self):
+        self._instances: dict[str, RecallSource] = {}
+
+    def get(self, name: str) -> Optional[RecallSource]:
+        """
+        获取共享的召回源实例
+
+        Args:
+            name: 召回源名称
+
+        Returns:
+            召回源实例，未注册返回 None
+        """
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        factory = _SOURCE_FACTORIES.get(name)
+        if factory is None:
+            logger.warning(f"Recall source not registered: {name}")
+            return None
+
+        instance = factory()
+        self._instances[name] = instance
+        logger.info(f"Recall source created: {name}")
+        return instance
+
+    def get_many(self, names: list[str]) -> dict[str, RecallSource]:
+        """获取多个召回源实例（忽略未注册的名称）"""
+        instances = {}
+        for name in names:
+            instance = self.get(name)
+            if instance is not None:
+                instances[name] = instance
+        return instances
+
+    async def warmup(self, names: list[str]) -> None:
+        """
+        预建召回源实例并执行预热
+
+        单个召回源预热失败只记录日志，不影响应用启动。
+
+        Args:
+            names: 需要预热的召回源名称
+        """
+        for name, instance in self.get_many(names).items():
+            try:
+                await instance.warmup()
+                logger.info(f"✅ Recall source warmed up: {name}")
+            except Exception as e:
+                logger.warning(f"⚠️ Recall source warmup failed: {name}: {e}")
+
+    def discard(self, name: str) -> None:
+        """移除已缓存的实例（下次获取时重建）"""
+        self._instances.pop(name, None)
+
+    def clear(self) -> None:
+        """清空所有缓存的实例"""
+        self._instances.clear()
+
+
+# 全局注册表实例（延迟初始化）
+_recall_source_registry: Optional[RecallSourceRegistry] = None
+
+
+def get_recall_source_registry() -> RecallSourceRegistry:
+    """获取召回源注册表（单例模式）"""
+    global _recall_source_registry
+    if _recall_source_registry is None:
+        _recall_source_registry = RecallSourceRegistry()
+    return _recall_source_registry
@@ -10,7 +10,8 @@ from src.agent.recall.schema import RecallHit, RecallRequest
 from src.agent.recall.sources.base import RecallSource
 from src.core.config import settings
 from src.core.utils import truncate_text_to_tokens
-from src.services.llm_factory import create_embeddings
+from src.services.embedding_cache import CachedEmbeddings
+from src.services.llm_factory import get_shared_embeddings
 from src.services.milvus_service import milvus_service
 
 logger = logging.getLogger(__name__)
@@ -22,6 +23,16 @@ class VectorRecallSource(RecallSource):
     def __init__(self):
         self._embeddings = None
 
+    def _get_embeddings(self) -> CachedEmbeddings:
+        """获取embeddings实例（带查询向量缓存，实例内复用）"""
+        if self._embeddings is None:
+            self._embeddings = CachedEmbeddings(get_shared_embeddings())
+        return self._embeddings
+
+    async def warmup(self) -> None:
+        """创建 Embedding 客户端并发送一次请求，提前建立长连接"""
+        await self._get_embeddings().aembed_query("warmup")
+
     @property
     def source_name(self) -> str:
         """召回源名称"""
@@ -38,9 +49,7 @@ class VectorRecallSource(RecallSource):
             召回命中结果列表
         """
         try:
-            # 获取embeddings实例
-            if self._embeddings is None:
-                self._embeddings = create_embeddings()
+            embeddings = self._get_embeddings()
 
             # 截断查询文本以避免token限制错误
             # 使用vector_chunk_size作为最大token数，确保不超过嵌入模型的限制
@@ -56,8 +65,8 @@ class VectorRecallSource(RecallSource):
                     f"to avoid token limit (max_tokens: {settings.vector_chunk_size})"
                 )
 
-            # 生成查询向量
-            query_embedding = await self._embeddings.aembed_query(truncated_query)
+            # 生成查询向量（命中缓存时不请求 Embedding API）
+            query_embedding = await embeddings.aembed_query(truncated_query)
 
             # 调用Milvus检索
             results = await milvus_service.search_knowledge(
@@ -6,12 +6,12 @@
 
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from pydantic import BaseModel
 
 from src.api.admin.dependencies import verify_admin_token
-from src.core.config import get_settings
 from src.db.base import DatabaseService
+from src.db.dependencies import get_db_service
 from src.db.repositories.conversation_repository import ConversationRepository
 
 router = APIRouter(prefix="/api/admin/analytics", tags=["Analytics"])
@@ -30,24 +30,23 @@ class DailyStatsResponse(BaseModel):
     count: int
 
 
+class HourlyStatsResponse(BaseModel):
+    """每小时统计响应"""
+    hour: str
+    count: int
+    avg_confidence: float
+
+
 class AnalyticsResponse(BaseModel):
     """统计响应"""
     overview: OverviewStatsResponse
     daily_stats: List[DailyStatsResponse]
 
 
-async def get_conversation_repository():
-    """获取对话历史 Repository - 依赖注入"""
-    settings = get_settings()
-    db_service = DatabaseService(settings.postgres_url)
-
-    try:
-        # 使用 get_session 上下文管理器
-        async with db_service.get_session() as session:
-            yield ConversationRepository(session)
-    finally:
-        # 确保连接被正确关闭
-        await db_service.close()
+async def get_conversation_repository(db_service: DatabaseService = Depends(get_db_service)):
+    """获取对话历史 Repository - 依赖注入（使用全局连接池）"""
+    async with db_service.get_session() as session:
+        yield ConversationRepository(session)
 
 
 @router.get("/overview", response_model=OverviewStatsResponse)
@@ -113,3 +112,32 @@ async def get_daily_stats(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"获取每日统计失败: {str(e)}"
         )
+
+
+@router.get("/hourly", response_model=List[HourlyStatsResponse])
+async def get_hourly_stats(
+    hours: int = Query(24, ge=1, le=24 * 31),
+    current_user: dict = Depends(verify_admin_token),
+    conversation_repo: ConversationRepository = Depends(get_conversation_repository)
+):
+    """
+    获取每小时统计
+
+    Args:
+        hours: 统计小时数
+        current_user: 当前用户信息
+        conversation_repo: 对话历史 Repository（依赖注入）
+
+    Returns:
+        List[HourlyStatsResponse]: 每小时统计数据
+    """
+    try:
+        hourly_stats = await conversation_repo.get_hourly_stats(hours=hours)
+
+        return [HourlyStatsResponse(**stat) for stat in hourly_stats]
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"获取每小时统计失败: {str(e)}"
+        )
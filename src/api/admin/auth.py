@@ -11,6 +11,7 @@ from src.api.admin.dependencies import get_admin_security
 from src.core.admin_security_bcrypt import AdminSecurity
 from src.core.config import get_settings
 from src.db.base import DatabaseService
+from src.db.dependencies import get_db_service
 from src.db.models import AdminUser
 
 router = APIRouter(prefix="/api/admin/auth", tags=["Admin Auth"])
@@ -38,7 +39,8 @@ class RefreshRequest(BaseModel):
 @router.post("/login", response_model=LoginResponse)
 async def login(
     request: LoginRequest,
-    admin_security: AdminSecurity = Depends(get_admin_security)
+    admin_security: AdminSecurity = Depends(get_admin_security),
+    db_service: DatabaseService = Depends(get_db_service)
 ):
     """
     管理员登录
@@ -46,6 +48,7 @@ async def login(
     Args:
         request: 登录请求
         admin_security: 管理员安全认证实例
+        db_service: 全局数据库服务（依赖注入）
 
     Returns:
         LoginResponse: 登录响应
@@ -53,36 +56,29 @@ async def login(
     Raises:
         HTTPException: 用户名或密码错误时抛出 401 错误
     """
-    settings = get_settings()
-
     # 从数据库查询管理员账户
-    db_service = DatabaseService(settings.postgres_url)
-    try:
-        async with db_service.get_session() as session:
-            from sqlalchemy import select
-            result = await session.execute(
-                select(AdminUser).where(AdminUser.username == request.username)
+    async with db_service.get_session() as session:
+        from sqlalchemy import select
+        result = await session.execute(
+            select(AdminUser).where(AdminUser.username == request.username)
+        )
+        admin_user = result.scalar_one_or_none()
+
+        # 验证用户存在且账户状态为激活（'Y'）
+        if not admin_user or admin_user.is_active != "Y":
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="用户名或密码错误",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+
+        # 验证密码
+        if not admin_security.verify_password(request.password, admin_user.password_hash):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="用户名或密码错误",
+                headers={"WWW-Authenticate": "Bearer"},
             )
-            admin_user = result.scalar_one_or_none()
-
-            # 验证用户存在且账户状态为激活（'Y'）
-            if not admin_user or admin_user.is_active != "Y":
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="用户名或密码错误",
-                    headers={"WWW-Authenticate": "Bearer"},
-                )
-
-            # 验证密码
-            if not admin_security.verify_password(request.password, admin_user.password_hash):
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="用户名或密码错误",
-                    headers={"WWW-Authenticate": "Bearer"},
-                )
-    finally:
-        # 确保数据库引擎被正确释放，避免连接泄漏
-        await db_service.engine.dispose()
 
     # 生成访问令牌和刷新令牌
     token_data = {
@@ -98,6 +94,7 @@ async def login(
     }
     refresh_token = admin_security.create_refresh_token(refresh_token_data)
 
+    settings = get_settings()
     return LoginResponse(
         access_token=access_token,
         refresh_token=refresh_token,
@@ -4,15 +4,18 @@
 提供对话历史查询和监控接口。
 """
 
+import base64
 from datetime import datetime
-from typing import Any, List, Optional
+from typing import Any, List, Literal, Optional, Tuple
+from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from pydantic import BaseModel, Field
 
 from src.api.admin.dependencies import verify_admin_token
-from src.core.config import get_settings
+from src.core.config import settings
 from src.db.base import DatabaseService
+from src.db.dependencies import get_db_service
 from src.db.repositories.conversation_repository import ConversationRepository
 
 router = APIRouter(prefix="/api/admin/conversations", tags=["Conversation Monitoring"])
@@ -35,20 +38,41 @@ class ConversationListResponse(BaseModel):
     total: int
     page: int
     page_size: int
+    total_is_estimate: bool = Field(default=False, description="total 是否为查询计划估计值")
+    next_cursor: Optional[str] = Field(default=None, description="下一页游标（传给 cursor 参数）")
 
 
-async def get_conversation_repository():
-    """获取对话历史 Repository - 依赖注入"""
-    settings = get_settings()
-    db_service = DatabaseService(settings.postgres_url)
+async def get_conversation_repository(db_service: DatabaseService = Depends(get_db_service)):
+    """获取对话历史 Repository - 依赖注入（使用全局连接池）"""
+    async with db_service.get_session() as session:
+        yield ConversationRepository(session)
 
+
+def _encode_cursor(conversation) -> str:
+    raw = f"{conversation.created_at.isoformat()}|{conversation.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
     try:
-        # 使用 get_session 上下文管理器
-        async with db_service.get_session() as session:
-            yield ConversationRepository(session)
-    finally:
-        # 确保连接被正确关闭
-        await db_service.close()
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, conversation_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), UUID(conversation_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="无效的分页游标")
+
+
+async def _count_conversations(
+    conversation_repo: ConversationRepository, count_mode: str, **filters
+) -> Tuple[int, bool]:
+    """统计总数，返回 (总数, 是否为估计值)"""
+    if count_mode != "exact":
+        estimate = await conversation_repo.estimate_conversations(**filters)
+        if estimate is not None and (
+            count_mode == "estimate" or estimate > settings.conversation_exact_count_threshold
+        ):
+            return estimate, True
+    return await conversation_repo.count_conversations(**filters), False
 
 
 @router.get("/history", response_model=ConversationListResponse)
@@ -58,6 +82,10 @@ async def get_conversation_history(
     start_date: Optional[datetime] = Query(None, description="开始日期"),
     end_date: Optional[datetime] = Query(None, description="结束日期"),
     session_id: Optional[str] = Query(None, description="会话ID筛选"),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的 next_cursor，传入时忽略 page）"),
+    count_mode: Literal["exact", "estimate", "auto"] = Query(
+        "auto", description="总数统计方式：exact 精确计数；estimate 查询计划估计；auto 估计值超过阈值时使用估计值"
+    ),
     current_user: dict = Depends(verify_admin_token),
     conversation_repo: ConversationRepository = Depends(get_conversation_repository)
 ):
@@ -70,12 +98,17 @@ async def get_conversation_history(
         start_date: 开始日期
         end_date: 结束日期
         session_id: 会话ID筛选（模糊匹配）
+        cursor: 分页游标（按 created_at, id 定位，深翻页不扫描前面的记录）
+        count_mode: 总数统计方式
         current_user: 当前用户信息
         conversation_repo: 对话历史 Repository（依赖注入）
 
     Returns:
         ConversationListResponse: 对话历史列表响应
     """
+    position = _decode_cursor(cursor) if cursor else None
+    filters = {"start_date": start_date, "end_date": end_date, "session_id": session_id}
+
     try:
 
         skip = (page - 1) * page_size
@@ -84,17 +117,12 @@ async def get_conversation_history(
         conversations = await conversation_repo.get_conversations(
             skip=skip,
             limit=page_size,
-            start_date=start_date,
-            end_date=end_date,
-            session_id=session_id
+            cursor=position,
+            **filters
         )
 
         # 获取总数
-        total = await conversation_repo.count_conversations(
-            start_date=start_date,
-            end_date=end_date,
-            session_id=session_id
-        )
+        total, total_is_estimate = await _count_conversations(conversation_repo, count_mode, **filters)
 
         # 格式化响应
         conversation_responses = [
@@ -114,7 +142,9 @@ async def get_conversation_history(
             conversations=conversation_responses,
             total=total,
             page=page,
-            page_size=page_size
+            page_size=page_size,
+            total_is_estimate=total_is_estimate,
+            next_cursor=_encode_cursor(conversations[-1]) if len(conversations) == page_size else None
         )
 
     except Exception as e:
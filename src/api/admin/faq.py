@@ -5,13 +5,11 @@ FAQ管理 API
 """
 
 import logging
-import time
 import uuid
-from typing import Dict, Optional
+from typing import Optional
 
 from fastapi import (
     APIRouter,
-    BackgroundTasks,
     Depends,
     File,
     Form,
@@ -26,6 +24,12 @@ from src.core.config import settings
 from src.repositories.milvus.base_milvus_repository import get_milvus_client
 from src.repositories.milvus.faq_repository import FAQRepository
 from src.services.faq_csv_parser import FAQCSVParser
+from src.services.job_queue import (
+    JobQueue,
+    PermanentJobError,
+    get_job_queue,
+    register_job_handler,
+)
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/admin/faq", tags=["FAQ Management"])
@@ -33,8 +37,8 @@ router = APIRouter(prefix="/api/admin/faq", tags=["FAQ Management"])
 # 文件大小限制（字节）
 MAX_FILE_SIZE = settings.max_upload_size_mb * 1024 * 1024
 
-# 导入任务状态存储（生产环境应使用 Redis）
-import_tasks: Dict[str, dict] = {}
+# 任务类型（由 worker 执行，状态保存在任务队列中）
+FAQ_IMPORT_JOB = "faq_import"
 
 
 async def process_faq_import_task(
@@ -48,6 +52,9 @@ async def process_faq_import_task(
     """
     后台任务：处理FAQ导入
 
+    逐批生成向量并写入 Milvus，进度随批次写入任务记录；中途失败时已写入的批次保留，
+    且不再重试（避免重复导入），尚未写入任何数据时抛出原异常由任务队列重试。
+
     Args:
         task_id: 任务ID
         file_content: CSV文件内容
@@ -55,51 +62,97 @@ async def process_faq_import_task(
         embed_cols: embedding列
         text_template: 文本模板
         language: 语言
+
+    Raises:
+        PermanentJobError: CSV为空或部分数据已写入后失败
     """
+    queue = get_job_queue()
+    imported_count = 0
     try:
-        # 更新状态为处理中
-        import_tasks[task_id]["status"] = "processing"
-        import_tasks[task_id]["message"] = "正在解析CSV..."
+        await queue.update(task_id, message="正在解析CSV...")
 
-        # 解析CSV
         parser = FAQCSVParser()
-        faqs = await parser.process_csv(
+        total_rows = parser.count_rows(file_content)
+        await queue.update(task_id, total=total_rows)
+
+        if not total_rows:
+            raise PermanentJobError("CSV文件为空或解析失败")
+
+        milvus_client = await get_milvus_client()
+        faq_repo = FAQRepository(milvus_client)
+        await faq_repo.initialize()
+
+        # 流式处理：按批生成向量，累积到 INGEST_INSERT_BATCH_SIZE 后写入 Milvus
+        pending: list[dict] = []
+        processed = 0
+        await queue.update(task_id, message=f"正在导入 {total_rows} 条FAQ...")
+        async for batch, consumed in parser.iter_faq_batches(
             file_content=file_content,
             text_columns=text_cols,
             embedding_columns=embed_cols,
             text_template=text_template,
             language=language,
-        )
+        ):
+            pending.extend(batch)
+            processed += consumed
+            if len(pending) >= settings.ingest_insert_batch_size:
+                imported_count += await faq_repo.insert_faqs(pending)
+                pending = []
+
+            await queue.update(
+                task_id,
+                processed=processed,
+                imported_count=imported_count,
+                progress=min(99, processed * 100 // total_rows),
+            )
 
-        import_tasks[task_id]["total"] = len(faqs)
-        import_tasks[task_id]["message"] = f"正在导入 {len(faqs)} 条FAQ..."
+        if pending:
+            imported_count += await faq_repo.insert_faqs(pending)
 
-        if not faqs:
-            import_tasks[task_id]["status"] = "failed"
-            import_tasks[task_id]["error"] = "CSV文件为空或解析失败"
-            return
+        if not imported_count:
+            raise PermanentJobError("CSV文件为空或解析失败")
 
-        # 插入到Milvus
-        milvus_client = await get_milvus_client()
-        faq_repo = FAQRepository(milvus_client)
-        await faq_repo.initialize()
+        await queue.update(
+            task_id,
+            progress=100,
+            processed=processed,
+            imported_count=imported_count,
+            message=f"成功导入 {imported_count} 条FAQ",
+        )
+        logger.info(f"✅ FAQ导入任务 {task_id} 完成，导入 {imported_count} 条")
 
-        inserted_count = await faq_repo.insert_faqs(faqs)
+    except PermanentJobError as e:
+        await queue.update(task_id, message=f"导入失败: {e}")
+        raise
+    except Exception as e:
+        # 已写入的批次保留，imported_count 为实际导入数
+        logger.error(f"❌ FAQ导入任务 {task_id} 失败（已导入 {imported_count} 条）: {e}")
+        await queue.update(
+            task_id,
+            imported_count=imported_count,
+            message=f"导入失败（已导入 {imported_count} 条）: {str(e)}",
+        )
+        if imported_count:
+            raise PermanentJobError(str(e)) from e
+        raise
 
-        # 更新状态为完成
-        import_tasks[task_id]["status"] = "completed"
-        import_tasks[task_id]["progress"] = 100
-        import_tasks[task_id]["processed"] = len(faqs)
-        import_tasks[task_id]["imported_count"] = inserted_count
-        import_tasks[task_id]["message"] = f"成功导入 {inserted_count} 条FAQ"
 
-        logger.info(f"✅ FAQ导入任务 {task_id} 完成，导入 {inserted_count} 条")
+@register_job_handler(FAQ_IMPORT_JOB)
+async def run_faq_import_job(job: dict, queue: JobQueue) -> None:
+    """任务队列处理函数：读取CSV内容并执行导入"""
+    file_content = await queue.get_blob(job["task_id"])
+    if file_content is None:
+        raise PermanentJobError("任务输入已过期或不存在")
 
-    except Exception as e:
-        logger.error(f"❌ FAQ导入任务 {task_id} 失败: {e}")
-        import_tasks[task_id]["status"] = "failed"
-        import_tasks[task_id]["error"] = str(e)
-        import_tasks[task_id]["message"] = f"导入失败: {str(e)}"
+    payload = job["payload"]
+    await process_faq_import_task(
+        job["task_id"],
+        file_content,
+        payload["text_columns"],
+        payload["embedding_columns"],
+        payload["text_template"],
+        payload["language"],
+    )
 
 
 class CSVPreviewResponse(BaseModel):
@@ -188,7 +241,6 @@ async def preview_csv(
 
 @router.post("/upload/import", response_model=FAQImportResponse)
 async def import_csv(
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     text_columns: str = Form(""),
     embedding_columns: str = Form(""),
@@ -199,10 +251,9 @@ async def import_csv(
     """
     导入CSV到FAQ库（异步后台处理）
 
-    立即返回任务ID，导入在后台执行
+    立即返回任务ID，导入由任务队列 worker 执行
 
     Args:
-        background_tasks: FastAPI 后台任务
         file: CSV文件
         text_columns: 用于生成text的列名（逗号分隔）
         embedding_columns: 用于生成embedding的列名（逗号分隔）
@@ -239,28 +290,24 @@ async def import_csv(
         # 创建任务ID
         task_id = str(uuid.uuid4())
 
-        # 初始化任务状态
-        import_tasks[task_id] = {
-            "task_id": task_id,
-            "status": "pending",
-            "progress": 0,
-            "total": 0,
-            "processed": 0,
-            "imported_count": 0,
-            "message": "任务已创建，等待处理...",
-            "error": None,
-            "created_at": time.time()
-        }
-
-        # 添加后台任务
-        background_tasks.add_task(
-            process_faq_import_task,
-            task_id,
-            content,
-            text_cols,
-            embed_cols,
-            text_template,
-            language
+        # 提交到任务队列（CSV 内容单独存储）
+        await get_job_queue().enqueue(
+            FAQ_IMPORT_JOB,
+            {
+                "text_columns": text_cols,
+                "embedding_columns": embed_cols,
+                "text_template": text_template,
+                "language": language,
+            },
+            job_id=task_id,
+            blob=content,
+            state={
+                "progress": 0,
+                "total": 0,
+                "processed": 0,
+                "imported_count": 0,
+                "message": "任务已创建，等待处理...",
+            },
         )
 
         logger.info(f"📤 创建FAQ导入任务: {task_id}")
@@ -295,7 +342,7 @@ async def get_import_status(
     Returns:
         FAQImportStatusResponse: 任务状态信息
     """
-    task = import_tasks.get(task_id)
+    task = await get_job_queue().get(task_id)
 
     if not task:
         raise HTTPException(
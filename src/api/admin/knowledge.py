@@ -4,15 +4,11 @@
 提供知识库文档的 CRUD 操作接口和文件上传功能。
 """
 
-import os
-import tempfile
-import uuid
 from datetime import datetime
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional
 
 from fastapi import (
     APIRouter,
-    BackgroundTasks,
     Depends,
     File,
     Form,
@@ -26,13 +22,19 @@ from pydantic import BaseModel
 from src.api.admin.dependencies import verify_admin_token
 from src.core.config import get_settings
 from src.db.base import DatabaseService
+from src.db.dependencies import get_db_service
 from src.db.repositories.file_upload_repository import FileUploadRepository
 from src.repositories.milvus.base_milvus_repository import get_milvus_client
 from src.repositories.milvus.knowledge_repository import KnowledgeRepository
-from src.services.file_upload_processor import FileUploadProcessor
+from src.services.file_parser import FileParser
+from src.services.file_upload_processor import FILE_UPLOAD_JOB, FileUploadProcessor
+from src.services.job_queue import get_job_queue
 
 router = APIRouter(prefix="/api/admin/knowledge", tags=["Knowledge Management"])
 
+# 上传文件分块读取大小
+UPLOAD_READ_CHUNK_SIZE = 1024 * 1024
+
 
 class DocumentResponse(BaseModel):
     """文档响应"""
@@ -303,29 +305,26 @@ async def delete_document(
 
 @router.post("/upload", response_model=List[FileUploadResponse])
 async def upload_files(
-    background_tasks: BackgroundTasks,
     files: List[UploadFile] = File(...),
     source: Optional[str] = Form(None),
     version: Optional[str] = Form("1.0"),
-    current_user: dict = Depends(verify_admin_token)
+    current_user: dict = Depends(verify_admin_token),
+    db_service: DatabaseService = Depends(get_db_service)
 ):
     """
     上传文件到知识库
 
     Args:
-        background_tasks: 后台任务
         files: 上传的文件列表
         source: 文件来源
         version: 文件版本
         current_user: 当前用户信息
+        db_service: 全局数据库服务（依赖注入）
 
     Returns:
         List[FileUploadResponse]: 上传结果列表
     """
     try:
-        settings = get_settings()
-        db_service = DatabaseService(settings.postgres_url)
-
         upload_responses = []
 
         async with db_service.get_session() as session:
@@ -337,34 +336,30 @@ async def upload_files(
                     if not file.filename:
                         continue
 
-                    # 检查文件大小
-                    file_content = await file.read()
-                    if len(file_content) > 10 * 1024 * 1024:  # 10MB
+                    # 分块读取文件并写入任务输入，同时检查文件大小（不在内存中保留整个文件）
+                    max_size = _max_upload_size()
+                    head = await file.read(UPLOAD_READ_CHUNK_SIZE)
+                    staging_id, file_size = await get_job_queue().stage_blob(
+                        _iter_upload_file(file, head), max_size
+                    )
+                    if staging_id is None:
                         upload_responses.append(FileUploadResponse(
                             upload_id="",
                             filename=file.filename,
                             status="failed",
-                            message="文件大小超过限制 (10MB)"
+                            message=f"文件大小超过限制 ({max_size // 1024 // 1024}MB)"
                         ))
                         continue
 
-                    # 保存文件到临时目录
-                    temp_dir = tempfile.gettempdir()
-                    temp_filename = f"{uuid.uuid4()}_{file.filename}"
-                    temp_path = os.path.join(temp_dir, temp_filename)
-
-                    with open(temp_path, 'wb') as f:
-                        f.write(file_content)
-
                     # 检测文件类型
-                    file_type = _detect_file_type(file_content, file.filename)
+                    file_type = _detect_file_type(head[:8192], file.filename)
 
-                    # 创建上传记录
+                    # 创建上传记录（文件内容随任务存入 Redis，不落 API 主机本地磁盘）
                     upload_data = {
                         'filename': file.filename,
                         'file_type': file_type,
-                        'file_size': len(file_content),
-                        'file_path': temp_path,
+                        'file_size': file_size,
+                        'file_path': None,
                         'source': source,
                         'version': version,
                         'uploader': current_user.get('sub', 'admin'),
@@ -374,12 +369,14 @@ async def upload_files(
 
                     upload_record = await upload_repo.create_upload_record(upload_data)
 
-                    # 添加后台处理任务
-                    processor = FileUploadProcessor(db_service)
-                    background_tasks.add_task(processor.process_file, str(upload_record.id))
+                    # 提交到任务队列，由 worker 解析和入库（任务 ID 使用上传记录 ID，重试时复用文件内容）
+                    upload_id = str(upload_record.id)
+                    await get_job_queue().enqueue(
+                        FILE_UPLOAD_JOB, {"upload_id": upload_id}, job_id=upload_id, staged_blob=staging_id
+                    )
 
                     upload_responses.append(FileUploadResponse(
-                        upload_id=str(upload_record.id),
+                        upload_id=upload_id,
                         filename=file.filename,
                         status="pending",
                         message="文件上传成功，正在处理..."
@@ -405,7 +402,8 @@ async def upload_files(
 @router.get("/uploads", response_model=List[UploadStatusResponse])
 async def list_uploads(
     limit: int = Query(20, le=100, description="返回数量限制"),
-    current_user: dict = Depends(verify_admin_token)
+    current_user: dict = Depends(verify_admin_token),
+    db_service: DatabaseService = Depends(get_db_service)
 ):
     """
     获取最近上传记录
@@ -413,14 +411,12 @@ async def list_uploads(
     Args:
         limit: 返回数量限制
         current_user: 当前用户信息
+        db_service: 全局数据库服务（依赖注入）
 
     Returns:
         List[UploadStatusResponse]: 上传记录列表
     """
     try:
-        settings = get_settings()
-        db_service = DatabaseService(settings.postgres_url)
-
         async with db_service.get_session() as session:
             upload_repo = FileUploadRepository(session)
             uploads = await upload_repo.get_recent_uploads(limit)
@@ -451,7 +447,8 @@ async def list_uploads(
 @router.get("/uploads/{upload_id}", response_model=UploadStatusResponse)
 async def get_upload_status(
     upload_id: str,
-    current_user: dict = Depends(verify_admin_token)
+    current_user: dict = Depends(verify_admin_token),
+    db_service: DatabaseService = Depends(get_db_service)
 ):
     """
     获取上传处理状态
@@ -459,14 +456,12 @@ async def get_upload_status(
     Args:
         upload_id: 上传记录 ID
         current_user: 当前用户信息
+        db_service: 全局数据库服务（依赖注入）
 
     Returns:
         UploadStatusResponse: 上传状态
     """
     try:
-        settings = get_settings()
-        db_service = DatabaseService(settings.postgres_url)
-
         async with db_service.get_session() as session:
             upload_repo = FileUploadRepository(session)
             upload = await upload_repo.get_upload_by_id(upload_id)
@@ -502,32 +497,34 @@ async def get_upload_status(
 @router.post("/uploads/{upload_id}/retry")
 async def retry_upload(
     upload_id: str,
-    current_user: dict = Depends(verify_admin_token)
+    current_user: dict = Depends(verify_admin_token),
+    db_service: DatabaseService = Depends(get_db_service)
 ):
     """
     重试失败的上传
 
+    只有任务队列中已最终失败、且文件内容仍在保留期内的上传可以重试；
+    处理中或等待自动重试的上传重新提交会被处理两次，返回 409。
+
     Args:
         upload_id: 上传记录 ID
         current_user: 当前用户信息
+        db_service: 全局数据库服务（依赖注入）
 
     Returns:
         dict: 重试结果
     """
     try:
-        settings = get_settings()
-        db_service = DatabaseService(settings.postgres_url)
+        if not await get_job_queue().retry(upload_id):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="只能重试已失败且文件仍在保留期内的上传（处理中或等待自动重试时无需重试，文件过期请重新上传）"
+            )
 
         processor = FileUploadProcessor(db_service)
-        success = await processor.retry_upload(upload_id)
+        await processor.reset_upload(upload_id)
 
-        if success:
-            return {"message": "重试任务已启动"}
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="重试失败"
-            )
+        return {"message": "重试任务已启动"}
 
     except HTTPException:
         raise
@@ -541,7 +538,8 @@ async def retry_upload(
 @router.delete("/uploads/{upload_id}")
 async def rollback_upload(
     upload_id: str,
-    current_user: dict = Depends(verify_admin_token)
+    current_user: dict = Depends(verify_admin_token),
+    db_service: DatabaseService = Depends(get_db_service)
 ):
     """
     回滚上传（删除相关文档）
@@ -549,14 +547,12 @@ async def rollback_upload(
     Args:
         upload_id: 上传记录 ID
         current_user: 当前用户信息
+        db_service: 全局数据库服务（依赖注入）
 
     Returns:
         dict: 回滚结果
     """
     try:
-        settings = get_settings()
-        db_service = DatabaseService(settings.postgres_url)
-
         processor = FileUploadProcessor(db_service)
         success = await processor.rollback_upload(upload_id)
 
@@ -593,7 +589,7 @@ async def preview_file(
         FilePreviewResponse: 文件预览结果
     """
     try:
-        from src.services.file_parser import FileParser
+        from src.services.token_accounting import get_token_counter
 
         # 验证文件
         if not file.filename:
@@ -606,19 +602,21 @@ async def preview_file(
         file_content = await file.read()
 
         # 检查文件大小
-        if len(file_content) > 10 * 1024 * 1024:  # 10MB
+        max_size = FileParser.MAX_FILE_SIZE
+        if len(file_content) > max_size:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="文件大小超过限制 (10MB)"
+                detail=f"文件大小超过限制 ({max_size // 1024 // 1024}MB)"
             )
 
         # 解析文件
         parser = FileParser()
         result = await parser.parse_file(file_content, file.filename)
 
-        # 估算 token 数量（粗略估算：1 token ≈ 4 字符）
-        total_chars = sum(len(chunk) for chunk in result['chunks'])
-        estimated_tokens = total_chars // 4
+        # 按 Embedding 模型编码计算 token 数量
+        estimated_tokens = sum(
+            get_token_counter(get_settings().embedding_model_name).count_batch(result['chunks'])
+        )
 
         return FilePreviewResponse(
             filename=file.filename,
@@ -637,6 +635,19 @@ async def preview_file(
         )
 
 
+def _max_upload_size() -> int:
+    """上传文件大小上限：解析上限和任务输入上限中的较小值"""
+    return min(FileParser.MAX_FILE_SIZE, get_settings().job_max_blob_size_mb * 1024 * 1024)
+
+
+async def _iter_upload_file(file: UploadFile, head: bytes) -> AsyncIterator[bytes]:
+    """分块读取上传文件（head 为已读取的第一块）"""
+    if head:
+        yield head
+    while chunk := await file.read(UPLOAD_READ_CHUNK_SIZE):
+        yield chunk
+
+
 def _detect_file_type(file_content: bytes, filename: str) -> str:
     """
     检测文件类型
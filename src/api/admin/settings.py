@@ -4,13 +4,17 @@
 提供系统配置查看和健康检查接口。
 """
 
+import asyncio
 from typing import Any, Dict
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel
+from sqlalchemy import text
 
 from src.api.admin.dependencies import verify_admin_token
 from src.core.config import get_settings
+from src.db.base import DatabaseService
+from src.db.dependencies import get_db_service
 
 router = APIRouter(prefix="/api/admin/settings", tags=["System Settings"])
 
@@ -73,13 +77,15 @@ async def get_system_config(
 
 @router.get("/health", response_model=HealthCheckResponse)
 async def health_check(
-    current_user: dict = Depends(verify_admin_token)
+    current_user: dict = Depends(verify_admin_token),
+    db_service: DatabaseService = Depends(get_db_service)
 ):
     """
     系统健康检查
 
     Args:
         current_user: 当前用户信息
+        db_service: 全局数据库服务（依赖注入）
 
     Returns:
         HealthCheckResponse: 健康检查结果
@@ -114,12 +120,10 @@ async def health_check(
             services["redis"] = {"status": "unhealthy", "message": str(e)}
             overall_status = "degraded"
 
-        # 检查 PostgreSQL 连接
+        # 检查 PostgreSQL 连接（复用全局连接池）
         try:
-            from src.db.base import DatabaseService
-            settings = get_settings()
-            DatabaseService(settings.postgres_url)
-            # 简单连接测试
+            async with db_service.get_session() as session:
+                await asyncio.wait_for(session.execute(text("SELECT 1")), timeout=5)
             services["postgres"] = {"status": "healthy", "message": "连接正常"}
         except Exception as e:
             services["postgres"] = {"status": "unhealthy", "message": str(e)}
@@ -17,6 +17,7 @@ from src.models.knowledge import (
     SearchResult,
 )
 from src.services import llm_factory
+from src.services.embedding_cache import CachedEmbeddings
 from src.services.milvus_service import milvus_service
 
 logger = logging.getLogger(__name__)
@@ -30,24 +31,24 @@ async def upsert_knowledge(request: KnowledgeUpsertRequest) -> KnowledgeUpsertRe
     批量上传知识库文档
 
     自动处理：
-    1. 文档切片（TODO: 实现文本切片逻辑）
+    1. 文档切片（按 token 滑动窗口）
     2. 生成 Embedding
     3. 存入 Milvus
     """
     logger.info(f"📥 Upserting {len(request.documents)} documents to knowledge base")
 
     try:
-        # 创建 Embeddings 实例（按模块引用，便于测试补丁生效）
-        embeddings = llm_factory.create_embeddings()
+        # 使用进程级共享的 Embeddings 实例（按模块引用，便于测试补丁生效）
+        embeddings = llm_factory.get_shared_embeddings()
 
         # 准备插入数据
         documents_to_insert = []
 
-        for doc in request.documents:
-            # 检查文本长度并分块
-            from src.core.utils import chunk_text_for_embedding
-            chunks = chunk_text_for_embedding(doc.text, max_tokens=512)
+        # 按 token 滑动窗口批量分块（VECTOR_CHUNK_SIZE / VECTOR_CHUNK_OVERLAP）
+        from src.core.utils import chunk_texts_by_tokens
+        chunked_docs = chunk_texts_by_tokens([doc.text for doc in request.documents])
 
+        for doc, chunks in zip(request.documents, chunked_docs):
             if len(chunks) > 1:
                 logger.info(f"Document split into {len(chunks)} chunks")
 
@@ -117,8 +118,8 @@ async def search_knowledge(
     logger.info(f"🔍 Searching knowledge base: query='{query}', top_k={top_k}")
 
     try:
-        # 生成查询向量
-        embeddings = llm_factory.create_embeddings()
+        # 生成查询向量（带查询向量缓存）
+        embeddings = CachedEmbeddings(llm_factory.get_shared_embeddings())
         # 截断查询文本到512 tokens以内
         from src.core.utils import truncate_text_to_tokens
         truncated_query = truncate_text_to_tokens(query, max_tokens=512)
@@ -16,8 +16,6 @@ from langchain_core.messages import AIMessage, HumanMessage
 from src.agent.main.graph import get_agent_app
 from src.core.config import settings
 from src.core.security import verify_api_key
-from src.db.base import DatabaseService
-from src.db.dependencies import get_db_service
 from src.models.openai_schema import (
     ChatCompletionChoice,
     ChatCompletionChunk,
@@ -26,55 +24,96 @@ from src.models.openai_schema import (
     ChatCompletionRequest,
     ChatCompletionResponse,
     ChatCompletionUsage,
+    ChatCompletionUsageChunk,
     ChatMessage,
     OpenAIModelList,
     OpenAIModelRef,
 )
+from src.services.answer_cache import (
+    CachedAnswer,
+    get_answer_cache,
+    record_cached_turn,
+    session_has_history,
+)
+from src.services.conversation_writer import get_conversation_writer
+from src.services.message_filter import get_message_filter
+from src.services.token_accounting import get_token_counter
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(dependencies=[Depends(verify_api_key)])
 
+# 回放缓存答案时每个 chunk 的字符数
+CACHED_ANSWER_CHUNK_SIZE = 20
 
-def _validate_message_source(message: str) -> bool:
+
+def _build_usage(token_usage: dict | None, user_message: str, response: str) -> ChatCompletionUsage:
+    """
+    构建 usage 字段
+
+    优先使用 LLM 节点记录的实际用量（含系统提示词、RAG 上下文和历史消息）；
+    未调用 LLM 时（如答案缓存命中）按 tiktoken 计数用户消息和回复。
     """
-    验证消息来源，过滤非用户来源的消息
+    if token_usage:
+        prompt_tokens = token_usage.get("prompt_tokens", 0)
+        completion_tokens = token_usage.get("completion_tokens", 0)
+    else:
+        prompt_tokens, completion_tokens = get_token_counter().count_batch([user_message, response])
+    return ChatCompletionUsage(
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        total_tokens=prompt_tokens + completion_tokens,
+    )
 
-    Args:
-        message: 待验证的消息内容
+
+async def _lookup_cached_answer(
+    app, config: dict, user_message: str
+) -> tuple[CachedAnswer | None, int | None]:
+    """
+    查询语义答案缓存
 
     Returns:
-        bool: True表示是用户来源的消息，False表示应该被过滤
+        (缓存答案, 请求开始时的缓存 generation)；
+        generation 为 None 表示本次请求不参与答案缓存
     """
-    # 检查是否启用消息过滤
-    if not settings.message_filter_enabled:
-        return True
-
-    # 检查是否包含系统标识符
-    system_indicators = [
-        "system:", "assistant:", "ai:", "bot:", "agent:",
-        "SYSTEM:", "ASSISTANT:", "AI:", "BOT:", "AGENT:"
-    ]
-
-    message_lower = message.lower()
-    for indicator in system_indicators:
-        if indicator.lower() in message_lower:
-            logger.warning(f"System message detected: {indicator}")
-            return False
-
-    # 检查是否以系统标识符开头
-    if message.strip().startswith(tuple(system_indicators)):
-        logger.warning("Message starts with system indicator")
-        return False
-
-    # 检查是否包含过多的技术术语（可能是系统消息）
-    technical_terms = [term.strip() for term in settings.technical_terms.split(",") if term.strip()]
-    technical_count = sum(1 for term in technical_terms if term.lower() in message_lower)
-    if technical_count >= settings.technical_terms_threshold:
-        logger.warning(f"Too many technical terms detected: {technical_count} (threshold: {settings.technical_terms_threshold})")
-        return False
-
-    return True
+    if not settings.answer_cache_enabled:
+        return None, None
 
-logger = logging.getLogger(__name__)
+    # 追问依赖上下文，只对会话首轮问题使用缓存
+    if await session_has_history(app, config):
+        return None, None
 
-router = APIRouter(dependencies=[Depends(verify_api_key)])
+    answer_cache = get_answer_cache()
+    generation = answer_cache.generation
+    cached = await answer_cache.lookup(user_message)
+    if cached is not None:
+        await record_cached_turn(app, config, user_message, cached)
+    return cached, generation
+
+
+async def _save_conversation(
+    session_id: str,
+    user_message: str,
+    ai_response: str,
+    retrieved_docs: list | None,
+    confidence_score: float | None,
+) -> None:
+    """提交对话到写后队列，由后台批量写入 PostgreSQL（失败只记录日志，不影响响应）"""
+    try:
+        await get_conversation_writer().submit(
+            session_id=session_id,
+            user_message=user_message,
+            ai_response=ai_response,
+            retrieved_docs=retrieved_docs,
+            confidence_score=confidence_score,
+        )
+    except Exception as e:
+        logger.error(
+            f"❌ Failed to queue conversation for saving | "
+            f"session_id={session_id} | "
+            f"error={str(e)} | "
+            f"error_type={type(e).__name__}"
+        )
 
 
 @router.get("/models")
@@ -152,7 +191,6 @@ async def list_models() -> OpenAIModelList:
 async def chat_completions(
     request: ChatCompletionRequest,
     http_request: Request,
-    db_service: "DatabaseService" = Depends(get_db_service),
 ) -> ChatCompletionResponse | StreamingResponse:
     """
     OpenAI 兼容的 Chat Completions 端点
@@ -240,7 +278,7 @@ async def chat_completions(
                 created_timestamp=created_timestamp,
                 model=request.model,
                 requested_model=requested_model,
-                db_service=db_service,
+                include_usage=bool(request.stream_options and request.stream_options.include_usage),
             ),
             media_type="text/event-stream",
         )
@@ -253,7 +291,6 @@ async def chat_completions(
         created_timestamp=created_timestamp,
         model=request.model,
         requested_model=requested_model,
-        db_service=db_service,
     )
 
 
@@ -264,14 +301,12 @@ async def _non_stream_response(
     created_timestamp: int,
     model: str,
     requested_model: str,
-    db_service: DatabaseService,
 ) -> ChatCompletionResponse:
     """非流式响应"""
-    from src.agent.main.nodes import _get_filter_reason, _is_valid_user_query
-
-    # 在非流式路径中也进行消息验证，过滤外部指令模板
-    if not _validate_message_source(user_message):
-        logger.warning("⚠️ 非流式API层过滤非用户来源消息")
+    # 在非流式路径中也进行消息验证：单遍检查来源和外部指令模板
+    verdict = get_message_filter().check(user_message)
+    if verdict.is_source_violation:
+        logger.warning(f"⚠️ 非流式API层过滤非用户来源消息 (reason: {verdict.reason}, {verdict.detail})")
         return ChatCompletionResponse(
             id=completion_id,
             created=created_timestamp,
@@ -291,9 +326,8 @@ async def _non_stream_response(
             ),
         )
 
-    if not _is_valid_user_query(user_message):
-        filter_reason = _get_filter_reason(user_message)
-        logger.warning(f"⚠️ 非流式API层过滤无效消息 (reason: {filter_reason}, length: {len(user_message)})")
+    if not verdict.allowed:
+        logger.warning(f"⚠️ 非流式API层过滤无效消息 (reason: {verdict.reason}, length: {len(user_message)})")
         return ChatCompletionResponse(
             id=completion_id,
             created=created_timestamp,
@@ -324,10 +358,36 @@ async def _non_stream_response(
         "next_step": None,
         "error": None,
         "confidence_score": None,
+        "token_usage": None,
     }
 
     config = {"configurable": {"thread_id": session_id}}
 
+    # === 语义答案缓存：命中时跳过 Agent ===
+    cached, cache_generation = await _lookup_cached_answer(app, config, user_message)
+    if cached is not None:
+        await _save_conversation(
+            session_id=session_id,
+            user_message=user_message,
+            ai_response=cached.answer,
+            retrieved_docs=cached.retrieved_docs,
+            confidence_score=cached.confidence_score,
+        )
+
+        return ChatCompletionResponse(
+            id=completion_id,
+            created=created_timestamp,
+            model=requested_model,
+            choices=[
+                ChatCompletionChoice(
+                    index=0,
+                    message=ChatMessage(role="assistant", content=cached.answer),
+                    finish_reason="stop",
+                )
+            ],
+            usage=_build_usage(None, user_message, cached.answer),
+        )
+
     try:
         result = await app.ainvoke(initial_state, config)
 
@@ -338,45 +398,24 @@ async def _non_stream_response(
         else:
             response_content = str(ai_message)
 
-        # === 新增：异步保存对话到 PostgreSQL ===
-        # 异步保存对话历史（不阻塞响应）
-        try:
-            from src.db.repositories.conversation_repository import ConversationRepository
-
-            # 使用全局 DatabaseService（通过依赖注入）
-            async with db_service.get_session() as db_session:
-                repo = ConversationRepository(db_session)
-
-                # 保存对话记录
-                conversation = await repo.create_conversation(
-                    session_id=session_id,
-                    user_message=user_message,
-                    ai_response=response_content,
-                    retrieved_docs=result.get("retrieved_docs"),
-                    confidence_score=result.get("confidence_score")
-                )
-
-                logger.info(
-                    f"✅ Conversation saved successfully | "
-                    f"session_id={session_id} | "
-                    f"conversation_id={conversation.id}"
-                )
+        # 保存对话历史（进入写后队列，不阻塞响应）
+        await _save_conversation(
+            session_id=session_id,
+            user_message=user_message,
+            ai_response=response_content,
+            retrieved_docs=result.get("retrieved_docs"),
+            confidence_score=result.get("confidence_score"),
+        )
 
-        except Exception as e:
-            # 保存失败不影响用户响应（符合架构要求）
-            # 只记录错误日志，不抛出异常
-            logger.error(
-                f"❌ Failed to save conversation to PostgreSQL | "
-                f"session_id={session_id} | "
-                f"error={str(e)} | "
-                f"error_type={type(e).__name__}"
+        # 写入语义答案缓存
+        if cache_generation is not None and not result.get("error"):
+            await get_answer_cache().store(
+                question=user_message,
+                answer=response_content,
+                retrieved_docs=result.get("retrieved_docs"),
+                confidence_score=result.get("confidence_score"),
+                generation=cache_generation,
             )
-            # 注意：不要 raise，让响应正常返回
-
-        # 计算 Token 使用（简化版，使用字符数估算）
-        prompt_tokens = len(user_message) // 4
-        completion_tokens = len(response_content) // 4
-        total_tokens = prompt_tokens + completion_tokens
 
         # 构建 OpenAI 格式响应
         return ChatCompletionResponse(
@@ -390,11 +429,7 @@ async def _non_stream_response(
                     finish_reason="stop",
                 )
             ],
-            usage=ChatCompletionUsage(
-                prompt_tokens=prompt_tokens,
-                completion_tokens=completion_tokens,
-                total_tokens=total_tokens,
-            ),
+            usage=_build_usage(result.get("token_usage"), user_message, response_content),
         )
 
     except Exception as e:
@@ -426,17 +461,15 @@ async def _stream_response(
     created_timestamp: int,
     model: str,
     requested_model: str,
-    db_service: DatabaseService,
+    include_usage: bool = False,
 ) -> AsyncGenerator[str, None]:
     """流式响应（SSE）"""
-    from src.agent.main.nodes import _is_valid_user_query
-
     app = get_agent_app()
 
-    # 在API层进行消息来源验证
-    # 检查消息来源，过滤非用户来源的消息
-    if not _validate_message_source(user_message):
-        logger.warning("⚠️ API层过滤非用户来源消息")
+    # 在API层进行消息验证：单遍检查来源（过滤非用户来源的消息）和外部指令模板
+    verdict = get_message_filter().check(user_message)
+    if verdict.is_source_violation:
+        logger.warning(f"⚠️ API层过滤非用户来源消息 (reason: {verdict.reason}, {verdict.detail})")
         # 返回错误响应，不进入Agent流程
         error_chunk = ChatCompletionChunk(
             id=completion_id,
@@ -456,11 +489,8 @@ async def _stream_response(
         yield "data: [DONE]\n\n"
         return
 
-    # 在API层进行消息验证，过滤外部指令模板
-    if not _is_valid_user_query(user_message):
-        from src.agent.main.nodes import _get_filter_reason
-        filter_reason = _get_filter_reason(user_message)
-        logger.warning(f"⚠️ API层过滤无效消息 (reason: {filter_reason}, length: {len(user_message)})")
+    if not verdict.allowed:
+        logger.warning(f"⚠️ API层过滤无效消息 (reason: {verdict.reason}, length: {len(user_message)})")
         # 返回错误响应，不进入Agent流程
         error_chunk = ChatCompletionChunk(
             id=completion_id,
@@ -488,6 +518,7 @@ async def _stream_response(
         "next_step": None,
         "error": None,
         "confidence_score": None,
+        "token_usage": None,
     }
 
     config = {"configurable": {"thread_id": session_id}}
@@ -496,6 +527,8 @@ async def _stream_response(
     collected_response = ""
     collected_retrieved_docs = None
     collected_confidence_score = None
+    collected_error = None
+    collected_token_usage = None
 
     try:
         # 发送初始 chunk（role）
@@ -513,11 +546,102 @@ async def _stream_response(
         )
         yield f"data: {first_chunk.model_dump_json()}\n\n"
 
+        # === 语义答案缓存：命中时回放缓存答案，跳过 Agent ===
+        cached, cache_generation = await _lookup_cached_answer(app, config, user_message)
+        if cached is not None:
+            for start in range(0, len(cached.answer), CACHED_ANSWER_CHUNK_SIZE):
+                content_chunk = ChatCompletionChunk(
+                    id=completion_id,
+                    created=created_timestamp,
+                    model=requested_model,
+                    choices=[
+                        ChatCompletionChunkChoice(
+                            index=0,
+                            delta=ChatCompletionChunkDelta(
+                                content=cached.answer[start:start + CACHED_ANSWER_CHUNK_SIZE]
+                            ),
+                            finish_reason=None,
+                        )
+                    ],
+                )
+                yield f"data: {content_chunk.model_dump_json()}\n\n"
+
+            final_chunk = ChatCompletionChunk(
+                id=completion_id,
+                created=created_timestamp,
+                model=requested_model,
+                choices=[
+                    ChatCompletionChunkChoice(
+                        index=0,
+                        delta=ChatCompletionChunkDelta(),
+                        finish_reason="stop",
+                    )
+                ],
+            )
+            yield f"data: {final_chunk.model_dump_json()}\n\n"
+            if include_usage:
+                usage_chunk = ChatCompletionUsageChunk(
+                    id=completion_id,
+                    created=created_timestamp,
+                    model=requested_model,
+                    choices=[],
+                    usage=_build_usage(None, user_message, cached.answer),
+                )
+                yield f"data: {usage_chunk.model_dump_json()}\n\n"
+            yield "data: [DONE]\n\n"
+
+            await _save_conversation(
+                session_id=session_id,
+                user_message=user_message,
+                ai_response=cached.answer,
+                retrieved_docs=cached.retrieved_docs,
+                confidence_score=cached.confidence_score,
+            )
+            return
+
         # 导入AIMessage类到函数作用域
-        from langchain_core.messages import AIMessage
+        from langchain_core.messages import AIMessage, AIMessageChunk
+
+        # 启用逐 token 流式时同时订阅 messages 模式：
+        # - "messages": LLM 节点生成的增量 token（AIMessageChunk）
+        # - "updates": 各节点完成后的状态更新（检索文档、置信度等）
+        stream_mode = ["updates", "messages"] if settings.llm_streaming_enabled else "updates"
+        streamed_tokens = False
 
         # 流式执行 Agent
-        async for chunk in app.astream(initial_state, config):
+        async for item in app.astream(initial_state, config, stream_mode=stream_mode):
+            if isinstance(item, tuple) and len(item) == 2:
+                mode, chunk = item
+            else:
+                mode, chunk = "updates", item
+
+            # === 增量 token：每个 delta 单独发送一个 chunk ===
+            if mode == "messages":
+                message, metadata = chunk
+                if metadata.get("langgraph_node") != "llm" or not isinstance(message, AIMessageChunk):
+                    continue
+                delta = message.content if isinstance(message.content, str) else ""
+                if not delta:
+                    continue
+
+                collected_response += delta
+                streamed_tokens = True
+
+                content_chunk = ChatCompletionChunk(
+                    id=completion_id,
+                    created=created_timestamp,
+                    model=requested_model,  # 返回用户请求的模型名（保持一致性）
+                    choices=[
+                        ChatCompletionChunkChoice(
+                            index=0,
+                            delta=ChatCompletionChunkDelta(content=delta),
+                            finish_reason=None,
+                        )
+                    ],
+                )
+                yield f"data: {content_chunk.model_dump_json()}\n\n"
+                continue
+
             logger.debug(f"📦 Agent chunk: {list(chunk.keys())}")
 
             # === 新增：收集检索文档 ===
@@ -538,6 +662,9 @@ async def _stream_response(
                     if "confidence_score" in llm_output:
                         collected_confidence_score = llm_output.get("confidence_score")
 
+                    collected_error = llm_output.get("error")
+                    collected_token_usage = llm_output.get("token_usage")
+
                 elif isinstance(llm_output, str):
                     # 如果llm_output是字符串，可能是错误信息或直接内容
                     logger.warning(f"⚠️ LLM output is string: {llm_output}")
@@ -547,6 +674,10 @@ async def _stream_response(
                     logger.error(f"❌ Unexpected llm_output type: {type(llm_output)}")
                     continue
 
+                # 已经逐 token 发送过的内容不再重复发送
+                if streamed_tokens:
+                    continue
+
                 if messages:
                     ai_message = messages[-1]
                     if isinstance(ai_message, AIMessage):
@@ -555,9 +686,8 @@ async def _stream_response(
                         # === 新增：累积完整响应 ===
                         collected_response += content
 
-                        # 发送内容 chunk
-                        # 注意：这里发送完整内容，实际应该发送增量
-                        # 为了简化，我们一次性发送（LangGraph 不原生支持 token-by-token 流式）
+                        # 未产生增量 token 时（流式关闭、模型不支持流式或 LLM 调用失败），
+                        # 一次性发送完整内容
                         content_chunk = ChatCompletionChunk(
                             id=completion_id,
                             created=created_timestamp,
@@ -587,38 +717,38 @@ async def _stream_response(
         )
         yield f"data: {final_chunk.model_dump_json()}\n\n"
 
+        # stream_options.include_usage：[DONE] 前发送 usage（choices 为空）
+        if include_usage:
+            usage_chunk = ChatCompletionUsageChunk(
+                id=completion_id,
+                created=created_timestamp,
+                model=requested_model,
+                choices=[],
+                usage=_build_usage(collected_token_usage, user_message, collected_response),
+            )
+            yield f"data: {usage_chunk.model_dump_json()}\n\n"
+
         # 发送 [DONE]
         yield "data: [DONE]\n\n"
 
-        # === 新增：流式响应完成后保存对话 ===
+        # 流式响应完成后保存对话
         if collected_response:
-            try:
-                from src.db.repositories.conversation_repository import ConversationRepository
-
-                # 使用全局 DatabaseService（通过依赖注入）
-                async with db_service.get_session() as db_session:
-                    repo = ConversationRepository(db_session)
-
-                    conversation = await repo.create_conversation(
-                        session_id=session_id,
-                        user_message=user_message,
-                        ai_response=collected_response,
-                        retrieved_docs=collected_retrieved_docs,
-                        confidence_score=collected_confidence_score
-                    )
-
-                    logger.info(
-                        f"✅ Streaming conversation saved | "
-                        f"session_id={session_id} | "
-                        f"conversation_id={conversation.id}"
-                    )
+            await _save_conversation(
+                session_id=session_id,
+                user_message=user_message,
+                ai_response=collected_response,
+                retrieved_docs=collected_retrieved_docs,
+                confidence_score=collected_confidence_score,
+            )
 
-            except Exception as e:
-                logger.error(
-                    f"❌ Failed to save streaming conversation | "
-                    f"session_id={session_id} | "
-                    f"error={str(e)} | "
-                    f"error_type={type(e).__name__}"
+            # 写入语义答案缓存
+            if cache_generation is not None and not collected_error:
+                await get_answer_cache().store(
+                    question=user_message,
+                    answer=collected_response,
+                    retrieved_docs=collected_retrieved_docs,
+                    confidence_score=collected_confidence_score,
+                    generation=cache_generation,
                 )
 
     except Exception as e:
@@ -0,0 +1,66 @@
+"""
+Aho-Corasick 多模式匹配自动机
+
+构建时将全部词编译为一个自动机，匹配时单遍扫描文本：
+- 耗时与文本长度和命中数相关，与词的数量无关
+- 同一位置重叠的词（如"技术支持"与"支持"）都会被识别
+- 区分大小写，调用方需自行统一大小写
+"""
+
+from collections import deque
+from typing import Iterable
+
+
+class AhoCorasick:
+    """Aho-Corasick 多模式匹配自动机"""
+
+    def __init__(self, terms: Iterable[str]):
+        # 状态转移、失败指针、各状态输出的词
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._output: list[list[str]] = [[]]
+
+        for term in terms:
+            if term:
+                self._add(term)
+        self._build()
+
+    def _add(self, term: str) -> None:
+        state = 0
+        for char in term:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        if term not in self._output[state]:
+            self._output[state].append(term)
+
+    def _build(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail_target = self._goto[fail].get(char, 0)
+                self._fail[next_state] = fail_target if fail_target != next_state else 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find_all(self, text: str) -> set[str]:
+        """返回文本中出现的全部词（去重）"""
+        found: set[str] = set()
+        state = 0
+        goto, fail, output = self._goto, self._fail, self._output
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
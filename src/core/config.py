@@ -110,6 +110,25 @@ class Settings(BaseSettings):
         default="deepseek-embedding", description="Embedding 模型名称"
     )
     embedding_dim: int = Field(default=1536, description="Embedding 维度")
+    embedding_request_timeout: float = Field(
+        default=30.0, gt=0, description="Embedding 请求超时时间（秒）"
+    )
+    embedding_pool_max_connections: int = Field(
+        default=20, ge=1, description="Embedding HTTP 连接池最大连接数"
+    )
+    embedding_pool_max_keepalive: int = Field(
+        default=10, ge=0, description="Embedding HTTP 连接池最大 keep-alive 连接数"
+    )
+    embedding_http2_enabled: bool = Field(
+        default=True, description="Embedding 连接池是否启用 HTTP/2（需安装 h2，未安装时回退 HTTP/1.1）"
+    )
+    embedding_batch_window_ms: float = Field(
+        default=0.0, ge=0.0, le=100.0,
+        description="查询向量合并窗口（毫秒），窗口内的并发查询合并为一次请求；0 表示关闭"
+    )
+    embedding_batch_max_size: int = Field(
+        default=32, ge=1, le=256, description="查询向量合并的最大批大小"
+    )
 
     # ===== Embedding API Key 配置 =====
     # 通用独立API Key配置（最高优先级）
@@ -201,6 +220,23 @@ class Settings(BaseSettings):
         default="redis", description="Checkpointer 类型"
     )
 
+    # ===== 对话上下文配置 =====
+    context_window_enabled: bool = Field(
+        default=True, description="是否启用对话上下文窗口（超出时将早期对话折叠为摘要）"
+    )
+    context_max_turns: int = Field(
+        default=10, ge=1, description="上下文窗口最多保留的对话轮数"
+    )
+    context_max_tokens: int = Field(
+        default=3000, ge=100, description="上下文窗口最多保留的 token 数（tiktoken 计数）"
+    )
+    context_summary_enabled: bool = Field(
+        default=True, description="是否使用 LLM 生成早期对话摘要（关闭时截断拼接原文）"
+    )
+    context_summary_max_tokens: int = Field(
+        default=500, ge=50, description="早期对话摘要最大 token 数"
+    )
+
     # ===== 向量召回配置 =====
     vector_top_k: int = Field(
         default=3,
@@ -238,7 +274,52 @@ class Settings(BaseSettings):
     llm_max_tokens: int = Field(
         default=2000, ge=1, le=10000, description="LLM 最大 Token 数"
     )
+    llm_streaming_enabled: bool = Field(
+        default=True, description="是否启用逐 token 流式输出（SSE）"
+    )
+    llm_request_timeout: float = Field(
+        default=60.0, gt=0, description="LLM 请求超时时间（秒）"
+    )
+    llm_pool_max_connections: int = Field(
+        default=100, ge=1, description="LLM HTTP 连接池最大连接数"
+    )
+    llm_pool_max_keepalive: int = Field(
+        default=20, ge=0, description="LLM HTTP 连接池最大 keep-alive 连接数"
+    )
+    llm_pool_keepalive_expiry: float = Field(
+        default=30.0, ge=0, description="LLM keep-alive 连接空闲过期时间（秒）"
+    )
+    llm_http2_enabled: bool = Field(
+        default=True, description="LLM 连接池是否启用 HTTP/2（需安装 h2，未安装时回退 HTTP/1.1）"
+    )
     cache_ttl: int = Field(default=300, ge=0, description="缓存 TTL（秒）")
+    embedding_cache_enabled: bool = Field(
+        default=True, description="是否启用查询向量缓存"
+    )
+    embedding_cache_max_entries: int = Field(
+        default=2048, ge=1, description="进程内查询向量 LRU 缓存最大条目数"
+    )
+    embedding_cache_redis_enabled: bool = Field(
+        default=False, description="是否启用 Redis 共享查询向量缓存（多实例部署时推荐）"
+    )
+    answer_cache_enabled: bool = Field(
+        default=False, description="是否启用语义答案缓存（相似问题直接返回缓存答案）"
+    )
+    answer_cache_similarity_threshold: float = Field(
+        default=0.95, ge=0.0, le=1.0, description="答案缓存命中的最小余弦相似度"
+    )
+    answer_cache_max_entries: int = Field(
+        default=1000, ge=1, description="答案缓存最大条目数"
+    )
+    answer_cache_ttl: int = Field(
+        default=3600, ge=0, description="答案缓存 TTL（秒，0 表示不过期）"
+    )
+
+    # ===== Token 计量配置 =====
+    token_encoding: str = Field(
+        default="cl100k_base",
+        description="tiktoken 无法识别的模型（如 deepseek-chat）使用的编码"
+    )
 
     # ===== 消息过滤配置 =====
     message_filter_enabled: bool = Field(
@@ -259,6 +340,21 @@ class Settings(BaseSettings):
         description="技术术语列表（逗号分隔）"
     )
 
+    # ===== 路由配置 =====
+    router_strategy: str = Field(
+        default="lexical",
+        description="路由策略：lexical（关键词）/ intent（关键词 + 意图分类）/ 已注册的自定义路由器名称"
+    )
+    router_intents_path: str = Field(
+        default="",
+        description="意图分类种子语句文件路径（JSON，留空使用内置文件）"
+    )
+    router_intent_threshold: float = Field(
+        default=0.15,
+        ge=0.0, le=1.0,
+        description="使用意图分类结果的最低相似度（低于该值使用关键词路由结果）"
+    )
+
     # ===== 召回编排层配置 =====
     recall_sources: list[str] = Field(
         default=["vector"],
@@ -278,10 +374,56 @@ class Settings(BaseSettings):
         ge=0, le=3,
         description="召回失败重试次数"
     )
+    recall_source_timeouts_ms: str = Field(
+        default="",
+        description="各召回源的超时时间（毫秒，逗号分隔，如 vector:800,faq:200；未配置的源使用 recall_timeout_ms）"
+    )
+    recall_hedge_sources: list[str] = Field(
+        default=[],
+        description="启用对冲请求的召回源（如 [\"vector\"]），超过对冲延迟仍未返回时并发发起第二次请求"
+    )
+    recall_hedge_delay_ms: int = Field(
+        default=300,
+        ge=1,
+        description="对冲请求延迟（毫秒），延迟样本不足时使用；样本足够后使用该召回源近期延迟的 p95"
+    )
+    recall_early_exit_min_hits: int = Field(
+        default=0,
+        ge=0,
+        description="已收集到的高置信度命中数达到该值时提前返回，不再等待其他召回源（0 表示不启用）"
+    )
+    recall_early_exit_confidence: float = Field(
+        default=0.8,
+        ge=0.0, le=1.0,
+        description="提前返回判断使用的置信度阈值"
+    )
     recall_merge_strategy: Literal["weighted", "rrf", "custom"] = Field(
         default="weighted",
         description="召回结果合并策略"
     )
+    recall_score_normalization: Literal["none", "minmax", "zscore"] = Field(
+        default="minmax",
+        description="weighted 策略下各召回源分数的归一化方法"
+    )
+    recall_rrf_k: int = Field(
+        default=60,
+        ge=1,
+        description="RRF 平滑常数 k（融合分数 = Σ weight / (k + rank)）"
+    )
+    faq_recall_lexical_weight: float = Field(
+        default=0.4,
+        ge=0.0, le=1.0,
+        description="FAQ召回中倒排索引词法分数的权重（向量分数权重为 1 - 该值）"
+    )
+    keyword_rules_path: str = Field(
+        default="",
+        description="关键词召回规则文件路径（JSON，留空使用内置规则）"
+    )
+    keyword_rules_reload_interval: int = Field(
+        default=5,
+        ge=0,
+        description="关键词规则文件修改检查间隔（秒，0 表示不热加载）"
+    )
     recall_degrade_threshold: float = Field(
         default=0.5,
         ge=0.0, le=1.0,
@@ -309,6 +451,57 @@ class Settings(BaseSettings):
 
     # ===== 文件上传配置 =====
     max_upload_size_mb: int = Field(default=10, description="最大上传文件大小（MB）")
+    knowledge_max_file_size_mb: int = Field(
+        default=100, ge=1, description="知识库文件上传的最大大小（MB），文件按页流式解析入库"
+    )
+    ingest_embedding_batch_size: int = Field(
+        default=32, ge=1, le=2048,
+        description="文件入库时每次 Embedding 请求的分块数（不超过提供商的单次输入上限）"
+    )
+    ingest_embedding_concurrency: int = Field(
+        default=4, ge=1, le=32, description="文件入库时并发的 Embedding 请求数"
+    )
+    ingest_insert_batch_size: int = Field(
+        default=1000, ge=1, le=10000, description="文件入库时每次写入 Milvus 的记录数"
+    )
+    parser_process_workers: int = Field(
+        default=2, ge=0, le=32,
+        description="文件解析进程池大小（0 表示在事件循环默认线程池中解析，不启用多进程）"
+    )
+    parser_pdf_pages_per_task: int = Field(
+        default=16, ge=1, description="PDF 按页并行提取时每个任务的最少页数"
+    )
+    parser_task_timeout_seconds: int = Field(
+        default=120, ge=1, description="单个解析/分块任务的超时时间（秒），超时会终止解析进程"
+    )
+
+    # ===== 后台任务配置 =====
+    job_queue_backend: Literal["redis", "fakeredis"] = Field(
+        default="redis", description="任务队列后端（fakeredis 仅用于本地开发和测试）"
+    )
+    job_queue_name: str = Field(default="ingest", description="任务队列名称（Redis 键前缀）")
+    job_worker_embedded: bool = Field(
+        default=True,
+        description="是否在 API 进程内运行 worker（生产环境建议关闭并单独运行 python -m src.worker）"
+    )
+    job_worker_concurrency: int = Field(
+        default=2, ge=1, le=32, description="每个 worker 进程并发执行的任务数"
+    )
+    job_max_attempts: int = Field(default=3, ge=1, le=10, description="任务最大尝试次数")
+    job_retry_backoff_seconds: float = Field(
+        default=2.0, ge=0.0, description="任务重试的初始退避时间（秒，之后每次翻倍）"
+    )
+    job_lease_seconds: int = Field(
+        default=60, ge=3,
+        description="任务执行租约（秒）：worker 执行期间每 1/3 租约续租一次，租约过期视为 worker 崩溃并重新入队"
+    )
+    job_result_ttl: int = Field(
+        default=86400, ge=0, description="已结束任务记录的保留时间（秒，0 表示永久保留）"
+    )
+    job_max_blob_size_mb: int = Field(
+        default=50, ge=1,
+        description="知识库上传文件随任务存入 Redis 的最大大小（MB），与解析上限取较小值，控制 Redis 内存占用"
+    )
 
     # ===== PostgreSQL 配置 =====
     postgres_host: str = Field(default="localhost", description="PostgreSQL主机")
@@ -316,6 +509,46 @@ class Settings(BaseSettings):
     postgres_db: str = Field(default="chat_agent_admin", description="PostgreSQL数据库名")
     postgres_user: str = Field(default="admin", description="PostgreSQL用户名")
     postgres_password: str = Field(default="", description="PostgreSQL密码")
+    postgres_pool_size: int = Field(default=10, ge=1, le=200, description="PostgreSQL 连接池常驻连接数（每个进程）")
+    postgres_max_overflow: int = Field(default=10, ge=0, le=200, description="连接池满时允许额外创建的连接数")
+    postgres_pool_timeout: float = Field(default=30.0, gt=0, description="从连接池获取连接的超时时间（秒）")
+    postgres_pool_recycle: int = Field(default=3600, ge=-1, description="连接回收时间（秒，-1 表示不回收）")
+    postgres_statement_cache_size: int = Field(
+        default=100, ge=0, description="asyncpg 预编译语句缓存大小（经 PgBouncer 事务模式连接时设为 0）"
+    )
+
+    # ===== 对话历史写入与查询配置 =====
+    conversation_write_batch_size: int = Field(
+        default=100, ge=1, le=5000, description="对话历史批量写入的最大条数"
+    )
+    conversation_write_flush_interval: float = Field(
+        default=1.0, gt=0, description="对话历史批量写入的最长等待时间（秒）"
+    )
+    conversation_write_queue_size: int = Field(
+        default=10000, ge=1, description="待写入对话历史的内存队列上限"
+    )
+    conversation_write_enqueue_timeout: float = Field(
+        default=0.05, ge=0, description="队列已满时请求最多等待的时间（秒），超时后直接落盘"
+    )
+    conversation_spill_dir: str = Field(
+        default="data/conversation_spill", description="数据库不可用时对话历史的本地落盘目录"
+    )
+    conversation_spill_retry_seconds: float = Field(
+        default=30.0, gt=0, description="回放落盘对话历史的重试间隔（秒）"
+    )
+    conversation_exact_count_threshold: int = Field(
+        default=100000, ge=0,
+        description="对话历史列表 count_mode=auto 时，估计行数超过该值则返回估计值而不精确计数"
+    )
+    conversation_partition_premake_months: int = Field(
+        default=3, ge=1, le=24, description="对话历史按月分区：提前创建的未来月份数"
+    )
+    conversation_retention_months: int = Field(
+        default=0, ge=0, description="对话历史保留月数（超期按月整块删除分区，0 表示永久保留）"
+    )
+    conversation_partition_maintenance_interval: int = Field(
+        default=3600, ge=60, description="分区维护任务的执行间隔（秒）"
+    )
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -2,13 +2,65 @@
 文本处理工具函数
 
 提供文本截断、分块等功能，用于处理 embedding API 的 token 限制。
+编码器进程内缓存；批量导入使用 encode_batch 版本，分块支持重叠的滑动窗口。
 """
 
+import logging
 import uuid
-from typing import List
+from functools import lru_cache
+from typing import List, Optional
 
 import tiktoken
 
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def get_encoding(name: str = "cl100k_base") -> Optional[tiktoken.Encoding]:
+    """
+    获取 tiktoken 编码器（进程内缓存）
+
+    Args:
+        name: 编码名称，默认cl100k_base
+
+    Returns:
+        编码器；加载失败（如无法下载编码文件）时返回 None
+    """
+    try:
+        return tiktoken.get_encoding(name)
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to load tiktoken encoding {name}, estimating tokens by characters: {e}")
+        return None
+
+
+def count_tokens(text: str, model: str = "cl100k_base") -> int:
+    """
+    计算文本的token数
+
+    Args:
+        text: 输入文本
+        model: tokenizer模型，默认cl100k_base
+
+    Returns:
+        token数（编码器不可用时按 1 token ≈ 2 字符估算）
+    """
+    if not text:
+        return 0
+    encoding = get_encoding(model)
+    if encoding is None:
+        return (len(text) + 1) // 2
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _fits_in_tokens(text: str, max_tokens: int) -> bool:
+    """
+    不编码即可确定文本不超过 token 上限
+
+    字节级 BPE 的每个 token 至少对应一个 UTF-8 字节，所以按字节数判断；
+    中文等多字节字符一个字符可能对应多个 token，不能按字符数判断。
+    """
+    return 0 <= max_tokens and len(text.encode("utf-8", errors="surrogatepass")) <= max_tokens
+
 
 def truncate_text_to_tokens(text: str, max_tokens: int = 512, model: str = "cl100k_base") -> str:
     """
@@ -22,16 +74,139 @@ def truncate_text_to_tokens(text: str, max_tokens: int = 512, model: str = "cl10
     Returns:
         截断后的文本
     """
-    try:
-        encoding = tiktoken.get_encoding(model)
-        tokens = encoding.encode(text)
-        if len(tokens) <= max_tokens:
-            return text
-        return encoding.decode(tokens[:max_tokens])
-    except Exception:
+    if _fits_in_tokens(text, max_tokens):
+        return text
+
+    encoding = get_encoding(model)
+    if encoding is None:
         # 降级方案：按字符截断（粗略估算 1 token ≈ 2-3 字符）
-        max_chars = max_tokens * 2
-        return text[:max_chars]
+        return text[:max(max_tokens, 0) * 2]
+
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max(max_tokens, 0)])
+
+
+def truncate_texts_to_tokens(
+    texts: List[str], max_tokens: int = 512, model: str = "cl100k_base"
+) -> List[str]:
+    """
+    批量截断文本到指定token数（批量导入使用，encode_batch 多线程编码）
+
+    Args:
+        texts: 输入文本列表
+        max_tokens: 最大token数，默认512
+        model: tokenizer模型，默认cl100k_base
+
+    Returns:
+        截断后的文本列表（顺序与输入一致）
+    """
+    encoding = get_encoding(model)
+    pending = [i for i, text in enumerate(texts) if not _fits_in_tokens(text, max_tokens)]
+    if encoding is None or not pending:
+        return [truncate_text_to_tokens(text, max_tokens, model) for text in texts]
+
+    results = list(texts)
+    encoded = encoding.encode_batch([texts[i] for i in pending], disallowed_special=())
+    for i, tokens in zip(pending, encoded):
+        if len(tokens) > max_tokens:
+            results[i] = encoding.decode(tokens[:max(max_tokens, 0)])
+    return results
+
+
+def _token_windows(tokens: List[int], chunk_size: int, overlap: int) -> List[List[int]]:
+    """按滑动窗口切分 token 序列（相邻窗口重叠 overlap 个 token）"""
+    if chunk_size <= 0:
+        return []
+    if len(tokens) <= chunk_size:
+        return [tokens]
+
+    step = max(chunk_size - max(overlap, 0), 1)
+    windows = []
+    for start in range(0, len(tokens), step):
+        windows.append(tokens[start:start + chunk_size])
+        if start + chunk_size >= len(tokens):
+            break
+    return windows
+
+
+def _chunk_by_chars(text: str, chunk_size: int, overlap: int) -> List[str]:
+    """降级方案：按字符滑动窗口分块（1 token ≈ 2 字符）"""
+    if chunk_size <= 0:
+        return []
+    max_chars = chunk_size * 2
+    if len(text) <= max_chars:
+        return [text]
+    step = max(max_chars - max(overlap, 0) * 2, 1)
+    chunks = []
+    for start in range(0, len(text), step):
+        chunks.append(text[start:start + max_chars])
+        if start + max_chars >= len(text):
+            break
+    return chunks
+
+
+def chunk_texts_by_tokens(
+    texts: List[str],
+    chunk_size: Optional[int] = None,
+    overlap: Optional[int] = None,
+    model: str = "cl100k_base",
+) -> List[List[str]]:
+    """
+    按 token 滑动窗口批量分块（encode_batch / decode_batch 多线程编解码）
+
+    Args:
+        texts: 输入文本列表
+        chunk_size: 每块最大token数，默认 VECTOR_CHUNK_SIZE
+        overlap: 相邻块重叠的token数，默认 VECTOR_CHUNK_OVERLAP
+        model: tokenizer模型，默认cl100k_base
+
+    Returns:
+        每个文本的分块列表（顺序与输入一致）
+    """
+    if chunk_size is None or overlap is None:
+        from src.core.config import settings
+
+        chunk_size = settings.vector_chunk_size if chunk_size is None else chunk_size
+        overlap = settings.vector_chunk_overlap if overlap is None else overlap
+
+    encoding = get_encoding(model)
+    if encoding is None:
+        return [_chunk_by_chars(text, chunk_size, overlap) for text in texts]
+
+    results: List[List[str]] = []
+    for text, tokens in zip(texts, encoding.encode_batch(list(texts), disallowed_special=())):
+        windows = _token_windows(tokens, chunk_size, overlap)
+        if len(windows) == 1 and len(windows[0]) == len(tokens):
+            # 无需分块时返回原文，避免解码误差
+            results.append([text])
+        else:
+            results.append(encoding.decode_batch(windows))
+    return results
+
+
+def chunk_text_by_tokens(
+    text: str,
+    chunk_size: Optional[int] = None,
+    overlap: Optional[int] = None,
+    model: str = "cl100k_base",
+) -> List[str]:
+    """
+    按 token 滑动窗口分块
+
+    Args:
+        text: 输入文本
+        chunk_size: 每块最大token数，默认 VECTOR_CHUNK_SIZE
+        overlap: 相邻块重叠的token数，默认 VECTOR_CHUNK_OVERLAP
+        model: tokenizer模型，默认cl100k_base
+
+    Returns:
+        文本块列表
+    """
+    if not isinstance(text, str):
+        raise TypeError(f"text must be str, got {type(text).__name__}")
+    return chunk_texts_by_tokens([text], chunk_size, overlap, model)[0]
 
 
 def chunk_text_for_embedding(text: str, max_tokens: int = 512) -> List[str]:
@@ -45,23 +220,9 @@ def chunk_text_for_embedding(text: str, max_tokens: int = 512) -> List[str]:
     Returns:
         文本块列表
     """
-    try:
-        encoding = tiktoken.get_encoding("cl100k_base")
-        tokens = encoding.encode(text)
-
-        if len(tokens) <= max_tokens:
-            return [text]
-
-        chunks = []
-        for i in range(0, len(tokens), max_tokens):
-            chunk_tokens = tokens[i:i + max_tokens]
-            chunks.append(encoding.decode(chunk_tokens))
-
-        return chunks
-    except Exception:
-        # 降级方案：按字符分块
-        max_chars = max_tokens * 2
-        return [text[i:i + max_chars] for i in range(0, len(text), max_chars)]
+    if 0 < max_tokens and _fits_in_tokens(text, max_tokens):
+        return [text]
+    return chunk_text_by_tokens(text, chunk_size=max_tokens, overlap=0)
 
 
 def generate_trace_id() -> str:
@@ -5,6 +5,7 @@
 """
 
 from contextlib import asynccontextmanager
+from typing import Optional
 
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
@@ -18,19 +19,41 @@ class Base(DeclarativeBase):
 class DatabaseService:
     """数据库服务类，管理异步数据库连接"""
 
-    def __init__(self, database_url: str):
+    def __init__(
+        self,
+        database_url: str,
+        pool_size: int = 10,
+        max_overflow: int = 10,
+        pool_timeout: float = 30.0,
+        pool_recycle: int = 3600,
+        statement_cache_size: Optional[int] = None,
+    ):
         """
         初始化数据库服务
 
         Args:
             database_url: 数据库连接 URL
+            pool_size: 连接池常驻连接数
+            max_overflow: 连接池满时允许额外创建的连接数
+            pool_timeout: 获取连接的超时时间（秒）
+            pool_recycle: 连接回收时间（秒）
+            statement_cache_size: asyncpg 预编译语句缓存大小（None 使用驱动默认值）
         """
+        connect_args = {}
+        if statement_cache_size is not None and "+asyncpg" in database_url:
+            # SQLAlchemy 适配层与 asyncpg 各有一层语句缓存，经 PgBouncer 事务模式连接时都需关闭
+            connect_args["prepared_statement_cache_size"] = statement_cache_size
+            connect_args["statement_cache_size"] = statement_cache_size
+
         self.engine = create_async_engine(
             database_url,
             echo=False,
-            pool_size=10,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
             pool_pre_ping=True,
-            pool_recycle=3600
+            pool_recycle=pool_recycle,
+            connect_args=connect_args,
         )
         self.async_session = async_sessionmaker(
             self.engine,
@@ -55,3 +78,37 @@ class DatabaseService:
     async def close(self):
         """关闭数据库连接"""
         await self.engine.dispose()
+
+
+# 进程级 DatabaseService（单例）
+_database_service: Optional[DatabaseService] = None
+
+
+def get_database_service() -> DatabaseService:
+    """
+    获取进程级 DatabaseService（单例），按配置创建连接池
+
+    API 进程在 lifespan 中创建并挂到 app.state（路由通过 get_db_service 注入），
+    后台 worker 等非请求上下文直接调用本函数，共享同一个连接池。
+    """
+    global _database_service
+    if _database_service is None:
+        from src.core.config import settings
+
+        _database_service = DatabaseService(
+            settings.postgres_url,
+            pool_size=settings.postgres_pool_size,
+            max_overflow=settings.postgres_max_overflow,
+            pool_timeout=settings.postgres_pool_timeout,
+            pool_recycle=settings.postgres_pool_recycle,
+            statement_cache_size=settings.postgres_statement_cache_size,
+        )
+    return _database_service
+
+
+async def close_database_service() -> None:
+    """关闭进程级 DatabaseService"""
+    global _database_service
+    if _database_service is not None:
+        await _database_service.close()
+        _database_service = None
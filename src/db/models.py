@@ -7,8 +7,8 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import JSON, Column, DateTime, Float, Integer, String, Text
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import JSON, Column, Date, DateTime, Float, Index, Integer, String, Text
+from sqlalchemy.dialects.postgresql import JSONB, UUID
 
 from .base import Base
 
@@ -17,19 +17,74 @@ class ConversationHistory(Base):
     """对话历史表"""
 
     __tablename__ = "conversation_history"
-
+    __table_args__ = (
+        # 游标分页按 (created_at, id) 定位；session_id 子串搜索的 pg_trgm 索引见 Alembic 迁移
+        Index("ix_conversation_history_created_at_id", "created_at", "id"),
+        # PostgreSQL 上按月范围分区，分区由 conversation_partitions 维护任务创建和删除
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+    # 分区表的主键必须包含分区键
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     session_id = Column(String(64), nullable=False, index=True)
     user_message = Column(Text)
     ai_response = Column(Text)
-    retrieved_docs = Column(JSON)
+    retrieved_docs = Column(JSON().with_variant(JSONB, "postgresql"))  # PostgreSQL 使用 JSONB（TOAST 压缩）
     confidence_score = Column(Float)
-    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    created_at = Column(DateTime, primary_key=True, default=datetime.utcnow, index=True)
 
     def __repr__(self) -> str:
         return f"<ConversationHistory(id={self.id}, session_id={self.session_id})>"
 
 
+class ConversationStatsHourly(Base):
+    """对话小时汇总表（写入对话时增量维护）"""
+
+    __tablename__ = "conversation_stats_hourly"
+
+    stat_hour = Column(DateTime, primary_key=True)  # 小时起点（UTC）
+    conversation_count = Column(Integer, nullable=False, default=0)
+    confidence_sum = Column(Float, nullable=False, default=0.0)
+    confidence_count = Column(Integer, nullable=False, default=0)  # 有置信度的对话数
+
+    def __repr__(self) -> str:
+        return f"<ConversationStatsHourly(stat_hour={self.stat_hour}, count={self.conversation_count})>"
+
+
+class ConversationStatsDaily(Base):
+    """对话每日汇总表（写入对话时增量维护）"""
+
+    __tablename__ = "conversation_stats_daily"
+
+    stat_date = Column(Date, primary_key=True)  # 日期（UTC）
+    conversation_count = Column(Integer, nullable=False, default=0)
+    active_sessions = Column(Integer, nullable=False, default=0)  # 当日有对话的会话数
+    new_sessions = Column(Integer, nullable=False, default=0)  # 当日首次出现的会话数
+    confidence_sum = Column(Float, nullable=False, default=0.0)
+    confidence_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self) -> str:
+        return f"<ConversationStatsDaily(stat_date={self.stat_date}, count={self.conversation_count})>"
+
+
+class ConversationSession(Base):
+    """会话首次出现记录（用于累计会话数去重）"""
+
+    __tablename__ = "conversation_sessions"
+
+    session_id = Column(String(64), primary_key=True)
+    first_seen_at = Column(DateTime, nullable=False)
+
+
+class ConversationSessionDay(Base):
+    """会话每日活跃记录（用于每日会话数去重，只需保留近期数据）"""
+
+    __tablename__ = "conversation_session_days"
+
+    stat_date = Column(Date, primary_key=True)
+    session_id = Column(String(64), primary_key=True)
+
+
 class AdminUser(Base):
     """管理员用户表"""
 
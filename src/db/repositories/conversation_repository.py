@@ -2,16 +2,52 @@
 对话历史 Repository
 
 提供对话历史数据的查询和统计功能。
+
+统计接口读取小时/每日汇总表，汇总表在写入对话的同一事务中增量维护，
+查询耗时只与统计天数相关，与对话总量无关。
 """
 
-from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
+import json
+import logging
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
 from uuid import UUID
 
-from sqlalchemy import desc, func, select
+from sqlalchemy import desc, func, insert, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.base import Executable
+from sqlalchemy.sql.elements import ClauseElement
+
+from ..models import (
+    AdminAuditLog,
+    ConversationHistory,
+    ConversationSession,
+    ConversationSessionDay,
+    ConversationStatsDaily,
+    ConversationStatsHourly,
+)
+
+logger = logging.getLogger(__name__)
+
+# 汇总表的累加列
+_HOURLY_COUNTERS = ("conversation_count", "confidence_sum", "confidence_count")
+_DAILY_COUNTERS = _HOURLY_COUNTERS + ("active_sessions", "new_sessions")
+
 
-from ..models import AdminAuditLog, ConversationHistory
+class _Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) 语句（仅 PostgreSQL）"""
+
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(_Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
 
 
 class ConversationRepository:
@@ -20,37 +56,60 @@ class ConversationRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
 
+    def _filter(
+        self,
+        query,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        session_id: Optional[str] = None,
+    ):
+        if start_date:
+            query = query.where(ConversationHistory.created_at >= start_date)
+        if end_date:
+            query = query.where(ConversationHistory.created_at <= end_date)
+        if session_id:
+            # PostgreSQL 上由 pg_trgm GIN 索引支持子串匹配
+            query = query.where(ConversationHistory.session_id.like(f"%{session_id}%"))
+        return query
+
     async def get_conversations(
         self,
         skip: int = 0,
         limit: int = 20,
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
-        session_id: Optional[str] = None
+        session_id: Optional[str] = None,
+        cursor: Optional[Tuple[datetime, UUID]] = None,
     ) -> List[ConversationHistory]:
         """
-        分页查询对话历史
+        分页查询对话历史（按时间倒序）
 
         Args:
-            skip: 跳过的记录数
+            skip: 跳过的记录数（传入 cursor 时忽略）
             limit: 返回的记录数
             start_date: 开始日期
             end_date: 结束日期
             session_id: 会话ID（模糊匹配）
+            cursor: 上一页最后一条记录的 (created_at, id)，按 (created_at, id) 索引定位，
+                    翻页深度不影响查询耗时
 
         Returns:
             List[ConversationHistory]: 对话历史列表
         """
-        query = select(ConversationHistory)
+        query = self._filter(select(ConversationHistory), start_date, end_date, session_id)
 
-        if start_date:
-            query = query.where(ConversationHistory.created_at >= start_date)
-        if end_date:
-            query = query.where(ConversationHistory.created_at <= end_date)
-        if session_id:
-            query = query.where(ConversationHistory.session_id.like(f"%{session_id}%"))
+        if cursor is not None:
+            query = query.where(
+                # 冗余的 created_at 条件使分区裁剪生效（行值比较不参与裁剪）
+                ConversationHistory.created_at <= cursor[0],
+                tuple_(ConversationHistory.created_at, ConversationHistory.id) < tuple_(*cursor),
+            )
+        else:
+            query = query.offset(skip)
 
-        query = query.order_by(desc(ConversationHistory.created_at)).offset(skip).limit(limit)
+        query = query.order_by(
+            desc(ConversationHistory.created_at), desc(ConversationHistory.id)
+        ).limit(limit)
 
         result = await self.session.execute(query)
         return result.scalars().all()
@@ -89,21 +148,39 @@ class ConversationRepository:
         Returns:
             int: 对话总数
         """
-        query = select(func.count(ConversationHistory.id))
-
-        if start_date:
-            query = query.where(ConversationHistory.created_at >= start_date)
-        if end_date:
-            query = query.where(ConversationHistory.created_at <= end_date)
-        if session_id:
-            query = query.where(ConversationHistory.session_id.like(f"%{session_id}%"))
+        query = self._filter(select(func.count(ConversationHistory.id)), start_date, end_date, session_id)
 
         result = await self.session.execute(query)
         return result.scalar() or 0
 
+    async def estimate_conversations(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        session_id: Optional[str] = None
+    ) -> Optional[int]:
+        """
+        估算对话总数（PostgreSQL 查询计划的行数估计，不扫描数据）
+
+        Returns:
+            Optional[int]: 估计值；非 PostgreSQL 或估算失败时返回 None
+        """
+        if self.session.get_bind().dialect.name != "postgresql":
+            return None
+
+        query = self._filter(select(ConversationHistory.id), start_date, end_date, session_id)
+        try:
+            plan = (await self.session.execute(_Explain(query))).scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]["Plan"]["Plan Rows"])
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to estimate conversation count: {e}")
+            return None
+
     async def get_daily_stats(self, days: int = 7) -> List[Dict[str, Any]]:
         """
-        获取每日统计信息
+        获取每日统计信息（读取每日汇总表）
 
         Args:
             days: 统计天数
@@ -111,54 +188,70 @@ class ConversationRepository:
         Returns:
             List[Dict[str, Any]]: 每日统计数据
         """
-        end_date = datetime.utcnow()
-        start_date = end_date - timedelta(days=days)
+        start_date = (datetime.utcnow() - timedelta(days=days)).date()
 
         query = select(
-            func.date(ConversationHistory.created_at).label('date'),
-            func.count(ConversationHistory.id).label('count')
+            ConversationStatsDaily.stat_date,
+            ConversationStatsDaily.conversation_count,
         ).where(
-            ConversationHistory.created_at >= start_date
-        ).group_by(
-            func.date(ConversationHistory.created_at)
-        ).order_by(
-            func.date(ConversationHistory.created_at)
-        )
+            ConversationStatsDaily.stat_date >= start_date,
+            ConversationStatsDaily.conversation_count > 0,
+        ).order_by(ConversationStatsDaily.stat_date)
+
+        result = await self.session.execute(query)
+        return [{"date": str(row.stat_date), "count": row.conversation_count} for row in result]
+
+    async def get_hourly_stats(self, hours: int = 24) -> List[Dict[str, Any]]:
+        """
+        获取每小时统计信息（读取小时汇总表）
+
+        Args:
+            hours: 统计小时数
+
+        Returns:
+            List[Dict[str, Any]]: 每小时统计数据
+        """
+        start_hour = (datetime.utcnow() - timedelta(hours=hours)).replace(minute=0, second=0, microsecond=0)
+
+        query = select(ConversationStatsHourly).where(
+            ConversationStatsHourly.stat_hour >= start_hour
+        ).order_by(ConversationStatsHourly.stat_hour)
 
         result = await self.session.execute(query)
-        return [{"date": str(row.date), "count": row.count} for row in result]
+        return [
+            {
+                "hour": row.stat_hour.isoformat(),
+                "count": row.conversation_count,
+                "avg_confidence": _average(row.confidence_sum, row.confidence_count),
+            }
+            for row in result.scalars()
+        ]
 
     async def get_session_stats(self) -> Dict[str, Any]:
         """
-        获取会话统计信息
+        获取会话统计信息（读取每日汇总表）
 
         Returns:
             Dict[str, Any]: 会话统计数据
         """
-        # 总会话数
-        total_sessions_query = select(func.count(func.distinct(ConversationHistory.session_id)))
-        total_sessions = await self.session.execute(total_sessions_query)
-        total_sessions_count = total_sessions.scalar() or 0
-
-        # 今日会话数
-        today = datetime.utcnow().date()
-        today_sessions_query = select(func.count(func.distinct(ConversationHistory.session_id))).where(
-            func.date(ConversationHistory.created_at) == today
+        # 累计会话数 = 每日新会话数之和；平均置信度按总和/总数计算
+        totals_query = select(
+            func.coalesce(func.sum(ConversationStatsDaily.new_sessions), 0),
+            func.coalesce(func.sum(ConversationStatsDaily.confidence_sum), 0.0),
+            func.coalesce(func.sum(ConversationStatsDaily.confidence_count), 0),
         )
-        today_sessions = await self.session.execute(today_sessions_query)
-        today_sessions_count = today_sessions.scalar() or 0
+        total_sessions, confidence_sum, confidence_count = (await self.session.execute(totals_query)).one()
 
-        # 平均置信度
-        avg_confidence_query = select(func.avg(ConversationHistory.confidence_score)).where(
-            ConversationHistory.confidence_score.isnot(None)
+        # 今日会话数
+        today_query = select(ConversationStatsDaily.active_sessions).where(
+            ConversationStatsDaily.stat_date == datetime.utcnow().date()
         )
-        avg_confidence = await self.session.execute(avg_confidence_query)
-        avg_confidence_score = avg_confidence.scalar() or 0.0
+        today_sessions = (await self.session.execute(today_query)).scalar() or 0
 
         return {
-            "total_sessions": total_sessions_count,
-            "today_sessions": today_sessions_count,
-            "avg_confidence": round(avg_confidence_score, 3)
+            "total_sessions": int(total_sessions or 0),
+            "today_sessions": int(today_sessions),
+            "avg_confidence": _average(confidence_sum, confidence_count),
         }
 
     async def log_admin_action(
@@ -236,6 +329,14 @@ class ConversationRepository:
 
         # 添加到会话
         self.session.add(conversation)
+        await self.session.flush()
+
+        # 同一事务内更新汇总表
+        await self._update_rollups([{
+            "session_id": conversation.session_id,
+            "confidence_score": conversation.confidence_score,
+            "created_at": conversation.created_at,
+        }])
 
         # 提交到数据库
         await self.session.commit()
@@ -244,3 +345,105 @@ class ConversationRepository:
         await self.session.refresh(conversation)
 
         return conversation
+
+    async def bulk_create_conversations(self, rows: List[Dict[str, Any]]) -> int:
+        """
+        批量写入对话历史记录
+
+        使用单条多行 INSERT（executemany 由驱动合并为多行 VALUES）并只提交一次，
+        不回读数据库生成的字段，调用方需预先填好 id 和 created_at。
+        汇总表按整批聚合后在同一事务中更新。
+
+        Args:
+            rows: 对话记录字典列表，字段与 ConversationHistory 列名一致
+
+        Returns:
+            int: 写入的记录数
+
+        Raises:
+            SQLAlchemyError: 数据库操作失败时抛出（整批回滚）
+        """
+        if not rows:
+            return 0
+
+        await self.session.execute(insert(ConversationHistory), rows)
+        await self._update_rollups(rows)
+        await self.session.commit()
+        return len(rows)
+
+    # ===== 汇总表维护 =====
+
+    def _dialect_insert(self):
+        """返回支持 ON CONFLICT 的 insert 构造（PostgreSQL / SQLite）"""
+        if self.session.get_bind().dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        return dialect_insert
+
+    async def _insert_new(self, model, values: List[Dict[str, Any]], returning) -> List[Any]:
+        """插入不存在的记录，返回实际插入的行（并发写入时每条记录只会被一个事务插入）"""
+        stmt = self._dialect_insert()(model).values(values).on_conflict_do_nothing().returning(returning)
+        result = await self.session.execute(stmt)
+        return list(result.scalars())
+
+    async def _increment(self, model, key: str, counters: tuple, buckets: Dict[Any, Dict[str, Any]]) -> None:
+        """按主键累加计数列（不存在则插入）"""
+        if not buckets:
+            return
+        insert_stmt = self._dialect_insert()(model)
+        # 按主键排序，避免并发事务加锁顺序不同导致死锁
+        values = [{key: bucket, **{name: data.get(name, 0) for name in counters}} for bucket, data in sorted(buckets.items())]
+        stmt = insert_stmt.values(values).on_conflict_do_update(
+            index_elements=[key],
+            set_={name: getattr(model, name) + getattr(insert_stmt.excluded, name) for name in counters},
+        )
+        await self.session.execute(stmt)
+
+    async def _update_rollups(self, rows: List[Dict[str, Any]]) -> None:
+        """
+        把一批对话累加到小时/每日汇总表
+
+        会话数需要去重：借助 conversation_sessions / conversation_session_days 的主键冲突判断
+        会话是否首次出现、当日是否首次活跃，只对新插入的记录计数。
+        """
+        hourly: Dict[datetime, Dict[str, Any]] = defaultdict(Counter)
+        daily: Dict[date, Dict[str, Any]] = defaultdict(Counter)
+        first_seen: Dict[str, datetime] = {}
+        session_days = set()
+
+        for row in rows:
+            created_at = row["created_at"]
+            confidence = row.get("confidence_score")
+            day = created_at.date()
+            for bucket in (hourly[created_at.replace(minute=0, second=0, microsecond=0)], daily[day]):
+                bucket["conversation_count"] += 1
+                if confidence is not None:
+                    bucket["confidence_sum"] += confidence
+                    bucket["confidence_count"] += 1
+            if row["session_id"] not in first_seen or created_at < first_seen[row["session_id"]]:
+                first_seen[row["session_id"]] = created_at
+            session_days.add((day, row["session_id"]))
+
+        new_sessions = await self._insert_new(
+            ConversationSession,
+            [{"session_id": sid, "first_seen_at": seen} for sid, seen in sorted(first_seen.items())],
+            ConversationSession.first_seen_at,
+        )
+        for seen in new_sessions:
+            daily[seen.date()]["new_sessions"] += 1
+
+        active_days = await self._insert_new(
+            ConversationSessionDay,
+            [{"stat_date": day, "session_id": sid} for day, sid in sorted(session_days)],
+            ConversationSessionDay.stat_date,
+        )
+        for day in active_days:
+            daily[day]["active_sessions"] += 1
+
+        await self._increment(ConversationStatsHourly, "stat_hour", _HOURLY_COUNTERS, hourly)
+        await self._increment(ConversationStatsDaily, "stat_date", _DAILY_COUNTERS, daily)
+
+
+def _average(total: Optional[float], count: Optional[int]) -> float:
+    return round(total / count, 3) if count else 0.0
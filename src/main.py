@@ -5,6 +5,7 @@ FastAPI 应用入口
     uvicorn src.main:app --reload --host 0.0.0.0 --port 8000
 """
 
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
@@ -30,13 +31,17 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     应用生命周期管理
 
     启动时:
-    - 初始化 PostgreSQL 连接（全局 DatabaseService）
+    - 初始化 PostgreSQL 连接（全局 DatabaseService）、对话历史写入器和分区维护任务
     - 初始化 Milvus 连接
     - 初始化 Redis 连接
     - 创建 Milvus Collections（如果不存在）
+    - 预建召回源实例并预热 Embedding 客户端
+    - 启动内嵌任务 worker（JOB_WORKER_EMBEDDED=true）
 
     关闭时:
-    - 关闭所有连接
+    - 停止内嵌 worker
+    - 写完待保存的对话历史
+    - 关闭所有连接（PostgreSQL、任务队列、LLM 连接池、查询向量缓存、Milvus）
     """
     logger.info("🚀 Starting Website Live Chat Agent...")
     logger.info(f"📊 LLM Provider: {settings.llm_provider}")
@@ -45,11 +50,20 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     logger.info(f"💾 Redis Host: {settings.redis_host}:{settings.redis_port}")
 
     # 初始化全局 DatabaseService（防止连接泄漏）
-    from src.db.base import DatabaseService
-    db_service = DatabaseService(settings.postgres_url)
+    from src.db.base import get_database_service
+    db_service = get_database_service()
     app.state.db_service = db_service
     logger.info("✅ Global DatabaseService initialized")
 
+    # 启动对话历史批量写入器
+    from src.services.conversation_writer import get_conversation_writer
+    get_conversation_writer().start()
+    logger.info("✅ Conversation writer started")
+
+    # 对话历史分区维护（PostgreSQL 分区表：预建分区、删除过期分区）
+    from src.services.conversation_partitions import get_partition_manager
+    get_partition_manager().start()
+
     # 初始化 Milvus（测试环境可通过SKIP_MILVUS_INIT=1跳过）
     if not __import__("os").environ.get("SKIP_MILVUS_INIT"):
         try:
@@ -61,6 +75,10 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
             from src.repositories import initialize_repositories
             await initialize_repositories()
             logger.info("✅ Repositories initialized successfully")
+
+            # 预建召回源并预热 Embedding 客户端
+            from src.agent.recall.sources.registry import get_recall_source_registry
+            await get_recall_source_registry().warmup(settings.recall_sources)
         except Exception as e:
             logger.error(f"❌ Failed to initialize Milvus: {e}")
             logger.warning("⚠️  Continuing without Milvus (some features will not work)")
@@ -88,19 +106,90 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     except Exception as e:
         logger.error(f"❌ Failed to compile LangGraph Agent: {e}")
 
+    # 内嵌任务 worker（JOB_WORKER_EMBEDDED=false 时需单独运行 python -m src.worker）
+    worker_task = None
+    if settings.job_worker_embedded:
+        from src.services.job_queue import JobWorker, get_job_queue
+        from src.worker import load_job_handlers
+
+        load_job_handlers()
+        job_worker = JobWorker(get_job_queue())
+        worker_task = asyncio.create_task(job_worker.run())
+        logger.info("✅ Embedded job worker started")
+
     yield
 
     # 清理资源
     logger.info("🛑 Shutting down Website Live Chat Agent...")
 
+    # 停止内嵌 worker 并关闭任务队列
+    try:
+        if worker_task is not None:
+            job_worker.stop()
+            await asyncio.wait_for(worker_task, timeout=5)
+        from src.services.job_queue import close_job_queue
+        await close_job_queue()
+        logger.info("✅ Job queue closed")
+    except Exception as e:
+        logger.error(f"❌ Error stopping job worker: {e}")
+
+    # 关闭文件解析进程池
+    try:
+        from src.services.file_parser import shutdown_parser_pool
+        shutdown_parser_pool()
+    except Exception as e:
+        logger.error(f"❌ Error closing file parser pool: {e}")
+
+    # 停止分区维护任务
+    try:
+        from src.services.conversation_partitions import close_partition_manager
+        await close_partition_manager()
+    except Exception as e:
+        logger.error(f"❌ Error stopping partition maintenance: {e}")
+
+    # 写完队列中的对话历史（需在关闭 DatabaseService 之前）
+    try:
+        from src.services.conversation_writer import close_conversation_writer
+        await close_conversation_writer()
+        logger.info("✅ Conversation writer drained")
+    except Exception as e:
+        logger.error(f"❌ Error draining conversation writer: {e}")
+
     # 关闭全局 DatabaseService
     try:
         if hasattr(app.state, 'db_service'):
-            await app.state.db_service.close()
+            from src.db.base import close_database_service
+            await close_database_service()
             logger.info("✅ Global DatabaseService closed")
     except Exception as e:
         logger.error(f"❌ Error closing DatabaseService: {e}")
 
+    # 关闭 LLM 客户端连接池
+    try:
+        from src.services.llm_registry import close_llm_registry
+        await close_llm_registry()
+        logger.info("✅ LLM client pool closed")
+    except Exception as e:
+        logger.error(f"❌ Error closing LLM client pool: {e}")
+
+    # 关闭 Embedding 客户端连接
+    try:
+        from src.services.llm_factory import reset_shared_embeddings
+        from src.services.providers.siliconflow_provider import close_siliconflow_embeddings
+        await close_siliconflow_embeddings()
+        reset_shared_embeddings()
+        logger.info("✅ Embedding clients closed")
+    except Exception as e:
+        logger.error(f"❌ Error closing embedding clients: {e}")
+
+    # 关闭查询向量缓存（Redis 连接）
+    try:
+        from src.services.embedding_cache import close_embedding_cache
+        await close_embedding_cache()
+        logger.info("✅ Embedding cache closed")
+    except Exception as e:
+        logger.error(f"❌ Error closing embedding cache: {e}")
+
     # 关闭 Milvus
     try:
         from src.services.milvus_service import milvus_service
@@ -149,11 +238,16 @@ async def app_exception_handler(request, exc: AppException) -> JSONResponse:
 
 # 注册路由
 # ruff: noqa: E402 - 导入必须在app创建后，避免循环依赖
+from src.agent.recall.latency import get_latency_tracker
 from src.api.admin import analytics, auth, conversations, faq
 from src.api.admin import knowledge as admin_knowledge
 from src.api.admin import settings as admin_settings
 from src.api.v1 import knowledge, openai_compat
+from src.services.answer_cache import get_answer_cache
+from src.services.embedding_cache import get_embedding_cache
+from src.services.faq_index import get_faq_index
 from src.services.milvus_service import milvus_service
+from src.services.token_accounting import get_token_metrics
 
 app.include_router(openai_compat.router, prefix="/v1", tags=["Chat"])
 app.include_router(knowledge.router, prefix="/api/v1", tags=["Knowledge"])
@@ -185,6 +279,13 @@ async def health_check() -> dict:
                 "host": settings.redis_host,
             },
         },
+        "metrics": {
+            "embedding_cache": get_embedding_cache().stats(),
+            "answer_cache": get_answer_cache().stats(),
+            "recall_latency": get_latency_tracker().stats(),
+            "faq_index": get_faq_index().stats(),
+            "token_usage": get_token_metrics().stats(),
+        },
         "timestamp": int(__import__("time").time()),
     }
 
@@ -16,6 +16,7 @@ class FAQ(BaseModel):
 
     model_config = ConfigDict(frozen=False, extra="allow")
 
+    id: str | None = Field(default=None, description="FAQ ID")
     text: str = Field(..., description="FAQ文本内容")
     score: float = Field(..., ge=0.0, le=1.0, description="相似度分数")
     metadata: dict[str, Any] = Field(default_factory=dict, description="FAQ元数据")
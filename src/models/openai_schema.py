@@ -10,6 +10,12 @@ from pydantic import BaseModel, Field
 
 
 # ===== 请求模型 =====
+class StreamOptions(BaseModel):
+    """流式响应选项"""
+
+    include_usage: bool = Field(default=False, description="是否在结束前发送包含 usage 的 chunk")
+
+
 class ChatMessage(BaseModel):
     """对话消息"""
 
@@ -27,6 +33,7 @@ class ChatCompletionRequest(BaseModel):
     max_tokens: int | None = Field(default=None, ge=1, description="最大生成 Token 数")
     top_p: float = Field(default=1.0, ge=0.0, le=1.0, description="核采样参数")
     session_id: str | None = Field(default=None, description="会话ID（可选，用于多轮对话追踪）")
+    stream_options: StreamOptions | None = Field(default=None, description="流式响应选项")
 
 
 # ===== 响应模型 =====
@@ -83,6 +90,12 @@ class ChatCompletionChunk(BaseModel):
     choices: list[ChatCompletionChunkChoice]
 
 
+class ChatCompletionUsageChunk(ChatCompletionChunk):
+    """流式响应 usage 块（stream_options.include_usage=true 时在 [DONE] 前发送）"""
+
+    usage: ChatCompletionUsage
+
+
 # ===== 模型列表（/v1/models） =====
 class OpenAIModelRef(BaseModel):
     """OpenAI 模型引用对象（兼容 /v1/models 返回项）。"""
@@ -6,13 +6,15 @@ FAQ Repository
 
 import logging
 import time
-from typing import Any
+from typing import Any, AsyncIterator
 
 from pymilvus import AsyncMilvusClient
 
 from src.models.entities.faq import FAQ
 from src.models.schemas.faq_schema import FAQCollectionSchema
 from src.repositories.milvus.base_milvus_repository import BaseMilvusRepository
+from src.services.answer_cache import invalidate_answer_cache
+from src.services.faq_index import get_faq_index
 
 logger = logging.getLogger(__name__)
 
@@ -57,13 +59,14 @@ class FAQRepository(BaseMilvusRepository[FAQ, FAQCollectionSchema]):
             query_embedding=query_embedding,
             top_k=top_k,
             score_threshold=score_threshold,
-            output_fields=["text", "metadata", "created_at"],
+            output_fields=["id", "text", "metadata", "created_at"],
             filter_expr=filter_expr,
         )
 
         # 转换为FAQ实体
         return [
             FAQ(
+                id=r.get("id"),
                 text=r["text"],
                 score=r["score"],
                 metadata=r.get("metadata", {}),
@@ -99,7 +102,12 @@ class FAQRepository(BaseMilvusRepository[FAQ, FAQCollectionSchema]):
             for item in data
         ]
 
-        return await self._base_insert(formatted_data)
+        inserted = await self._base_insert(formatted_data)
+        await invalidate_answer_cache("FAQ inserted")
+        # 增量更新倒排索引，并通知其他进程重建
+        get_faq_index().add_many(formatted_data)
+        await get_faq_index().shared_generation.bump()
+        return inserted
 
     async def insert_faqs(
         self,
@@ -161,6 +169,40 @@ class FAQRepository(BaseMilvusRepository[FAQ, FAQCollectionSchema]):
             logger.error(f"查询FAQ列表失败: {e}")
             return []
 
+    async def iter_faqs(self, batch_size: int = 1000) -> AsyncIterator[list[dict[str, Any]]]:
+        """
+        分批读取全部FAQ（用于构建倒排索引）
+
+        Args:
+            batch_size: 每批条数
+
+        Yields:
+            list[dict]: FAQ列表，格式: {id, text, metadata}
+
+        按主键 keyset 分页（id > 上一批最大 id）：Milvus 要求 offset + limit <= 16384，
+        offset 分页在 FAQ 较多时会失败，且越往后越慢。
+        """
+        last_id: str | None = None
+        while True:
+            expr = "created_at > 0" if last_id is None else f'created_at > 0 and id > "{last_id}"'
+            results = await self.client.query(
+                collection_name=self.collection_name,
+                filter=expr,
+                output_fields=["id", "text", "metadata"],
+                limit=batch_size,
+            )
+            if not results:
+                return
+
+            yield [
+                {"id": r["id"], "text": r["text"], "metadata": r.get("metadata", {})}
+                for r in results
+            ]
+
+            if len(results) < batch_size:
+                return
+            last_id = max(r["id"] for r in results)
+
     async def count_faqs(self) -> int:
         """
         统计FAQ总数
@@ -215,5 +257,10 @@ class FAQRepository(BaseMilvusRepository[FAQ, FAQCollectionSchema]):
         Returns:
             bool: 删除是否成功
         """
-        return await self.delete(faq_id)
+        deleted = await self.delete(faq_id)
+        if deleted:
+            await invalidate_answer_cache(f"FAQ deleted: {faq_id}")
+            get_faq_index().remove(faq_id)
+            await get_faq_index().shared_generation.bump()
+        return deleted
 
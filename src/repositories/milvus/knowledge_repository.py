@@ -13,6 +13,7 @@ from pymilvus import AsyncMilvusClient
 from src.models.entities.knowledge import Knowledge
 from src.models.schemas.knowledge_schema import KnowledgeCollectionSchema
 from src.repositories.milvus.base_milvus_repository import BaseMilvusRepository
+from src.services.answer_cache import invalidate_answer_cache
 
 logger = logging.getLogger(__name__)
 
@@ -93,7 +94,9 @@ class KnowledgeRepository(BaseMilvusRepository[Knowledge, KnowledgeCollectionSch
         ]
 
         # 调用基类插入
-        return await self._base_insert(data)
+        inserted = await self._base_insert(data)
+        await invalidate_answer_cache("knowledge documents inserted")
+        return inserted
 
     async def add_document(
         self,
@@ -129,6 +132,7 @@ class KnowledgeRepository(BaseMilvusRepository[Knowledge, KnowledgeCollectionSch
 
         # 插入到 Milvus
         await self._base_insert(data)
+        await invalidate_answer_cache("knowledge document added")
 
         return doc_id
 
@@ -310,6 +314,7 @@ class KnowledgeRepository(BaseMilvusRepository[Knowledge, KnowledgeCollectionSch
                     "created_at": doc.get("created_at", int(time.time()))
                 }]
             )
+            await invalidate_answer_cache(f"knowledge document updated: {doc_id}")
 
             return True
 
@@ -333,6 +338,7 @@ class KnowledgeRepository(BaseMilvusRepository[Knowledge, KnowledgeCollectionSch
                 collection_name=self.collection_name,
                 filter=f'id == "{doc_id}"'
             )
+            await invalidate_answer_cache(f"knowledge document deleted: {doc_id}")
 
             return True
 
@@ -0,0 +1,294 @@
+"""
+语义答案缓存
+
+高频 FAQ 类问题每次都完整执行 router → recall → LLM，得到的答案基本相同。
+答案缓存位于 Agent 之前：
+- 对用户消息生成向量（复用查询向量缓存）
+- 在进程内向量索引中查找相似度超过阈值的历史问题
+- 命中时直接返回缓存答案（非流式）或回放为流式 chunk
+- 知识库 / FAQ 变更时整体失效，避免返回过期答案（其他进程的变更通过 Redis 中的 generation 感知）
+
+只缓存基于检索结果生成、且无错误的首轮问答，避免上下文相关的追问被复用。
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import numpy as np
+
+from src.core.config import settings
+from src.services.cache_invalidation import SharedGeneration
+from src.services.embedding_cache import CachedEmbeddings
+from src.services.llm_factory import get_shared_embeddings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedAnswer:
+    """缓存的问答"""
+
+    question: str
+    answer: str
+    retrieved_docs: Optional[list[Any]]
+    confidence_score: Optional[float]
+    created_at: float
+    similarity: float = 1.0
+
+
+class SemanticAnswerCache:
+    """
+    语义答案缓存（进程内向量索引）
+
+    向量按行归一化后存放在矩阵中，查找时一次矩阵乘法得到全部余弦相似度。
+    条目数达到上限时淘汰最早写入的条目。
+    """
+
+    def __init__(
+        self,
+        similarity_threshold: float = 0.95,
+        max_entries: int = 1000,
+        ttl: int = 3600,
+        shared_generation: Optional[SharedGeneration] = None,
+    ):
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self._vectors: Optional[np.ndarray] = None
+        self._entries: list[CachedAnswer] = []
+        # 每次失效递增，用于丢弃失效前发起的写入
+        self.generation = 0
+        # 跨进程失效（为 None 时只在进程内失效）
+        self.shared_generation = shared_generation
+        self._embeddings: Optional[CachedEmbeddings] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _normalize(vector: list[float]) -> Optional[np.ndarray]:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(array))
+        if norm == 0.0:
+            return None
+        return array / norm
+
+    async def _embed(self, question: str) -> list[float]:
+        """生成问题向量（命中查询向量缓存时无网络请求，与召回源共用 Embeddings 实例）"""
+        if self._embeddings is None:
+            self._embeddings = CachedEmbeddings(get_shared_embeddings())
+        return await self._embeddings.aembed_query(question)
+
+    def _remove(self, index: int) -> None:
+        del self._entries[index]
+        if self._vectors is not None:
+            self._vectors = np.delete(self._vectors, index, axis=0)
+            if len(self._vectors) == 0:
+                self._vectors = None
+
+    def lookup_vector(self, vector: list[float]) -> Optional[CachedAnswer]:
+        """
+        按向量查找相似问题
+
+        Args:
+            vector: 问题向量
+
+        Returns:
+            相似度超过阈值的缓存答案，未命中返回 None
+        """
+        query = self._normalize(vector)
+        if query is None or self._vectors is None or query.shape[0] != self._vectors.shape[1]:
+            return None
+
+        similarities = self._vectors @ query
+        index = int(np.argmax(similarities))
+        similarity = float(similarities[index])
+        if similarity < self.similarity_threshold:
+            return None
+
+        entry = self._entries[index]
+        if self.ttl > 0 and time.time() - entry.created_at > self.ttl:
+            self._remove(index)
+            return None
+
+        entry.similarity = similarity
+        return entry
+
+    def add_vector(self, vector: list[float], entry: CachedAnswer) -> None:
+        """写入缓存，超过上限时淘汰最早的条目"""
+        normalized = self._normalize(vector)
+        if normalized is None:
+            return
+
+        if self._vectors is not None and normalized.shape[0] != self._vectors.shape[1]:
+            # 向量维度变化（切换了 Embedding 模型），旧索引不再可比
+            self.invalidate("embedding dimension changed")
+
+        if self._vectors is None:
+            self._vectors = normalized.reshape(1, -1)
+        else:
+            self._vectors = np.vstack([self._vectors, normalized])
+        self._entries.append(entry)
+
+        while len(self._entries) > self.max_entries:
+            self._remove(0)
+
+    async def _sync_shared_generation(self) -> None:
+        """其他进程变更了知识库 / FAQ 时清空本地缓存"""
+        if self.shared_generation is not None and await self.shared_generation.changed():
+            self.invalidate("knowledge changed in another process")
+
+    async def lookup(self, question: str) -> Optional[CachedAnswer]:
+        """
+        查找语义相似的已缓存问题
+
+        Args:
+            question: 用户问题
+
+        Returns:
+            缓存答案，未命中或出错返回 None
+        """
+        try:
+            await self._sync_shared_generation()
+            vector = await self._embed(question)
+            entry = self.lookup_vector(vector)
+        except Exception as e:
+            logger.error(f"❌ Answer cache lookup failed: {e}")
+            return None
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        logger.info(
+            f"🎯 Answer cache hit (similarity: {entry.similarity:.3f}) | "
+            f"question='{question}' | cached='{entry.question}'"
+        )
+        return entry
+
+    async def store(
+        self,
+        question: str,
+        answer: str,
+        retrieved_docs: Optional[list[Any]],
+        confidence_score: Optional[float],
+        generation: int,
+    ) -> None:
+        """
+        缓存问答结果
+
+        Args:
+            question: 用户问题
+            answer: Agent 生成的答案
+            retrieved_docs: 检索到的文档
+            confidence_score: 置信度
+            generation: 请求开始时的 generation（期间发生失效则放弃写入）
+        """
+        if not answer or not retrieved_docs:
+            return
+
+        try:
+            vector = await self._embed(question)
+            await self._sync_shared_generation()
+            if generation != self.generation:
+                logger.debug("Answer cache invalidated during request, skip store")
+                return
+
+            self.add_vector(
+                vector,
+                CachedAnswer(
+                    question=question,
+                    answer=answer,
+                    retrieved_docs=retrieved_docs,
+                    confidence_score=confidence_score,
+                    created_at=time.time(),
+                ),
+            )
+        except Exception as e:
+            logger.error(f"❌ Answer cache store failed: {e}")
+
+    def invalidate(self, reason: str = "") -> None:
+        """清空缓存（知识库或 FAQ 变更时调用）"""
+        if self._entries:
+            logger.info(f"🧹 Answer cache invalidated ({len(self._entries)} entries): {reason}")
+        self._entries = []
+        self._vectors = None
+        self.generation += 1
+        self.invalidations += 1
+
+    def stats(self) -> dict:
+        """导出缓存命中统计"""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+async def session_has_history(app: Any, config: dict) -> bool:
+    """
+    判断会话是否已有历史消息
+
+    追问通常依赖上下文，只对会话首轮问题使用答案缓存。
+    读取 checkpointer 失败时按"有历史"处理，不使用缓存。
+    """
+    try:
+        snapshot = await app.aget_state(config)
+        return bool(snapshot.values.get("messages"))
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to read session state for answer cache: {e}")
+        return True
+
+
+async def record_cached_turn(app: Any, config: dict, question: str, entry: CachedAnswer) -> None:
+    """将缓存命中的问答写入会话状态，保持后续多轮对话的上下文完整"""
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    try:
+        await app.aupdate_state(
+            config,
+            {
+                "messages": [HumanMessage(content=question), AIMessage(content=entry.answer)],
+                "retrieved_docs": entry.retrieved_docs or [],
+                "confidence_score": entry.confidence_score,
+            },
+            as_node="llm",
+        )
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to record cached answer in session state: {e}")
+
+
+# 全局缓存实例（延迟初始化）
+_answer_cache: Optional[SemanticAnswerCache] = None
+_answer_generation = SharedGeneration("answers")
+
+
+def get_answer_cache() -> SemanticAnswerCache:
+    """获取语义答案缓存（单例模式）"""
+    global _answer_cache
+    if _answer_cache is None:
+        _answer_cache = SemanticAnswerCache(
+            similarity_threshold=settings.answer_cache_similarity_threshold,
+            max_entries=settings.answer_cache_max_entries,
+            ttl=settings.answer_cache_ttl,
+            shared_generation=_answer_generation,
+        )
+    return _answer_cache
+
+
+async def invalidate_answer_cache(reason: str = "knowledge changed") -> None:
+    """知识库 / FAQ 变更后使答案缓存失效（本进程立即清空，并通知其他进程）"""
+    if _answer_cache is not None:
+        _answer_cache.invalidate(reason)
+    await _answer_generation.bump()
@@ -0,0 +1,80 @@
+"""
+跨进程缓存失效
+
+答案缓存和 FAQ 倒排索引都保存在进程内，API 进程和 worker 进程各有一份。
+一个进程修改知识库 / FAQ 后只能直接失效自己的缓存，因此在 Redis 中为每类缓存维护一个 generation：
+- 发生变更的进程失效本地缓存后递增 generation
+- 其他进程使用缓存前读取 generation，与上次看到的值不同则丢弃本地缓存（答案缓存清空、FAQ 索引重建）
+
+Redis 复用任务队列的连接。Redis 不可用时只记录日志，不影响本进程内的失效。
+"""
+
+import logging
+from typing import Optional
+
+import redis.asyncio as redis
+
+from src.services.job_queue import get_job_queue
+
+logger = logging.getLogger(__name__)
+
+
+class SharedGeneration:
+    """保存在 Redis 中的缓存 generation"""
+
+    def __init__(self, name: str, client: Optional[redis.Redis] = None):
+        self.name = name
+        self.key = f"cache:{name}:generation"
+        self._client = client
+        # 本进程最近一次看到的 generation（None 表示尚未读取）
+        self.seen: Optional[int] = None
+
+    @property
+    def client(self) -> redis.Redis:
+        return self._client or get_job_queue().client
+
+    async def read(self) -> Optional[int]:
+        """读取当前 generation，Redis 不可用时返回 None"""
+        try:
+            return int(await self.client.get(self.key) or 0)
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to read {self.name} cache generation: {e}")
+            return None
+
+    async def bump(self) -> None:
+        """
+        通知其他进程缓存已失效
+
+        调用方已失效本进程的缓存。递增后的值紧接着上次看到的值时直接记为已看到，
+        本进程不会因为自己的变更再失效一次；中间有其他进程的变更时保留旧值，下次检查时再处理。
+        """
+        try:
+            value = int(await self.client.incr(self.key))
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to publish {self.name} cache invalidation: {e}")
+            return
+
+        if self.seen is None or value == self.seen + 1:
+            self.seen = value
+
+    async def changed(self) -> bool:
+        """
+        其他进程是否在上次检查之后发生了变更
+
+        首次调用只记录当前值；Redis 不可用时按未变更处理。
+        """
+        value = await self.read()
+        if value is None:
+            return False
+        if self.seen is None:
+            self.seen = value
+            return False
+        if value == self.seen:
+            return False
+
+        self.seen = value
+        return True
+
+    def reset(self) -> None:
+        """忘记已看到的值（本地缓存被清空时调用）"""
+        self.seen = None
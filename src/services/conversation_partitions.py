@@ -0,0 +1,192 @@
+"""
+对话历史按月分区维护
+
+PostgreSQL 上 conversation_history 按 created_at 按月范围分区（见 Alembic 迁移），本模块定期：
+- 预建当月及未来几个月的分区（写入不存在的分区会失败，由对话写入器落盘后回放）
+- 按保留期整块删除过期分区，不执行 DELETE，不产生死元组，VACUUM 只需处理近期分区
+- 清理会话每日活跃去重表中的过期记录
+
+多个进程同时运行时由 advisory lock 保证同一时间只有一个进程执行。非 PostgreSQL 数据库不做任何操作。
+"""
+
+import asyncio
+import logging
+import re
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, text
+
+from src.core.config import settings
+from src.db.base import DatabaseService, get_database_service
+from src.db.models import ConversationSessionDay
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "conversation_history"
+PARTITION_PREFIX = f"{PARENT_TABLE}_p"
+PARTITION_PATTERN = re.compile(rf"^{PARTITION_PREFIX}(\d{{4}})(\d{{2}})$")
+# pg_try_advisory_xact_lock 的键（"chat" 的 ASCII）
+MAINTENANCE_LOCK_KEY = 0x63686174
+# 删除分区需要父表的排他锁，拿不到时放弃本轮，避免阻塞对话写入
+LOCK_TIMEOUT = "5s"
+# 会话每日活跃记录只用于当日去重，保留一周以兼容回放的迟到数据
+SESSION_DAYS_RETENTION_DAYS = 7
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARTITION_PREFIX}{month:%Y%m}"
+
+
+def partition_month(name: str) -> Optional[date]:
+    match = PARTITION_PATTERN.match(name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def planned_months(today: date, premake_months: int) -> List[date]:
+    """当月及未来 premake_months 个月"""
+    current = month_start(today)
+    return [add_months(current, offset) for offset in range(premake_months + 1)]
+
+
+def expired_partitions(names: Iterable[str], today: date, retention_months: int) -> List[str]:
+    """整月都早于保留期起点的分区（retention_months=0 表示永久保留）"""
+    if retention_months <= 0:
+        return []
+    cutoff = add_months(month_start(today), -retention_months)
+    return sorted(name for name in names if (month := partition_month(name)) is not None and month < cutoff)
+
+
+class ConversationPartitionManager:
+    """对话历史分区维护任务"""
+
+    def __init__(
+        self,
+        db_service: Optional[DatabaseService] = None,
+        premake_months: Optional[int] = None,
+        retention_months: Optional[int] = None,
+        interval: Optional[float] = None,
+    ):
+        self._db_service = db_service
+        self.premake_months = premake_months or settings.conversation_partition_premake_months
+        self.retention_months = (
+            settings.conversation_retention_months if retention_months is None else retention_months
+        )
+        self.interval = interval or settings.conversation_partition_maintenance_interval
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def db_service(self) -> DatabaseService:
+        return self._db_service or get_database_service()
+
+    async def run_once(self, today: Optional[date] = None) -> Dict[str, List[str]]:
+        """执行一轮维护，返回创建和删除的分区"""
+        today = today or datetime.utcnow().date()
+        result = {"created": [], "dropped": []}
+
+        async with self.db_service.get_session() as session:
+            if session.get_bind().dialect.name != "postgresql":
+                return result
+            if not await self._is_partitioned(session):
+                logger.warning("⚠️ conversation_history is not partitioned, run `alembic upgrade head` to enable partitions")
+                return result
+
+            locked = (await session.execute(
+                text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": MAINTENANCE_LOCK_KEY}
+            )).scalar()
+            if not locked:
+                return result
+            await session.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+
+            existing = set(await self._existing_partitions(session))
+            for month in planned_months(today, self.premake_months):
+                name = partition_name(month)
+                if name in existing:
+                    continue
+                await session.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARENT_TABLE} "
+                    f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+                ))
+                result["created"].append(name)
+
+            for name in expired_partitions(existing, today, self.retention_months):
+                # 单个分区删除失败（如锁超时）只回滚到保存点，下一轮重试
+                try:
+                    async with session.begin_nested():
+                        await session.execute(text(f"DROP TABLE IF EXISTS {name}"))
+                    result["dropped"].append(name)
+                except Exception as e:
+                    logger.warning(f"⚠️ Failed to drop expired partition {name}, will retry: {e}")
+
+            await session.execute(delete(ConversationSessionDay).where(
+                ConversationSessionDay.stat_date < today - timedelta(days=SESSION_DAYS_RETENTION_DAYS)
+            ))
+            await session.commit()
+
+        if result["created"] or result["dropped"]:
+            logger.info(
+                f"✅ Conversation partitions maintained | created={result['created']} | dropped={result['dropped']}"
+            )
+        return result
+
+    async def _is_partitioned(self, session) -> bool:
+        query = text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table))"
+        )
+        return bool((await session.execute(query, {"table": PARENT_TABLE})).scalar())
+
+    async def _existing_partitions(self, session) -> List[str]:
+        query = text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:table)"
+        )
+        return list((await session.execute(query, {"table": PARENT_TABLE})).scalars())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"❌ Conversation partition maintenance failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """启动定期维护（启动时立即执行一轮）"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+# ===== 全局维护任务 =====
+
+_partition_manager: Optional[ConversationPartitionManager] = None
+
+
+def get_partition_manager() -> ConversationPartitionManager:
+    """获取分区维护任务单例"""
+    global _partition_manager
+    if _partition_manager is None:
+        _partition_manager = ConversationPartitionManager()
+    return _partition_manager
+
+
+async def close_partition_manager() -> None:
+    """停止分区维护任务"""
+    global _partition_manager
+    if _partition_manager is not None:
+        await _partition_manager.close()
+        _partition_manager = None
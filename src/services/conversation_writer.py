@@ -0,0 +1,404 @@
+"""
+对话历史写后（write-behind）持久化
+
+聊天请求只把对话记录放入内存队列即返回，后台任务按条数或时间间隔批量写入 PostgreSQL，
+避免每轮对话都在请求路径上执行 INSERT + COMMIT + 回读。
+
+- 批量：一批记录使用一条多行 INSERT、一次提交
+- 背压：队列有上限，满时请求短暂等待，仍无空间则直接落盘，不阻塞对话
+- 降级：写入失败（如 PostgreSQL 不可用）时整批写入本地 JSONL 文件，按间隔自动回放；
+  进程退出前未回放完的文件由之后的进程重新认领
+- 隔离：记录本身导致的错误（如文本含 NUL 字节）二分定位到具体记录，写入 quarantine-*.jsonl
+  待人工处理（改名为 pending-*.jsonl 即可重新回放），其余记录照常写入
+- 关闭：停止时写完队列中剩余记录，写不进数据库的记录落盘
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError, StatementError
+
+from src.core.config import settings
+from src.db.base import DatabaseService, get_database_service
+from src.db.repositories.conversation_repository import ConversationRepository
+
+logger = logging.getLogger(__name__)
+
+PENDING_PREFIX = "pending-"
+REPLAY_PREFIX = "replay-"
+QUARANTINE_PREFIX = "quarantine-"
+# replay-{认领进程 pid}-{认领时间}-{原文件名}
+CLAIMED_PATTERN = re.compile(rf"^{REPLAY_PREFIX}(\d+)-\d+-(.+)$")
+
+
+class _WriteInterruptedError(Exception):
+    """连接类错误中断写入，rows 为尚未写入的记录"""
+
+    def __init__(self, rows: List[Dict[str, Any]], written: int):
+        super().__init__(f"{len(rows)} conversations not written")
+        self.rows = rows
+        self.written = written
+
+
+class ConversationWriter:
+    """对话历史批量写入器（每个进程一个）"""
+
+    def __init__(
+        self,
+        db_service: Optional[DatabaseService] = None,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        queue_size: Optional[int] = None,
+        enqueue_timeout: Optional[float] = None,
+        spill_dir: Optional[str] = None,
+        spill_retry_seconds: Optional[float] = None,
+    ):
+        self._db_service = db_service
+        self.batch_size = batch_size or settings.conversation_write_batch_size
+        self.flush_interval = flush_interval or settings.conversation_write_flush_interval
+        self.queue_size = queue_size or settings.conversation_write_queue_size
+        self.enqueue_timeout = (
+            settings.conversation_write_enqueue_timeout if enqueue_timeout is None else enqueue_timeout
+        )
+        self.spill_dir = Path(spill_dir or settings.conversation_spill_dir)
+        self.spill_retry_seconds = spill_retry_seconds or settings.conversation_spill_retry_seconds
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._current_flush: Optional[asyncio.Future] = None
+        # 已从队列取出、尚未交给写入的记录（关闭时需要一并写入）
+        self._batch: List[Dict[str, Any]] = []
+        self._next_replay = 0.0
+        self._closed = False
+
+        self.flushed = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.spilled = 0
+        self.replayed = 0
+        self.quarantined = 0
+
+    @property
+    def db_service(self) -> DatabaseService:
+        return self._db_service or get_database_service()
+
+    def start(self) -> None:
+        """启动后台写入任务（需在事件循环中调用）"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # 队列绑定事件循环，换循环时重建
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._loop = loop
+            self._task = None
+        if self._task is None or self._task.done():
+            self._closed = False
+            self._task = loop.create_task(self._run())
+
+    async def submit(
+        self,
+        session_id: str,
+        user_message: str,
+        ai_response: str,
+        retrieved_docs: Optional[List[Dict[str, Any]]] = None,
+        confidence_score: Optional[float] = None,
+    ) -> None:
+        """
+        提交一条对话记录
+
+        id 和 created_at 在提交时生成，保证批量写入和回放后时间顺序不变。
+        队列满时最多等待 enqueue_timeout 秒，超时直接落盘。
+        """
+        row = {
+            "id": uuid.uuid4(),
+            "session_id": session_id,
+            "user_message": user_message,
+            "ai_response": ai_response,
+            "retrieved_docs": retrieved_docs,
+            "confidence_score": confidence_score,
+            "created_at": datetime.utcnow(),
+        }
+
+        if self._closed:
+            await self._spill([row])
+            return
+
+        self.start()
+        try:
+            self._queue.put_nowait(row)
+            return
+        except asyncio.QueueFull:
+            pass
+
+        try:
+            await asyncio.wait_for(self._queue.put(row), timeout=self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("⚠️ Conversation write queue full, spilling record to disk")
+            await self._spill([row])
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                self._batch.append(await asyncio.wait_for(self._queue.get(), timeout=self.flush_interval))
+            except asyncio.TimeoutError:
+                await self._maybe_replay()
+                continue
+
+            deadline = loop.time() + self.flush_interval
+            while len(self._batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    self._batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            rows, self._batch = self._batch, []
+            # shield：关闭时取消循环不会打断进行中的写入
+            self._current_flush = asyncio.ensure_future(self._flush(rows))
+            await asyncio.shield(self._current_flush)
+            self._current_flush = None
+            await self._maybe_replay()
+
+    async def _flush(self, rows: List[Dict[str, Any]]) -> bool:
+        """写入一批记录，失败时落盘"""
+        try:
+            self.flushed += await self._write_isolating(rows)
+            self.batches += 1
+            return True
+        except _WriteInterruptedError as e:
+            self.flushed += e.written
+            self.failed_batches += 1
+            logger.error(f"❌ Failed to write {len(e.rows)} conversations, spilling to disk: {e.__cause__}")
+            await self._spill(e.rows)
+            return False
+
+    async def _write_isolating(self, rows: List[Dict[str, Any]]) -> int:
+        """
+        写入记录并隔离无法写入的记录，返回写入条数
+
+        记录本身导致的错误二分拆批重试，定位到单条后隔离；
+        其他错误（数据库不可用、超时等）抛出 _WriteInterruptedError，携带尚未写入的记录。
+        """
+        written = 0
+        pending = deque([rows])
+        while pending:
+            chunk = pending.popleft()
+            try:
+                await self._write(chunk)
+                written += len(chunk)
+                continue
+            except Exception as e:
+                if not _is_data_error(e):
+                    remaining = [row for part in (chunk, *pending) for row in part]
+                    raise _WriteInterruptedError(remaining, written) from e
+                if len(chunk) == 1:
+                    logger.error(f"❌ Quarantining conversation {chunk[0]['id']} that cannot be written: {e}")
+                    await self._quarantine(chunk)
+                    continue
+            middle = len(chunk) // 2
+            pending.extendleft([chunk[middle:], chunk[:middle]])
+        return written
+
+    async def _write(self, rows: List[Dict[str, Any]]) -> None:
+        async with self.db_service.get_session() as session:
+            await ConversationRepository(session).bulk_create_conversations(rows)
+
+    # ===== 落盘与回放 =====
+
+    async def _spill(self, rows: List[Dict[str, Any]]) -> None:
+        try:
+            await asyncio.to_thread(self._append_spill_file, rows)
+            self.spilled += len(rows)
+        except Exception as e:
+            logger.error(f"❌ Failed to spill {len(rows)} conversations to {self.spill_dir}: {e}")
+
+    async def _quarantine(self, rows: List[Dict[str, Any]]) -> None:
+        try:
+            await asyncio.to_thread(self._append_spill_file, rows, QUARANTINE_PREFIX)
+            self.quarantined += len(rows)
+        except Exception as e:
+            logger.error(f"❌ Failed to quarantine {len(rows)} conversations to {self.spill_dir}: {e}")
+
+    def _append_spill_file(self, rows: List[Dict[str, Any]], prefix: str = PENDING_PREFIX) -> None:
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        path = self.spill_dir / f"{prefix}{os.getpid()}.jsonl"
+        lines = "".join(json.dumps(_dump_row(row), ensure_ascii=False) + "\n" for row in rows)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+    def _claim_spill_files(self) -> List[Path]:
+        """
+        认领待回放文件
+
+        改名是原子操作：多个进程同时回放时每个文件只会被一个进程认领，
+        改名后追加方会新建文件，不会与读取冲突。
+        认领后进程退出（崩溃、重启）留下的文件按 pid 判断后重新认领。
+        落盘目录需为本机目录，不能在多台主机或容器之间共享（pid 只在本机有效）。
+        """
+        if not self.spill_dir.is_dir():
+            return []
+        pid = os.getpid()
+        claimed_prefix = f"{REPLAY_PREFIX}{pid}-"
+
+        candidates = [(path, path.name) for path in sorted(self.spill_dir.glob(f"{PENDING_PREFIX}*.jsonl"))]
+        for path in sorted(self.spill_dir.glob(f"{REPLAY_PREFIX}*.jsonl")):
+            match = CLAIMED_PATTERN.match(path.name)
+            if match and int(match.group(1)) != pid and not _pid_alive(int(match.group(1))):
+                candidates.append((path, match.group(2)))
+
+        for path, original_name in candidates:
+            try:
+                path.rename(path.with_name(f"{claimed_prefix}{time.time_ns()}-{original_name}"))
+            except OSError:
+                continue
+        return sorted(self.spill_dir.glob(f"{claimed_prefix}*.jsonl"))
+
+    async def _maybe_replay(self) -> None:
+        now = time.monotonic()
+        if now < self._next_replay:
+            return
+        self._next_replay = now + self.spill_retry_seconds
+        await self.replay_spilled()
+
+    async def replay_spilled(self) -> int:
+        """
+        把落盘的记录写回数据库
+
+        文件整体处理完才删除；数据库不可用时只保留未写入的记录，等待下次重试；
+        无法写入的单条记录被隔离，不会阻塞整个文件。
+        """
+        replayed = 0
+        for path in await asyncio.to_thread(self._claim_spill_files):
+            rows = await asyncio.to_thread(_load_spill_file, path)
+            for start in range(0, len(rows), self.batch_size):
+                end = start + self.batch_size
+                try:
+                    replayed += await self._write_isolating(rows[start:end])
+                except _WriteInterruptedError as e:
+                    logger.warning(f"⚠️ Spilled conversation replay failed, will retry later: {e.__cause__}")
+                    replayed += e.written
+                    await asyncio.to_thread(_rewrite_spill_file, path, e.rows + rows[end:])
+                    self.replayed += replayed
+                    return replayed
+            path.unlink(missing_ok=True)
+
+        if replayed:
+            self.replayed += replayed
+            logger.info(f"✅ Replayed {replayed} spilled conversations")
+        return replayed
+
+    async def close(self) -> None:
+        """停止后台任务，写完剩余记录（写入失败的落盘）"""
+        self._closed = True
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._current_flush is not None:
+            await asyncio.gather(self._current_flush, return_exceptions=True)
+            self._current_flush = None
+
+        rows, self._batch = self._batch, []
+        while self._queue is not None and not self._queue.empty():
+            rows.append(self._queue.get_nowait())
+        for start in range(0, len(rows), self.batch_size):
+            await self._flush(rows[start:start + self.batch_size])
+        if rows:
+            logger.info(f"✅ Drained {len(rows)} pending conversations")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "spilled": self.spilled,
+            "replayed": self.replayed,
+            "quarantined": self.quarantined,
+        }
+
+
+def _is_data_error(error: Exception) -> bool:
+    """
+    是否为记录本身导致、重试也不会成功的错误
+
+    数据库返回的数据/约束类错误和参数处理错误属于此类；
+    连接类错误（OperationalError、InterfaceError、连接失效）、月分区尚未创建（分区维护任务补建后即可写入）
+    及其他未知错误按可重试处理。
+    """
+    if isinstance(error, DBAPIError):
+        if error.connection_invalidated or isinstance(error, (OperationalError, InterfaceError)):
+            return False
+        return "no partition of relation" not in str(error.orig)
+    return isinstance(error, StatementError)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _dump_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {**row, "id": str(row["id"]), "created_at": row["created_at"].isoformat()}
+
+
+def _load_row(data: Dict[str, Any]) -> Dict[str, Any]:
+    return {**data, "id": uuid.UUID(data["id"]), "created_at": datetime.fromisoformat(data["created_at"])}
+
+
+def _load_spill_file(path: Path) -> List[Dict[str, Any]]:
+    rows = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                rows.append(_load_row(json.loads(line)))
+            except (ValueError, KeyError) as e:
+                logger.error(f"❌ Skipping corrupt spilled conversation in {path.name}: {e}")
+    return rows
+
+
+def _rewrite_spill_file(path: Path, rows: List[Dict[str, Any]]) -> None:
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.writelines(json.dumps(_dump_row(row), ensure_ascii=False) + "\n" for row in rows)
+    tmp.replace(path)
+
+
+# ===== 全局写入器 =====
+
+_conversation_writer: Optional[ConversationWriter] = None
+
+
+def get_conversation_writer() -> ConversationWriter:
+    """获取对话历史写入器单例"""
+    global _conversation_writer
+    if _conversation_writer is None:
+        _conversation_writer = ConversationWriter()
+    return _conversation_writer
+
+
+async def close_conversation_writer() -> None:
+    """写完剩余对话历史并停止写入器"""
+    global _conversation_writer
+    if _conversation_writer is not None:
+        await _conversation_writer.close()
+        _conversation_writer = None
@@ -0,0 +1,264 @@
+"""
+查询向量缓存
+
+客服场景的查询高度重复（"退货政策"、"怎么付款"），缓存查询向量可以省去
+大部分检索前的 Embedding 网络往返：
+- 缓存键：规范化后的查询文本 + Embedding 模型名
+- 一级缓存：进程内 LRU（条目数上限 + TTL）
+- 二级缓存：可选的 Redis 共享缓存（多实例共享，TTL 相同）
+- TTL 使用 settings.cache_ttl（0 表示不过期）
+- 命中/未命中计数通过 stats() 导出
+"""
+
+import hashlib
+import json
+import logging
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import List, Optional
+
+import redis.asyncio as redis
+from langchain_core.embeddings import Embeddings
+
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = "embedding:query"
+
+
+def normalize_query(text: str) -> str:
+    """
+    规范化查询文本（用于生成缓存键）
+
+    - Unicode NFKC 归一（全角/半角统一）
+    - 合并连续空白并去除首尾空白
+    - 英文统一小写
+
+    Args:
+        text: 原始查询文本
+
+    Returns:
+        规范化后的文本
+    """
+    text = unicodedata.normalize("NFKC", text)
+    return " ".join(text.split()).lower()
+
+
+class EmbeddingCache:
+    """
+    查询向量缓存（进程内 LRU + 可选 Redis）
+
+    Redis 不可用时只记录日志并退化为进程内缓存，不影响检索。
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        ttl: int = 300,
+        redis_enabled: bool = False,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.redis_enabled = redis_enabled
+
+        # key -> (过期时间戳, 向量)；过期时间为 None 表示不过期
+        self._entries: OrderedDict[str, tuple[Optional[float], List[float]]] = OrderedDict()
+        self._redis_client: Optional[redis.Redis] = None
+
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(text: str, model: str) -> str:
+        """根据规范化文本和模型名生成缓存键"""
+        digest = hashlib.sha256(normalize_query(text).encode("utf-8")).hexdigest()
+        return f"{REDIS_KEY_PREFIX}:{model}:{digest}"
+
+    def _get_redis_client(self) -> redis.Redis:
+        """获取 Redis 客户端（延迟初始化）"""
+        if self._redis_client is None:
+            redis_url = "redis://"
+            if settings.redis_password:
+                redis_url += f":{settings.redis_password}@"
+            redis_url += f"{settings.redis_host}:{settings.redis_port}/{settings.redis_db}"
+            self._redis_client = redis.from_url(
+                redis_url,
+                encoding="utf-8",
+                decode_responses=True,
+                max_connections=settings.redis_max_connections,
+            )
+        return self._redis_client
+
+    def get_local(self, key: str) -> Optional[List[float]]:
+        """查询进程内缓存（不更新计数）"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, vector = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return vector
+
+    def set_local(self, key: str, vector: List[float]) -> None:
+        """写入进程内缓存，超过上限时淘汰最久未使用的条目"""
+        expires_at = time.monotonic() + self.ttl if self.ttl > 0 else None
+        self._entries[key] = (expires_at, vector)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[List[float]]:
+        """
+        查询缓存：先查进程内 LRU，再查 Redis
+
+        Args:
+            key: 缓存键（make_key 生成）
+
+        Returns:
+            缓存的向量，未命中返回 None
+        """
+        vector = self.get_local(key)
+        if vector is not None:
+            self.hits += 1
+            return vector
+
+        if self.redis_enabled:
+            try:
+                cached = await self._get_redis_client().get(key)
+                if cached:
+                    vector = json.loads(cached)
+                    self.set_local(key, vector)
+                    self.redis_hits += 1
+                    return vector
+            except Exception as e:
+                logger.warning(f"⚠️ Embedding cache Redis read failed: {e}")
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, vector: List[float]) -> None:
+        """写入缓存（进程内 + Redis）"""
+        self.set_local(key, vector)
+
+        if self.redis_enabled:
+            try:
+                payload = json.dumps(vector)
+                if self.ttl > 0:
+                    await self._get_redis_client().setex(key, self.ttl, payload)
+                else:
+                    await self._get_redis_client().set(key, payload)
+            except Exception as e:
+                logger.warning(f"⚠️ Embedding cache Redis write failed: {e}")
+
+    def clear(self) -> None:
+        """清空进程内缓存和计数"""
+        self._entries.clear()
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        """导出缓存命中统计"""
+        total = self.hits + self.redis_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.redis_hits) / total, 4) if total else 0.0,
+        }
+
+    async def aclose(self) -> None:
+        """关闭 Redis 连接"""
+        if self._redis_client is not None:
+            try:
+                await self._redis_client.aclose()
+            except Exception as e:
+                logger.error(f"❌ Failed to close embedding cache Redis client: {e}")
+            finally:
+                self._redis_client = None
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    带查询向量缓存的 Embeddings 包装
+
+    只缓存 embed_query / aembed_query；文档向量（入库场景）直接透传。
+    实际请求仍使用调用方传入的原始文本，规范化只用于缓存键。
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: Optional[EmbeddingCache] = None):
+        self.embeddings = embeddings
+        self.cache = cache or get_embedding_cache()
+
+    @property
+    def model(self) -> str:
+        """缓存键使用的模型名"""
+        return settings.embedding_model_name
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.embeddings.aembed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        """同步查询（只使用进程内缓存）"""
+        if not settings.embedding_cache_enabled:
+            return self.embeddings.embed_query(text)
+
+        key = self.cache.make_key(text, self.model)
+        vector = self.cache.get_local(key)
+        if vector is not None:
+            self.cache.hits += 1
+            return vector
+
+        self.cache.misses += 1
+        vector = self.embeddings.embed_query(text)
+        self.cache.set_local(key, vector)
+        return vector
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """异步查询（进程内 LRU → Redis → Embedding API）"""
+        if not settings.embedding_cache_enabled:
+            return await self.embeddings.aembed_query(text)
+
+        key = self.cache.make_key(text, self.model)
+        vector = await self.cache.get(key)
+        if vector is not None:
+            return vector
+
+        vector = await self.embeddings.aembed_query(text)
+        await self.cache.set(key, vector)
+        return vector
+
+
+# 全局缓存实例（延迟初始化）
+_embedding_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """获取查询向量缓存（单例模式）"""
+    global _embedding_cache
+    if _embedding_cache is None:
+        _embedding_cache = EmbeddingCache(
+            max_entries=settings.embedding_cache_max_entries,
+            ttl=settings.cache_ttl,
+            redis_enabled=settings.embedding_cache_redis_enabled,
+        )
+    return _embedding_cache
+
+
+async def close_embedding_cache() -> None:
+    """关闭查询向量缓存（应用关闭时调用）"""
+    global _embedding_cache
+    if _embedding_cache is not None:
+        await _embedding_cache.aclose()
+        _embedding_cache = None
@@ -7,7 +7,7 @@
 import logging
 from typing import List
 
-from src.services.llm_factory import create_embeddings
+from src.services.llm_factory import get_shared_embeddings
 
 logger = logging.getLogger(__name__)
 
@@ -16,7 +16,7 @@ class EmbeddingService:
     """嵌入服务类"""
 
     def __init__(self):
-        self.embeddings = create_embeddings()
+        self.embeddings = get_shared_embeddings()
 
     async def get_embedding(self, text: str) -> List[float]:
         """
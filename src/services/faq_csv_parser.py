@@ -2,14 +2,17 @@
 FAQ CSV 解析服务
 
 提供灵活的CSV解析和处理功能，支持用户自定义列配置。
+导入按流式处理：逐块检测编码、csv reader 逐行读取、按批生成向量，内存占用与文件行数无关。
 """
 
+import codecs
 import csv
 import io
 import logging
 import uuid
-from typing import Any
+from typing import Any, AsyncIterator, Iterator
 
+from src.core.config import settings
 from src.services.embedding_service import get_embedding_service
 
 logger = logging.getLogger(__name__)
@@ -17,6 +20,9 @@ logger = logging.getLogger(__name__)
 # 常见CSV编码列表（按优先级排序）
 COMMON_ENCODINGS = ['utf-8', 'gbk', 'gb2312', 'shift-jis', 'euc-kr', 'iso-8859-1', 'utf-16']
 
+# 编码检测时每次解码的字节数
+DECODE_BLOCK_SIZE = 64 * 1024
+
 
 class FAQCSVParser:
     """FAQ CSV 解析器 - 支持灵活的列配置"""
@@ -31,25 +37,28 @@ class FAQCSVParser:
             self._embedding_service = get_embedding_service()
         return self._embedding_service
 
-    def _decode_csv(self, file_content: bytes) -> str:
+    def _detect_encoding(self, file_content: bytes) -> str:
         """
-        尝试多种编码解码CSV
+        逐块增量解码，返回第一个能完整解码的编码（不生成完整的解码文本）
 
         Args:
             file_content: 原始字节内容
 
         Returns:
-            解码后的文本
+            编码名称
 
         Raises:
             ValueError: 所有编码都失败
         """
-        # 尝试常见编码
+        view = memoryview(file_content)
         for encoding in COMMON_ENCODINGS:
             try:
-                text = file_content.decode(encoding)
+                decoder = codecs.getincrementaldecoder(encoding)()
+                for start in range(0, len(view), DECODE_BLOCK_SIZE):
+                    decoder.decode(view[start:start + DECODE_BLOCK_SIZE])
+                decoder.decode(b"", final=True)
                 logger.info(f"成功使用 {encoding} 编码解析CSV")
-                return text
+                return encoding
             except (UnicodeDecodeError, LookupError):
                 continue
 
@@ -59,6 +68,38 @@ class FAQCSVParser:
             "请确保文件是有效的CSV格式。"
         )
 
+    def _decode_csv(self, file_content: bytes) -> str:
+        """
+        尝试多种编码解码CSV
+
+        Args:
+            file_content: 原始字节内容
+
+        Returns:
+            解码后的文本
+
+        Raises:
+            ValueError: 所有编码都失败
+        """
+        return file_content.decode(self._detect_encoding(file_content))
+
+    def _iter_rows(self, file_content: bytes) -> tuple[list[str], Iterator[dict[str, str]]]:
+        """
+        以文本流方式逐行读取CSV
+
+        Returns:
+            (列名, 行迭代器)
+        """
+        encoding = self._detect_encoding(file_content)
+        stream = io.TextIOWrapper(io.BytesIO(file_content), encoding=encoding, newline="")
+        reader = csv.DictReader(stream)
+        return list(reader.fieldnames or []), iter(reader)
+
+    def count_rows(self, file_content: bytes) -> int:
+        """统计CSV数据行数（流式，不保留行内容）"""
+        _, rows = self._iter_rows(file_content)
+        return sum(1 for _ in rows)
+
     async def parse_csv_preview(
         self,
         file_content: bytes
@@ -77,32 +118,38 @@ class FAQCSVParser:
                 "detected_language": "zh"
             }
         """
-        text = self._decode_csv(file_content)
-        reader = csv.DictReader(io.StringIO(text))
+        columns, rows = self._iter_rows(file_content)
 
-        columns = list(reader.fieldnames or [])
-        rows = list(reader)
+        preview_rows = []
+        total_rows = 0
+        for row in rows:
+            if total_rows < 5:
+                preview_rows.append(row)
+            total_rows += 1
 
         # 自动检测语言
-        detected_language = self._detect_language(rows, columns)
+        detected_language = self._detect_language(preview_rows, columns)
 
         return {
             "columns": columns,
-            "preview_rows": rows[:5],
-            "total_rows": len(rows),
+            "preview_rows": preview_rows,
+            "total_rows": total_rows,
             "detected_language": detected_language,
         }
 
-    async def process_csv(
+    async def iter_faq_batches(
         self,
         file_content: bytes,
         text_columns: list[str],
         embedding_columns: list[str],
         text_template: str = "{question}\n答：{answer}",
         language: str = "zh",
-    ) -> list[dict[str, Any]]:
+        batch_size: int | None = None,
+    ) -> AsyncIterator[tuple[list[dict[str, Any]], int]]:
         """
-        根据配置处理CSV
+        流式处理CSV，按批生成FAQ
+
+        每批最多 batch_size 行（默认 INGEST_EMBEDDING_BATCH_SIZE），一次 get_embeddings 调用。
 
         Args:
             file_content: CSV文件内容
@@ -110,43 +157,108 @@ class FAQCSVParser:
             embedding_columns: 用于生成embedding的列名
             text_template: 文本拼接模板
             language: 语言标记
+            batch_size: 每批行数
 
-        Returns:
-            处理后的FAQ列表
+        Yields:
+            (本批FAQ列表, 本批读取的行数)
         """
-        text = self._decode_csv(file_content)
-        reader = csv.DictReader(io.StringIO(text))
+        batch_size = batch_size or settings.ingest_embedding_batch_size
+        _, rows = self._iter_rows(file_content)
 
-        faqs = []
-        for row in reader:
+        pending: list[tuple[dict[str, str], str, str]] = []
+        consumed = 0
+        for row in rows:
+            consumed += 1
             # 跳过空行
             if not any(row.values()):
                 continue
 
             try:
-                # 生成text（根据模板）
-                text_content = self._generate_text(row, text_columns, text_template)
-
-                # 生成embedding（根据配置的列）
-                embedding_content = self._generate_embedding_text(row, embedding_columns)
-                embedding = await self._get_embedding_service().get_embedding(embedding_content)
-
-                # 构建FAQ
-                faqs.append({
-                    "id": str(uuid.uuid4()),
-                    "text": text_content,
-                    "embedding": embedding,
-                    "metadata": {
-                        **row,  # 保存所有原始列
-                        "language": language,
-                        "text_template": text_template,
-                        "embedding_source": ",".join(embedding_columns),
-                    }
-                })
+                pending.append((
+                    row,
+                    self._generate_text(row, text_columns, text_template),
+                    self._generate_embedding_text(row, embedding_columns),
+                ))
             except Exception as e:
                 logger.warning(f"处理CSV行失败，跳过: {e}")
                 continue
 
+            if len(pending) >= batch_size:
+                yield await self._embed_rows(pending, embedding_columns, text_template, language), consumed
+                pending, consumed = [], 0
+
+        if pending or consumed:
+            yield await self._embed_rows(pending, embedding_columns, text_template, language), consumed
+
+    async def _embed_rows(
+        self,
+        pending: list[tuple[dict[str, str], str, str]],
+        embedding_columns: list[str],
+        text_template: str,
+        language: str,
+    ) -> list[dict[str, Any]]:
+        """为一批行生成向量并构建FAQ（批量请求失败时逐行重试，跳过失败的行）"""
+        if not pending:
+            return []
+
+        embedding_service = self._get_embedding_service()
+        try:
+            embeddings = await embedding_service.get_embeddings([item[2] for item in pending])
+        except Exception as e:
+            logger.warning(f"批量生成 {len(pending)} 行的嵌入向量失败，逐行重试: {e}")
+            embeddings = []
+            for _, _, embedding_content in pending:
+                try:
+                    embeddings.append(await embedding_service.get_embedding(embedding_content))
+                except Exception as row_error:
+                    logger.warning(f"处理CSV行失败，跳过: {row_error}")
+                    embeddings.append(None)
+
+        return [
+            {
+                "id": str(uuid.uuid4()),
+                "text": text_content,
+                "embedding": embedding,
+                "metadata": {
+                    **row,  # 保存所有原始列
+                    "language": language,
+                    "text_template": text_template,
+                    "embedding_source": ",".join(embedding_columns),
+                },
+            }
+            for (row, text_content, _), embedding in zip(pending, embeddings)
+            if embedding is not None
+        ]
+
+    async def process_csv(
+        self,
+        file_content: bytes,
+        text_columns: list[str],
+        embedding_columns: list[str],
+        text_template: str = "{question}\n答：{answer}",
+        language: str = "zh",
+    ) -> list[dict[str, Any]]:
+        """
+        根据配置处理CSV
+
+        返回完整列表（含全部向量），大文件导入请使用 iter_faq_batches。
+
+        Args:
+            file_content: CSV文件内容
+            text_columns: 用于生成text的列名
+            embedding_columns: 用于生成embedding的列名
+            text_template: 文本拼接模板
+            language: 语言标记
+
+        Returns:
+            处理后的FAQ列表
+        """
+        faqs = []
+        async for batch, _ in self.iter_faq_batches(
+            file_content, text_columns, embedding_columns, text_template, language
+        ):
+            faqs.extend(batch)
+
         logger.info(f"成功处理 {len(faqs)} 条FAQ")
         return faqs
 
@@ -0,0 +1,224 @@
+"""
+FAQ 倒排索引
+
+FAQ 召回中"用户原样输入了某个 FAQ 问题"的比例很高，这类查询不需要 Embedding + Milvus 往返。
+这里在进程内维护 FAQ 集合的倒排索引：
+- 应用启动时从 FAQ collection 全量构建
+- FAQRepository 插入 / 删除 FAQ 时增量更新，并通过 Redis 中的 generation 通知其他进程重建
+- 分词：英文按单词，中文按字符 bigram（查询与文档使用相同的规范化）
+- 问题完全一致时返回精确匹配（分数 1.0），否则按 IDF 加权的查询词覆盖率打分（0~1）
+"""
+
+import logging
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Optional
+
+from src.services.cache_invalidation import SharedGeneration
+from src.services.embedding_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+|[\u4e00-\u9fff]+")
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    分词（英文单词 + 中文字符 bigram）
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        词项列表（可能重复）
+    """
+    tokens = []
+    for run in _TOKEN_PATTERN.findall(normalize_query(text)):
+        if run[0].isascii():
+            tokens.append(run)
+        elif len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def question_key(text: str) -> str:
+    """精确匹配键：规范化后去掉末尾标点（"退货政策？" 与 "退货政策" 视为同一问题）"""
+    return normalize_query(text).rstrip("?？!！。.，, ")
+
+
+def faq_question(text: str, metadata: dict[str, Any]) -> str:
+    """FAQ 问题（导入时未提供 question 列则使用整段文本）"""
+    return metadata.get("question") or text
+
+
+@dataclass
+class IndexedFAQ:
+    """已索引的 FAQ"""
+
+    faq_id: str
+    text: str
+    metadata: dict[str, Any]
+    terms: Counter = field(default_factory=Counter)
+
+
+@dataclass
+class LexicalMatch:
+    """倒排索引匹配结果"""
+
+    faq: IndexedFAQ
+    score: float
+    exact: bool = False
+
+
+class FAQLexicalIndex:
+    """FAQ 倒排索引（进程内）"""
+
+    def __init__(self):
+        self._docs: dict[str, IndexedFAQ] = {}
+        # 词项 -> {faq_id: 词频}
+        self._postings: dict[str, dict[str, int]] = {}
+        # 规范化后的问题 -> faq_id 集合
+        self._questions: dict[str, set[str]] = {}
+        self.ready = False
+        # 跨进程变更通知（构建时记录，召回前检查）
+        self.shared_generation = SharedGeneration("faq")
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, faq_id: str, text: str, metadata: Optional[dict[str, Any]] = None) -> None:
+        """添加或更新一条 FAQ"""
+        metadata = metadata or {}
+        if faq_id in self._docs:
+            self.remove(faq_id)
+
+        question = faq_question(text, metadata)
+        doc = IndexedFAQ(
+            faq_id=faq_id,
+            text=text,
+            metadata=metadata,
+            terms=Counter(tokenize(f"{question}\n{text}")),
+        )
+        self._docs[faq_id] = doc
+        for term, count in doc.terms.items():
+            self._postings.setdefault(term, {})[faq_id] = count
+        self._questions.setdefault(question_key(question), set()).add(faq_id)
+
+    def add_many(self, records: Iterable[dict[str, Any]]) -> None:
+        """批量添加 FAQ（记录格式与 FAQRepository.insert 相同：{id, text, metadata}）"""
+        for record in records:
+            self.add(str(record["id"]), record.get("text", ""), record.get("metadata") or {})
+
+    def remove(self, faq_id: str) -> None:
+        """删除一条 FAQ"""
+        doc = self._docs.pop(faq_id, None)
+        if doc is None:
+            return
+
+        for term in doc.terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(faq_id, None)
+                if not postings:
+                    del self._postings[term]
+
+        key = question_key(faq_question(doc.text, doc.metadata))
+        ids = self._questions.get(key)
+        if ids is not None:
+            ids.discard(faq_id)
+            if not ids:
+                del self._questions[key]
+
+    def clear(self) -> None:
+        """清空索引"""
+        self._docs.clear()
+        self._postings.clear()
+        self._questions.clear()
+        self.ready = False
+        self.shared_generation.reset()
+
+    def _idf(self, term: str) -> float:
+        df = len(self._postings.get(term, ()))
+        return math.log(1 + len(self._docs) / df) if df else 0.0
+
+    def search(self, query: str, top_k: int = 5) -> list[LexicalMatch]:
+        """
+        检索 FAQ
+
+        Args:
+            query: 用户查询
+            top_k: 返回结果数量
+
+        Returns:
+            按分数降序排列的匹配结果（精确匹配分数为 1.0）
+        """
+        exact_ids = self._questions.get(question_key(query), set())
+        matches = [LexicalMatch(self._docs[faq_id], 1.0, exact=True) for faq_id in exact_ids]
+
+        query_terms = set(tokenize(query))
+        weights = {term: self._idf(term) for term in query_terms}
+        total_weight = sum(weights.values())
+        if total_weight > 0:
+            accumulated: dict[str, float] = {}
+            for term, weight in weights.items():
+                for faq_id in self._postings.get(term, ()):
+                    if faq_id not in exact_ids:
+                        accumulated[faq_id] = accumulated.get(faq_id, 0.0) + weight
+            # 未出现在任何 FAQ 中的查询词也计入分母，避免只命中一个常见词就得到高分
+            missing = sum(1 for weight in weights.values() if not weight)
+            total_weight += missing * math.log(1 + len(self._docs))
+            matches.extend(
+                LexicalMatch(self._docs[faq_id], score / total_weight)
+                for faq_id, score in accumulated.items()
+            )
+
+        matches.sort(key=lambda x: x.score, reverse=True)
+        return matches[:top_k]
+
+    async def build(self, repository: Any, batch_size: int = 1000) -> int:
+        """
+        从 FAQ collection 全量构建索引
+
+        Args:
+            repository: FAQRepository
+            batch_size: 每批读取的条数
+
+        Returns:
+            索引的 FAQ 数量
+        """
+        # 先记录 generation：构建期间其他进程的变更会在下次检查时触发重建
+        generation = await self.shared_generation.read()
+
+        # 在新索引中构建完成后再替换，重建期间召回仍使用旧索引
+        fresh = FAQLexicalIndex()
+        async for batch in repository.iter_faqs(batch_size=batch_size):
+            fresh.add_many(batch)
+        self._docs, self._postings, self._questions = fresh._docs, fresh._postings, fresh._questions
+        self.ready = True
+        self.shared_generation.seen = generation
+        logger.info(f"✅ FAQ index built: {len(self._docs)} FAQs, {len(self._postings)} terms")
+        return len(self._docs)
+
+    def stats(self) -> dict:
+        """导出索引规模"""
+        return {
+            "ready": self.ready,
+            "faqs": len(self._docs),
+            "terms": len(self._postings),
+        }
+
+
+# 全局索引实例（延迟初始化）
+_faq_index: Optional[FAQLexicalIndex] = None
+
+
+def get_faq_index() -> FAQLexicalIndex:
+    """获取 FAQ 倒排索引（单例模式）"""
+    global _faq_index
+    if _faq_index is None:
+        _faq_index = FAQLexicalIndex()
+    return _faq_index
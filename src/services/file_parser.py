@@ -2,18 +2,283 @@
 文件解析服务
 
 支持 PDF、Markdown、纯文本等格式的文件解析和智能分块。
+
+PDF 提取、Markdown 转换和分块都是 CPU 密集操作，统一放到独立的解析进程池中执行，
+避免大文件解析阻塞同一事件循环上的对话请求。进程中执行的函数定义在模块顶层以便序列化。
 """
 
+import asyncio
 import logging
+import multiprocessing
+import os
 import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from io import BytesIO
-from typing import Dict, List
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple, Union
 
 import markdown
 from pypdf import PdfReader
 
+from src.core.config import settings
+
 logger = logging.getLogger(__name__)
 
+# 解析进程池（单例）
+_parser_pool: Optional[ProcessPoolExecutor] = None
+
+# 每个解析进程内复用的 Markdown 转换器
+_markdown_converter: Optional[markdown.Markdown] = None
+
+
+def get_parser_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    获取解析进程池（单例）
+
+    Returns:
+        ProcessPoolExecutor | None: PARSER_PROCESS_WORKERS=0 时返回 None，使用事件循环默认线程池
+    """
+    global _parser_pool
+    if settings.parser_process_workers <= 0:
+        return None
+    if _parser_pool is None:
+        # 使用 spawn 启动，避免 fork 复制事件循环线程和连接状态
+        _parser_pool = ProcessPoolExecutor(
+            max_workers=settings.parser_process_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        logger.info(f"✅ File parser process pool started: {settings.parser_process_workers} workers")
+    return _parser_pool
+
+
+def _discard_parser_pool(pool: Optional[ProcessPoolExecutor]) -> None:
+    """终止超时或已损坏的进程池，下次调用时重建"""
+    global _parser_pool
+    if pool is None:
+        return
+    if _parser_pool is pool:
+        _parser_pool = None
+    # Python 3.14 之前没有公开的终止接口，只能直接终止子进程
+    for process in list((getattr(pool, "_processes", None) or {}).values()):
+        process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+    logger.warning("⚠️ File parser process pool terminated, it will be recreated on next use")
+
+
+def shutdown_parser_pool() -> None:
+    """关闭解析进程池（应用退出时调用）"""
+    global _parser_pool
+    pool, _parser_pool = _parser_pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+        logger.info("✅ File parser process pool closed")
+
+
+def _split_page_ranges(start: int, total: int, parts: int, min_pages: int) -> List[Tuple[int, int]]:
+    """将 [start, total) 页均分为最多 parts 段，每段至少 min_pages 页"""
+    remaining = total - start
+    if remaining <= 0:
+        return []
+    count = max(1, min(parts, remaining // min_pages))
+    size = -(-remaining // count)
+    return [(page, min(page + size, total)) for page in range(start, total, size)]
+
+
+def extract_pdf_pages(
+    source: Union[bytes, str], start: int = 0, end: Optional[int] = None
+) -> Tuple[int, List[str]]:
+    """
+    提取 PDF 第 [start, end) 页的文本（在解析进程中执行）
+
+    Args:
+        source: PDF 文件内容或文件路径（传路径时由解析进程自行读取，避免跨进程传输整个文件）
+        start: 起始页（含）
+        end: 结束页（不含），None 表示到最后一页
+
+    Returns:
+        Tuple[int, List[str]]: (总页数, 各页文本)
+    """
+    reader = PdfReader(source if isinstance(source, str) else BytesIO(source))
+    total_pages = len(reader.pages)
+    stop = total_pages if end is None else min(end, total_pages)
+    return total_pages, [reader.pages[index].extract_text() or "" for index in range(start, stop)]
+
+
+def markdown_to_text(file_content: bytes) -> str:
+    """Markdown 转换为纯文本（在解析进程中执行）"""
+    global _markdown_converter
+    try:
+        text_content = file_content.decode('utf-8')
+    except UnicodeDecodeError:
+        # 尝试其他编码
+        text_content = file_content.decode('gbk')
+
+    if _markdown_converter is None:
+        _markdown_converter = markdown.Markdown(extensions=['codehilite', 'fenced_code'])
+
+    # 转换为 HTML 然后提取纯文本
+    html_content = _markdown_converter.reset().convert(text_content)
+
+    # 简单的 HTML 标签清理
+    clean_text = re.sub(r'<[^>]+>', '', html_content)
+    clean_text = re.sub(r'\n\s*\n', '\n\n', clean_text)
+
+    return clean_text.strip()
+
+
+_PARAGRAPH_SPLIT = re.compile(r'\n\s*\n')
+_SENTENCE_SPLIT = re.compile(r'[.!?。！？]\s*')
+_SENTENCE_END = re.compile(r'[.!?。！？]')
+
+
+class StreamingChunker:
+    """
+    增量智能分块
+
+    按段落切分，过长的段落再按句子打包成不超过 max_chunk_size 的块。文本可以分段输入
+    （如逐页），各段之间按换行拼接，结果与整体分块一致。未结束的段落超过 carry_limit 时
+    先打包其中已完整的句子，缓冲区大小不随文档增长。
+    """
+
+    def __init__(self, max_chunk_size: int, min_chunk_size: int, carry_limit: Optional[int] = None):
+        self.max_chunk_size = max_chunk_size
+        self.min_chunk_size = min_chunk_size
+        self.carry_limit = carry_limit or max(4 * max_chunk_size, 4096)
+        # 尚未结束的段落（None 表示还没有输入）
+        self._buffer: Optional[str] = None
+        # 正在按句子打包的长段落的当前块（None 表示当前段落尚未开始打包）
+        self._current: Optional[str] = None
+
+    def feed(self, text: str) -> List[str]:
+        """输入一段文本，返回已确定的分块"""
+        data = text if self._buffer is None else f"{self._buffer}\n{text}"
+        paragraphs = _PARAGRAPH_SPLIT.split(data)
+        self._buffer = paragraphs.pop()
+
+        chunks: List[str] = []
+        for paragraph in paragraphs:
+            self._close_paragraph(paragraph, chunks)
+
+        if len(self._buffer) > self.carry_limit and (
+            self._current is not None or len(self._buffer.strip()) > self.max_chunk_size
+        ):
+            self._pack_settled(chunks)
+
+        return self._filter(chunks)
+
+    def close(self) -> List[str]:
+        """结束输入，返回剩余分块"""
+        chunks: List[str] = []
+        if self._buffer is not None:
+            self._close_paragraph(self._buffer, chunks)
+        self._buffer = None
+        return self._filter(chunks)
+
+    def _filter(self, chunks: List[str]) -> List[str]:
+        # 过滤掉太短的块
+        return [chunk for chunk in chunks if len(chunk) >= self.min_chunk_size]
+
+    def _close_paragraph(self, paragraph: str, chunks: List[str]) -> None:
+        if self._current is None:
+            paragraph = paragraph.strip()
+            if not paragraph:
+                return
+
+            # 段落长度合适，直接保存
+            if len(paragraph) <= self.max_chunk_size:
+                chunks.append(paragraph)
+                return
+
+            # 段落太长，按句子分割
+            self._current = ""
+
+        self._pack(paragraph, chunks)
+
+        # 保存最后一个块
+        if self._current:
+            chunks.append(self._current.strip())
+        self._current = None
+
+    def _pack(self, text: str, chunks: List[str]) -> None:
+        for sentence in _SENTENCE_SPLIT.split(text):
+            sentence = sentence.strip()
+            if not sentence:
+                continue
+
+            # 如果加上这个句子会超过限制，先保存当前块
+            if len(self._current) + len(sentence) + 1 > self.max_chunk_size:
+                if self._current:
+                    chunks.append(self._current.strip())
+                    self._current = sentence
+                else:
+                    # 单个句子太长，直接保存
+                    chunks.append(sentence)
+            else:
+                self._current = f"{self._current} {sentence}" if self._current else sentence
+
+    def _pack_settled(self, chunks: List[str]) -> None:
+        """打包长段落中已完整的句子（最后一个句子可能在后续文本中继续）"""
+        last = None
+        for last in _SENTENCE_END.finditer(self._buffer):
+            pass
+        if last is None:
+            return
+
+        if self._current is None:
+            self._current = ""
+        self._pack(self._buffer[:last.end()], chunks)
+        self._buffer = self._buffer[last.end():]
+
+
+def smart_chunk(text: str, max_chunk_size: int, min_chunk_size: int) -> List[str]:
+    """
+    智能分块算法（在解析进程中执行）
+
+    Args:
+        text: 原始文本
+        max_chunk_size: 最大分块字符数
+        min_chunk_size: 最小分块字符数
+
+    Returns:
+        List[str]: 分块后的文本列表
+    """
+    chunker = StreamingChunker(max_chunk_size, min_chunk_size)
+    return chunker.feed(text) + chunker.close()
+
+
+def decode_text(file_content: bytes) -> str:
+    """按 UTF-8、GBK、Latin-1 顺序尝试解码文本"""
+    for encoding in ('utf-8', 'gbk'):
+        try:
+            return file_content.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return file_content.decode('latin-1')
+
+
+def _read_source(source: Union[bytes, str]) -> bytes:
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            return f.read()
+    return source
+
+
+def chunk_document(source: Union[bytes, str], file_type: str, max_chunk_size: int, min_chunk_size: int) -> List[str]:
+    """
+    解析 Markdown/纯文本文件并分块（在解析进程中执行）
+
+    Args:
+        source: 文件内容或文件路径
+        file_type: 'markdown' 或 'txt'
+    """
+    file_content = _read_source(source)
+    if file_type == 'markdown':
+        text_content = markdown_to_text(file_content)
+    else:
+        text_content = decode_text(file_content).strip()
+    return smart_chunk(text_content, max_chunk_size, min_chunk_size)
+
 
 class FileParser:
     """文件解析服务"""
@@ -25,14 +290,10 @@ class FileParser:
         'text/x-markdown': 'markdown'
     }
 
-    MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+    MAX_FILE_SIZE = settings.knowledge_max_file_size_mb * 1024 * 1024
     MAX_CHUNK_SIZE = 500  # 最大分块字符数
     MIN_CHUNK_SIZE = 50   # 最小分块字符数
 
-    def __init__(self):
-        """初始化文件解析器"""
-        self.md = markdown.Markdown(extensions=['codehilite', 'fenced_code'])
-
     async def parse_file(self, file_content: bytes, filename: str) -> Dict:
         """
         解析文件内容
@@ -63,7 +324,7 @@ class FileParser:
                 raise ValueError(f"不支持的文件类型: {file_type}")
 
             # 智能分块
-            chunks = self._smart_chunk(text_content)
+            chunks = await self._chunk(text_content)
 
             # 构建元数据
             metadata = {
@@ -84,6 +345,99 @@ class FileParser:
             logger.error(f"解析文件失败 {filename}: {e}")
             raise
 
+    async def iter_chunks(
+        self, source: Union[bytes, str], filename: str
+    ) -> AsyncIterator[Tuple[List[str], float]]:
+        """
+        流式解析文件，边解析边产出分块
+
+        PDF 按页段提取，每完成一段即增量分块产出，同时在途的页段不超过解析进程数，
+        下游向量化和写入无需等待整个文件解析完成，内存占用也不随页数增长。
+        分块结果与 parse_file 一致。
+
+        Args:
+            source: 文件内容或文件路径（传路径时由解析进程读取文件）
+            filename: 文件名
+
+        Yields:
+            Tuple[List[str], float]: (本段分块, 已解析比例 0~1)
+        """
+        if isinstance(source, str):
+            file_size = os.path.getsize(source)
+            with open(source, 'rb') as f:
+                head = f.read(8192)
+        else:
+            file_size, head = len(source), source[:8192]
+
+        file_type = self._detect_file_type(head, filename)
+
+        if file_size > self.MAX_FILE_SIZE:
+            raise ValueError(f"文件大小超过限制 ({self.MAX_FILE_SIZE / 1024 / 1024:.1f}MB)")
+
+        if file_type == 'pdf':
+            async for chunks, parsed in self._iter_pdf_chunks(source):
+                yield chunks, parsed
+        else:
+            chunks = await self._run_in_pool(
+                chunk_document, source, file_type, self.MAX_CHUNK_SIZE, self.MIN_CHUNK_SIZE
+            )
+            yield chunks, 1.0
+
+    async def _iter_pdf_chunks(self, source: Union[bytes, str]) -> AsyncIterator[Tuple[List[str], float]]:
+        """按页段并行提取 PDF，按页序增量分块"""
+        pages_per_task = settings.parser_pdf_pages_per_task
+        window = max(settings.parser_process_workers, 1)
+        chunker = StreamingChunker(self.MAX_CHUNK_SIZE, self.MIN_CHUNK_SIZE)
+        has_text = False
+
+        def feed(page_texts: List[str]) -> List[str]:
+            nonlocal has_text
+            text = "\n".join(page_text for page_text in page_texts if page_text)
+            if not text:
+                return []
+            has_text = has_text or bool(text.strip())
+            return chunker.feed(text)
+
+        try:
+            # 第一段同时返回总页数
+            total_pages, pages = await self._run_in_pool(extract_pdf_pages, source, 0, pages_per_task)
+        except Exception as e:
+            logger.error(f"PDF 解析失败: {e}")
+            raise ValueError(f"PDF 文件解析失败: {str(e)}")
+        yield feed(pages), min(pages_per_task, total_pages) / max(total_pages, 1)
+
+        starts = iter(range(pages_per_task, total_pages, pages_per_task))
+        in_flight = deque()
+
+        def submit() -> None:
+            start = next(starts, None)
+            if start is not None:
+                end = min(start + pages_per_task, total_pages)
+                task = asyncio.create_task(self._run_in_pool(extract_pdf_pages, source, start, end))
+                in_flight.append((end, task))
+
+        try:
+            for _ in range(window):
+                submit()
+
+            while in_flight:
+                end, task = in_flight.popleft()
+                try:
+                    _, pages = await task
+                except Exception as e:
+                    logger.error(f"PDF 解析失败: {e}")
+                    raise ValueError(f"PDF 文件解析失败: {str(e)}")
+                submit()
+                yield feed(pages), end / total_pages
+        finally:
+            for _, task in in_flight:
+                task.cancel()
+
+        if not has_text:
+            raise ValueError("PDF 文件中没有可提取的文本内容")
+
+        yield chunker.close(), 1.0
+
     def _detect_file_type(self, file_content: bytes, filename: str) -> str:
         """
         检测文件类型
@@ -129,16 +483,52 @@ class FileParser:
         # 不支持的文件类型
         raise ValueError(f"不支持的文件类型: {filename} (扩展名: {ext})")
 
-    async def _parse_pdf(self, file_content: bytes) -> str:
-        """解析 PDF 文件"""
+    async def _run_in_pool(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        在解析进程池中执行 CPU 密集任务，避免阻塞事件循环
+
+        Raises:
+            ValueError: 任务超时或解析进程异常退出
+        """
+        loop = asyncio.get_running_loop()
+        pool = get_parser_pool()
+        timeout = settings.parser_task_timeout_seconds
         try:
-            pdf_reader = PdfReader(BytesIO(file_content))
-            text_content = ""
+            return await asyncio.wait_for(loop.run_in_executor(pool, func, *args), timeout=timeout)
+        except asyncio.TimeoutError:
+            # 已开始执行的任务无法取消，只能终止进程
+            if pool is not None:
+                _discard_parser_pool(pool)
+            raise ValueError(f"解析超时（超过 {timeout} 秒）")
+        except BrokenProcessPool as e:
+            _discard_parser_pool(pool)
+            raise ValueError(f"解析进程异常退出: {e}")
 
-            for page in pdf_reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text_content += page_text + "\n"
+    async def _parse_pdf(self, file_content: bytes) -> str:
+        """解析 PDF 文件（进程池模式下按页分段并行提取）"""
+        try:
+            # 线程池模式下受 GIL 限制并行无收益，整本一次提取
+            parallel = get_parser_pool() is not None
+            head_pages = settings.parser_pdf_pages_per_task if parallel else None
+
+            # 第一段同时返回总页数，页数少的文件一次完成
+            total_pages, pages = await self._run_in_pool(extract_pdf_pages, file_content, 0, head_pages)
+
+            if len(pages) < total_pages:
+                ranges = _split_page_ranges(
+                    len(pages),
+                    total_pages,
+                    settings.parser_process_workers,
+                    settings.parser_pdf_pages_per_task,
+                )
+                results = await asyncio.gather(*[
+                    self._run_in_pool(extract_pdf_pages, file_content, start, end)
+                    for start, end in ranges
+                ])
+                for _, page_texts in results:
+                    pages.extend(page_texts)
+
+            text_content = "\n".join(page_text for page_text in pages if page_text)
 
             if not text_content.strip():
                 raise ValueError("PDF 文件中没有可提取的文本内容")
@@ -152,28 +542,7 @@ class FileParser:
     async def _parse_markdown(self, file_content: bytes) -> str:
         """解析 Markdown 文件"""
         try:
-            # 解码为文本
-            text_content = file_content.decode('utf-8')
-
-            # 转换为 HTML 然后提取纯文本
-            html_content = self.md.convert(text_content)
-
-            # 简单的 HTML 标签清理
-            clean_text = re.sub(r'<[^>]+>', '', html_content)
-            clean_text = re.sub(r'\n\s*\n', '\n\n', clean_text)
-
-            return clean_text.strip()
-
-        except UnicodeDecodeError:
-            # 尝试其他编码
-            try:
-                text_content = file_content.decode('gbk')
-                html_content = self.md.convert(text_content)
-                clean_text = re.sub(r'<[^>]+>', '', html_content)
-                return clean_text.strip()
-            except Exception as e:
-                logger.error(f"Markdown 解析失败: {e}")
-                raise ValueError(f"Markdown 文件解析失败: {str(e)}")
+            return await self._run_in_pool(markdown_to_text, file_content)
         except Exception as e:
             logger.error(f"Markdown 解析失败: {e}")
             raise ValueError(f"Markdown 文件解析失败: {str(e)}")
@@ -181,30 +550,20 @@ class FileParser:
     async def _parse_text(self, file_content: bytes) -> str:
         """解析纯文本文件"""
         try:
-            # 尝试 UTF-8 编码
-            text_content = file_content.decode('utf-8')
-            return text_content.strip()
-
-        except UnicodeDecodeError:
-            try:
-                # 尝试 GBK 编码
-                text_content = file_content.decode('gbk')
-                return text_content.strip()
-            except UnicodeDecodeError:
-                try:
-                    # 尝试 Latin-1 编码
-                    text_content = file_content.decode('latin-1')
-                    return text_content.strip()
-                except Exception as e:
-                    logger.error(f"文本文件解析失败: {e}")
-                    raise ValueError(f"无法解码文本文件: {str(e)}")
+            return decode_text(file_content).strip()
         except Exception as e:
             logger.error(f"文本文件解析失败: {e}")
             raise ValueError(f"文本文件解析失败: {str(e)}")
 
+    async def _chunk(self, text: str) -> List[str]:
+        """在解析进程池中执行智能分块"""
+        chunks = await self._run_in_pool(smart_chunk, text, self.MAX_CHUNK_SIZE, self.MIN_CHUNK_SIZE)
+        logger.info(f"文本分块完成: {len(chunks)} 个块")
+        return chunks
+
     def _smart_chunk(self, text: str) -> List[str]:
         """
-        智能分块算法
+        智能分块算法（同步版本）
 
         Args:
             text: 原始文本
@@ -212,56 +571,9 @@ class FileParser:
         Returns:
             List[str]: 分块后的文本列表
         """
-        if not text.strip():
-            return []
-
-        # 按段落分割
-        paragraphs = re.split(r'\n\s*\n', text.strip())
-        chunks = []
-
-        for paragraph in paragraphs:
-            paragraph = paragraph.strip()
-            if not paragraph:
-                continue
-
-            # 如果段落太长，进一步分割
-            if len(paragraph) > self.MAX_CHUNK_SIZE:
-                # 按句子分割
-                sentences = re.split(r'[.!?。！？]\s*', paragraph)
-                current_chunk = ""
-
-                for sentence in sentences:
-                    sentence = sentence.strip()
-                    if not sentence:
-                        continue
-
-                    # 如果加上这个句子会超过限制，先保存当前块
-                    if len(current_chunk) + len(sentence) + 1 > self.MAX_CHUNK_SIZE:
-                        if current_chunk:
-                            chunks.append(current_chunk.strip())
-                            current_chunk = sentence
-                        else:
-                            # 单个句子太长，直接保存
-                            chunks.append(sentence)
-                    else:
-                        if current_chunk:
-                            current_chunk += " " + sentence
-                        else:
-                            current_chunk = sentence
-
-                # 保存最后一个块
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-            else:
-                # 段落长度合适，直接保存
-                if len(paragraph) >= self.MIN_CHUNK_SIZE:
-                    chunks.append(paragraph)
-
-        # 过滤掉太短的块
-        filtered_chunks = [chunk for chunk in chunks if len(chunk) >= self.MIN_CHUNK_SIZE]
-
-        logger.info(f"文本分块完成: {len(filtered_chunks)} 个块")
-        return filtered_chunks
+        chunks = smart_chunk(text, self.MAX_CHUNK_SIZE, self.MIN_CHUNK_SIZE)
+        logger.info(f"文本分块完成: {len(chunks)} 个块")
+        return chunks
 
     def get_supported_extensions(self) -> List[str]:
         """获取支持的文件扩展名"""
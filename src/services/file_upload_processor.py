@@ -7,18 +7,30 @@
 import asyncio
 import logging
 import os
+import tempfile
+import uuid
 from datetime import datetime
-from typing import Dict, List
+from typing import AsyncIterable, AsyncIterator, Dict, List, Optional, Set, Tuple
 
-from src.db.base import DatabaseService
+from src.core.config import settings
+from src.db.base import DatabaseService, get_database_service
 from src.db.repositories.file_upload_repository import FileUploadRepository
 from src.repositories.milvus.base_milvus_repository import get_milvus_client
 from src.repositories.milvus.knowledge_repository import KnowledgeRepository
 from src.services.embedding_service import get_embedding_service
 from src.services.file_parser import FileParser
+from src.services.job_queue import (
+    JobQueue,
+    PermanentJobError,
+    is_last_attempt,
+    register_job_handler,
+)
 
 logger = logging.getLogger(__name__)
 
+# 任务类型（由任务队列 worker 执行）
+FILE_UPLOAD_JOB = "file_upload"
+
 
 class FileUploadProcessor:
     """文件上传处理服务"""
@@ -27,43 +39,19 @@ class FileUploadProcessor:
         """初始化文件上传处理器"""
         self.db_service = db_service
         self.file_parser = FileParser()
-        self.max_retries = 3
 
-    async def process_file(self, upload_record_id: str) -> bool:
+    async def process_file(self, upload_record_id: str, content: Optional[AsyncIterable[bytes]]) -> None:
         """
-        处理上传的文件
+        处理上传的文件（失败时抛出异常，由任务队列按退避重试）
 
         Args:
             upload_record_id: 上传记录 ID
+            content: 文件内容分块（逐块读取任务队列中保存的上传文件）；为空表示已过期
 
-        Returns:
-            bool: 处理是否成功
+        Raises:
+            PermanentJobError: 上传记录不存在或文件内容已过期（重试无意义）
         """
-        retry_count = 0
-
-        while retry_count < self.max_retries:
-            try:
-                return await self._do_process(upload_record_id)
-            except Exception as e:
-                retry_count += 1
-                logger.error(f"处理文件失败 (重试 {retry_count}/{self.max_retries}): {e}")
-
-                if retry_count >= self.max_retries:
-                    # 标记为失败
-                    await self._update_status(
-                        upload_record_id,
-                        status="failed",
-                        error_message=str(e)
-                    )
-                    return False
-                else:
-                    # 等待后重试
-                    await asyncio.sleep(2 ** retry_count)
-
-        return False
-
-    async def _do_process(self, upload_record_id: str) -> bool:
-        """执行文件处理逻辑"""
+        local_path = None
         try:
             # 1. 获取上传记录
             async with self.db_service.get_session() as session:
@@ -71,8 +59,7 @@ class FileUploadProcessor:
                 upload_record = await upload_repo.get_upload_by_id(upload_record_id)
 
                 if not upload_record:
-                    logger.error(f"上传记录不存在: {upload_record_id}")
-                    return False
+                    raise PermanentJobError(f"上传记录不存在: {upload_record_id}")
 
                 # 2. 更新状态为处理中
                 await upload_repo.update_status(
@@ -81,112 +68,184 @@ class FileUploadProcessor:
                     progress=10
                 )
 
-            # 3. 读取文件内容
-            if not upload_record.file_path or not os.path.exists(upload_record.file_path):
-                raise FileNotFoundError(f"文件不存在: {upload_record.file_path}")
+            # 3. 上传内容写入本机临时文件（解析进程按路径读取），worker 不依赖 API 主机的文件系统
+            if content is None:
+                raise PermanentJobError(f"文件不存在或已过期，请重新上传: {upload_record.filename}")
+            local_path = await _write_temp_file(content, upload_record.filename)
 
-            with open(upload_record.file_path, 'rb') as f:
-                file_content = f.read()
-
-            # 4. 解析文件内容
+            # 4. 流式解析并入库：解析出的分块直接进入向量化与写入流水线
             await self._update_status(upload_record_id, status="processing", progress=30)
-            parsed_result = await self.file_parser.parse_file(file_content, upload_record.filename)
-
-            chunks = parsed_result['chunks']
-            metadata = parsed_result['metadata']
-
-            if not chunks:
-                raise ValueError("文件解析后没有有效内容")
-
-            logger.info(f"文件解析完成: {len(chunks)} 个分块")
-
-            # 5. 生成向量并存储到 Milvus
-            await self._update_status(upload_record_id, status="processing", progress=50)
-            milvus_ids = await self._store_to_milvus(chunks, upload_record, metadata)
+            milvus_ids = await self._store_chunk_stream(
+                self.file_parser.iter_chunks(local_path, upload_record.filename),
+                upload_record,
+            )
 
-            # 6. 更新处理结果
-            await self._update_status(upload_record_id, status="processing", progress=90)
+            # 5. 更新处理结果
             await self._update_result(upload_record_id, {
-                'document_count': len(chunks),
+                'document_count': len(milvus_ids),
                 'milvus_ids': milvus_ids,
                 'status': 'completed',
                 'progress': 100
             })
+            logger.info(f"文件处理完成: {upload_record_id}")
+        finally:
+            if local_path is not None:
+                try:
+                    os.remove(local_path)
+                except OSError as e:
+                    logger.warning(f"清理临时文件失败: {e}")
 
-            # 7. 清理临时文件
-            try:
-                os.remove(upload_record.file_path)
-                logger.info(f"清理临时文件: {upload_record.file_path}")
-            except Exception as e:
-                logger.warning(f"清理临时文件失败: {e}")
+    async def _store_to_milvus(self, chunks: List[str], upload_record, metadata: Dict) -> List[str]:
+        """
+        将已全部解析的分块存储到 Milvus
 
-            logger.info(f"文件处理完成: {upload_record_id}")
-            return True
+        Returns:
+            成功存储的文档 ID（按分块顺序）
+        """
+        async def single_batch():
+            yield chunks, 1.0
 
-        except Exception as e:
-            logger.error(f"处理文件失败: {e}")
-            await self._update_status(
-                upload_record_id,
-                status="failed",
-                error_message=str(e)
-            )
-            return False
+        return await self._store_chunk_stream(single_batch(), upload_record, total_chunks=len(chunks))
 
-    async def _store_to_milvus(self, chunks: List[str], upload_record, metadata: Dict) -> List[str]:
-        """将分块存储到 Milvus"""
-        try:
-            # 获取 Milvus 客户端和知识库仓库
-            milvus_client = await get_milvus_client()
-            knowledge_repo = KnowledgeRepository(milvus_client)
+    async def _store_chunk_stream(
+        self,
+        batches: AsyncIterator[Tuple[List[str], float]],
+        upload_record,
+        total_chunks: Optional[int] = None,
+    ) -> List[str]:
+        """
+        流式向量化分块并存储到 Milvus
 
-            # 获取嵌入服务
-            embedding_service = get_embedding_service()
+        流水线处理：解析器每产出一段分块即按 INGEST_EMBEDDING_BATCH_SIZE 切批调用 get_embeddings，
+        最多 INGEST_EMBEDDING_CONCURRENCY 个批次在途（达到上限时暂停读取解析结果）；生成的向量按
+        INGEST_INSERT_BATCH_SIZE 批量写入 Milvus，每完成一个批次更新一次进度（30% → 90%）。
+        解析中途失败时删除已写入的分块。
 
-            milvus_ids = []
+        Args:
+            batches: 解析器产出的 (分块列表, 已解析比例)
+            upload_record: 上传记录
+            total_chunks: 分块总数（已知时写入每个分块的元数据）
 
-            # 批量处理分块
-            for i, chunk in enumerate(chunks):
+        Returns:
+            成功存储的文档 ID（按分块顺序）
+        """
+        # 获取 Milvus 客户端和知识库仓库
+        milvus_client = await get_milvus_client()
+        knowledge_repo = KnowledgeRepository(milvus_client)
+
+        # 获取嵌入服务
+        embedding_service = get_embedding_service()
+
+        batch_size = settings.ingest_embedding_batch_size
+        insert_batch_size = settings.ingest_insert_batch_size
+        semaphore = asyncio.Semaphore(settings.ingest_embedding_concurrency)
+
+        base_metadata = {
+            'filename': upload_record.filename,
+            'file_type': upload_record.file_type,
+            'source': upload_record.source,
+            'version': upload_record.version,
+            'uploader': upload_record.uploader,
+            'upload_id': str(upload_record.id),
+            'created_at': int(datetime.utcnow().timestamp()),
+        }
+        if total_chunks is not None:
+            base_metadata['total_chunks'] = total_chunks
+
+        stored: List[Tuple[int, str]] = []
+        pending: List[Dict] = []
+        tasks: Set[asyncio.Task] = set()
+        state = {'chunks': 0, 'batches': 0, 'embedded_chunks': 0, 'embedded_batches': 0, 'parsed': 0.0, 'progress': 30}
+
+        async def flush():
+            if not pending:
+                return
+            batch = list(pending)
+            pending.clear()
+            try:
+                await knowledge_repo.insert(batch)
+                stored.extend((doc['metadata']['chunk_index'], doc['id']) for doc in batch)
+            except Exception as e:
+                logger.error(f"写入 {len(batch)} 个分块到 Milvus 失败: {e}")
+
+        async def report_progress():
+            if total_chunks:
+                ratio = state['embedded_chunks'] / total_chunks
+            else:
+                ratio = state['parsed'] * state['embedded_batches'] / state['batches']
+            progress = 30 + int(60 * min(ratio, 1.0))
+            if progress > state['progress']:
+                state['progress'] = progress
+                await self._update_status(str(upload_record.id), status="processing", progress=progress)
+
+        async def embed_batch(start: int, batch: List[str]):
+            try:
                 try:
-                    # 生成嵌入向量
-                    embedding = await embedding_service.get_embedding(chunk)
-
-                    # 构建文档元数据
-                    doc_metadata = {
-                        'filename': upload_record.filename,
-                        'file_type': upload_record.file_type,
-                        'source': upload_record.source,
-                        'version': upload_record.version,
-                        'uploader': upload_record.uploader,
-                        'upload_id': str(upload_record.id),
-                        'chunk_index': i,
-                        'total_chunks': len(chunks),
-                        'created_at': int(datetime.utcnow().timestamp())
-                    }
-
-                    # 存储到 Milvus
-                    doc_id = await knowledge_repo.add_document(
-                        text=chunk,
-                        metadata=doc_metadata,
-                        embedding=embedding
-                    )
-
-                    milvus_ids.append(doc_id)
-                    logger.debug(f"存储分块 {i+1}/{len(chunks)} 到 Milvus: {doc_id}")
-
+                    embeddings = await embedding_service.get_embeddings(batch)
                 except Exception as e:
-                    logger.error(f"存储分块 {i+1} 失败: {e}")
-                    continue
-
-            if not milvus_ids:
-                raise ValueError("没有成功存储任何分块到 Milvus")
+                    logger.error(f"生成分块 {start + 1}-{start + len(batch)} 的嵌入向量失败: {e}")
+                else:
+                    for offset, (text, embedding) in enumerate(zip(batch, embeddings)):
+                        pending.append({
+                            'id': str(uuid.uuid4()),
+                            'text': text,
+                            'embedding': embedding,
+                            'metadata': {**base_metadata, 'chunk_index': start + offset},
+                        })
+                    if len(pending) >= insert_batch_size:
+                        await flush()
+            finally:
+                semaphore.release()
+            state['embedded_chunks'] += len(batch)
+            state['embedded_batches'] += 1
+            await report_progress()
+            logger.debug(f"向量化批次 {state['embedded_batches']}/{state['batches']} 完成")
+
+        async def submit(batch: List[str]):
+            # 在途批次达到上限时等待，暂停读取解析结果
+            await semaphore.acquire()
+            task = asyncio.create_task(embed_batch(state['chunks'], batch))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            state['chunks'] += len(batch)
+            state['batches'] += 1
 
-            logger.info(f"成功存储 {len(milvus_ids)} 个分块到 Milvus")
-            return milvus_ids
+        try:
+            buffer: List[str] = []
+            async for chunks, parsed in batches:
+                state['parsed'] = parsed
+                buffer.extend(chunks)
+                while len(buffer) >= batch_size:
+                    await submit(buffer[:batch_size])
+                    del buffer[:batch_size]
+            if buffer:
+                await submit(buffer)
+
+            await asyncio.gather(*tasks)
+            await flush()
 
         except Exception as e:
             logger.error(f"存储到 Milvus 失败: {e}")
+            for task in list(tasks):
+                task.cancel()
+            # 解析中途失败时删除已写入的分块，避免重试后重复入库
+            for _, doc_id in stored:
+                try:
+                    await knowledge_repo.delete_document(doc_id)
+                except Exception as delete_error:
+                    logger.warning(f"删除 Milvus 文档失败 {doc_id}: {delete_error}")
             raise
 
+        if not state['chunks']:
+            raise ValueError("文件解析后没有有效内容")
+
+        if not stored:
+            raise ValueError("没有成功存储任何分块到 Milvus")
+
+        milvus_ids = [doc_id for _, doc_id in sorted(stored)]
+        logger.info(f"成功存储 {len(milvus_ids)}/{state['chunks']} 个分块到 Milvus")
+        return milvus_ids
+
     async def _update_status(self, upload_id: str, status: str, progress: int = None, error_message: str = None):
         """更新上传状态"""
         try:
@@ -251,26 +310,54 @@ class FileUploadProcessor:
             logger.error(f"回滚上传失败: {e}")
             return False
 
-    async def retry_upload(self, upload_id: str) -> bool:
-        """
-        重试失败的上传
-
-        Args:
-            upload_id: 上传记录 ID
-
-        Returns:
-            bool: 重试是否成功
-        """
-        try:
-            # 重置状态
-            await self._update_status(upload_id, status="pending", progress=0, error_message=None)
-
-            # 重新处理
-            return await self.process_file(upload_id)
-
-        except Exception as e:
-            logger.error(f"重试上传失败: {e}")
-            return False
-
-
-
+    async def reset_upload(self, upload_id: str) -> None:
+        """重置上传状态为待处理（重试前调用）"""
+        await self._update_status(upload_id, status="pending", progress=0, error_message=None)
+
+    async def mark_failed(self, upload_id: str, error_message: str) -> None:
+        """标记上传处理失败（任务队列不再重试，可通过重试接口重新提交）"""
+        await self._update_status(upload_id, status="failed", error_message=error_message)
+
+    async def mark_retrying(self, upload_id: str, error_message: str) -> None:
+        """处理失败但任务队列将自动重试：保持待处理状态，记录本次错误"""
+        await self._update_status(
+            upload_id, status="pending", progress=0, error_message=f"处理失败，等待自动重试: {error_message}"
+        )
+
+
+async def _write_temp_file(content: AsyncIterable[bytes], filename: str) -> str:
+    """将文件内容逐块写入本机临时文件（保留扩展名），返回路径"""
+    fd, path = tempfile.mkstemp(prefix="upload-", suffix=os.path.splitext(filename)[1])
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in content:
+                await asyncio.to_thread(f.write, chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+@register_job_handler(FILE_UPLOAD_JOB)
+async def run_file_upload_job(job: Dict, queue: JobQueue) -> None:
+    """
+    任务队列处理函数：处理上传的文件，失败时由任务队列按退避重试
+
+    文件内容随任务保存在 Redis 中（任务 ID 即上传记录 ID），任意主机上的 worker 都能处理；
+    只有最后一次尝试失败时才把上传记录标记为 failed（之前的失败保持 pending，避免等待重试期间被手动重试）。
+    任务最终失败后内容保留 JOB_RESULT_TTL 秒，期间可通过重试接口重新入队。
+    """
+    upload_id = job["payload"]["upload_id"]
+    # 逐块读取文件内容，不把整个文件读入内存
+    content = queue.iter_blob(job["task_id"]) if await queue.has_blob(job["task_id"]) else None
+    # 共享进程级连接池，不为每个任务创建数据库引擎
+    processor = FileUploadProcessor(get_database_service())
+    try:
+        await processor.process_file(upload_id, content)
+    except Exception as e:
+        logger.error(f"处理文件失败: {e}")
+        if isinstance(e, PermanentJobError) or is_last_attempt(job):
+            await processor.mark_failed(upload_id, str(e))
+        else:
+            await processor.mark_retrying(upload_id, str(e))
+        raise
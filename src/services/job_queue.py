@@ -0,0 +1,621 @@
+"""
+后台任务队列
+
+FAQ 导入、文件入库等耗时任务通过 Redis 队列交给独立的 worker 进程执行（python -m src.worker），
+任务状态和进度保存在 Redis 中，任意 API 实例都能查询：
+- 任务记录：{prefix}:job:{id}（Hash，字段值为 JSON）
+- 待执行队列：{prefix}:pending（List），执行中：{prefix}:processing（List，BLMOVE 保证不丢任务）
+- 延迟重试：{prefix}:delayed（ZSet，score 为可执行时间），到期后在同一事务中移回待执行队列
+- 执行租约：{prefix}:leases（ZSet，score 为租约到期时间），worker 执行期间定期续租
+- 大体积输入（如 CSV 内容、上传文件）：{prefix}:blob:{id}（List，按 1MB 分块存储，写入和读取都不需要整份放入内存）
+- 失败按指数退避重试，超过 JOB_MAX_ATTEMPTS 或抛出 PermanentJobError 时标记为 failed
+- failed 的任务在保留期内可通过 retry 以同一任务 ID 重新提交（复用保存的输入）
+- 租约过期（超过 JOB_LEASE_SECONDS 未续租，即 worker 崩溃）的任务重新入队，执行时间再长也不会被误回收
+- JOB_QUEUE_BACKEND=fakeredis 时使用进程内 fakeredis（本地开发和测试）
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Optional
+
+import redis.asyncio as redis
+
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 任务状态
+JOB_PENDING = "pending"
+JOB_PROCESSING = "processing"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+# 任务处理函数：接收任务记录和队列（用于更新进度、读取输入）
+JobHandler = Callable[[dict[str, Any], "JobQueue"], Awaitable[None]]
+
+# 任务输入分块大小
+BLOB_CHUNK_SIZE = 1024 * 1024
+# 暂存输入（已写入但尚未提交任务）的过期时间（秒），提交任务前进程退出时自动清理
+BLOB_STAGING_TTL = 3600
+
+
+class PermanentJobError(Exception):
+    """不应重试的任务错误（如输入无效、部分结果已写入）"""
+
+
+class JobQueue:
+    """基于 Redis 的任务队列"""
+
+    def __init__(
+        self,
+        client: redis.Redis,
+        name: str = "ingest",
+        blocking: bool = True,
+        lease_seconds: Optional[float] = None,
+    ):
+        """
+        Args:
+            client: Redis 客户端（bytes 模式）
+            name: 队列名称
+            blocking: 是否使用阻塞式 BLMOVE 等待任务（fakeredis 的阻塞命令不让出事件循环，需关闭）
+            lease_seconds: 执行租约时长（秒），默认 JOB_LEASE_SECONDS
+        """
+        self.client = client
+        self.blocking = blocking
+        self.lease_seconds = lease_seconds or settings.job_lease_seconds
+        self.prefix = f"jobs:{name}"
+        self.pending_key = f"{self.prefix}:pending"
+        self.processing_key = f"{self.prefix}:processing"
+        self.delayed_key = f"{self.prefix}:delayed"
+        self.leases_key = f"{self.prefix}:leases"
+
+    def _job_key(self, job_id: str) -> str:
+        return f"{self.prefix}:job:{job_id}"
+
+    def _blob_key(self, job_id: str) -> str:
+        return f"{self.prefix}:blob:{job_id}"
+
+    def _staging_key(self, staging_id: str) -> str:
+        return f"{self.prefix}:staging:{staging_id}"
+
+    async def stage_blob(self, chunks: AsyncIterable[bytes], max_size: int) -> tuple[Optional[str], int]:
+        """
+        分块写入任务输入（提交任务前调用，如上传文件边读边写）
+
+        Args:
+            chunks: 输入内容分块
+            max_size: 最大字节数，超过时停止读取并删除已写入的内容
+
+        Returns:
+            (暂存 ID, 已读取字节数)；超过 max_size 时暂存 ID 为 None
+        """
+        staging_id = str(uuid.uuid4())
+        key = self._staging_key(staging_id)
+        size = 0
+        try:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_size:
+                    await self.client.delete(key)
+                    return None, size
+                for start in range(0, len(chunk), BLOB_CHUNK_SIZE):
+                    async with self.client.pipeline(transaction=True) as pipe:
+                        pipe.rpush(key, chunk[start:start + BLOB_CHUNK_SIZE])
+                        pipe.expire(key, BLOB_STAGING_TTL)
+                        await pipe.execute()
+        except BaseException:
+            await self.client.delete(key)
+            raise
+        if size == 0:
+            await self.client.rpush(key, b"")
+            await self.client.expire(key, BLOB_STAGING_TTL)
+        return staging_id, size
+
+    async def enqueue(
+        self,
+        job_type: str,
+        payload: dict[str, Any],
+        *,
+        job_id: Optional[str] = None,
+        blob: Optional[bytes] = None,
+        staged_blob: Optional[str] = None,
+        state: Optional[dict[str, Any]] = None,
+        max_attempts: Optional[int] = None,
+    ) -> str:
+        """
+        提交任务
+
+        Args:
+            job_type: 任务类型（对应注册的处理函数）
+            payload: 任务参数（JSON 可序列化）
+            job_id: 任务ID，默认生成 UUID
+            blob: 大体积输入（单独存储，处理函数通过 get_blob / iter_blob 读取）
+            staged_blob: stage_blob 返回的暂存 ID（与 blob 二选一）
+            state: 初始状态字段（如 progress、message）
+            max_attempts: 最大尝试次数，默认 JOB_MAX_ATTEMPTS
+
+        Returns:
+            任务ID
+        """
+        job_id = job_id or str(uuid.uuid4())
+        record = _new_record(job_id, job_type, payload, max_attempts or settings.job_max_attempts, state)
+
+        blob_key = self._blob_key(job_id)
+        if staged_blob is not None:
+            # 暂存内容已过期时 RENAME 报错，任务不会入队
+            await self.client.rename(self._staging_key(staged_blob), blob_key)
+
+        async with self.client.pipeline(transaction=True) as pipe:
+            # 复用任务 ID 时不保留旧记录的字段和过期时间
+            pipe.delete(self._job_key(job_id))
+            pipe.hset(self._job_key(job_id), mapping=_encode(record))
+            if blob is not None:
+                pipe.delete(blob_key)
+                pipe.rpush(blob_key, *_split_blob(blob))
+            elif staged_blob is not None:
+                pipe.persist(blob_key)
+            pipe.lpush(self.pending_key, job_id)
+            await pipe.execute()
+
+        logger.info(f"📤 Job enqueued: {job_type} {job_id}")
+        return job_id
+
+    async def retry(self, job_id: str) -> bool:
+        """
+        以同一任务 ID 重新提交最终失败的任务（复用保存的输入）
+
+        只有状态为 failed 且输入仍在保留期内的任务可以重新提交：等待自动重试或执行中的任务重新提交会被执行两次。
+        任务记录重置为初始状态，记录和输入不再过期。WATCH 任务记录，并发重试时只有一个请求成功。
+
+        Returns:
+            是否已重新提交
+        """
+        job_key = self._job_key(job_id)
+        blob_key = self._blob_key(job_id)
+        async with self.client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(job_key, blob_key)
+                    raw = await pipe.hgetall(job_key)
+                    job = _decode(raw) if raw else None
+                    if not job or job.get("status") != JOB_FAILED or not await pipe.exists(blob_key):
+                        return False
+                    record = _new_record(job_id, job["type"], job["payload"], job["max_attempts"])
+                    pipe.multi()
+                    pipe.delete(job_key)
+                    pipe.hset(job_key, mapping=_encode(record))
+                    pipe.persist(blob_key)
+                    pipe.lpush(self.pending_key, job_id)
+                    await pipe.execute()
+                    logger.info(f"🔁 Job resubmitted: {job['type']} {job_id}")
+                    return True
+                except redis.WatchError:
+                    continue
+
+    async def get(self, job_id: str) -> Optional[dict[str, Any]]:
+        """获取任务记录（不存在返回 None）"""
+        raw = await self.client.hgetall(self._job_key(job_id))
+        return _decode(raw) if raw else None
+
+    async def update(self, job_id: str, **fields: Any) -> None:
+        """更新任务状态/进度字段"""
+        fields["updated_at"] = time.time()
+        await self.client.hset(self._job_key(job_id), mapping=_encode(fields))
+
+    async def get_blob(self, job_id: str) -> Optional[bytes]:
+        """读取任务的大体积输入（不存在返回 None）"""
+        chunks = await self.client.lrange(self._blob_key(job_id), 0, -1)
+        return b"".join(chunks) if chunks else None
+
+    async def has_blob(self, job_id: str) -> bool:
+        """任务输入是否仍然存在（完成或失败后超过保留期会被清理）"""
+        return bool(await self.client.exists(self._blob_key(job_id)))
+
+    async def iter_blob(self, job_id: str) -> AsyncIterator[bytes]:
+        """逐块读取任务输入（大文件不需要整份读入内存）"""
+        index = 0
+        while (chunk := await self.client.lindex(self._blob_key(job_id), index)) is not None:
+            yield chunk
+            index += 1
+
+    async def promote_delayed(self) -> int:
+        """
+        将到期的延迟任务移回待执行队列
+
+        WATCH 延迟集合后在 MULTI 事务中移出并入队：worker 在两步之间崩溃不会丢任务，
+        多个 worker 同时执行时集合被修改会重试，不会重复入队。
+        """
+        async with self.client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(self.delayed_key)
+                    due = await pipe.zrangebyscore(self.delayed_key, 0, time.time())
+                    if not due:
+                        return 0
+                    pipe.multi()
+                    pipe.zrem(self.delayed_key, *due)
+                    pipe.lpush(self.pending_key, *due)
+                    await pipe.execute()
+                    return len(due)
+                except redis.WatchError:
+                    continue
+
+    async def renew_lease(self, job_id: str) -> bool:
+        """
+        续租执行中的任务
+
+        Returns:
+            租约是否仍然有效（已被回收的任务不会重新获得租约）
+        """
+        return bool(await self.client.zadd(
+            self.leases_key, {job_id: time.time() + self.lease_seconds}, xx=True, ch=True
+        ))
+
+    async def dequeue(self, timeout: float = 1.0) -> Optional[str]:
+        """
+        取出一个任务并标记为执行中
+
+        Args:
+            timeout: 队列为空时的最长等待时间（秒）
+
+        Returns:
+            任务ID；超时返回 None
+        """
+        await self.promote_delayed()
+        if self.blocking:
+            raw_id = await self.client.blmove(self.pending_key, self.processing_key, timeout, "RIGHT", "LEFT")
+        else:
+            raw_id = await self.client.lmove(self.pending_key, self.processing_key, "RIGHT", "LEFT")
+            if raw_id is None:
+                await asyncio.sleep(timeout)
+        if raw_id is None:
+            return None
+
+        job_id = _text(raw_id)
+        await self.client.zadd(self.leases_key, {job_id: time.time() + self.lease_seconds})
+        attempts = await self.client.hincrby(self._job_key(job_id), "attempts", 1)
+        await self.update(job_id, status=JOB_PROCESSING, started_at=time.time(), attempts=attempts)
+        return job_id
+
+    async def complete(self, job_id: str, **fields: Any) -> None:
+        """标记任务完成"""
+        await self.update(job_id, status=JOB_COMPLETED, error=None, **fields)
+        await self._finish(job_id)
+
+    async def fail(self, job_id: str, error: str, retryable: bool = True) -> bool:
+        """
+        记录任务失败，未超过最大尝试次数时按指数退避重新调度
+
+        Args:
+            job_id: 任务ID
+            error: 错误信息
+            retryable: 是否允许重试
+
+        Returns:
+            是否已重新调度
+        """
+        job = await self.get(job_id) or {}
+        attempts = int(job.get("attempts", 0))
+        max_attempts = int(job.get("max_attempts", settings.job_max_attempts))
+
+        if retryable and attempts < max_attempts:
+            delay = settings.job_retry_backoff_seconds * (2 ** (attempts - 1))
+            await self.update(job_id, status=JOB_PENDING, error=error, retry_at=time.time() + delay)
+            async with self.client.pipeline(transaction=True) as pipe:
+                pipe.lrem(self.processing_key, 0, job_id)
+                pipe.zrem(self.leases_key, job_id)
+                pipe.zadd(self.delayed_key, {job_id: time.time() + delay})
+                await pipe.execute()
+            logger.warning(f"🔄 Job {job_id} failed (attempt {attempts}/{max_attempts}), retry in {delay:.1f}s: {error}")
+            return True
+
+        await self.update(job_id, status=JOB_FAILED, error=error)
+        await self._finish(job_id, keep_blob=True)
+        logger.error(f"❌ Job {job_id} failed after {attempts} attempts: {error}")
+        return False
+
+    async def _finish(self, job_id: str, keep_blob: bool = False) -> None:
+        """
+        任务结束：移出执行中队列，记录保留 JOB_RESULT_TTL 秒
+
+        完成的任务删除输入；失败的任务保留输入（与记录同样过期），便于以同一任务 ID 重新提交。
+        """
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.lrem(self.processing_key, 0, job_id)
+            pipe.zrem(self.leases_key, job_id)
+            if not keep_blob:
+                pipe.delete(self._blob_key(job_id))
+            if settings.job_result_ttl:
+                pipe.expire(self._job_key(job_id), settings.job_result_ttl)
+                if keep_blob:
+                    pipe.expire(self._blob_key(job_id), settings.job_result_ttl)
+            await pipe.execute()
+
+    async def recover_stale(self) -> int:
+        """
+        将租约过期的任务（worker 崩溃遗留）重新放回待执行队列
+
+        没有租约的执行中任务（刚取出尚未登记，或升级前遗留）先补登一个租约期，
+        到期仍无人续租时再回收。
+
+        Returns:
+            重新入队的任务数
+        """
+        now = time.time()
+        recovered = 0
+        for raw_id in await self.client.lrange(self.processing_key, 0, -1):
+            job_id = _text(raw_id)
+            expiry = await self.client.zscore(self.leases_key, job_id)
+            if expiry is None:
+                await self.client.zadd(self.leases_key, {job_id: now + self.lease_seconds}, nx=True)
+                continue
+            if expiry <= now and await self._requeue_expired(job_id):
+                recovered += 1
+        if recovered:
+            logger.warning(f"⚠️ Recovered {recovered} jobs with expired leases")
+        return recovered
+
+    async def _requeue_expired(self, job_id: str) -> bool:
+        """租约仍过期时把任务移回待执行队列（WATCH 租约和执行中队列，期间被续租或完成则放弃）"""
+        async with self.client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(self.leases_key, self.processing_key)
+                    expiry = await pipe.zscore(self.leases_key, job_id)
+                    if expiry is None or expiry > time.time():
+                        return False
+                    if await pipe.lpos(self.processing_key, job_id) is None:
+                        return False
+                    exists = await pipe.exists(self._job_key(job_id))
+                    pipe.multi()
+                    pipe.lrem(self.processing_key, 1, job_id)
+                    pipe.zrem(self.leases_key, job_id)
+                    if exists:
+                        pipe.hset(
+                            self._job_key(job_id),
+                            mapping=_encode({"status": JOB_PENDING, "updated_at": time.time()}),
+                        )
+                        pipe.lpush(self.pending_key, job_id)
+                    await pipe.execute()
+                    return bool(exists)
+                except redis.WatchError:
+                    continue
+
+    async def stats(self) -> dict[str, int]:
+        """队列长度统计"""
+        return {
+            "pending": await self.client.llen(self.pending_key),
+            "processing": await self.client.llen(self.processing_key),
+            "delayed": await self.client.zcard(self.delayed_key),
+        }
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def _split_blob(blob: bytes) -> list[bytes]:
+    return [blob[start:start + BLOB_CHUNK_SIZE] for start in range(0, len(blob), BLOB_CHUNK_SIZE)] or [b""]
+
+
+def _new_record(
+    job_id: str,
+    job_type: str,
+    payload: dict[str, Any],
+    max_attempts: int,
+    state: Optional[dict[str, Any]] = None,
+) -> dict[str, Any]:
+    now = time.time()
+    return {
+        **(state or {}),
+        "task_id": job_id,
+        "type": job_type,
+        "payload": payload,
+        "status": JOB_PENDING,
+        "attempts": 0,
+        "max_attempts": max_attempts,
+        "error": None,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def is_last_attempt(job: dict[str, Any]) -> bool:
+    """本次执行失败后任务队列是否不再重试（处理函数据此决定是否向用户报告失败）"""
+    return int(job.get("attempts", 0)) >= int(job.get("max_attempts", settings.job_max_attempts))
+
+
+def _text(value: Any) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else str(value)
+
+
+def _encode(fields: dict[str, Any]) -> dict[str, str]:
+    return {key: json.dumps(value, ensure_ascii=False) for key, value in fields.items()}
+
+
+def _decode(raw: dict[Any, Any]) -> dict[str, Any]:
+    return {_text(key): json.loads(_text(value)) for key, value in raw.items()}
+
+
+# ===== 处理函数注册 =====
+
+_JOB_HANDLERS: dict[str, JobHandler] = {}
+_JOB_CONCURRENCY: dict[str, int] = {}
+
+
+def register_job_handler(job_type: str, max_concurrency: Optional[int] = None):
+    """
+    注册任务处理函数（装饰器）
+
+    Args:
+        job_type: 任务类型
+        max_concurrency: 单个 worker 内该类型任务的最大并发数，默认不单独限制
+    """
+    def decorator(handler: JobHandler) -> JobHandler:
+        _JOB_HANDLERS[job_type] = handler
+        if max_concurrency:
+            _JOB_CONCURRENCY[job_type] = max_concurrency
+        return handler
+
+    return decorator
+
+
+def get_job_handler(job_type: str) -> Optional[JobHandler]:
+    return _JOB_HANDLERS.get(job_type)
+
+
+class JobWorker:
+    """任务 worker：从队列取任务并发执行"""
+
+    def __init__(self, queue: JobQueue, concurrency: Optional[int] = None):
+        self.queue = queue
+        self.concurrency = concurrency or settings.job_worker_concurrency
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._type_slots = {
+            job_type: asyncio.Semaphore(limit) for job_type, limit in _JOB_CONCURRENCY.items()
+        }
+        self._tasks: set[asyncio.Task] = set()
+        self._stopping = asyncio.Event()
+
+    async def execute(self, job_id: str) -> None:
+        """执行单个任务（已通过 dequeue 标记为执行中）"""
+        job = await self.queue.get(job_id)
+        if not job:
+            logger.warning(f"⚠️ Job record missing: {job_id}")
+            await self.queue.client.lrem(self.queue.processing_key, 0, job_id)
+            return
+
+        handler = get_job_handler(job["type"])
+        if handler is None:
+            await self.queue.fail(job_id, f"未注册的任务类型: {job['type']}", retryable=False)
+            return
+
+        type_slot = self._type_slots.get(job["type"])
+        try:
+            async with self._leased(job_id):
+                if type_slot:
+                    async with type_slot:
+                        await handler(job, self.queue)
+                else:
+                    await handler(job, self.queue)
+            await self.queue.complete(job_id)
+            logger.info(f"✅ Job completed: {job['type']} {job_id}")
+        except PermanentJobError as e:
+            await self.queue.fail(job_id, str(e), retryable=False)
+        except Exception as e:
+            await self.queue.fail(job_id, str(e))
+
+    @asynccontextmanager
+    async def _leased(self, job_id: str):
+        """执行期间每 1/3 租约续租一次，worker 存活时任务不会被回收"""
+        task = asyncio.create_task(self._renew_lease_periodically(job_id))
+        try:
+            yield
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _renew_lease_periodically(self, job_id: str) -> None:
+        while True:
+            await asyncio.sleep(self.queue.lease_seconds / 3)
+            try:
+                if not await self.queue.renew_lease(job_id):
+                    logger.warning(f"⚠️ Lease of job {job_id} was lost, it may be executed again by another worker")
+            except Exception as e:
+                logger.error(f"❌ Failed to renew lease of job {job_id}: {e}")
+
+    async def _run_slot(self, job_id: str) -> None:
+        try:
+            await self.execute(job_id)
+        except Exception as e:
+            logger.error(f"❌ Job {job_id} crashed worker slot: {e}")
+        finally:
+            self._slots.release()
+
+    async def run(self, poll_timeout: float = 1.0) -> None:
+        """持续处理任务，直到 stop() 被调用"""
+        logger.info(f"🚀 Job worker started (queue={self.queue.prefix}, concurrency={self.concurrency})")
+        last_recovery = 0.0
+        while not self._stopping.is_set():
+            await self._slots.acquire()
+            try:
+                if time.time() - last_recovery > self.queue.lease_seconds:
+                    await self.queue.recover_stale()
+                    last_recovery = time.time()
+                job_id = await self.queue.dequeue(timeout=poll_timeout)
+            except asyncio.CancelledError:
+                self._slots.release()
+                raise
+            except Exception as e:
+                self._slots.release()
+                logger.error(f"❌ Job queue unavailable: {e}")
+                await asyncio.sleep(poll_timeout)
+                continue
+
+            if job_id is None:
+                self._slots.release()
+                continue
+
+            task = asyncio.create_task(self._run_slot(job_id))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        logger.info("🛑 Job worker stopped")
+
+    async def drain(self) -> int:
+        """处理队列中当前可执行的全部任务后返回（测试和一次性脚本使用）"""
+        processed = 0
+        while (job_id := await self.queue.dequeue(timeout=0.01)) is not None:
+            await self.execute(job_id)
+            processed += 1
+        return processed
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+
+# ===== 全局队列 =====
+
+_job_queue: Optional[JobQueue] = None
+_fake_server = None
+
+
+def _create_client() -> redis.Redis:
+    if settings.job_queue_backend == "fakeredis":
+        import fakeredis
+
+        global _fake_server
+        if _fake_server is None:
+            _fake_server = fakeredis.FakeServer()
+        return fakeredis.aioredis.FakeRedis(server=_fake_server)
+
+    redis_url = "redis://"
+    if settings.redis_password:
+        redis_url += f":{settings.redis_password}@"
+    redis_url += f"{settings.redis_host}:{settings.redis_port}/{settings.redis_db}"
+    return redis.from_url(redis_url, max_connections=settings.redis_max_connections)
+
+
+def get_job_queue() -> JobQueue:
+    """获取任务队列单例"""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue(
+            _create_client(),
+            settings.job_queue_name,
+            blocking=settings.job_queue_backend != "fakeredis",
+        )
+    return _job_queue
+
+
+async def close_job_queue() -> None:
+    """关闭任务队列连接"""
+    global _job_queue
+    if _job_queue is not None:
+        await _job_queue.close()
+        _job_queue = None
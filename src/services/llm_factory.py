@@ -4,8 +4,9 @@ LLM 模型工厂
 根据配置返回对应的 LLM 实例（支持插件化架构）。
 """
 
+import hashlib
 import logging
-from typing import Any
+from typing import Any, Optional
 
 from langchain_core.language_models.chat_models import BaseChatModel
 
@@ -15,12 +16,23 @@ from src.services.providers import create_provider
 
 logger = logging.getLogger(__name__)
 
+EmbeddingsKey = tuple[str, Optional[str], str, str]
 
-def create_llm() -> BaseChatModel:
+# 进程级共享的 Embeddings 实例（按配置缓存，延迟初始化）
+_shared_embeddings: dict[EmbeddingsKey, Any] = {}
+
+
+def create_llm(**client_options: Any) -> BaseChatModel:
     """
     创建 LLM 实例
 
     根据 settings.llm_provider 返回对应的 Chat Model。
+    每次调用都会新建实例；对话热路径请使用 src.services.llm_registry.get_llm()
+    复用进程级共享实例和连接池。
+
+    Args:
+        **client_options: 透传给提供商的客户端选项
+            （http_client / http_async_client / timeout）
 
     Returns:
         BaseChatModel 实例
@@ -33,7 +45,7 @@ def create_llm() -> BaseChatModel:
     try:
         # 使用插件化架构
         if provider in ["openai", "deepseek", "siliconflow","customize"]:
-            return _create_plugin_llm(provider)
+            return _create_plugin_llm(provider, **client_options)
         elif provider == "anthropic":
             # Anthropic 暂时保持原有实现
             return _create_anthropic_llm()
@@ -44,12 +56,13 @@ def create_llm() -> BaseChatModel:
         raise
 
 
-def _create_plugin_llm(provider: str) -> BaseChatModel:
+def _create_plugin_llm(provider: str, **client_options: Any) -> BaseChatModel:
     """
     使用插件化架构创建 LLM 实例
 
     Args:
         provider: 提供商名称
+        **client_options: 透传给提供商的客户端选项
 
     Returns:
         BaseChatModel 实例
@@ -67,6 +80,9 @@ def _create_plugin_llm(provider: str) -> BaseChatModel:
     if base_url:
         config["base_url"] = base_url
 
+    # 共享连接池等客户端选项
+    config.update({k: v for k, v in client_options.items() if v is not None})
+
     # 创建提供商实例
     provider_name = f"{provider}_llm"
     provider_instance = create_provider(provider_name, config)
@@ -104,6 +120,7 @@ def create_embeddings() -> Any:
     创建 Embedding 模型
 
     根据 settings.embedding_provider 返回对应的 Embeddings 实例。
+    每次调用都会新建实例（各自维护连接池）；请求路径请使用 get_shared_embeddings()。
 
     Returns:
         Embeddings 实例
@@ -124,6 +141,35 @@ def create_embeddings() -> Any:
         raise
 
 
+def get_shared_embeddings() -> Any:
+    """
+    获取进程级共享的 Embeddings 实例
+
+    所有调用方共用同一个实例：复用一个连接池，并发查询可以合并为一次请求。
+    切换提供商、Base URL、API Key 或模型后创建新实例。
+
+    Returns:
+        Embeddings 实例
+    """
+    key = (
+        settings.embedding_provider,
+        settings.get_embedding_base_url(),
+        hashlib.sha256((settings.embedding_api_key or "").encode()).hexdigest(),
+        settings.embedding_model_name,
+    )
+    embeddings = _shared_embeddings.get(key)
+    if embeddings is None:
+        embeddings = create_embeddings()
+        _shared_embeddings[key] = embeddings
+        logger.info(f"✅ Shared embeddings created: provider={key[0]}, model={key[3]}")
+    return embeddings
+
+
+def reset_shared_embeddings() -> None:
+    """丢弃共享的 Embeddings 实例（应用关闭时在关闭连接后调用）"""
+    _shared_embeddings.clear()
+
+
 def _create_plugin_embeddings(provider: str) -> Any:
     """
     使用插件化架构创建 Embeddings 实例
@@ -138,6 +184,13 @@ def _create_plugin_embeddings(provider: str) -> Any:
     config = {
         "api_key": settings.embedding_api_key,
         "model": settings.embedding_model_name,
+        # 连接池与查询合并配置（仅自定义 HTTP 实现的提供商使用）
+        "timeout": settings.embedding_request_timeout,
+        "max_connections": settings.embedding_pool_max_connections,
+        "max_keepalive_connections": settings.embedding_pool_max_keepalive,
+        "http2": settings.embedding_http2_enabled,
+        "batch_window_ms": settings.embedding_batch_window_ms,
+        "batch_max_size": settings.embedding_batch_max_size,
     }
 
     # 添加 Base URL（如果需要）
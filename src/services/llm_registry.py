@@ -0,0 +1,153 @@
+"""
+LLM 客户端池
+
+进程级 LLM 客户端注册表：
+- 按 provider / base_url / API Key / model / temperature / max_tokens 缓存 Chat Model 实例
+- 所有实例共享一组长连接 httpx 客户端（keep-alive，可选 HTTP/2）
+- 应用关闭时（src.main:lifespan）统一释放连接
+"""
+
+import hashlib
+import logging
+from typing import Any, Optional
+
+import httpx
+from langchain_core.language_models.chat_models import BaseChatModel
+
+from src.core.config import settings
+from src.services.llm_factory import create_llm
+from src.services.providers.base import is_http2_available
+
+logger = logging.getLogger(__name__)
+
+LLMClientKey = tuple[str, Optional[str], str, str, float, int]
+
+
+class LLMClientRegistry:
+    """
+    LLM 客户端注册表
+
+    同一配置组合只创建一次 Chat Model，后续请求复用已建立的连接，
+    避免每轮对话都重新创建客户端和进行 TLS 握手。
+    """
+
+    def __init__(self):
+        self._clients: dict[LLMClientKey, BaseChatModel] = {}
+        self._http_client: Optional[httpx.Client] = None
+        self._http_async_client: Optional[httpx.AsyncClient] = None
+
+    @staticmethod
+    def _http2_available() -> bool:
+        """检查是否可以启用 HTTP/2（依赖 h2 包）"""
+        if not settings.llm_http2_enabled:
+            return False
+        if not is_http2_available():
+            logger.warning("⚠️ h2 not installed, LLM connection pool falls back to HTTP/1.1")
+            return False
+        return True
+
+    def _client_options(self) -> dict[str, Any]:
+        """获取（必要时创建）共享的 httpx 客户端"""
+        if self._http_async_client is None:
+            http2 = self._http2_available()
+            limits = httpx.Limits(
+                max_connections=settings.llm_pool_max_connections,
+                max_keepalive_connections=settings.llm_pool_max_keepalive,
+                keepalive_expiry=settings.llm_pool_keepalive_expiry,
+            )
+            timeout = httpx.Timeout(settings.llm_request_timeout)
+
+            self._http_async_client = httpx.AsyncClient(http2=http2, limits=limits, timeout=timeout)
+            self._http_client = httpx.Client(http2=http2, limits=limits, timeout=timeout)
+
+            logger.info(
+                f"🔌 LLM connection pool created (http2={http2}, "
+                f"max_connections={settings.llm_pool_max_connections}, "
+                f"max_keepalive={settings.llm_pool_max_keepalive})"
+            )
+
+        return {
+            "http_client": self._http_client,
+            "http_async_client": self._http_async_client,
+            "timeout": settings.llm_request_timeout,
+        }
+
+    @staticmethod
+    def _current_key() -> LLMClientKey:
+        """根据当前配置生成缓存键（API Key 只保存摘要，轮换密钥或切换网关时创建新实例）"""
+        return (
+            settings.llm_provider,
+            settings.llm_base_url,
+            hashlib.sha256(settings.llm_api_key.encode()).hexdigest(),
+            settings.llm_model_name,
+            settings.llm_temperature,
+            settings.llm_max_tokens,
+        )
+
+    def get(self) -> BaseChatModel:
+        """
+        获取当前配置对应的共享 LLM 实例
+
+        Returns:
+            BaseChatModel 实例
+        """
+        key = self._current_key()
+        llm = self._clients.get(key)
+        if llm is None:
+            llm = create_llm(**self._client_options())
+            self._clients[key] = llm
+            logger.info(f"✅ LLM client registered: provider={key[0]}, model={key[3]}")
+        return llm
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    async def aclose(self) -> None:
+        """关闭共享连接池并清空注册表"""
+        self._clients.clear()
+
+        if self._http_async_client is not None:
+            try:
+                await self._http_async_client.aclose()
+            except Exception as e:
+                logger.error(f"❌ Failed to close LLM async http client: {e}")
+            finally:
+                self._http_async_client = None
+
+        if self._http_client is not None:
+            try:
+                self._http_client.close()
+            except Exception as e:
+                logger.error(f"❌ Failed to close LLM http client: {e}")
+            finally:
+                self._http_client = None
+
+
+# 全局注册表实例（延迟初始化）
+_llm_registry: Optional[LLMClientRegistry] = None
+
+
+def get_llm_registry() -> LLMClientRegistry:
+    """获取 LLM 客户端注册表（单例模式）"""
+    global _llm_registry
+    if _llm_registry is None:
+        _llm_registry = LLMClientRegistry()
+    return _llm_registry
+
+
+def get_llm() -> BaseChatModel:
+    """
+    获取共享的 LLM 实例
+
+    Returns:
+        BaseChatModel 实例
+    """
+    return get_llm_registry().get()
+
+
+async def close_llm_registry() -> None:
+    """关闭 LLM 客户端注册表（应用关闭时调用）"""
+    global _llm_registry
+    if _llm_registry is not None:
+        await _llm_registry.aclose()
+        _llm_registry = None
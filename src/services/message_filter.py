@@ -0,0 +1,195 @@
+"""
+消息过滤器
+
+根据消息过滤配置构建一个 MessageFilter：
+- 系统标识符、指令模板关键词、技术术语编译为一个 Aho-Corasick 自动机
+- 每条消息只扫描一遍，同时给出是否放行和过滤原因
+- 配置变化（如管理后台修改）时才重新构建，否则复用同一实例
+
+过滤原因：
+- system_message_detected: 包含系统标识符（system: / assistant: 等）
+- too_many_technical_terms: 技术术语数量达到阈值
+- message_too_long: 超过最大长度
+- instruction_template_detected: 包含指令模板关键词
+- instruction_pattern_detected: 以指令开头（You are / Please 等）
+"""
+
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+from src.core.aho_corasick import AhoCorasick
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 系统标识符（匹配不区分大小写）
+SYSTEM_INDICATORS = ("system:", "assistant:", "ai:", "bot:", "agent:")
+
+# 指令开头（区分大小写）
+INSTRUCTION_STARTS = ("You are", "Your role", "Please", "Convert", "Transform")
+
+# 来源校验失败的原因（API 层按"系统消息"回复）
+SOURCE_REASONS = frozenset({"system_message_detected", "too_many_technical_terms"})
+
+_SYSTEM = "system"
+_INSTRUCTION = "instruction"
+_TECHNICAL = "technical"
+
+
+@dataclass(frozen=True)
+class FilterVerdict:
+    """过滤结果"""
+
+    allowed: bool
+    reason: Optional[str] = None
+    detail: str = ""
+
+    @property
+    def is_source_violation(self) -> bool:
+        """是否为来源校验失败（系统消息）"""
+        return self.reason in SOURCE_REASONS
+
+
+ALLOWED = FilterVerdict(allowed=True)
+
+
+def _split_terms(value: str) -> list[str]:
+    return [term.strip() for term in value.split(",") if term.strip()]
+
+
+class MessageFilter:
+    """编译后的消息过滤器"""
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        max_length: int = 1000,
+        instruction_keywords: list[str] | None = None,
+        technical_terms: list[str] | None = None,
+        technical_terms_threshold: int = 3,
+    ):
+        self.enabled = enabled
+        self.max_length = max_length
+        self.technical_terms_threshold = technical_terms_threshold
+
+        # 小写词 -> 所属类别（同一个词可能同时属于多个类别）
+        self._categories: dict[str, set[str]] = {}
+        for category, terms in (
+            (_SYSTEM, SYSTEM_INDICATORS),
+            (_INSTRUCTION, instruction_keywords or []),
+            (_TECHNICAL, technical_terms or []),
+        ):
+            for term in terms:
+                if term:
+                    self._categories.setdefault(term.lower(), set()).add(category)
+
+        self._automaton = AhoCorasick(self._categories.keys())
+
+    @classmethod
+    def from_settings(cls) -> "MessageFilter":
+        """根据当前配置构建过滤器"""
+        return cls(
+            enabled=settings.message_filter_enabled,
+            max_length=settings.message_max_length,
+            instruction_keywords=_split_terms(settings.instruction_keywords),
+            technical_terms=_split_terms(settings.technical_terms),
+            technical_terms_threshold=settings.technical_terms_threshold,
+        )
+
+    @property
+    def term_count(self) -> int:
+        return len(self._categories)
+
+    def check(self, message: str, check_source: bool = True) -> FilterVerdict:
+        """
+        单遍检查消息
+
+        Args:
+            message: 待检查的消息
+            check_source: 是否做来源校验（系统标识符优先判定，技术术语按来源失败处理）；
+                为 False 时只做用户查询校验，与 Agent 内部的判定顺序一致
+
+        Returns:
+            过滤结果
+        """
+        if not self.enabled:
+            return ALLOWED
+
+        too_long = len(message) > self.max_length
+        if too_long and not check_source:
+            # 超长消息无需扫描
+            return FilterVerdict(
+                allowed=False,
+                reason="message_too_long",
+                detail=f"{len(message)} chars (max: {self.max_length})",
+            )
+
+        system_hit: Optional[str] = None
+        instruction_hit: Optional[str] = None
+        technical_count = 0
+        for term in self._automaton.find_all(message.lower()):
+            categories = self._categories[term]
+            if _SYSTEM in categories:
+                system_hit = term
+            if _INSTRUCTION in categories:
+                instruction_hit = term
+            if _TECHNICAL in categories:
+                technical_count += 1
+
+        too_many_technical = technical_count >= self.technical_terms_threshold
+        technical_detail = f"{technical_count} (threshold: {self.technical_terms_threshold})"
+
+        if check_source:
+            if system_hit is not None:
+                return FilterVerdict(allowed=False, reason="system_message_detected", detail=system_hit)
+            if too_many_technical:
+                return FilterVerdict(allowed=False, reason="too_many_technical_terms", detail=technical_detail)
+
+        if too_long:
+            return FilterVerdict(
+                allowed=False,
+                reason="message_too_long",
+                detail=f"{len(message)} chars (max: {self.max_length})",
+            )
+        if instruction_hit is not None:
+            return FilterVerdict(allowed=False, reason="instruction_template_detected", detail=instruction_hit)
+        if message.strip().startswith(INSTRUCTION_STARTS):
+            return FilterVerdict(allowed=False, reason="instruction_pattern_detected")
+        if too_many_technical:
+            return FilterVerdict(allowed=False, reason="too_many_technical_terms", detail=technical_detail)
+
+        return ALLOWED
+
+
+# 全局单例（按配置签名缓存）
+_message_filter: Optional[MessageFilter] = None
+_message_filter_key: Optional[tuple] = None
+_message_filter_lock = threading.Lock()
+
+
+def _settings_key() -> tuple:
+    return (
+        settings.message_filter_enabled,
+        settings.message_max_length,
+        settings.instruction_keywords,
+        settings.technical_terms,
+        settings.technical_terms_threshold,
+    )
+
+
+def get_message_filter() -> MessageFilter:
+    """获取消息过滤器（配置变化时重新构建）"""
+    global _message_filter, _message_filter_key
+
+    key = _settings_key()
+    if _message_filter is not None and key == _message_filter_key:
+        return _message_filter
+
+    with _message_filter_lock:
+        if _message_filter is None or key != _message_filter_key:
+            _message_filter = MessageFilter.from_settings()
+            _message_filter_key = key
+            logger.info(f"✅ Message filter compiled: {_message_filter.term_count} terms")
+        return _message_filter
@@ -30,6 +30,7 @@ from pymilvus import AsyncMilvusClient, DataType
 
 from src.core.config import settings
 from src.core.exceptions import MilvusConnectionError
+from src.services.answer_cache import invalidate_answer_cache
 
 logger = logging.getLogger(__name__)
 
@@ -320,6 +321,7 @@ class MilvusService:
         )
 
         logger.info(f"📥 Inserted {len(documents)} documents into knowledge base")
+        await invalidate_answer_cache("knowledge documents inserted")
         return len(documents)
 
     async def search_history_by_session(
@@ -11,6 +11,15 @@ from langchain_core.embeddings import Embeddings
 from langchain_core.language_models.chat_models import BaseChatModel
 
 
+def is_http2_available() -> bool:
+    """检查 httpx 的 HTTP/2 依赖（h2）是否已安装"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
 class ModelProvider(ABC):
     """模型提供商抽象基类"""
 
@@ -59,6 +68,14 @@ class LLMProvider(ModelProvider):
         """创建LLM实例"""
         pass
 
+    def _http_client_kwargs(self) -> Dict[str, Any]:
+        """共享的 httpx 客户端（由 LLM 客户端池注入，未注入时使用 SDK 默认客户端）"""
+        return {
+            key: self.config[key]
+            for key in ("http_client", "http_async_client", "timeout")
+            if self.config.get(key) is not None
+        }
+
     def create_embeddings(self) -> Embeddings:
         """LLM提供商不支持embeddings"""
         raise NotImplementedError("LLM provider does not support embeddings")
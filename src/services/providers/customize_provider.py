@@ -31,6 +31,7 @@ class CustomizeLLMProvider(LLMProvider):
             openai_api_base=self.config["base_url"],
             temperature=self.config.get("temperature", 0.7),
             max_tokens=self.config.get("max_tokens", 1000),
+            **self._http_client_kwargs(),
         )
 
     def get_models(self) -> List[str]:
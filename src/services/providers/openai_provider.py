@@ -24,6 +24,7 @@ class OpenAILLMProvider(LLMProvider):
             openai_api_key=self.config["api_key"],
             temperature=self.config.get("temperature", 0.7),
             max_tokens=self.config.get("max_tokens", 1000),
+            **self._http_client_kwargs(),
         )
 
     def get_models(self) -> List[str]:
@@ -6,16 +6,20 @@
 
 import asyncio
 import logging
-from typing import List
+import threading
+import weakref
+from typing import Any, Coroutine, List, Optional, TypeVar
 
 import httpx
 from langchain_core.embeddings import Embeddings
 from langchain_openai import ChatOpenAI
 
-from .base import EmbeddingProvider, LLMProvider
+from .base import EmbeddingProvider, LLMProvider, is_http2_available
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 
 class SiliconFlowLLMProvider(LLMProvider):
     """硅基流动 LLM提供商"""
@@ -31,6 +35,7 @@ class SiliconFlowLLMProvider(LLMProvider):
             openai_api_base=self.config["base_url"],
             temperature=self.config.get("temperature", 0.7),
             max_tokens=self.config.get("max_tokens", 1000),
+            **self._http_client_kwargs(),
         )
 
     def get_models(self) -> List[str]:
@@ -53,47 +58,135 @@ class SiliconFlowLLMProvider(LLMProvider):
             return False
 
 
-class SiliconFlowEmbeddings(Embeddings):
-    """硅基流动自定义Embedding类，确保发送文本而不是token ID数组"""
+class _EventLoopThread:
+    """
+    后台事件循环线程
+
+    同步 embed_* 方法复用同一个常驻事件循环执行异步请求，
+    避免每次调用都新建线程池和嵌套 asyncio.run。
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or self._thread is None or not self._thread.is_alive():
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name=self._name, daemon=True)
+                thread.start()
+                self._loop, self._thread = loop, thread
+            return self._loop
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def run(self, coro: Coroutine[Any, Any, T]) -> T:
+        """在后台事件循环中执行协程并阻塞等待结果"""
+        loop = self._ensure_started()
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    def stop(self) -> None:
+        """停止后台事件循环并等待线程退出"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop, self._thread = None, None
+        if loop is None or thread is None:
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        if not thread.is_alive():
+            loop.close()
+
+
+# 所有 SiliconFlowEmbeddings 实例共享的同步调用线程
+_sync_loop_thread = _EventLoopThread("siliconflow-embedding-loop")
+
+# 已创建的实例（弱引用），应用关闭时统一释放连接
+_live_embeddings: "weakref.WeakSet[SiliconFlowEmbeddings]" = weakref.WeakSet()
+
+
+class _QueryBatch:
+    """待合并的查询批次"""
+
+    def __init__(self):
+        self.items: list[tuple[str, asyncio.Future]] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
 
-    def __init__(self, api_key: str, model: str = "BAAI/bge-large-zh-v1.5", base_url: str = "https://api.siliconflow.cn/v1"):
+class SiliconFlowEmbeddings(Embeddings):
+    """
+    硅基流动自定义Embedding类，确保发送文本而不是token ID数组
+
+    - 每个事件循环复用一个带连接数限制的长连接 httpx.AsyncClient（可选 HTTP/2）
+    - 同步方法通过常驻的后台事件循环线程执行
+    - 可选的查询合并：batch_window_ms 窗口内的并发 aembed_query 合并为一次 /embeddings 请求
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "BAAI/bge-large-zh-v1.5",
+        base_url: str = "https://api.siliconflow.cn/v1",
+        timeout: float = 30.0,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        http2: bool = True,
+        batch_window_ms: float = 0.0,
+        batch_max_size: int = 32,
+    ):
         self.api_key = api_key
         self.model = model
         self.base_url = base_url
         self.max_retries = 2  # 最大重试次数
         self.retry_delay = 1.0  # 重试延迟（秒）
+        self.timeout = timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+        self.http2 = http2 and is_http2_available()
+        if http2 and not self.http2:
+            logger.warning("⚠️ h2 not installed, SiliconFlow embeddings fall back to HTTP/1.1")
+        self.batch_window_ms = batch_window_ms
+        self.batch_max_size = batch_max_size
+
+        # httpx.AsyncClient 绑定创建它的事件循环，因此按事件循环分别维护
+        self._clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient] = (
+            weakref.WeakKeyDictionary()
+        )
+        self._pending_batches: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _QueryBatch] = (
+            weakref.WeakKeyDictionary()
+        )
+        self._flush_tasks: set[asyncio.Task] = set()
+        _live_embeddings.add(self)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """获取当前事件循环的共享 httpx 客户端"""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits, http2=self.http2)
+            self._clients[loop] = client
+        return client
+
+    async def aclose(self) -> None:
+        """关闭当前事件循环上的共享 httpx 客户端"""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None and not client.is_closed:
+            await client.aclose()
 
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
         """嵌入文档列表"""
-        try:
-            # 检查是否已经在事件循环中
-            asyncio.get_running_loop()
-            # 如果已经在事件循环中，使用 run_in_executor 在单独线程中运行
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(self._run_async_in_thread, self.aembed_documents, texts)
-                return future.result()
-        except RuntimeError:
-            # 没有运行的事件循环，使用 asyncio.run
-            return asyncio.run(self.aembed_documents(texts))
+        return _sync_loop_thread.run(self.aembed_documents(texts))
 
     def embed_query(self, text: str) -> List[float]:
         """嵌入查询文本"""
-        try:
-            # 检查是否已经在事件循环中
-            asyncio.get_running_loop()
-            # 如果已经在事件循环中，使用 run_in_executor 在单独线程中运行
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(self._run_async_in_thread, self.aembed_query, text)
-                return future.result()
-        except RuntimeError:
-            # 没有运行的事件循环，使用 asyncio.run
-            return asyncio.run(self.aembed_query(text))
-
-    def _run_async_in_thread(self, async_func, *args):
-        """在单独线程中运行异步函数"""
-        return asyncio.run(async_func(*args))
+        return _sync_loop_thread.run(self.aembed_query(text))
 
     async def _make_embedding_request(self, input_data, is_query: bool = False):
         """发送嵌入请求，包含重试机制和错误处理"""
@@ -101,25 +194,25 @@ class SiliconFlowEmbeddings(Embeddings):
 
         for attempt in range(self.max_retries + 1):
             try:
-                async with httpx.AsyncClient(timeout=30.0) as client:
-                    response = await client.post(
-                        f"{self.base_url}/embeddings",
-                        headers={
-                            "Authorization": f"Bearer {self.api_key}",
-                            "Content-Type": "application/json"
-                        },
-                        json={
-                            "input": input_data,
-                            "model": self.model
-                        }
-                    )
-                    response.raise_for_status()
-                    data = response.json()
-
-                    if is_query:
-                        return data["data"][0]["embedding"]
-                    else:
-                        return [item["embedding"] for item in data["data"]]
+                client = self._get_client()
+                response = await client.post(
+                    f"{self.base_url}/embeddings",
+                    headers={
+                        "Authorization": f"Bearer {self.api_key}",
+                        "Content-Type": "application/json"
+                    },
+                    json={
+                        "input": input_data,
+                        "model": self.model
+                    }
+                )
+                response.raise_for_status()
+                data = response.json()
+
+                if is_query:
+                    return data["data"][0]["embedding"]
+                else:
+                    return [item["embedding"] for item in data["data"]]
 
             except httpx.HTTPStatusError as e:
                 last_exception = e
@@ -160,9 +253,74 @@ class SiliconFlowEmbeddings(Embeddings):
         return await self._make_embedding_request(texts, is_query=False)
 
     async def aembed_query(self, text: str) -> List[float]:
-        """异步嵌入查询文本"""
+        """异步嵌入查询文本（启用合并窗口时与并发查询合并请求）"""
+        if self.batch_window_ms > 0:
+            return await self._enqueue_query(text)
         return await self._make_embedding_request(text, is_query=True)
 
+    async def _enqueue_query(self, text: str) -> List[float]:
+        """将查询加入当前事件循环的待合并批次，等待批次返回结果"""
+        loop = asyncio.get_running_loop()
+        batch = self._pending_batches.get(loop)
+        if batch is None:
+            batch = _QueryBatch()
+            batch.timer = loop.call_later(self.batch_window_ms / 1000, self._flush_pending, loop)
+            self._pending_batches[loop] = batch
+
+        future = loop.create_future()
+        batch.items.append((text, future))
+
+        if len(batch.items) >= self.batch_max_size:
+            self._flush_pending(loop)
+
+        return await future
+
+    def _flush_pending(self, loop: asyncio.AbstractEventLoop) -> None:
+        """取出当前批次并提交合并请求"""
+        batch = self._pending_batches.pop(loop, None)
+        if batch is None or not batch.items:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+
+        task = loop.create_task(self._flush_batch(batch.items))
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def _flush_batch(self, items: list[tuple[str, asyncio.Future]]) -> None:
+        """发送合并后的 /embeddings 请求并分发结果"""
+        unique_texts = list(dict.fromkeys(text for text, _ in items))
+        try:
+            vectors = await self._make_embedding_request(unique_texts, is_query=False)
+        except Exception as e:
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        vector_by_text = dict(zip(unique_texts, vectors))
+        for text, future in items:
+            if not future.done():
+                future.set_result(vector_by_text[text])
+
+        logger.debug(f"SiliconFlow embedding batch: {len(items)} queries, {len(unique_texts)} unique")
+
+
+async def close_siliconflow_embeddings() -> None:
+    """
+    关闭所有 SiliconFlowEmbeddings 实例的连接
+
+    当前事件循环和后台同步线程上的 httpx 客户端都会关闭，随后停止后台线程。
+    """
+    for embeddings in list(_live_embeddings):
+        try:
+            await embeddings.aclose()
+            if _sync_loop_thread.is_running:
+                await asyncio.to_thread(_sync_loop_thread.run, embeddings.aclose())
+        except Exception as e:
+            logger.error(f"❌ Failed to close SiliconFlow embedding client: {e}")
+    _sync_loop_thread.stop()
+
 
 class SiliconFlowEmbeddingProvider(EmbeddingProvider):
     """硅基流动 Embedding提供商"""
@@ -175,7 +333,13 @@ class SiliconFlowEmbeddingProvider(EmbeddingProvider):
         return SiliconFlowEmbeddings(
             api_key=self.config["api_key"],
             model=self.config.get("model", "BAAI/bge-large-zh-v1.5"),
-            base_url=self.config.get("base_url", "https://api.siliconflow.cn/v1")
+            base_url=self.config.get("base_url", "https://api.siliconflow.cn/v1"),
+            timeout=self.config.get("timeout", 30.0),
+            max_connections=self.config.get("max_connections", 20),
+            max_keepalive_connections=self.config.get("max_keepalive_connections", 10),
+            http2=self.config.get("http2", True),
+            batch_window_ms=self.config.get("batch_window_ms", 0.0),
+            batch_max_size=self.config.get("batch_max_size", 32),
         )
 
     def get_models(self) -> List[str]:
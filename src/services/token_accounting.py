@@ -0,0 +1,207 @@
+"""
+Token 计量服务
+
+提供与 OpenAI 计数方式一致的 token 统计，用于 usage 字段、指标和上下文窗口：
+- 编码器按模型选择（tiktoken 已知的模型使用对应编码，其他模型使用 TOKEN_ENCODING）
+- 编码器进程内缓存，批量计数使用 tiktoken encode_batch
+- 消息计数包含每条消息的格式开销和回复引导 token
+- LLM 返回 usage_metadata 时以服务端计数为准，否则使用 tiktoken 计数
+- 全局累计指标（按模型、按计数来源）
+"""
+
+import logging
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Iterable, Optional, Sequence
+
+import tiktoken
+from langchain_core.messages import BaseMessage
+
+from src.core.config import settings
+from src.core.utils import get_encoding
+
+logger = logging.getLogger(__name__)
+
+# 每条消息的格式开销（role、分隔符等）
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# 回复引导 token（每次请求一次）
+REPLY_PRIMING_TOKENS = 3
+
+
+@dataclass
+class TokenUsage:
+    """单次调用的 token 用量"""
+
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    source: str = "tiktoken"
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.total_tokens,
+            "source": self.source,
+        }
+
+
+def encoding_name_for_model(model: Optional[str]) -> str:
+    """
+    获取模型对应的编码名称
+
+    Args:
+        model: 模型名称（如 gpt-4o、deepseek-chat）
+
+    Returns:
+        tiktoken 编码名称（未知模型返回 TOKEN_ENCODING）
+    """
+    if model:
+        try:
+            return tiktoken.encoding_name_for_model(model)
+        except KeyError:
+            pass
+    return settings.token_encoding
+
+
+def _message_text(message: Any) -> str:
+    content = message.content if hasattr(message, "content") else message.get("content", "")
+    return content if isinstance(content, str) else str(content)
+
+
+class TokenCounter:
+    """基于 tiktoken 的计数器（编码器不可用时按字符估算）"""
+
+    def __init__(self, encoding_name: str):
+        self.encoding_name = encoding_name
+        self._encoding = get_encoding(encoding_name)
+
+    def count(self, text: str) -> int:
+        """计算单个文本的 token 数"""
+        if not text:
+            return 0
+        if self._encoding is None:
+            return (len(text) + 1) // 2
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+    def count_batch(self, texts: Sequence[str]) -> list[int]:
+        """批量计算 token 数"""
+        if self._encoding is None:
+            return [self.count(text) for text in texts]
+        return [len(tokens) for tokens in self._encoding.encode_batch(list(texts), disallowed_special=())]
+
+    def count_messages(self, messages: Iterable[BaseMessage | dict]) -> int:
+        """
+        计算发送给 LLM 的消息列表的 prompt token 数
+
+        Args:
+            messages: LangChain 消息或 {"role", "content"} 字典
+
+        Returns:
+            token 数（含每条消息的格式开销和回复引导 token）
+        """
+        texts = [_message_text(message) for message in messages]
+        if not texts:
+            return 0
+        return sum(self.count_batch(texts)) + MESSAGE_OVERHEAD_TOKENS * len(texts) + REPLY_PRIMING_TOKENS
+
+    def usage_for(self, prompt_messages: Sequence[BaseMessage], response: Any) -> TokenUsage:
+        """
+        计算一次 LLM 调用的用量
+
+        Args:
+            prompt_messages: 发送给 LLM 的消息（含系统提示词和 RAG 上下文）
+            response: LLM 返回的消息
+
+        Returns:
+            用量（有 usage_metadata 时使用服务端计数）
+        """
+        usage_metadata = getattr(response, "usage_metadata", None)
+        if isinstance(usage_metadata, dict) and usage_metadata.get("input_tokens"):
+            return TokenUsage(
+                prompt_tokens=int(usage_metadata.get("input_tokens", 0)),
+                completion_tokens=int(usage_metadata.get("output_tokens", 0)),
+                source="provider",
+            )
+        return TokenUsage(
+            prompt_tokens=self.count_messages(prompt_messages),
+            completion_tokens=self.count(_message_text(response)),
+        )
+
+
+@lru_cache(maxsize=32)
+def _counter_for_encoding(encoding_name: str) -> TokenCounter:
+    return TokenCounter(encoding_name)
+
+
+def get_token_counter(model: Optional[str] = None) -> TokenCounter:
+    """
+    获取模型对应的计数器（按编码缓存）
+
+    Args:
+        model: 模型名称，默认使用当前 LLM 模型
+
+    Returns:
+        计数器实例
+    """
+    return _counter_for_encoding(encoding_name_for_model(model or settings.llm_model_name))
+
+
+class TokenUsageMetrics:
+    """token 用量累计指标"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._calls = 0
+            self._prompt_tokens = 0
+            self._completion_tokens = 0
+            self._by_model: dict[str, dict[str, int]] = defaultdict(
+                lambda: {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+            )
+            self._by_source: dict[str, int] = defaultdict(int)
+
+    def record(self, usage: TokenUsage, model: Optional[str] = None) -> None:
+        """记录一次 LLM 调用的用量"""
+        with self._lock:
+            self._calls += 1
+            self._prompt_tokens += usage.prompt_tokens
+            self._completion_tokens += usage.completion_tokens
+            stats = self._by_model[model or settings.llm_model_name]
+            stats["calls"] += 1
+            stats["prompt_tokens"] += usage.prompt_tokens
+            stats["completion_tokens"] += usage.completion_tokens
+            self._by_source[usage.source] += 1
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self._calls,
+                "prompt_tokens": self._prompt_tokens,
+                "completion_tokens": self._completion_tokens,
+                "total_tokens": self._prompt_tokens + self._completion_tokens,
+                "avg_prompt_tokens": round(self._prompt_tokens / self._calls, 1) if self._calls else 0.0,
+                "by_model": {model: dict(stats) for model, stats in self._by_model.items()},
+                "by_source": dict(self._by_source),
+            }
+
+
+# 全局单例
+_token_metrics: Optional[TokenUsageMetrics] = None
+
+
+def get_token_metrics() -> TokenUsageMetrics:
+    """获取 token 用量指标单例"""
+    global _token_metrics
+    if _token_metrics is None:
+        _token_metrics = TokenUsageMetrics()
+    return _token_metrics
@@ -0,0 +1,66 @@
+"""
+后台任务 worker 入口
+
+从任务队列取出 FAQ 导入、文件入库等任务执行，与 API 进程分离，避免 CPU 密集的解析影响对话请求。
+
+启动命令:
+    python -m src.worker
+"""
+
+import asyncio
+import importlib
+import logging
+import signal
+
+from src.core.config import settings
+
+logging.basicConfig(
+    level=getattr(logging, settings.log_level),
+    format="%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+# 注册任务处理函数的模块
+JOB_HANDLER_MODULES = [
+    "src.api.admin.faq",
+    "src.services.file_upload_processor",
+]
+
+
+def load_job_handlers() -> None:
+    """导入处理函数模块，完成注册"""
+    for module in JOB_HANDLER_MODULES:
+        importlib.import_module(module)
+
+
+async def main() -> None:
+    from src.db.base import close_database_service
+    from src.services.file_parser import shutdown_parser_pool
+    from src.services.job_queue import JobWorker, close_job_queue, get_job_queue
+    from src.services.llm_factory import reset_shared_embeddings
+    from src.services.llm_registry import close_llm_registry
+    from src.services.providers.siliconflow_provider import close_siliconflow_embeddings
+
+    if settings.job_queue_backend == "fakeredis":
+        logger.warning("⚠️ JOB_QUEUE_BACKEND=fakeredis: the queue is process-local, API jobs will not reach this worker")
+
+    load_job_handlers()
+    worker = JobWorker(get_job_queue())
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+
+    try:
+        await worker.run()
+    finally:
+        await close_job_queue()
+        await close_database_service()
+        await close_llm_registry()
+        await close_siliconflow_embeddings()
+        reset_shared_embeddings()
+        shutdown_parser_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -8,6 +8,7 @@
 """
 
 import os
+import tempfile
 from typing import Generator
 
 import fakeredis.aioredis
@@ -37,6 +38,9 @@ os.environ.update({
     "EMBEDDING_MODEL": "text-embedding-ada-002",
     "EMBEDDING_DIM": "1536",
     "LANGGRAPH_CHECKPOINTER": "memory",
+    "JOB_QUEUE_BACKEND": "fakeredis",  # 任务队列使用进程内 fakeredis
+    "PARSER_PROCESS_WORKERS": "0",  # 文件解析默认在线程池中执行，使 mock 生效
+    "CONVERSATION_SPILL_DIR": os.path.join(tempfile.gettempdir(), "chat-agent-test-spill"),  # 对话历史落盘不写入仓库
     "SKIP_MILVUS_INIT": "1",  # 测试环境跳过Milvus初始化，避免卡住
     # 管理员认证配置（必填，用于安全验证）
     "ADMIN_PASSWORD": "TestSecurePassword123!",
@@ -44,6 +48,37 @@ os.environ.update({
 })
 
 
+@pytest.fixture(autouse=True)
+def reset_embedding_cache():
+    """每个测试前清空查询向量缓存，避免跨测试命中"""
+    from src.services.embedding_cache import get_embedding_cache
+
+    get_embedding_cache().clear()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def reset_shared_embeddings():
+    """每个测试前丢弃共享的 Embeddings 实例，使 mock 的 create_embeddings 生效"""
+    from src.services.llm_factory import reset_shared_embeddings
+
+    reset_shared_embeddings()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def reset_recall_sources():
+    """每个测试前清空共享的召回源实例、延迟样本和FAQ索引，使 mock 的依赖生效"""
+    from src.agent.recall.latency import get_latency_tracker
+    from src.agent.recall.sources.registry import get_recall_source_registry
+    from src.services.faq_index import get_faq_index
+
+    get_recall_source_registry().clear()
+    get_latency_tracker().clear()
+    get_faq_index().clear()
+    yield
+
+
 @pytest.fixture(scope="session")
 def test_api_key() -> str:
     """测试 API Key"""
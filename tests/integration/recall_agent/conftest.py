@@ -0,0 +1,33 @@
+"""
+召回Agent集成测试共享fixture
+"""
+
+import pytest
+
+from src.services.faq_index import get_faq_index
+
+
+@pytest.fixture
+def imported_faqs():
+    """模拟已导入FAQ collection的数据（预先构建倒排索引，不依赖Milvus）"""
+    index = get_faq_index()
+    index.add_many([
+        {
+            "id": "faq_001",
+            "text": "你们的退货政策是什么？\n答：我们提供30天无理由退货服务，商品需保持原包装和标签完整。",
+            "metadata": {
+                "question": "你们的退货政策是什么？",
+                "answer": "我们提供30天无理由退货服务，商品需保持原包装和标签完整。",
+            },
+        },
+        {
+            "id": "faq_002",
+            "text": "如何联系客服？\n答：您可以通过在线客服、电话400-123-4567或邮件support@example.com联系我们。",
+            "metadata": {
+                "question": "如何联系客服？",
+                "answer": "您可以通过在线客服、电话400-123-4567或邮件support@example.com联系我们。",
+            },
+        },
+    ])
+    index.ready = True
+    return index
@@ -25,7 +25,7 @@ class TestRecallAgentEndToEnd:
 
     @pytest.mark.asyncio
     @patch('src.agent.recall.nodes.settings')
-    @patch('src.agent.recall.sources.vector_source.create_embeddings')
+    @patch('src.agent.recall.sources.vector_source.get_shared_embeddings')
     @patch('src.agent.recall.sources.vector_source.milvus_service')
     async def test_recall_agent_vector_only(self, mock_milvus, mock_embeddings, mock_settings, recall_request):
         """测试仅向量召回的端到端流程"""
@@ -35,6 +35,13 @@ class TestRecallAgentEndToEnd:
         mock_settings.recall_timeout_ms = 500
         mock_settings.recall_retry = 1
         mock_settings.recall_merge_strategy = "weighted"
+        mock_settings.recall_score_normalization = "minmax"
+        mock_settings.recall_rrf_k = 60
+        mock_settings.recall_source_timeouts_ms = ""
+        mock_settings.recall_hedge_sources = []
+        mock_settings.recall_hedge_delay_ms = 300
+        mock_settings.recall_early_exit_min_hits = 0
+        mock_settings.recall_early_exit_confidence = 0.8
         mock_settings.recall_degrade_threshold = 0.5
         mock_settings.recall_fallback_enabled = True
         mock_settings.recall_experiment_enabled = False
@@ -67,7 +74,7 @@ class TestRecallAgentEndToEnd:
 
     @pytest.mark.asyncio
     @patch('src.agent.recall.nodes.settings')
-    async def test_recall_agent_multi_source(self, mock_settings, recall_request):
+    async def test_recall_agent_multi_source(self, mock_settings, recall_request, imported_faqs):
         """测试多源召回的端到端流程"""
         # Mock配置
         mock_settings.recall_sources = ["vector", "faq", "keyword"]
@@ -75,6 +82,13 @@ class TestRecallAgentEndToEnd:
         mock_settings.recall_timeout_ms = 500
         mock_settings.recall_retry = 1
         mock_settings.recall_merge_strategy = "weighted"
+        mock_settings.recall_score_normalization = "minmax"
+        mock_settings.recall_rrf_k = 60
+        mock_settings.recall_source_timeouts_ms = ""
+        mock_settings.recall_hedge_sources = []
+        mock_settings.recall_hedge_delay_ms = 300
+        mock_settings.recall_early_exit_min_hits = 0
+        mock_settings.recall_early_exit_confidence = 0.8
         mock_settings.recall_degrade_threshold = 0.5
         mock_settings.recall_fallback_enabled = True
         mock_settings.recall_experiment_enabled = False
@@ -104,6 +118,13 @@ class TestRecallAgentEndToEnd:
         mock_settings.recall_timeout_ms = 500
         mock_settings.recall_retry = 1
         mock_settings.recall_merge_strategy = "weighted"
+        mock_settings.recall_score_normalization = "minmax"
+        mock_settings.recall_rrf_k = 60
+        mock_settings.recall_source_timeouts_ms = ""
+        mock_settings.recall_hedge_sources = []
+        mock_settings.recall_hedge_delay_ms = 300
+        mock_settings.recall_early_exit_min_hits = 0
+        mock_settings.recall_early_exit_confidence = 0.8
         mock_settings.recall_degrade_threshold = 0.9  # 高阈值，容易触发降级
         mock_settings.recall_fallback_enabled = True
         mock_settings.recall_experiment_enabled = False
@@ -132,6 +153,13 @@ class TestRecallAgentEndToEnd:
         mock_settings.recall_timeout_ms = 500
         mock_settings.recall_retry = 1
         mock_settings.recall_merge_strategy = "weighted"
+        mock_settings.recall_score_normalization = "minmax"
+        mock_settings.recall_rrf_k = 60
+        mock_settings.recall_source_timeouts_ms = ""
+        mock_settings.recall_hedge_sources = []
+        mock_settings.recall_hedge_delay_ms = 300
+        mock_settings.recall_early_exit_min_hits = 0
+        mock_settings.recall_early_exit_confidence = 0.8
         mock_settings.recall_degrade_threshold = 0.5
         mock_settings.recall_fallback_enabled = True
         mock_settings.recall_experiment_enabled = True
@@ -157,6 +185,13 @@ class TestRecallAgentEndToEnd:
         mock_settings.recall_timeout_ms = 100  # 短超时
         mock_settings.recall_retry = 0
         mock_settings.recall_merge_strategy = "weighted"
+        mock_settings.recall_score_normalization = "minmax"
+        mock_settings.recall_rrf_k = 60
+        mock_settings.recall_source_timeouts_ms = ""
+        mock_settings.recall_hedge_sources = []
+        mock_settings.recall_hedge_delay_ms = 300
+        mock_settings.recall_early_exit_min_hits = 0
+        mock_settings.recall_early_exit_confidence = 0.8
         mock_settings.recall_degrade_threshold = 0.5
         mock_settings.recall_fallback_enabled = True
         mock_settings.recall_experiment_enabled = False
@@ -184,6 +219,13 @@ class TestRecallAgentPerformance:
         mock_settings.recall_timeout_ms = 500
         mock_settings.recall_retry = 1
         mock_settings.recall_merge_strategy = "weighted"
+        mock_settings.recall_score_normalization = "minmax"
+        mock_settings.recall_rrf_k = 60
+        mock_settings.recall_source_timeouts_ms = ""
+        mock_settings.recall_hedge_sources = []
+        mock_settings.recall_hedge_delay_ms = 300
+        mock_settings.recall_early_exit_min_hits = 0
+        mock_settings.recall_early_exit_confidence = 0.8
         mock_settings.recall_degrade_threshold = 0.5
         mock_settings.recall_fallback_enabled = True
         mock_settings.recall_experiment_enabled = False
@@ -212,6 +254,13 @@ class TestRecallAgentPerformance:
         mock_settings.recall_timeout_ms = 500
         mock_settings.recall_retry = 1
         mock_settings.recall_merge_strategy = "weighted"
+        mock_settings.recall_score_normalization = "minmax"
+        mock_settings.recall_rrf_k = 60
+        mock_settings.recall_source_timeouts_ms = ""
+        mock_settings.recall_hedge_sources = []
+        mock_settings.recall_hedge_delay_ms = 300
+        mock_settings.recall_early_exit_min_hits = 0
+        mock_settings.recall_early_exit_confidence = 0.8
         mock_settings.recall_degrade_threshold = 0.5
         mock_settings.recall_fallback_enabled = True
         mock_settings.recall_experiment_enabled = False
@@ -25,6 +25,13 @@ class TestRecallAgentPerformance:
         mock_settings.recall_timeout_ms = 500
         mock_settings.recall_retry = 1
         mock_settings.recall_merge_strategy = "weighted"
+        mock_settings.recall_score_normalization = "minmax"
+        mock_settings.recall_rrf_k = 60
+        mock_settings.recall_source_timeouts_ms = ""
+        mock_settings.recall_hedge_sources = []
+        mock_settings.recall_hedge_delay_ms = 300
+        mock_settings.recall_early_exit_min_hits = 0
+        mock_settings.recall_early_exit_confidence = 0.8
         mock_settings.recall_degrade_threshold = 0.5
         mock_settings.recall_fallback_enabled = True
         mock_settings.recall_experiment_enabled = False
@@ -85,6 +92,13 @@ class TestRecallAgentPerformance:
         mock_settings.recall_timeout_ms = 500
         mock_settings.recall_retry = 1
         mock_settings.recall_merge_strategy = "weighted"
+        mock_settings.recall_score_normalization = "minmax"
+        mock_settings.recall_rrf_k = 60
+        mock_settings.recall_source_timeouts_ms = ""
+        mock_settings.recall_hedge_sources = []
+        mock_settings.recall_hedge_delay_ms = 300
+        mock_settings.recall_early_exit_min_hits = 0
+        mock_settings.recall_early_exit_confidence = 0.8
         mock_settings.recall_degrade_threshold = 0.5
         mock_settings.recall_fallback_enabled = True
         mock_settings.recall_experiment_enabled = False
@@ -138,6 +152,13 @@ class TestRecallAgentPerformance:
         mock_settings.recall_timeout_ms = 500
         mock_settings.recall_retry = 1
         mock_settings.recall_merge_strategy = "weighted"
+        mock_settings.recall_score_normalization = "minmax"
+        mock_settings.recall_rrf_k = 60
+        mock_settings.recall_source_timeouts_ms = ""
+        mock_settings.recall_hedge_sources = []
+        mock_settings.recall_hedge_delay_ms = 300
+        mock_settings.recall_early_exit_min_hits = 0
+        mock_settings.recall_early_exit_confidence = 0.8
         mock_settings.recall_degrade_threshold = 0.5
         mock_settings.recall_fallback_enabled = True
         mock_settings.recall_experiment_enabled = False
@@ -191,6 +212,13 @@ class TestRecallAgentPerformance:
         mock_settings.recall_timeout_ms = 500
         mock_settings.recall_retry = 1
         mock_settings.recall_merge_strategy = "weighted"
+        mock_settings.recall_score_normalization = "minmax"
+        mock_settings.recall_rrf_k = 60
+        mock_settings.recall_source_timeouts_ms = ""
+        mock_settings.recall_hedge_sources = []
+        mock_settings.recall_hedge_delay_ms = 300
+        mock_settings.recall_early_exit_min_hits = 0
+        mock_settings.recall_early_exit_confidence = 0.8
         mock_settings.recall_degrade_threshold = 0.5
         mock_settings.recall_fallback_enabled = True
         mock_settings.recall_experiment_enabled = False
@@ -220,7 +248,7 @@ class TestRecallAgentPerformance:
 
     @pytest.mark.asyncio
     @patch('src.agent.recall.nodes.settings')
-    async def test_recall_degradation_rate(self, mock_settings):
+    async def test_recall_degradation_rate(self, mock_settings, imported_faqs):
         """测试降级率"""
         # Mock配置
         mock_settings.recall_sources = ["faq", "keyword"]
@@ -228,6 +256,13 @@ class TestRecallAgentPerformance:
         mock_settings.recall_timeout_ms = 500
         mock_settings.recall_retry = 1
         mock_settings.recall_merge_strategy = "weighted"
+        mock_settings.recall_score_normalization = "minmax"
+        mock_settings.recall_rrf_k = 60
+        mock_settings.recall_source_timeouts_ms = ""
+        mock_settings.recall_hedge_sources = []
+        mock_settings.recall_hedge_delay_ms = 300
+        mock_settings.recall_early_exit_min_hits = 0
+        mock_settings.recall_early_exit_confidence = 0.8
         mock_settings.recall_degrade_threshold = 0.5
         mock_settings.recall_fallback_enabled = True
         mock_settings.recall_experiment_enabled = False
@@ -0,0 +1,55 @@
+"""
+对话历史批量写入微基准
+
+计时结果受机器负载影响，不放在单元测试中。
+"""
+
+import time
+
+import pytest
+import pytest_asyncio
+
+from src.db.base import Base, DatabaseService
+from tests.unit.test_conversation_writer import count_rows, make_writer, submit_many
+
+
+@pytest_asyncio.fixture
+async def db_service(tmp_path):
+    service = DatabaseService(f"sqlite+aiosqlite:///{tmp_path / 'chat.db'}")
+    async with service.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield service
+    await service.close()
+
+
+@pytest.mark.integration
+class TestWriteBenchmark:
+    """微基准：批量写入 vs 逐条 INSERT + COMMIT + 回读"""
+
+    @pytest.mark.asyncio
+    async def test_throughput(self, db_service, tmp_path):
+        from src.db.repositories.conversation_repository import ConversationRepository
+
+        count = 300
+        start = time.perf_counter()
+        for i in range(count):
+            async with db_service.get_session() as session:
+                await ConversationRepository(session).create_conversation(
+                    session_id=f"inline-{i}", user_message="问题", ai_response="回答"
+                )
+        inline_cost = time.perf_counter() - start
+
+        writer = make_writer(db_service, tmp_path, batch_size=100, flush_interval=10.0)
+        start = time.perf_counter()
+        await submit_many(writer, count, prefix="batched")
+        submit_cost = time.perf_counter() - start
+        await writer.close()
+        batched_cost = time.perf_counter() - start
+
+        print(
+            f"\n写入 {count} 条对话: 逐条 {inline_cost * 1000:.0f}ms  "
+            f"批量 {batched_cost * 1000:.0f}ms（请求路径 {submit_cost * 1000:.1f}ms）"
+        )
+
+        assert await count_rows(db_service) == count * 2
+        assert inline_cost / batched_cost >= 3
@@ -0,0 +1,83 @@
+"""
+文件解析进程池微基准
+
+计时结果受机器负载影响，不放在单元测试中。测试 PDF 复用单元测试中的生成函数。
+"""
+
+import asyncio
+import math
+import time
+
+import pytest
+
+from src.services import file_parser as parser_module
+from src.services.file_parser import FileParser, extract_pdf_pages, smart_chunk
+from tests.unit.test_file_parser import build_pdf
+
+BENCHMARK_PAGES = 80
+
+
+@pytest.fixture
+def process_pool(mocker):
+    """启用真实的解析进程池"""
+    mocker.patch.object(parser_module.settings, "parser_process_workers", 2)
+    mocker.patch.object(parser_module.settings, "parser_pdf_pages_per_task", 4)
+    mocker.patch.object(parser_module.settings, "parser_task_timeout_seconds", 30)
+    parser_module.shutdown_parser_pool()
+    yield parser_module.settings
+    parser_module.shutdown_parser_pool()
+
+
+@pytest.mark.integration
+class TestEventLoopLatencyBenchmark:
+    """微基准：解析大 PDF 期间事件循环上的请求延迟（模拟 /v1/chat/completions）"""
+
+    @staticmethod
+    async def measure_latency(work) -> float:
+        """在 work 执行期间每 5ms 调度一次轻量任务，返回调度延迟的 p99（毫秒）"""
+        delays = []
+        done = False
+
+        async def ticker():
+            while not done:
+                start = time.perf_counter()
+                await asyncio.sleep(0.005)
+                delays.append(time.perf_counter() - start - 0.005)
+
+        task = asyncio.create_task(ticker())
+        await asyncio.sleep(0.05)
+        await work()
+        done = True
+        await task
+        delays.sort()
+        return delays[math.ceil(len(delays) * 0.99) - 1] * 1000
+
+    @pytest.mark.asyncio
+    async def test_chat_latency_flat_while_parsing(self, process_pool):
+        content = build_pdf(pages=BENCHMARK_PAGES)
+        parser = FileParser()
+        # 预热：启动解析进程
+        await parser._run_in_pool(len, b"warmup")
+
+        async def idle():
+            await asyncio.sleep(0.5)
+
+        async def parse_inline():
+            # 改造前：async 方法内同步解析
+            _, pages = extract_pdf_pages(content)
+            smart_chunk("\n".join(pages), parser.MAX_CHUNK_SIZE, parser.MIN_CHUNK_SIZE)
+
+        async def parse_in_pool():
+            await parser.parse_file(content, "large.pdf")
+
+        idle_p99 = await self.measure_latency(idle)
+        inline_p99 = await self.measure_latency(parse_inline)
+        pool_p99 = await self.measure_latency(parse_in_pool)
+
+        print(
+            f"\n解析 {BENCHMARK_PAGES} 页 PDF ({len(content) / 1024:.0f}KB) 期间事件循环延迟 p99: "
+            f"空闲 {idle_p99:.1f}ms  同步解析 {inline_p99:.1f}ms  进程池 {pool_p99:.1f}ms"
+        )
+
+        assert pool_p99 < 50
+        assert inline_p99 > 5 * max(pool_p99, 1)
@@ -332,11 +332,11 @@ class TestFileUploadFlow:
             # 模拟知识库仓库
             mock_knowledge_repo_instance = AsyncMock()
             mock_knowledge_repo.return_value = mock_knowledge_repo_instance
-            mock_knowledge_repo_instance.add_document.return_value = "doc-id-1"
+            mock_knowledge_repo_instance.insert.return_value = 1
 
             # 模拟嵌入服务
             mock_embedding_service = AsyncMock()
-            mock_embedding_service.get_embedding.return_value = [0.1, 0.2, 0.3]
+            mock_embedding_service.get_embeddings.return_value = [[0.1, 0.2, 0.3]]
             mock_embedding.return_value = mock_embedding_service
 
             # 创建临时文件
@@ -351,16 +351,16 @@ class TestFileUploadFlow:
                 # 创建处理器
                 processor = FileUploadProcessor(mock_db_service.return_value)
 
-                # 执行处理
-                result = await processor.process_file("test-upload-id")
+                # 执行处理（文件内容按任务队列的分块形式传入）
+                async def content():
+                    yield b"Sample text content for testing"
 
-                # 验证结果
-                assert result is True
+                await processor.process_file("test-upload-id", content())
 
                 # 验证调用
                 mock_repo.return_value.update_status.assert_called()
                 mock_repo.return_value.update_result.assert_called()
-                mock_knowledge_repo_instance.add_document.assert_called()
+                mock_knowledge_repo_instance.insert.assert_called()
 
             finally:
                 # 清理临时文件
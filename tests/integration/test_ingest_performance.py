@@ -0,0 +1,81 @@
+"""
+文件入库流水线微基准
+
+计时结果受机器负载影响，不放在单元测试中。模拟 Embedding 服务复用单元测试中的定义。
+"""
+
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.services import file_upload_processor as processor_module
+from src.services.file_upload_processor import FileUploadProcessor
+from tests.unit.test_file_upload_processor import FakeEmbeddingService, use_embedding_service
+
+
+@pytest.fixture
+def upload_record():
+    record = MagicMock()
+    record.id = "upload-1"
+    record.filename = "manual.pdf"
+    record.file_type = "pdf"
+    record.source = "docs"
+    record.version = "1.0"
+    record.uploader = "admin"
+    return record
+
+
+@pytest.fixture
+def knowledge_repo(mocker):
+    repo = MagicMock()
+    repo.insert = AsyncMock(side_effect=lambda documents: len(documents))
+    repo.add_document = AsyncMock(side_effect=lambda text, metadata, embedding: f"doc-{metadata['chunk_index']}")
+    mocker.patch.object(processor_module, "get_milvus_client", AsyncMock())
+    mocker.patch.object(processor_module, "KnowledgeRepository", return_value=repo)
+    return repo
+
+
+@pytest.fixture
+def ingest_settings(mocker):
+    return mocker.patch.object(processor_module, "settings")
+
+
+@pytest.fixture
+def processor(mocker):
+    processor = FileUploadProcessor(MagicMock())
+    mocker.patch.object(processor, "_update_status", AsyncMock())
+    return processor
+
+
+@pytest.mark.integration
+class TestIngestBenchmark:
+    """微基准：批量 + 并发流水线 vs 逐块向量化、逐条写入"""
+
+    @pytest.mark.asyncio
+    async def test_throughput(self, mocker, processor, upload_record, knowledge_repo, ingest_settings):
+        ingest_settings.ingest_embedding_batch_size = 32
+        ingest_settings.ingest_embedding_concurrency = 4
+        ingest_settings.ingest_insert_batch_size = 1000
+        chunks = [f"分块{i}" for i in range(200)]
+
+        serial_service = FakeEmbeddingService()
+        start = time.perf_counter()
+        for index, chunk in enumerate(chunks):
+            embedding = await serial_service.get_embedding(chunk)
+            await knowledge_repo.add_document(text=chunk, metadata={"chunk_index": index}, embedding=embedding)
+        serial_cost = time.perf_counter() - start
+
+        pipeline_service = use_embedding_service(mocker, FakeEmbeddingService())
+        start = time.perf_counter()
+        milvus_ids = await processor._store_to_milvus(chunks, upload_record, {})
+        pipeline_cost = time.perf_counter() - start
+
+        print(
+            f"\n入库 {len(chunks)} 个分块: 逐块 {serial_cost * 1000:.0f}ms ({len(serial_service.calls)} 次请求)  "
+            f"流水线 {pipeline_cost * 1000:.0f}ms ({len(pipeline_service.calls)} 次请求)"
+        )
+
+        assert len(milvus_ids) == len(chunks)
+        assert knowledge_repo.insert.call_count == 1
+        assert serial_cost / pipeline_cost >= 10
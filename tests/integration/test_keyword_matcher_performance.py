@@ -0,0 +1,63 @@
+"""
+关键词规则匹配器微基准
+
+计时结果受机器负载影响，不放在单元测试中。
+"""
+
+import time
+
+import pytest
+
+from src.agent.recall.sources.keyword_matcher import (
+    DEFAULT_RULES_PATH,
+    KeywordRuleSet,
+    load_keyword_rules,
+)
+
+
+@pytest.mark.integration
+class TestKeywordMatcherBenchmark:
+    """微基准：单次查询耗时不随规则数量增长"""
+
+    QUERY = "你们的企业版价格是多少，API接口文档在哪里，登录密码忘记了怎么办"
+
+    @staticmethod
+    def build_rule_set(rule_count: int) -> KeywordRuleSet:
+        rules = load_keyword_rules(DEFAULT_RULES_PATH)
+        synthetic = [
+            {
+                "id": f"synthetic_{i}",
+                "keywords": [f"产品{i}型号", f"sku{i}x", f"配件{i}号"],
+                "content": f"产品{i}",
+                "priority": 0.5,
+            }
+            for i in range(rule_count)
+        ]
+        base = [
+            {"id": rule.id, "keywords": rule.keywords, "content": rule.content, "priority": rule.priority}
+            for rule in rules.rules
+        ]
+        return KeywordRuleSet(base + synthetic)
+
+    @staticmethod
+    def per_query_us(rule_set: KeywordRuleSet, rounds: int = 5, iterations: int = 200) -> float:
+        best = float("inf")
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                rule_set.score(TestKeywordMatcherBenchmark.QUERY)
+            best = min(best, (time.perf_counter() - start) / iterations)
+        return best * 1_000_000
+
+    def test_per_query_cost_flat(self):
+        timings = {}
+        for rule_count in (10, 1_000, 10_000):
+            rule_set = self.build_rule_set(rule_count)
+            timings[rule_count] = self.per_query_us(rule_set)
+
+        print("\n规则数  单次查询(us)")
+        for rule_count, cost in timings.items():
+            print(f"{rule_count:>6}  {cost:>10.1f}")
+
+        # 规则数增加 1000 倍，单次查询耗时应基本持平（留出计时抖动余量）
+        assert timings[10_000] < timings[10] * 3
@@ -0,0 +1,58 @@
+"""
+消息过滤器微基准
+
+计时结果受机器负载影响，不放在单元测试中。
+"""
+
+import time
+
+import pytest
+
+from src.services.message_filter import MessageFilter
+
+
+@pytest.mark.integration
+class TestMessageFilterBenchmark:
+    """微基准：单条消息过滤耗时不随配置词数量增长"""
+
+    MESSAGE = "你好，我想了解一下企业版的价格和API接口文档，另外登录密码忘记了应该怎么办？"
+
+    @staticmethod
+    def build_terms(count: int) -> list[str]:
+        return [f"term{i}" for i in range(count)]
+
+    @staticmethod
+    def per_message_us(check, rounds: int = 5, iterations: int = 200) -> float:
+        best = float("inf")
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                check(TestMessageFilterBenchmark.MESSAGE)
+            best = min(best, (time.perf_counter() - start) / iterations)
+        return best * 1_000_000
+
+    @staticmethod
+    def naive_check(terms: list[str]):
+        """逐词子串查找（原实现方式）"""
+        def check(message: str) -> int:
+            message_lower = message.lower()
+            return sum(1 for term in terms if term.lower() in message_lower)
+        return check
+
+    def test_filter_cost_flat(self):
+        timings = {}
+        for term_count in (10, 1_000, 10_000):
+            terms = self.build_terms(term_count)
+            message_filter = MessageFilter(instruction_keywords=terms, technical_terms=terms)
+            timings[term_count] = (
+                self.per_message_us(message_filter.check),
+                self.per_message_us(self.naive_check(terms), iterations=20),
+            )
+
+        print("\n词数量  自动机(us)  逐词查找(us)")
+        for term_count, (compiled, naive) in timings.items():
+            print(f"{term_count:>6}  {compiled:>10.1f}  {naive:>12.1f}")
+
+        # 词数量增加 1000 倍，单条消息耗时应基本持平（留出计时抖动余量）
+        assert timings[10_000][0] < timings[10][0] * 3
+        assert timings[10_000][0] < timings[10_000][1]
@@ -0,0 +1,51 @@
+"""
+查询路由器微基准
+
+计时结果受机器负载影响，不放在单元测试中。
+"""
+
+import time
+
+import pytest
+
+from src.agent.main.router import (
+    DEFAULT_INTENTS_PATH,
+    LexicalRouter,
+    QueryRouter,
+    load_intent_router,
+)
+
+
+@pytest.fixture
+def intent_router():
+    pytest.importorskip("numpy")
+    return load_intent_router(DEFAULT_INTENTS_PATH, threshold=0.15)
+
+
+@pytest.mark.integration
+class TestRouterBenchmark:
+    """微基准：单次路由耗时低于 1 毫秒"""
+
+    QUERY = "你好，我想问一下企业版的价格和发票怎么开，订单什么时候能发货"
+
+    @staticmethod
+    def per_route_us(router: QueryRouter, rounds: int = 5, iterations: int = 200) -> float:
+        best = float("inf")
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                router.route(TestRouterBenchmark.QUERY)
+            best = min(best, (time.perf_counter() - start) / iterations)
+        return best * 1_000_000
+
+    def test_route_under_one_millisecond(self, intent_router):
+        timings = {
+            "lexical": self.per_route_us(LexicalRouter()),
+            "intent": self.per_route_us(intent_router),
+        }
+
+        print("\n路由器   单次路由(us)")
+        for name, cost in timings.items():
+            print(f"{name:<8} {cost:>10.1f}")
+
+        assert all(cost < 1000 for cost in timings.values())
@@ -0,0 +1,73 @@
+"""
+tiktoken 编码器缓存与批量分块微基准
+
+计时结果受机器负载影响，不放在单元测试中。
+"""
+
+import time
+
+import pytest
+import tiktoken
+
+from src.core.utils import (
+    chunk_text_by_tokens,
+    chunk_texts_by_tokens,
+    get_encoding,
+    truncate_text_to_tokens,
+)
+
+
+@pytest.fixture
+def real_encoding():
+    encoding = get_encoding()
+    if encoding is None:
+        pytest.skip("tiktoken encoding unavailable")
+    return encoding
+
+
+@pytest.mark.integration
+class TestTokenizerBenchmark:
+    """微基准：编码器缓存与批量分块"""
+
+    DOCUMENTS = ["退货政策：自收货之日起30天内可无理由退货。" * 40 + str(i) for i in range(200)]
+
+    @staticmethod
+    def best_of(func, rounds: int = 3) -> float:
+        best = float("inf")
+        for _ in range(rounds):
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    def test_cached_truncation_faster(self, real_encoding):
+        query = "请问企业版的价格和发票怎么开？" * 60
+
+        def uncached():
+            for _ in range(200):
+                encoding = tiktoken.get_encoding("cl100k_base")
+                encoding.decode(encoding.encode(query)[:512])
+
+        def cached():
+            for _ in range(200):
+                truncate_text_to_tokens(query, max_tokens=512)
+
+        uncached_cost = self.best_of(uncached)
+        cached_cost = self.best_of(cached)
+        print(f"\n截断 200 次: 逐次获取编码器 {uncached_cost * 1000:.1f}ms  缓存 {cached_cost * 1000:.1f}ms")
+
+        assert cached_cost <= uncached_cost * 1.1
+
+    def test_batch_chunking_faster(self, real_encoding):
+        def per_document():
+            for text in self.DOCUMENTS:
+                chunk_text_by_tokens(text, chunk_size=500, overlap=50)
+
+        def batched():
+            chunk_texts_by_tokens(self.DOCUMENTS, chunk_size=500, overlap=50)
+
+        per_document_cost = self.best_of(per_document)
+        batched_cost = self.best_of(batched)
+        print(f"\n分块 {len(self.DOCUMENTS)} 个文档: 逐个 {per_document_cost * 1000:.1f}ms  批量 {batched_cost * 1000:.1f}ms")
+
+        assert batched_cost <= per_document_cost * 1.1
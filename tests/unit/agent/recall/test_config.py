@@ -18,6 +18,13 @@ class TestLoadRecallConfig:
         mock_settings.recall_timeout_ms = 3000
         mock_settings.recall_retry = 1
         mock_settings.recall_merge_strategy = "weighted"
+        mock_settings.recall_score_normalization = "minmax"
+        mock_settings.recall_rrf_k = 60
+        mock_settings.recall_source_timeouts_ms = ""
+        mock_settings.recall_hedge_sources = []
+        mock_settings.recall_hedge_delay_ms = 300
+        mock_settings.recall_early_exit_min_hits = 0
+        mock_settings.recall_early_exit_confidence = 0.8
         mock_settings.recall_degrade_threshold = 0.5
         mock_settings.recall_fallback_enabled = True
         mock_settings.recall_experiment_enabled = False
@@ -44,6 +51,13 @@ class TestLoadRecallConfig:
         mock_settings.recall_timeout_ms = 3000
         mock_settings.recall_retry = 1
         mock_settings.recall_merge_strategy = "weighted"
+        mock_settings.recall_score_normalization = "minmax"
+        mock_settings.recall_rrf_k = 60
+        mock_settings.recall_source_timeouts_ms = ""
+        mock_settings.recall_hedge_sources = []
+        mock_settings.recall_hedge_delay_ms = 300
+        mock_settings.recall_early_exit_min_hits = 0
+        mock_settings.recall_early_exit_confidence = 0.8
         mock_settings.recall_degrade_threshold = 0.5
         mock_settings.recall_fallback_enabled = True
         mock_settings.recall_experiment_enabled = True
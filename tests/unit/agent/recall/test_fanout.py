@@ -0,0 +1,210 @@
+"""
+fanout_node 截止时间 / 对冲请求 / 提前返回单元测试
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from src.agent.recall.latency import SourceLatencyTracker, get_latency_tracker
+from src.agent.recall.nodes import fanout_node
+from src.agent.recall.schema import RecallHit, RecallRequest
+
+
+class FakeSource:
+    """按调用次数返回不同延迟的召回源"""
+
+    def __init__(self, name: str, delays: list[float], confidence: float = 0.9, error: Exception | None = None):
+        self.source_name = name
+        self.delays = delays
+        self.confidence = confidence
+        self.error = error
+        self.calls = 0
+
+    async def acquire(self, request):
+        delay = self.delays[min(self.calls, len(self.delays) - 1)]
+        self.calls += 1
+        await asyncio.sleep(delay)
+        if self.error:
+            raise self.error
+        return [
+            RecallHit(
+                source=self.source_name,
+                score=self.confidence,
+                confidence=self.confidence,
+                reason="测试",
+                content=f"{self.source_name}-{self.calls}",
+                metadata={},
+            )
+        ]
+
+
+@pytest.fixture
+def register_sources(mocker):
+    def _register(*sources: FakeSource):
+        mocker.patch.dict(
+            'src.agent.recall.sources.registry._SOURCE_FACTORIES',
+            {source.source_name: (lambda s=source: s) for source in sources},
+            clear=True,
+        )
+
+    return _register
+
+
+def make_state(sources: list[str], **config) -> dict:
+    return {
+        "request": RecallRequest(query="测试", session_id="session-123", trace_id="trace-456"),
+        "config": {"sources": sources, "timeout_ms": 500, "retry": 0, **config},
+    }
+
+
+class TestFanoutDeadlines:
+    """测试截止时间"""
+
+    @pytest.mark.asyncio
+    async def test_slow_first_source_does_not_block(self, register_sources):
+        """排在前面的慢召回源超时不影响已完成的召回源"""
+        register_sources(FakeSource("vector", [2.0]), FakeSource("faq", [0.01]))
+
+        start = time.perf_counter()
+        result = await fanout_node(make_state(["vector", "faq"], timeout_ms=200))
+        elapsed = time.perf_counter() - start
+
+        assert [hit.source for hit in result["hits"]] == ["faq"]
+        assert elapsed < 0.5
+
+    @pytest.mark.asyncio
+    async def test_per_source_deadline(self, register_sources):
+        register_sources(FakeSource("vector", [0.05]), FakeSource("faq", [0.3]))
+
+        start = time.perf_counter()
+        result = await fanout_node(
+            make_state(["vector", "faq"], timeout_ms=1000, source_timeouts_ms={"faq": 100})
+        )
+        elapsed = time.perf_counter() - start
+
+        assert [hit.source for hit in result["hits"]] == ["vector"]
+        assert elapsed < 0.25
+
+    @pytest.mark.asyncio
+    async def test_failed_source_returns_empty(self, register_sources):
+        register_sources(
+            FakeSource("vector", [0.01], error=RuntimeError("boom")),
+            FakeSource("faq", [0.01]),
+        )
+
+        result = await fanout_node(make_state(["vector", "faq"]))
+
+        assert [hit.source for hit in result["hits"]] == ["faq"]
+
+
+class TestFanoutHedging:
+    """测试对冲请求"""
+
+    @pytest.mark.asyncio
+    async def test_hedged_request_wins(self, register_sources):
+        """原请求卡在长尾时，对冲请求先返回"""
+        vector = FakeSource("vector", [2.0, 0.01])
+        register_sources(vector)
+
+        start = time.perf_counter()
+        result = await fanout_node(
+            make_state(["vector"], timeout_ms=1000, hedge_sources=["vector"], hedge_delay_ms=30)
+        )
+        elapsed = time.perf_counter() - start
+
+        assert vector.calls == 2
+        assert [hit.content for hit in result["hits"]] == ["vector-2"]
+        assert elapsed < 0.5
+
+    @pytest.mark.asyncio
+    async def test_no_hedge_when_fast(self, register_sources):
+        vector = FakeSource("vector", [0.01])
+        register_sources(vector)
+
+        result = await fanout_node(
+            make_state(["vector"], hedge_sources=["vector"], hedge_delay_ms=200)
+        )
+
+        assert vector.calls == 1
+        assert len(result["hits"]) == 1
+        assert get_latency_tracker().stats()["vector"]["samples"] == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_request_waits_for_hedge(self, register_sources):
+        vector = FakeSource("vector", [0.1, 0.01])
+        register_sources(vector)
+        original_acquire = vector.acquire
+
+        async def flaky_acquire(request):
+            if vector.calls == 0:
+                vector.calls += 1
+                await asyncio.sleep(0.1)
+                raise RuntimeError("milvus timeout")
+            return await original_acquire(request)
+
+        vector.acquire = flaky_acquire
+
+        result = await fanout_node(
+            make_state(["vector"], hedge_sources=["vector"], hedge_delay_ms=20)
+        )
+
+        assert [hit.content for hit in result["hits"]] == ["vector-2"]
+
+
+class TestFanoutEarlyExit:
+    """测试高置信度提前返回"""
+
+    @pytest.mark.asyncio
+    async def test_early_exit(self, register_sources):
+        register_sources(FakeSource("vector", [1.0]), FakeSource("faq", [0.01], confidence=0.95))
+
+        start = time.perf_counter()
+        result = await fanout_node(
+            make_state(["vector", "faq"], timeout_ms=2000, early_exit_min_hits=1, early_exit_confidence=0.9)
+        )
+        elapsed = time.perf_counter() - start
+
+        assert [hit.source for hit in result["hits"]] == ["faq"]
+        assert elapsed < 0.5
+
+    @pytest.mark.asyncio
+    async def test_low_confidence_keeps_waiting(self, register_sources):
+        register_sources(FakeSource("vector", [0.1]), FakeSource("faq", [0.01], confidence=0.5))
+
+        result = await fanout_node(
+            make_state(["vector", "faq"], early_exit_min_hits=1, early_exit_confidence=0.9)
+        )
+
+        assert sorted(hit.source for hit in result["hits"]) == ["faq", "vector"]
+
+
+class TestSourceLatencyTracker:
+    """测试延迟统计"""
+
+    def test_hedge_delay_uses_default_until_enough_samples(self):
+        tracker = SourceLatencyTracker(min_samples=5)
+        for _ in range(4):
+            tracker.record("vector", 0.1)
+
+        assert tracker.hedge_delay("vector", 0.3) == 0.3
+
+        tracker.record("vector", 0.1)
+        assert tracker.hedge_delay("vector", 0.3) == 0.1
+
+    def test_percentile(self):
+        tracker = SourceLatencyTracker(min_samples=1)
+        for value in range(1, 101):
+            tracker.record("vector", value / 1000)
+
+        assert tracker.percentile("vector", 95) == pytest.approx(0.095)
+        assert tracker.percentile("vector", 50) == pytest.approx(0.050)
+        assert tracker.stats()["vector"] == {"samples": 100, "p50_ms": 50.0, "p95_ms": 95.0}
+
+    def test_window(self):
+        tracker = SourceLatencyTracker(window_size=3, min_samples=1)
+        for value in [1.0, 0.1, 0.1, 0.1]:
+            tracker.record("vector", value)
+
+        assert tracker.percentile("vector", 100) == 0.1
@@ -0,0 +1,124 @@
+"""
+关键词规则匹配器单元测试
+"""
+
+import json
+import os
+import time
+
+import pytest
+
+from src.agent.recall.schema import RecallRequest
+from src.agent.recall.sources.keyword_matcher import (
+    DEFAULT_RULES_PATH,
+    KeywordRuleSet,
+    load_keyword_rules,
+)
+from src.agent.recall.sources.keyword_source import KeywordRecallSource
+from src.core.aho_corasick import AhoCorasick
+
+
+class TestAhoCorasick:
+    """测试多模式匹配自动机"""
+
+    def test_overlapping_terms(self):
+        automaton = AhoCorasick(["技术支持", "支持", "技术", "持续"])
+
+        assert automaton.find_all("需要技术支持吗") == {"技术支持", "支持", "技术"}
+
+    def test_suffix_terms(self):
+        automaton = AhoCorasick(["he", "she", "his", "hers"])
+
+        assert automaton.find_all("ushers") == {"she", "he", "hers"}
+
+    def test_no_terms(self):
+        assert AhoCorasick([]).find_all("任何文本") == set()
+
+
+class TestKeywordRuleSet:
+    """测试规则编译与评分"""
+
+    def test_default_rules_scores(self):
+        """内置规则的分数与原逐条匹配实现一致"""
+        rule_set = load_keyword_rules(DEFAULT_RULES_PATH)
+
+        scores = {rule.id: score for rule, score in rule_set.score("价格是多少")}
+
+        # (1/5 * 0.4 + 0.3) * 0.9 + 0.1
+        assert scores["rule_001"] == pytest.approx(0.442)
+
+    def test_case_insensitive(self):
+        rule_set = load_keyword_rules(DEFAULT_RULES_PATH)
+
+        assert "rule_004" in {rule.id for rule, _ in rule_set.score("api 怎么调用")}
+
+    def test_legacy_literal_patterns_folded(self):
+        rule_set = KeywordRuleSet([
+            {"id": "r1", "keywords": ["价格"], "patterns": ["价格|报价"], "content": "c", "priority": 1.0},
+        ])
+
+        assert rule_set.rules[0].keywords == ["价格", "报价"]
+        assert rule_set.score("报价单")[0][0].id == "r1"
+
+    def test_large_rule_set_scores_match_default_rules(self):
+        """追加大量不相关规则不改变原有规则的命中和分数"""
+        with open(DEFAULT_RULES_PATH, encoding="utf-8") as f:
+            data = json.load(f)
+        synthetic = [
+            {"id": f"synthetic_{i}", "keywords": [f"产品{i}型号", f"sku{i}x"], "content": f"产品{i}"}
+            for i in range(1_000)
+        ]
+        base = KeywordRuleSet(data["rules"], data.get("synonyms"))
+        rule_set = KeywordRuleSet(data["rules"] + synthetic, data.get("synonyms"))
+        query = "你们的企业版价格是多少，API接口文档在哪里"
+
+        expected = {rule.id: score for rule, score in base.score(query)}
+        assert {rule.id: score for rule, score in rule_set.score(query)} == expected
+
+    def test_regex_patterns_ignored(self):
+        rule_set = KeywordRuleSet([
+            {"id": "r1", "keywords": ["价格"], "patterns": [r"\\d+元"], "content": "c"},
+        ])
+
+        assert rule_set.rules[0].keywords == ["价格"]
+
+
+class TestKeywordRulesHotReload:
+    """测试规则文件热加载"""
+
+    def write_rules(self, path, keyword, mtime):
+        path.write_text(
+            json.dumps({"rules": [{"id": keyword, "keywords": [keyword], "content": keyword, "priority": 1.0}]}),
+            encoding="utf-8",
+        )
+        os.utime(path, (mtime, mtime))
+
+    @pytest.mark.asyncio
+    async def test_reload_on_change(self, tmp_path, mocker):
+        mocker.patch("src.agent.recall.sources.keyword_source.settings.keyword_rules_reload_interval", 0.01)
+        rules_path = tmp_path / "rules.json"
+        self.write_rules(rules_path, "发票", 1_000_000)
+        source = KeywordRecallSource(rules_path)
+        request = RecallRequest(query="发票和退款", session_id="s", trace_id="t")
+
+        assert [hit.metadata["rule_id"] for hit in await source.acquire(request)] == ["发票"]
+
+        self.write_rules(rules_path, "退款", 1_000_100)
+        time.sleep(0.02)
+
+        assert [hit.metadata["rule_id"] for hit in await source.acquire(request)] == ["退款"]
+
+    @pytest.mark.asyncio
+    async def test_invalid_file_keeps_previous_rules(self, tmp_path, mocker):
+        mocker.patch("src.agent.recall.sources.keyword_source.settings.keyword_rules_reload_interval", 0.01)
+        rules_path = tmp_path / "rules.json"
+        self.write_rules(rules_path, "发票", 1_000_000)
+        source = KeywordRecallSource(rules_path)
+        request = RecallRequest(query="发票", session_id="s", trace_id="t")
+        await source.acquire(request)
+
+        rules_path.write_text("{invalid", encoding="utf-8")
+        os.utime(rules_path, (1_000_100, 1_000_100))
+        time.sleep(0.02)
+
+        assert len(await source.acquire(request)) == 1
@@ -0,0 +1,204 @@
+"""
+召回结果合并策略单元测试
+"""
+
+import pytest
+
+from src.agent.recall import merge as merge_module
+from src.agent.recall.merge import (
+    RecallMerger,
+    RRFMerger,
+    WeightedMerger,
+    get_recall_merger,
+    normalize_scores,
+    original_score,
+    register_recall_merger,
+)
+from src.agent.recall.nodes import fallback_node, merge_node
+from src.agent.recall.schema import RecallHit, RecallRequest
+
+
+def make_hit(source: str, score: float, content: str) -> RecallHit:
+    return RecallHit(
+        source=source,
+        score=score,
+        confidence=min(score, 1.0),
+        reason=f"{source}匹配",
+        content=content,
+        metadata={},
+    )
+
+
+@pytest.fixture(autouse=True)
+def reset_custom_mergers():
+    """隔离自定义合并器注册表"""
+    saved = dict(merge_module._CUSTOM_MERGERS)
+    yield
+    merge_module._CUSTOM_MERGERS.clear()
+    merge_module._CUSTOM_MERGERS.update(saved)
+
+
+class TestNormalizeScores:
+    """测试分数归一化"""
+
+    def test_none_keeps_scores(self):
+        hits = [make_hit("faq", 3.0, "a"), make_hit("faq", 1.0, "b")]
+        assert normalize_scores(hits, "none") == [3.0, 1.0]
+
+    def test_minmax(self):
+        hits = [make_hit("faq", 3.0, "a"), make_hit("faq", 2.0, "b"), make_hit("faq", 1.0, "c")]
+        assert normalize_scores(hits, "minmax") == [1.0, 0.5, 0.0]
+
+    def test_minmax_single_hit_clipped(self):
+        assert normalize_scores([make_hit("faq", 5.0, "a")], "minmax") == [1.0]
+        assert normalize_scores([make_hit("vector", 0.4, "a")], "minmax") == [0.4]
+
+    def test_zscore_preserves_order(self):
+        hits = [make_hit("faq", 10.0, "a"), make_hit("faq", 5.0, "b"), make_hit("faq", 0.0, "c")]
+        scores = normalize_scores(hits, "zscore")
+        assert scores[0] > scores[1] > scores[2]
+        assert scores[1] == pytest.approx(0.5)
+        assert all(0.0 < score < 1.0 for score in scores)
+
+    def test_unknown_method(self):
+        with pytest.raises(ValueError):
+            normalize_scores([make_hit("faq", 1.0, "a")], "unknown")
+
+
+class TestWeightedMerger:
+    """测试加权合并"""
+
+    def test_minmax_aligns_score_scales(self):
+        """FAQ 启发式分数远大于向量相似度时，归一化后按源内排名公平竞争"""
+        hits = [
+            make_hit("vector", 0.9, "向量-最佳"),
+            make_hit("vector", 0.3, "向量-较差"),
+            make_hit("faq", 8.0, "FAQ-最佳"),
+            make_hit("faq", 6.0, "FAQ-较差"),
+        ]
+
+        raw = WeightedMerger("none").merge(hits, {"vector": 1.0, "faq": 1.0})
+        assert [hit.content for hit in raw[:2]] == ["FAQ-最佳", "FAQ-较差"]
+
+        normalized = WeightedMerger("minmax").merge(hits, {"vector": 1.0, "faq": 1.0})
+        assert {hit.content for hit in normalized[:2]} == {"向量-最佳", "FAQ-最佳"}
+
+    def test_keeps_original_score(self):
+        hits = [make_hit("faq", 8.0, "a"), make_hit("faq", 6.0, "b")]
+
+        merged = WeightedMerger("minmax").merge(hits, {"faq": 0.5})
+
+        assert merged[0].score == 0.5
+        assert merged[0].metadata["original_score"] == 8.0
+        assert merged[0].metadata["weight"] == 0.5
+        assert original_score(merged[1]) == 6.0
+
+    def test_deduplicates(self):
+        hits = [make_hit("vector", 0.9, "相同内容"), make_hit("faq", 0.5, "相同内容")]
+
+        merged = WeightedMerger("none").merge(hits, {"vector": 1.0, "faq": 1.0})
+
+        assert len(merged) == 1
+        assert merged[0].source == "vector"
+
+
+class TestRRFMerger:
+    """测试 Reciprocal Rank Fusion"""
+
+    def test_rank_based_scores(self):
+        hits = [make_hit("vector", 0.9, "a"), make_hit("vector", 0.1, "b")]
+
+        merged = RRFMerger(k=60).merge(hits, {"vector": 1.0})
+
+        assert merged[0].score == pytest.approx(1 / 61)
+        assert merged[1].score == pytest.approx(1 / 62)
+
+    def test_accumulates_across_sources(self):
+        """多个召回源都命中的内容排在单源命中之前"""
+        hits = [
+            make_hit("vector", 0.9, "只有向量"),
+            make_hit("vector", 0.8, "共同命中"),
+            make_hit("faq", 12.0, "共同命中"),
+        ]
+
+        merged = RRFMerger(k=60).merge(hits, {"vector": 1.0, "faq": 1.0})
+
+        assert merged[0].content == "共同命中"
+        assert merged[0].score == pytest.approx(1 / 62 + 1 / 61)
+        assert sorted(merged[0].metadata["rrf_sources"]) == ["faq", "vector"]
+        # 代表结果保留原始分数最高的命中
+        assert merged[0].metadata["original_score"] == 12.0
+        assert len(merged) == 2
+
+    def test_weights(self):
+        hits = [make_hit("vector", 0.9, "a"), make_hit("faq", 0.9, "b")]
+
+        merged = RRFMerger(k=60).merge(hits, {"vector": 1.0, "faq": 0.5})
+
+        assert merged[0].source == "vector"
+        assert merged[1].score == pytest.approx(0.5 / 61)
+
+
+class TestGetRecallMerger:
+    """测试合并器选择与注册"""
+
+    def test_builtin_strategies(self):
+        assert isinstance(get_recall_merger("weighted"), WeightedMerger)
+        rrf = get_recall_merger("rrf", rrf_k=10)
+        assert isinstance(rrf, RRFMerger)
+        assert rrf.k == 10
+
+    def test_custom_merger(self):
+        class ReverseMerger(RecallMerger):
+            def merge(self, hits, weights):
+                return sorted(hits, key=lambda x: x.score)
+
+        merger = ReverseMerger()
+        register_recall_merger("custom", merger)
+
+        assert get_recall_merger("custom") is merger
+
+    def test_unknown_strategy_falls_back(self):
+        merger = get_recall_merger("custom", normalization="zscore")
+
+        assert isinstance(merger, WeightedMerger)
+        assert merger.normalization == "zscore"
+
+
+class TestMergeNodeStrategies:
+    """测试 merge_node / fallback_node 与合并策略的配合"""
+
+    @pytest.fixture
+    def request_obj(self):
+        return RecallRequest(query="测试", session_id="session-123", trace_id="trace-456", top_k=2)
+
+    @pytest.mark.asyncio
+    async def test_merge_node_rrf(self, request_obj):
+        state = {
+            "hits": [
+                make_hit("vector", 0.9, "a"),
+                make_hit("vector", 0.8, "b"),
+                make_hit("faq", 9.0, "b"),
+                make_hit("faq", 1.0, "c"),
+            ],
+            "config": {"weights": {"vector": 1.0, "faq": 1.0}, "merge_strategy": "rrf", "rrf_k": 60},
+            "request": request_obj,
+        }
+
+        result = await merge_node(state)
+
+        assert [hit.content for hit in result["hits"]] == ["b", "a"]
+
+    @pytest.mark.asyncio
+    async def test_fallback_uses_original_score(self, request_obj):
+        """RRF 融合分数很小，降级判断应使用原始分数"""
+        merged = RRFMerger().merge([make_hit("vector", 0.9, "a")], {"vector": 1.0})
+        state = {
+            "hits": merged,
+            "config": {"degrade_threshold": 0.5, "fallback_enabled": True},
+            "request": request_obj,
+        }
+
+        result = await fallback_node(state)
+
+        assert result == {}
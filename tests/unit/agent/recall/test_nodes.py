@@ -48,6 +48,13 @@ class TestPrepareNode:
         mock.recall_timeout_ms = 500
         mock.recall_retry = 1
         mock.recall_merge_strategy = "weighted"
+        mock.recall_score_normalization = "minmax"
+        mock.recall_rrf_k = 60
+        mock.recall_source_timeouts_ms = ""
+        mock.recall_hedge_sources = []
+        mock.recall_hedge_delay_ms = 300
+        mock.recall_early_exit_min_hits = 0
+        mock.recall_early_exit_confidence = 0.8
         mock.recall_degrade_threshold = 0.5
         mock.recall_fallback_enabled = True
         mock.recall_experiment_enabled = False
@@ -99,8 +106,12 @@ class TestFanoutNode:
     @pytest.fixture
     def mock_sources(self, mocker):
         """Mock召回源"""
-        mock_vector = mocker.patch('src.agent.recall.nodes.VectorRecallSource')
-        mock_faq = mocker.patch('src.agent.recall.nodes.FAQRecallSource')
+        mock_vector = mocker.MagicMock()
+        mock_faq = mocker.MagicMock()
+        mocker.patch.dict(
+            'src.agent.recall.sources.registry._SOURCE_FACTORIES',
+            {"vector": mock_vector, "faq": mock_faq},
+        )
 
         # Mock向量召回源
         mock_vector_instance = mocker.MagicMock()
@@ -0,0 +1,113 @@
+"""
+测试召回源注册表
+"""
+
+import pytest
+
+from src.agent.recall.nodes import fanout_node
+from src.agent.recall.schema import RecallHit, RecallRequest
+from src.agent.recall.sources.base import RecallSource
+from src.agent.recall.sources.registry import (
+    RecallSourceRegistry,
+    get_recall_source_registry,
+    list_recall_sources,
+    register_recall_source,
+)
+
+
+class StaticRecallSource(RecallSource):
+    """返回固定结果的自定义召回源"""
+
+    instances = 0
+
+    def __init__(self):
+        StaticRecallSource.instances += 1
+        self.warmed_up = False
+
+    @property
+    def source_name(self) -> str:
+        return "static"
+
+    async def warmup(self) -> None:
+        self.warmed_up = True
+
+    async def acquire(self, request: RecallRequest) -> list[RecallHit]:
+        return [
+            RecallHit(
+                source="static",
+                score=0.9,
+                confidence=0.9,
+                reason="固定结果",
+                content=f"static:{request.query}",
+                metadata={},
+            )
+        ]
+
+
+@pytest.fixture
+def static_source(mocker):
+    """注册自定义召回源（测试结束后恢复注册表）"""
+    mocker.patch.dict("src.agent.recall.sources.registry._SOURCE_FACTORIES")
+    StaticRecallSource.instances = 0
+    register_recall_source("static", StaticRecallSource)
+    return StaticRecallSource
+
+
+def test_builtin_sources_registered():
+    """内置召回源已注册"""
+    assert {"vector", "faq", "keyword"} <= set(list_recall_sources())
+
+
+def test_registry_reuses_instances():
+    """同一召回源只构建一次"""
+    registry = RecallSourceRegistry()
+
+    assert registry.get("faq") is registry.get("faq")
+    assert registry.get("unknown") is None
+    assert set(registry.get_many(["faq", "keyword", "unknown"])) == {"faq", "keyword"}
+
+
+@pytest.mark.asyncio
+async def test_warmup_builds_and_warms_sources(static_source):
+    """warmup 预建实例并调用召回源的预热方法"""
+    registry = RecallSourceRegistry()
+
+    await registry.warmup(["static"])
+
+    instance = registry.get("static")
+    assert instance.warmed_up is True
+    assert static_source.instances == 1
+
+
+@pytest.mark.asyncio
+async def test_warmup_failure_does_not_raise(mocker):
+    """预热失败只记录日志"""
+    registry = RecallSourceRegistry()
+    source = registry.get("vector")
+    mocker.patch.object(source, "warmup", side_effect=Exception("embedding down"))
+
+    await registry.warmup(["vector"])
+
+
+@pytest.mark.asyncio
+async def test_fanout_uses_registered_custom_source(static_source):
+    """fanout_node 通过注册表调用自定义召回源，并在请求间复用实例"""
+    request = RecallRequest(query="退货", session_id="s", trace_id="t")
+    state = {"request": request, "config": {"sources": ["static"], "timeout_ms": 500, "retry": 0}}
+
+    first = await fanout_node(state)
+    second = await fanout_node(state)
+
+    assert [hit.content for hit in first["hits"]] == ["static:退货"]
+    assert len(second["hits"]) == 1
+    assert static_source.instances == 1
+
+
+def test_register_replaces_existing_instance(static_source):
+    """重新注册同名召回源时丢弃旧实例"""
+    registry = get_recall_source_registry()
+    old = registry.get("static")
+
+    register_recall_source("static", StaticRecallSource)
+
+    assert registry.get("static") is not old
@@ -6,16 +6,55 @@ import pytest
 
 from src.agent.recall.schema import RecallHit, RecallRequest
 from src.agent.recall.sources.faq_source import FAQRecallSource
+from src.agent.recall.sources.keyword_matcher import KeywordRuleSet
 from src.agent.recall.sources.keyword_source import KeywordRecallSource
+from src.models.entities.faq import FAQ
+from src.services.faq_index import get_faq_index
 
 
 class TestFAQRecallSource:
     """测试FAQ召回源"""
 
     @pytest.fixture
-    def faq_source(self):
+    def faq_index(self):
+        """预先构建的FAQ倒排索引"""
+        index = get_faq_index()
+        index.add_many([
+            {
+                "id": "faq_001",
+                "text": "你们的退货政策是什么？\n答：我们提供30天无理由退货服务，商品需保持原包装和标签完整。",
+                "metadata": {"question": "你们的退货政策是什么？", "answer": "我们提供30天无理由退货服务，商品需保持原包装和标签完整。"},
+            },
+            {
+                "id": "faq_002",
+                "text": "如何联系客服？\n答：您可以通过在线客服、电话或邮件联系我们。",
+                "metadata": {"question": "如何联系客服？", "answer": "您可以通过在线客服、电话或邮件联系我们。"},
+            },
+            {
+                "id": "faq_003",
+                "text": "退款多久到账？\n答：退货审核通过后3-5个工作日原路退款。",
+                "metadata": {"question": "退款多久到账？", "answer": "退货审核通过后3-5个工作日原路退款。"},
+            },
+        ])
+        index.ready = True
+        return index
+
+    @pytest.fixture
+    def faq_repo(self, mocker):
+        """Mock FAQ Repository（默认向量检索无结果）"""
+        repo = mocker.MagicMock()
+        repo.search = mocker.AsyncMock(return_value=[])
+        mocker.patch("src.repositories.get_faq_repository", return_value=repo)
+        return repo
+
+    @pytest.fixture
+    def faq_source(self, mocker, faq_index, faq_repo):
         """创建FAQ召回源实例"""
-        return FAQRecallSource()
+        source = FAQRecallSource()
+        embeddings = mocker.MagicMock()
+        embeddings.aembed_query = mocker.AsyncMock(return_value=[0.1] * 8)
+        mocker.patch.object(source, "_get_embeddings", return_value=embeddings)
+        return source
 
     @pytest.fixture
     def recall_request(self):
@@ -71,6 +110,59 @@ class TestFAQRecallSource:
 
         assert len(hits) <= 2
 
+    @pytest.mark.asyncio
+    async def test_exact_question_skips_vector_search(self, faq_source, faq_repo, recall_request):
+        """问题完全一致时直接返回，不请求 Embedding / Milvus"""
+        recall_request.query = "如何联系客服"
+
+        hits = await faq_source.acquire(recall_request)
+
+        assert hits[0].metadata["faq_id"] == "faq_002"
+        assert hits[0].metadata["match_type"] == "exact"
+        assert hits[0].score == 1.0
+        faq_repo.search.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_merges_vector_and_lexical_scores(self, mocker, faq_source, faq_repo, recall_request):
+        """向量检索结果与词法分数按FAQ合并"""
+        faq_repo.search = mocker.AsyncMock(return_value=[
+            FAQ(
+                id="faq_003",
+                text="退款多久到账？\n答：退货审核通过后3-5个工作日原路退款。",
+                score=0.9,
+                metadata={"question": "退款多久到账？", "answer": "退货审核通过后3-5个工作日原路退款。"},
+            ),
+            FAQ(id="faq_009", text="仅向量命中的FAQ", score=0.8, metadata={}),
+        ])
+        recall_request.query = "退款要多久"
+
+        hits = await faq_source.acquire(recall_request)
+
+        by_id = {hit.metadata["faq_id"]: hit for hit in hits}
+        assert by_id["faq_003"].metadata["match_type"] == "hybrid"
+        assert by_id["faq_003"].metadata["vector_score"] == 0.9
+        assert by_id["faq_003"].metadata["lexical_score"] > 0
+        assert by_id["faq_009"].metadata["match_type"] == "vector"
+        assert by_id["faq_009"].content == "仅向量命中的FAQ"
+        assert hits[0].metadata["faq_id"] == "faq_003"
+
+    @pytest.mark.asyncio
+    async def test_builds_index_on_warmup(self, mocker):
+        """未构建索引时从 FAQ collection 构建"""
+        get_faq_index().clear()
+
+        async def iter_faqs(batch_size=1000):
+            yield [{"id": "faq_100", "text": "发票怎么开？", "metadata": {}}]
+
+        repo = mocker.MagicMock()
+        repo.iter_faqs = iter_faqs
+        mocker.patch("src.repositories.get_faq_repository", return_value=repo)
+
+        await FAQRecallSource().warmup()
+
+        assert get_faq_index().ready
+        assert get_faq_index().search("发票怎么开")[0].exact
+
 
 class TestKeywordRecallSource:
     """测试关键词召回源"""
@@ -115,38 +207,34 @@ class TestKeywordRecallSource:
         # 应该返回空结果或低分结果
         assert isinstance(hits, list)
 
-    def test_calculate_keyword_score(self, keyword_source):
+    def test_calculate_keyword_score(self):
         """测试关键词分数计算"""
         # 测试直接匹配
-        rule = {
-            "keywords": ["价格", "费用"],
-            "patterns": [r"价格|费用"],
-            "priority": 0.9
-        }
+        rule_set = KeywordRuleSet([
+            {"id": "r1", "keywords": ["价格", "费用"], "content": "价格说明", "priority": 0.9}
+        ])
 
-        score = keyword_source._calculate_keyword_score("价格是多少", rule)
-        assert score > 0
+        scores = rule_set.score("价格是多少")
+        assert scores and scores[0][1] > 0
 
         # 测试不匹配
-        score = keyword_source._calculate_keyword_score("完全不相关", rule)
-        assert score == 0
+        assert rule_set.score("完全不相关") == []
 
-    def test_synonym_matching(self, keyword_source):
+    def test_synonym_matching(self):
         """测试同义词匹配"""
-        # 测试同义词匹配
-        rule = {
-            "keywords": ["价格"],
-            "patterns": [r"价格"],
-            "priority": 0.9
-        }
+        rule_set = KeywordRuleSet(
+            [{"id": "r1", "keywords": ["价格"], "content": "价格说明", "priority": 0.9}],
+            synonyms={"价格": ["费用"]},
+        )
 
         # 直接匹配
-        score1 = keyword_source._calculate_keyword_score("价格", rule)
+        score1 = rule_set.score("价格")[0][1]
         # 同义词匹配
-        score2 = keyword_source._calculate_keyword_score("费用", rule)
+        score2 = rule_set.score("费用")[0][1]
 
         assert score1 > 0
         assert score2 > 0
+        assert score1 > score2
 
 
 class TestVectorRecallSource:
@@ -175,7 +263,7 @@ class TestVectorRecallSource:
     async def test_acquire_success(self, mocker, vector_source, recall_request):
         """测试成功召回"""
         # Mock embeddings
-        mock_embeddings = mocker.patch('src.agent.recall.sources.vector_source.create_embeddings')
+        mock_embeddings = mocker.patch('src.agent.recall.sources.vector_source.get_shared_embeddings')
         mock_embeddings.return_value.aembed_query = mocker.AsyncMock(return_value=[0.1, 0.2, 0.3])
 
         # Mock milvus service
@@ -198,7 +286,7 @@ class TestVectorRecallSource:
     async def test_acquire_empty_results(self, mocker, vector_source, recall_request):
         """测试空结果"""
         # Mock embeddings
-        mock_embeddings = mocker.patch('src.agent.recall.sources.vector_source.create_embeddings')
+        mock_embeddings = mocker.patch('src.agent.recall.sources.vector_source.get_shared_embeddings')
         mock_embeddings.return_value.aembed_query = mocker.AsyncMock(return_value=[0.1, 0.2, 0.3])
 
         # Mock milvus service返回空结果
@@ -213,7 +301,7 @@ class TestVectorRecallSource:
     async def test_acquire_exception_handling(self, mocker, vector_source, recall_request):
         """测试异常处理"""
         # Mock embeddings抛出异常
-        mock_embeddings = mocker.patch('src.agent.recall.sources.vector_source.create_embeddings')
+        mock_embeddings = mocker.patch('src.agent.recall.sources.vector_source.get_shared_embeddings')
         mock_embeddings.return_value.aembed_query = mocker.AsyncMock(side_effect=Exception("Embedding error"))
 
         hits = await vector_source.acquire(recall_request)
@@ -225,7 +313,7 @@ class TestVectorRecallSource:
     async def test_acquire_query_truncation(self, mocker, vector_source, recall_request):
         """测试查询截断功能"""
         # Mock embeddings
-        mock_embeddings = mocker.patch('src.agent.recall.sources.vector_source.create_embeddings')
+        mock_embeddings = mocker.patch('src.agent.recall.sources.vector_source.get_shared_embeddings')
         mock_embeddings.return_value.aembed_query = mocker.AsyncMock(return_value=[0.1, 0.2, 0.3])
 
         # Mock milvus service
@@ -0,0 +1,174 @@
+"""
+对话上下文窗口与滚动摘要单元测试
+"""
+
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+from src.agent.main import context as context_module
+from src.agent.main.context import (
+    context_node,
+    count_message_tokens,
+    fallback_summary,
+    select_window,
+    split_turns,
+)
+from src.agent.main.graph import create_agent_graph
+from src.core.utils import count_tokens
+
+
+def build_history(turns: int) -> list:
+    messages = []
+    for i in range(turns):
+        messages.append(HumanMessage(content=f"第{i}个问题，随便聊聊", id=f"h{i}"))
+        messages.append(AIMessage(content=f"第{i}个回答，好的", id=f"a{i}"))
+    return messages
+
+
+@pytest.fixture
+def context_settings(mocker):
+    settings = mocker.patch.object(context_module, "settings")
+    settings.context_window_enabled = True
+    settings.context_max_turns = 4
+    settings.context_max_tokens = 10_000
+    settings.context_summary_enabled = True
+    settings.context_summary_max_tokens = 200
+    return settings
+
+
+@pytest.fixture
+def summary_llm(mocker):
+    llm = MagicMock()
+    llm.ainvoke = AsyncMock(return_value=AIMessage(content="用户在闲聊"))
+    mocker.patch.object(context_module, "get_llm", return_value=llm)
+    return llm
+
+
+class TestWindowing:
+    """测试轮次切分与窗口选择"""
+
+    def test_split_turns(self):
+        turns = split_turns([AIMessage(content="欢迎"), *build_history(2), HumanMessage(content="新问题")])
+
+        assert [len(turn) for turn in turns] == [1, 2, 2, 1]
+
+    def test_select_window_by_turns(self):
+        assert select_window([10] * 6, max_turns=3, max_tokens=1000) == 3
+
+    def test_select_window_by_tokens(self):
+        assert select_window([10, 10, 50, 20], max_turns=10, max_tokens=75) == 2
+
+    def test_select_window_keeps_latest_turn(self):
+        assert select_window([10, 500], max_turns=10, max_tokens=100) == 1
+        assert select_window([], max_turns=10, max_tokens=100) == 0
+
+    def test_count_message_tokens(self):
+        messages = build_history(1)
+
+        assert count_message_tokens(messages) == sum(count_tokens(m.content) + 4 for m in messages)
+
+
+class TestContextNode:
+    """测试折叠与摘要"""
+
+    @pytest.mark.asyncio
+    async def test_within_window(self, context_settings, summary_llm):
+        assert await context_node({"messages": build_history(4)}) == {}
+        summary_llm.ainvoke.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_folds_oldest_turns(self, context_settings, summary_llm):
+        messages = build_history(5) + [HumanMessage(content="最新问题", id="latest")]
+
+        result = await context_node({"messages": messages, "conversation_summary": "之前的摘要"})
+
+        # 6 轮超出窗口（4 轮），折叠到一半窗口（保留 2 轮）
+        removed = [message.id for message in result["messages"]]
+        assert all(isinstance(message, RemoveMessage) for message in result["messages"])
+        assert removed == ["h0", "a0", "h1", "a1", "h2", "a2", "h3", "a3"]
+        assert result["conversation_summary"] == "用户在闲聊"
+
+        prompt = summary_llm.ainvoke.call_args.args[0][0].content
+        assert "之前的摘要" in prompt
+        assert "第3个问题" in prompt
+        assert "第4个问题" not in prompt
+
+    @pytest.mark.asyncio
+    async def test_token_budget(self, context_settings, summary_llm):
+        context_settings.context_max_turns = 100
+        context_settings.context_max_tokens = count_message_tokens(build_history(3))
+
+        result = await context_node({"messages": build_history(6)})
+
+        assert len(result["messages"]) > 0
+
+    @pytest.mark.asyncio
+    async def test_llm_failure_uses_bounded_fallback(self, context_settings, summary_llm):
+        summary_llm.ainvoke.side_effect = RuntimeError("llm down")
+        context_settings.context_summary_max_tokens = 50
+
+        result = await context_node({"messages": build_history(20)})
+
+        assert "第" in result["conversation_summary"]
+        assert count_tokens(result["conversation_summary"]) <= 50
+
+    @pytest.mark.asyncio
+    async def test_summary_disabled(self, context_settings, summary_llm):
+        context_settings.context_summary_enabled = False
+
+        result = await context_node({"messages": build_history(6)})
+
+        summary_llm.ainvoke.assert_not_called()
+        assert "用户: 第0个问题" in result["conversation_summary"]
+
+    @pytest.mark.asyncio
+    async def test_disabled(self, context_settings):
+        context_settings.context_window_enabled = False
+
+        assert await context_node({"messages": build_history(50)}) == {}
+
+    def test_fallback_summary_keeps_newest(self):
+        summary = fallback_summary("旧摘要" * 100, build_history(1), max_tokens=30)
+
+        assert summary.endswith("助手: 第0个回答，好的")
+
+
+class TestLongSession:
+    """长会话中 prompt 与 checkpoint 保持有界"""
+
+    @pytest.mark.asyncio
+    async def test_bounded_over_many_turns(self, context_settings, summary_llm, mocker):
+        prompt_tokens = []
+        last_prompt = []
+
+        async def answer(messages, config=None):
+            prompt_tokens.append(count_message_tokens(messages))
+            last_prompt[:] = messages
+            return AIMessage(content="好的，" + "明白" * 20)
+
+        llm = MagicMock()
+        llm.ainvoke = answer
+        mocker.patch("src.agent.main.nodes.get_llm", return_value=llm)
+
+        app = create_agent_graph().compile(checkpointer=MemorySaver())
+        config = {"configurable": {"thread_id": "long-session"}}
+
+        for i in range(30):
+            await app.ainvoke(
+                {"messages": [HumanMessage(content=f"随便聊聊第{i}次")], "session_id": "long-session"},
+                config,
+            )
+
+        state = (await app.aget_state(config)).values
+        assert len(split_turns(state["messages"])) <= context_settings.context_max_turns
+        assert state["conversation_summary"] == "用户在闲聊"
+
+        # 窗口填满后 prompt 不再增长
+        assert max(prompt_tokens[10:]) <= max(prompt_tokens[:10]) + count_tokens("用户在闲聊") + 20
+
+        # 摘要随系统提示词发送给 LLM
+        await app.ainvoke({"messages": [HumanMessage(content="再聊一次")], "session_id": "long-session"}, config)
+        assert "此前对话摘要" in last_prompt[0].content
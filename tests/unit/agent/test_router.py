@@ -0,0 +1,142 @@
+"""
+查询路由器单元测试
+"""
+
+import pytest
+
+from src.agent.main import router as router_module
+from src.agent.main.router import (
+    DEFAULT_INTENTS_PATH,
+    IntentRouter,
+    LexicalRouter,
+    QueryRouter,
+    RouteDecision,
+    get_query_router,
+    load_intent_router,
+    register_query_router,
+)
+
+# (查询, 期望路由)
+LABELED_QUERIES = [
+    ("你好", "direct"),
+    ("您好，在吗", "direct"),
+    ("谢谢你的帮助", "direct"),
+    ("你在干什么呀", "direct"),
+    ("你叫什么名字", "direct"),
+    ("好的谢谢", "direct"),
+    ("哈哈哈哈", "direct"),
+    ("hello there", "direct"),
+    ("你是机器人吗", "direct"),
+    ("早上好呀", "direct"),
+    ("退货政策是什么？", "retrieve"),
+    ("你们的产品有哪些功能？", "retrieve"),
+    ("我的订单什么时候发货", "retrieve"),
+    ("保修多久", "retrieve"),
+    ("可以开发票吗", "retrieve"),
+    ("怎么联系人工客服", "retrieve"),
+    ("how much does the pro plan cost", "retrieve"),
+    ("what is your refund policy", "retrieve"),
+    ("你好，退货怎么操作", "retrieve"),
+    ("多少钱一个月", "retrieve"),
+]
+
+
+@pytest.fixture
+def intent_router():
+    return load_intent_router(DEFAULT_INTENTS_PATH, threshold=0.15)
+
+
+def accuracy(router: QueryRouter) -> float:
+    correct = sum(router.route(query).next_step == expected for query, expected in LABELED_QUERIES)
+    return correct / len(LABELED_QUERIES)
+
+
+class TestLexicalRouter:
+    """测试关键词路由"""
+
+    @pytest.mark.parametrize("query,reason", [
+        ("你好", "greeting"),
+        ("Hello", "greeting"),
+        ("好的，谢谢", "chitchat"),
+        ("今天天气不错", "no_keywords"),
+    ])
+    def test_direct(self, query, reason):
+        decision = LexicalRouter().route(query)
+
+        assert decision == RouteDecision(next_step="direct", reason=reason)
+
+    def test_knowledge_keywords_win_over_greeting(self):
+        """短消息同时包含问候和知识关键词时仍然检索"""
+        assert LexicalRouter().route("你好，产品价格").next_step == "retrieve"
+
+    def test_long_greeting_is_not_small_talk(self):
+        decision = LexicalRouter().route("你好" + "啊" * 30)
+
+        assert decision.reason == "no_keywords"
+
+
+class TestIntentRouter:
+    """测试意图分类路由"""
+
+    def test_loaded(self, intent_router):
+        assert isinstance(intent_router, IntentRouter)
+        assert set(intent_router.classifier.intents) == {"greeting", "chitchat", "knowledge"}
+
+    def test_chitchat_with_knowledge_keyword_skips_recall(self, intent_router):
+        """"什么"是知识关键词，但闲聊不应触发检索"""
+        assert LexicalRouter().route("你叫什么名字").next_step == "retrieve"
+
+        decision = intent_router.route("你叫什么名字")
+
+        assert decision.next_step == "direct"
+        assert decision.intent == "chitchat"
+        assert decision.to_tool_call()["reason"] == "intent"
+
+    def test_low_confidence_falls_back_to_lexical(self, intent_router):
+        assert intent_router.route("今天天气不错").reason == "no_keywords"
+
+    def test_more_accurate_than_lexical(self, intent_router):
+        lexical_accuracy = accuracy(LexicalRouter())
+        intent_accuracy = accuracy(intent_router)
+
+        print(f"\n关键词路由准确率: {lexical_accuracy:.2f}  意图路由准确率: {intent_accuracy:.2f}")
+
+        assert intent_accuracy > lexical_accuracy
+        assert intent_accuracy >= 0.9
+
+    def test_invalid_intents_file_falls_back_to_lexical(self, tmp_path):
+        path = tmp_path / "intents.json"
+        path.write_text("{invalid", encoding="utf-8")
+
+        assert isinstance(load_intent_router(path, threshold=0.15), LexicalRouter)
+
+
+class TestGetQueryRouter:
+    """测试按配置选择路由器"""
+
+    @pytest.fixture(autouse=True)
+    def reset_router(self, mocker):
+        mocker.patch.object(router_module, "_query_router", None)
+        mocker.patch.dict(router_module._CUSTOM_ROUTERS, clear=True)
+
+    def test_strategy_switch(self, mocker):
+        mocker.patch.object(router_module.settings, "router_strategy", "lexical")
+        assert isinstance(get_query_router(), LexicalRouter)
+
+        mocker.patch.object(router_module.settings, "router_strategy", "intent")
+        assert isinstance(get_query_router(), IntentRouter)
+
+    def test_custom_router(self, mocker):
+        class AlwaysRetrieve(QueryRouter):
+            def route(self, query):
+                return RouteDecision(next_step="retrieve", reason="custom")
+
+        mocker.patch.object(router_module.settings, "router_strategy", "always")
+        register_query_router("always", AlwaysRetrieve())
+
+        assert get_query_router().route("你好").reason == "custom"
+
+    def test_unknown_strategy_falls_back(self, mocker):
+        mocker.patch.object(router_module.settings, "router_strategy", "missing")
+
+        assert isinstance(get_query_router(), LexicalRouter)
@@ -0,0 +1,160 @@
+"""
+语义答案缓存接入测试
+
+验证 /v1/chat/completions 在命中答案缓存时跳过 Agent，
+未命中时执行 Agent 并写入缓存。
+"""
+
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from src.agent.main.graph import compile_agent_graph
+from src.agent.recall.schema import RecallHit, RecallResult
+from src.api.v1.openai_compat import _non_stream_response, _stream_response
+from src.core.config import settings
+from src.services.answer_cache import CachedAnswer, SemanticAnswerCache
+
+
+def _make_writer() -> MagicMock:
+    """构造对话历史写入器替身"""
+    writer = MagicMock()
+    writer.submit = AsyncMock()
+    return writer
+
+
+def _request_kwargs(session_id: str) -> dict:
+    return {
+        "user_message": "退货政策是什么",
+        "session_id": session_id,
+        "completion_id": "chatcmpl-test",
+        "created_timestamp": 0,
+        "model": "test-model",
+        "requested_model": "test-model",
+    }
+
+
+def _warm_cache() -> SemanticAnswerCache:
+    cache = SemanticAnswerCache(similarity_threshold=0.95)
+    cache.add_vector(
+        [1.0, 0.0],
+        CachedAnswer(
+            question="退货政策",
+            answer="我们支持30天无理由退货，请保留购买凭证。",
+            retrieved_docs=["退货政策文档"],
+            confidence_score=0.9,
+            created_at=__import__("time").time(),
+        ),
+    )
+    return cache
+
+
+@pytest.mark.asyncio
+async def test_non_stream_cache_hit_skips_agent():
+    """命中缓存时直接返回缓存答案，不调用 LLM"""
+    cache = _warm_cache()
+    app = compile_agent_graph()
+    get_llm = MagicMock()
+    writer = _make_writer()
+
+    with patch.object(settings, "answer_cache_enabled", True), \
+         patch.object(cache, "_embed", AsyncMock(return_value=[0.99, 0.05])), \
+         patch("src.api.v1.openai_compat.get_answer_cache", return_value=cache), \
+         patch("src.api.v1.openai_compat.get_agent_app", return_value=app), \
+         patch("src.agent.main.nodes.get_llm", get_llm), \
+         patch("src.api.v1.openai_compat.get_conversation_writer", return_value=writer):
+        response = await _non_stream_response(**_request_kwargs("cache-hit"))
+
+    assert response.choices[0].message.content == "我们支持30天无理由退货，请保留购买凭证。"
+    get_llm.assert_not_called()
+    writer.submit.assert_awaited_once()
+
+    # 缓存命中的问答写入会话状态，后续追问仍有上下文
+    snapshot = await app.aget_state({"configurable": {"thread_id": "cache-hit"}})
+    assert len(snapshot.values["messages"]) == 2
+
+
+@pytest.mark.asyncio
+async def test_stream_cache_hit_replays_answer():
+    """流式请求命中缓存时按 chunk 回放缓存答案"""
+    cache = _warm_cache()
+
+    with patch.object(settings, "answer_cache_enabled", True), \
+         patch.object(cache, "_embed", AsyncMock(return_value=[1.0, 0.0])), \
+         patch("src.api.v1.openai_compat.get_answer_cache", return_value=cache), \
+         patch("src.api.v1.openai_compat.get_agent_app", return_value=compile_agent_graph()), \
+         patch("src.api.v1.openai_compat.get_conversation_writer", return_value=_make_writer()):
+        lines = [line async for line in _stream_response(**_request_kwargs("cache-stream"))]
+
+    choices = [
+        json.loads(line.removeprefix("data: "))["choices"][0]
+        for line in lines
+        if line.strip() != "data: [DONE]"
+    ]
+    deltas = [c["delta"]["content"] for c in choices if c["delta"].get("content")]
+    assert "".join(deltas) == "我们支持30天无理由退货，请保留购买凭证。"
+    assert len(deltas) > 1
+    assert choices[-1]["finish_reason"] == "stop"
+    assert lines[-1] == "data: [DONE]\n\n"
+
+
+@pytest.mark.asyncio
+async def test_cache_miss_runs_agent_and_stores_answer():
+    """未命中时执行 Agent，基于检索结果的答案写入缓存"""
+    cache = SemanticAnswerCache(similarity_threshold=0.95)
+    fake_llm = GenericFakeChatModel(messages=iter([AIMessage(content="30天无理由退货")]))
+    recall_result = RecallResult(
+        hits=[
+            RecallHit(
+                source="vector",
+                score=0.9,
+                confidence=0.9,
+                reason="test",
+                content="退货政策：30天无理由退货",
+                metadata={"title": "退货"},
+            )
+        ],
+        latency_ms=1.0,
+        degraded=False,
+        trace_id="trace-test",
+    )
+
+    with patch.object(settings, "answer_cache_enabled", True), \
+         patch.object(cache, "_embed", AsyncMock(return_value=[1.0, 0.0])), \
+         patch("src.api.v1.openai_compat.get_answer_cache", return_value=cache), \
+         patch("src.api.v1.openai_compat.get_agent_app", return_value=compile_agent_graph()), \
+         patch("src.agent.main.nodes.get_llm", return_value=fake_llm), \
+         patch("src.agent.recall.graph.invoke_recall_agent", AsyncMock(return_value=recall_result)), \
+         patch("src.api.v1.openai_compat.get_conversation_writer", return_value=_make_writer()):
+        response = await _non_stream_response(**_request_kwargs("cache-miss"))
+
+    assert response.choices[0].message.content == "30天无理由退货"
+    assert len(cache) == 1
+    assert cache.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_skipped_for_follow_up_turns():
+    """会话已有历史时不查询缓存"""
+    cache = _warm_cache()
+    app = compile_agent_graph()
+    fake_llm = GenericFakeChatModel(messages=iter([
+        AIMessage(content="第一轮回答"),
+        AIMessage(content="第二轮回答"),
+    ]))
+
+    with patch.object(settings, "answer_cache_enabled", True), \
+         patch.object(cache, "_embed", AsyncMock(return_value=[0.0, 1.0])), \
+         patch("src.api.v1.openai_compat.get_answer_cache", return_value=cache), \
+         patch("src.api.v1.openai_compat.get_agent_app", return_value=app), \
+         patch("src.agent.main.nodes.get_llm", return_value=fake_llm), \
+         patch("src.api.v1.openai_compat.get_conversation_writer", return_value=_make_writer()):
+        await _non_stream_response(**_request_kwargs("follow-up"))
+        cache._embed.return_value = [1.0, 0.0]
+        response = await _non_stream_response(**_request_kwargs("follow-up"))
+
+    assert response.choices[0].message.content == "第二轮回答"
+    assert cache.stats()["hits"] == 0
@@ -0,0 +1,85 @@
+"""
+逐 token 流式响应测试
+
+验证 /v1/chat/completions 流式路径按增量 delta 发送 chunk，
+同时收集完整回复用于持久化。
+"""
+
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from src.agent.main.graph import compile_agent_graph
+from src.api.v1.openai_compat import _stream_response
+from src.core.config import settings
+
+
+def _make_writer() -> MagicMock:
+    """构造对话历史写入器替身"""
+    writer = MagicMock()
+    writer.submit = AsyncMock()
+    return writer
+
+
+async def _collect_deltas(**kwargs) -> list[dict]:
+    """运行流式生成器（包括 [DONE] 之后的持久化）并解析出所有 choices[0]"""
+    choices = []
+    async for line in _stream_response(**kwargs):
+        payload = line.removeprefix("data: ").strip()
+        if payload != "[DONE]":
+            choices.append(json.loads(payload)["choices"][0])
+    return choices
+
+
+@pytest.mark.asyncio
+async def test_stream_response_emits_token_deltas():
+    """启用流式时每个 token 单独发送，并保存完整回复"""
+    fake_llm = GenericFakeChatModel(messages=iter([AIMessage(content="您好 欢迎 光临")]))
+    writer = _make_writer()
+
+    with patch.object(settings, "llm_streaming_enabled", True), \
+         patch("src.agent.main.nodes.get_llm", return_value=fake_llm), \
+         patch("src.api.v1.openai_compat.get_agent_app", return_value=compile_agent_graph()), \
+         patch("src.api.v1.openai_compat.get_conversation_writer", return_value=writer):
+        choices = await _collect_deltas(
+            user_message="hello",
+            session_id="stream-test",
+            completion_id="chatcmpl-test",
+            created_timestamp=0,
+            model="test-model",
+            requested_model="test-model",
+        )
+
+    deltas = [c["delta"]["content"] for c in choices if c["delta"].get("content")]
+    assert len(deltas) > 1
+    assert "".join(deltas) == "您好 欢迎 光临"
+    assert choices[-1]["finish_reason"] == "stop"
+
+    writer.submit.assert_awaited_once()
+    assert writer.submit.call_args.kwargs["ai_response"] == "您好 欢迎 光临"
+
+
+@pytest.mark.asyncio
+async def test_stream_response_disabled_sends_full_message():
+    """关闭流式时在 LLM 节点完成后一次性发送完整内容"""
+    fake_llm = GenericFakeChatModel(messages=iter([AIMessage(content="您好 欢迎 光临")]))
+    writer = _make_writer()
+
+    with patch.object(settings, "llm_streaming_enabled", False), \
+         patch("src.agent.main.nodes.get_llm", return_value=fake_llm), \
+         patch("src.api.v1.openai_compat.get_agent_app", return_value=compile_agent_graph()), \
+         patch("src.api.v1.openai_compat.get_conversation_writer", return_value=writer):
+        choices = await _collect_deltas(
+            user_message="hello",
+            session_id="stream-test-disabled",
+            completion_id="chatcmpl-test",
+            created_timestamp=0,
+            model="test-model",
+            requested_model="test-model",
+        )
+
+    deltas = [c["delta"]["content"] for c in choices if c["delta"].get("content")]
+    assert deltas == ["您好 欢迎 光临"]
@@ -2,11 +2,12 @@
 管理 API 单元测试
 """
 
-from unittest.mock import AsyncMock, Mock, patch
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
 
 from fastapi.testclient import TestClient
 
 from src.core.admin_security_bcrypt import AdminSecurity
+from src.db.dependencies import get_db_service
 from src.main import app
 
 
@@ -19,6 +20,14 @@ class TestAdminAPI:
         self.secret_key = "test-secret-key-min-32-chars-long"
         self.security = AdminSecurity(self.secret_key, 60)
 
+        # 通过 dependency_overrides 注入模拟的全局 DatabaseService
+        self.db_service = MagicMock()
+        app.dependency_overrides[get_db_service] = lambda: self.db_service
+
+    def teardown_method(self):
+        """测试后清理"""
+        app.dependency_overrides.pop(get_db_service, None)
+
     def test_health_check(self):
         """测试健康检查接口"""
         response = self.client.get("/api/v1/health")
@@ -30,8 +39,7 @@ class TestAdminAPI:
         # 不检查具体状态，因为测试环境可能没有连接外部服务
 
     @patch('src.core.config.get_settings')
-    @patch('src.api.admin.auth.DatabaseService')
-    def test_admin_login_success(self, mock_db_service, mock_get_settings):
+    def test_admin_login_success(self, mock_get_settings):
         """测试管理员登录成功"""
         # Mock 配置
         mock_settings = Mock()
@@ -49,9 +57,8 @@ class TestAdminAPI:
 
         mock_session = Mock()
         mock_session.execute = AsyncMock(return_value=Mock(scalar_one_or_none=Mock(return_value=mock_admin_user)))
-        mock_db_service.return_value.get_session.return_value.__aenter__ = AsyncMock(return_value=mock_session)
-        mock_db_service.return_value.get_session.return_value.__aexit__ = AsyncMock(return_value=None)
-        mock_db_service.return_value.engine.dispose = AsyncMock()  # Mock engine.dispose()
+        self.db_service.get_session.return_value.__aenter__ = AsyncMock(return_value=mock_session)
+        self.db_service.get_session.return_value.__aexit__ = AsyncMock(return_value=None)
 
         # 测试登录
         login_data = {
@@ -71,8 +78,7 @@ class TestAdminAPI:
         assert data["expires_in"] == 3600  # 60分钟 * 60秒
 
     @patch('src.core.config.get_settings')
-    @patch('src.api.admin.auth.DatabaseService')
-    def test_admin_login_wrong_username(self, mock_db_service, mock_get_settings):
+    def test_admin_login_wrong_username(self, mock_get_settings):
         """测试管理员登录 - 错误用户名"""
         # Mock 配置
         mock_settings = Mock()
@@ -84,9 +90,8 @@ class TestAdminAPI:
         # Mock 数据库查询结果 - 用户不存在
         mock_session = Mock()
         mock_session.execute = AsyncMock(return_value=Mock(scalar_one_or_none=Mock(return_value=None)))
-        mock_db_service.return_value.get_session.return_value.__aenter__ = AsyncMock(return_value=mock_session)
-        mock_db_service.return_value.get_session.return_value.__aexit__ = AsyncMock(return_value=None)
-        mock_db_service.return_value.engine.dispose = AsyncMock()
+        self.db_service.get_session.return_value.__aenter__ = AsyncMock(return_value=mock_session)
+        self.db_service.get_session.return_value.__aexit__ = AsyncMock(return_value=None)
 
         # 测试错误用户名
         login_data = {
@@ -99,8 +104,7 @@ class TestAdminAPI:
         assert "用户名或密码错误" in response.json()["detail"]
 
     @patch('src.core.config.get_settings')
-    @patch('src.api.admin.auth.DatabaseService')
-    def test_admin_login_wrong_password(self, mock_db_service, mock_get_settings):
+    def test_admin_login_wrong_password(self, mock_get_settings):
         """测试管理员登录 - 错误密码"""
         # Mock 配置
         mock_settings = Mock()
@@ -117,9 +121,8 @@ class TestAdminAPI:
 
         mock_session = Mock()
         mock_session.execute = AsyncMock(return_value=Mock(scalar_one_or_none=Mock(return_value=mock_admin_user)))
-        mock_db_service.return_value.get_session.return_value.__aenter__ = AsyncMock(return_value=mock_session)
-        mock_db_service.return_value.get_session.return_value.__aexit__ = AsyncMock(return_value=None)
-        mock_db_service.return_value.engine.dispose = AsyncMock()
+        self.db_service.get_session.return_value.__aenter__ = AsyncMock(return_value=mock_session)
+        self.db_service.get_session.return_value.__aexit__ = AsyncMock(return_value=None)
 
         # 测试错误密码
         login_data = {
@@ -207,8 +210,7 @@ class TestAdminAPI:
         assert response.status_code == 422
 
     @patch('src.core.config.get_settings')
-    @patch('src.api.admin.auth.DatabaseService')
-    def test_jwt_expiration_handling(self, mock_db_service, mock_get_settings):
+    def test_jwt_expiration_handling(self, mock_get_settings):
         """测试 JWT 过期处理"""
         # Mock 配置
         mock_settings = Mock()
@@ -225,9 +227,8 @@ class TestAdminAPI:
 
         mock_session = Mock()
         mock_session.execute = AsyncMock(return_value=Mock(scalar_one_or_none=Mock(return_value=mock_admin_user)))
-        mock_db_service.return_value.get_session.return_value.__aenter__ = AsyncMock(return_value=mock_session)
-        mock_db_service.return_value.get_session.return_value.__aexit__ = AsyncMock(return_value=None)
-        mock_db_service.return_value.engine.dispose = AsyncMock()
+        self.db_service.get_session.return_value.__aenter__ = AsyncMock(return_value=mock_session)
+        self.db_service.get_session.return_value.__aexit__ = AsyncMock(return_value=None)
 
         # 登录获取 token
         login_data = {
@@ -21,7 +21,7 @@ async def test_call_llm_simple(mocker, mock_llm):
         "session_id": "test-123",
     }
 
-    mocker.patch("src.agent.main.nodes.create_llm", return_value=mock_llm)
+    mocker.patch("src.agent.main.nodes.get_llm", return_value=mock_llm)
     result = await call_llm_node(state)
 
     assert "messages" in result
@@ -49,7 +49,7 @@ async def test_call_llm_with_context(mocker, mock_llm):
         "session_id": "test-123",
     }
 
-    mocker.patch("src.agent.main.nodes.create_llm", return_value=mock_llm)
+    mocker.patch("src.agent.main.nodes.get_llm", return_value=mock_llm)
     result = await call_llm_node(state)
 
     assert "messages" in result
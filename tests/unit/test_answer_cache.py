@@ -0,0 +1,153 @@
+"""
+测试语义答案缓存
+
+验证相似度阈值、容量淘汰、TTL、失效以及失效期间的写入保护。
+"""
+
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from src.services.answer_cache import (
+    CachedAnswer,
+    SemanticAnswerCache,
+    get_answer_cache,
+    invalidate_answer_cache,
+)
+
+
+def _entry(question: str, answer: str = "答案", created_at: float | None = None) -> CachedAnswer:
+    return CachedAnswer(
+        question=question,
+        answer=answer,
+        retrieved_docs=["doc"],
+        confidence_score=0.9,
+        created_at=created_at if created_at is not None else time.time(),
+    )
+
+
+def test_lookup_respects_similarity_threshold():
+    """相似度超过阈值命中，低于阈值不命中"""
+    cache = SemanticAnswerCache(similarity_threshold=0.95)
+    cache.add_vector([1.0, 0.0], _entry("退货政策", "30天无理由退货"))
+
+    hit = cache.lookup_vector([0.99, 0.05])
+    assert hit is not None
+    assert hit.answer == "30天无理由退货"
+    assert hit.similarity > 0.95
+
+    assert cache.lookup_vector([0.5, 0.5]) is None
+
+
+def test_lookup_returns_most_similar_entry():
+    """多个候选时返回最相似的问题"""
+    cache = SemanticAnswerCache(similarity_threshold=0.9)
+    cache.add_vector([1.0, 0.0, 0.0], _entry("退货", "退货答案"))
+    cache.add_vector([0.0, 1.0, 0.0], _entry("付款", "付款答案"))
+
+    assert cache.lookup_vector([0.05, 1.0, 0.0]).answer == "付款答案"
+
+
+def test_evicts_oldest_when_full():
+    """超过容量时淘汰最早写入的条目"""
+    cache = SemanticAnswerCache(similarity_threshold=0.99, max_entries=2)
+    cache.add_vector([1.0, 0.0, 0.0], _entry("a"))
+    cache.add_vector([0.0, 1.0, 0.0], _entry("b"))
+    cache.add_vector([0.0, 0.0, 1.0], _entry("c"))
+
+    assert len(cache) == 2
+    assert cache.lookup_vector([1.0, 0.0, 0.0]) is None
+    assert cache.lookup_vector([0.0, 0.0, 1.0]).question == "c"
+
+
+def test_expired_entry_is_removed():
+    """过期条目不再命中"""
+    cache = SemanticAnswerCache(similarity_threshold=0.9, ttl=60)
+    cache.add_vector([1.0, 0.0], _entry("退货", created_at=time.time() - 120))
+
+    assert cache.lookup_vector([1.0, 0.0]) is None
+    assert len(cache) == 0
+
+
+def test_invalidate_clears_entries():
+    """知识库变更后缓存清空"""
+    cache = SemanticAnswerCache(similarity_threshold=0.9)
+    cache.add_vector([1.0, 0.0], _entry("退货"))
+
+    cache.invalidate("test")
+
+    assert len(cache) == 0
+    assert cache.lookup_vector([1.0, 0.0]) is None
+    assert cache.stats()["invalidations"] == 1
+
+
+@pytest.mark.asyncio
+async def test_invalidate_answer_cache_uses_singleton():
+    """invalidate_answer_cache 作用于全局实例"""
+    cache = get_answer_cache()
+    cache.add_vector([1.0, 0.0], _entry("退货"))
+
+    await invalidate_answer_cache("FAQ inserted")
+
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_store_skipped_when_invalidated_during_request():
+    """请求期间发生失效时放弃写入，避免缓存过期答案"""
+    cache = SemanticAnswerCache(similarity_threshold=0.9)
+    generation = cache.generation
+
+    with patch.object(cache, "_embed", AsyncMock(return_value=[1.0, 0.0])):
+        cache.invalidate("knowledge changed")
+        await cache.store("退货", "答案", ["doc"], 0.9, generation)
+
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_store_requires_retrieved_docs():
+    """只缓存基于检索结果生成的答案"""
+    cache = SemanticAnswerCache(similarity_threshold=0.9)
+
+    with patch.object(cache, "_embed", AsyncMock(return_value=[1.0, 0.0])):
+        await cache.store("你好", "你好！", [], None, cache.generation)
+        await cache.store("退货", "30天无理由退货", ["doc"], 0.9, cache.generation)
+
+    assert len(cache) == 1
+
+
+@pytest.mark.asyncio
+async def test_embed_uses_shared_embeddings(mocker):
+    """问题向量使用进程级共享的 Embeddings 实例，不为每个请求创建客户端"""
+    embeddings = mocker.MagicMock()
+    embeddings.aembed_query = AsyncMock(side_effect=[[1.0, 0.0], [0.0, 1.0]])
+    get_shared = mocker.patch(
+        "src.services.answer_cache.get_shared_embeddings", return_value=embeddings
+    )
+    cache = SemanticAnswerCache()
+
+    assert await cache._embed("退货") == [1.0, 0.0]
+    assert await cache._embed("付款") == [0.0, 1.0]
+
+    get_shared.assert_called_once()
+    assert embeddings.aembed_query.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_lookup_counts_hits_and_misses():
+    """lookup 记录命中/未命中次数，Embedding 失败时按未命中处理"""
+    cache = SemanticAnswerCache(similarity_threshold=0.9)
+    cache.add_vector([1.0, 0.0], _entry("退货"))
+
+    with patch.object(cache, "_embed", AsyncMock(side_effect=[[1.0, 0.0], [0.0, 1.0]])):
+        assert await cache.lookup("退货") is not None
+        assert await cache.lookup("付款") is None
+
+    with patch.object(cache, "_embed", AsyncMock(side_effect=Exception("embedding down"))):
+        assert await cache.lookup("退货") is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
@@ -0,0 +1,156 @@
+"""
+测试跨进程缓存失效
+
+两个 FakeRedis 客户端连接同一个 FakeServer，分别模拟 API 进程和 worker 进程。
+"""
+
+import time
+from unittest.mock import AsyncMock
+
+import fakeredis
+import pytest
+
+from src.agent.recall.sources.faq_source import FAQRecallSource
+from src.services.answer_cache import CachedAnswer, SemanticAnswerCache
+from src.services.cache_invalidation import SharedGeneration
+from src.services.faq_index import get_faq_index
+
+
+@pytest.fixture
+def clients():
+    """API 进程与 worker 进程各自的 Redis 连接"""
+    server = fakeredis.FakeServer()
+    return fakeredis.aioredis.FakeRedis(server=server), fakeredis.aioredis.FakeRedis(server=server)
+
+
+def _answer_cache(client) -> SemanticAnswerCache:
+    cache = SemanticAnswerCache(similarity_threshold=0.9, shared_generation=SharedGeneration("answers", client))
+    cache._embed = AsyncMock(return_value=[1.0, 0.0])
+    return cache
+
+
+def _entry(question: str) -> CachedAnswer:
+    return CachedAnswer(
+        question=question,
+        answer="30天无理由退货",
+        retrieved_docs=["doc"],
+        confidence_score=0.9,
+        created_at=time.time(),
+    )
+
+
+@pytest.mark.asyncio
+async def test_invalidation_from_other_process_clears_answer_cache(clients):
+    """worker 变更知识库后，API 进程下次查找时清空答案缓存"""
+    api_client, worker_client = clients
+    api_cache = _answer_cache(api_client)
+    api_cache.add_vector([1.0, 0.0], _entry("退货政策"))
+    assert await api_cache.lookup("退货政策") is not None
+
+    worker_cache = _answer_cache(worker_client)
+    worker_cache.invalidate("FAQ inserted")
+    await worker_cache.shared_generation.bump()
+
+    assert await api_cache.lookup("退货政策") is None
+    assert len(api_cache) == 0
+    assert api_cache.stats()["invalidations"] == 1
+
+
+@pytest.mark.asyncio
+async def test_store_skipped_when_other_process_invalidates_during_request(clients):
+    """请求期间其他进程发生变更时放弃写入"""
+    api_client, worker_client = clients
+    api_cache = _answer_cache(api_client)
+    await api_cache.lookup("退货政策")
+    generation = api_cache.generation
+
+    await SharedGeneration("answers", worker_client).bump()
+    await api_cache.store("退货政策", "旧答案", ["doc"], 0.9, generation)
+
+    assert len(api_cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_own_invalidation_does_not_clear_cache_again(clients):
+    """本进程自己的变更只失效一次，之后写入的答案仍可命中"""
+    api_client, _ = clients
+    api_cache = _answer_cache(api_client)
+    await api_cache.lookup("退货政策")
+
+    api_cache.invalidate("FAQ inserted")
+    await api_cache.shared_generation.bump()
+    await api_cache.store("退货政策", "新答案", ["doc"], 0.9, api_cache.generation)
+
+    hit = await api_cache.lookup("退货政策")
+    assert hit is not None
+    assert hit.answer == "新答案"
+
+
+@pytest.mark.asyncio
+async def test_changed_treats_redis_errors_as_unchanged():
+    """Redis 不可用时不影响本进程使用缓存"""
+    client = AsyncMock()
+    client.get.side_effect = ConnectionError("redis down")
+    client.incr.side_effect = ConnectionError("redis down")
+    generation = SharedGeneration("answers", client)
+
+    await generation.bump()
+
+    assert await generation.changed() is False
+    assert generation.seen is None
+
+
+@pytest.mark.asyncio
+async def test_faq_change_from_other_process_rebuilds_index(clients, mocker, monkeypatch):
+    """worker 导入 FAQ 后，API 进程下次召回前重建倒排索引"""
+    api_client, worker_client = clients
+    collection = [{"id": "faq_001", "text": "退货政策是什么？", "metadata": {}}]
+
+    async def iter_faqs(batch_size=1000):
+        yield list(collection)
+
+    repo = mocker.MagicMock()
+    repo.iter_faqs = iter_faqs
+    mocker.patch("src.repositories.get_faq_repository", return_value=repo)
+
+    index = get_faq_index()
+    monkeypatch.setattr(index, "shared_generation", SharedGeneration("faq", api_client))
+    source = FAQRecallSource()
+    await source.warmup()
+    assert index.search("发票怎么开") == []
+
+    collection.append({"id": "faq_002", "text": "发票怎么开？", "metadata": {}})
+    await SharedGeneration("faq", worker_client).bump()
+    await source._ensure_index()
+
+    assert index.search("发票怎么开")[0].faq.faq_id == "faq_002"
+    assert len(index) == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_faq_rebuild_is_retried(clients, mocker, monkeypatch):
+    """重建失败时保留旧索引，下次召回重试"""
+    api_client, worker_client = clients
+
+    async def iter_faqs(batch_size=1000):
+        yield [{"id": "faq_001", "text": "退货政策是什么？", "metadata": {}}]
+
+    repo = mocker.MagicMock()
+    repo.iter_faqs = iter_faqs
+    get_repository = mocker.patch("src.repositories.get_faq_repository", return_value=repo)
+
+    index = get_faq_index()
+    monkeypatch.setattr(index, "shared_generation", SharedGeneration("faq", api_client))
+    source = FAQRecallSource()
+    await source.warmup()
+
+    await SharedGeneration("faq", worker_client).bump()
+    get_repository.side_effect = RuntimeError("Milvus unavailable")
+    with pytest.raises(RuntimeError):
+        await source._ensure_index()
+    assert index.search("退货政策是什么")[0].exact
+
+    get_repository.side_effect = None
+    build = mocker.spy(index, "build")
+    await source._ensure_index()
+    build.assert_called_once()
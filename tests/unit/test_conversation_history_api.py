@@ -0,0 +1,113 @@
+"""
+对话历史列表接口测试（游标分页与总数估算）
+"""
+
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api.admin.dependencies import verify_admin_token
+from src.db.base import Base, DatabaseService
+from src.db.dependencies import get_db_service
+from src.db.repositories.conversation_repository import ConversationRepository
+from src.main import app
+
+HISTORY_URL = "/api/admin/conversations/history"
+
+
+async def _seed(url: str, count: int) -> None:
+    service = DatabaseService(url)
+    async with service.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    now = datetime.utcnow()
+    async with service.get_session() as session:
+        await ConversationRepository(session).bulk_create_conversations([
+            {
+                "id": uuid.uuid4(),
+                "session_id": f"session-{i % 2}",
+                "user_message": f"问题{i}",
+                "ai_response": "回答",
+                "retrieved_docs": None,
+                "confidence_score": 0.5,
+                "created_at": now - timedelta(minutes=i),
+            }
+            for i in range(count)
+        ])
+    await service.close()
+
+
+@pytest.fixture
+def client(tmp_path):
+    url = f"sqlite+aiosqlite:///{tmp_path / 'history.db'}"
+    asyncio.run(_seed(url, 25))
+
+    db_service = DatabaseService(url)
+    app.dependency_overrides[get_db_service] = lambda: db_service
+    app.dependency_overrides[verify_admin_token] = lambda: {"sub": "admin"}
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+
+
+class TestCursorPagination:
+    """测试游标分页"""
+
+    def test_walk_pages_with_cursor(self, client):
+        first = client.get(HISTORY_URL, params={"page_size": 10}).json()
+        assert first["total"] == 25
+        assert first["total_is_estimate"] is False
+
+        messages = [c["user_message"] for c in first["conversations"]]
+        cursor = first["next_cursor"]
+        while cursor:
+            page = client.get(HISTORY_URL, params={"page_size": 10, "cursor": cursor}).json()
+            messages += [c["user_message"] for c in page["conversations"]]
+            cursor = page["next_cursor"]
+
+        assert messages == [f"问题{i}" for i in range(25)]
+
+    def test_cursor_with_session_filter(self, client):
+        first = client.get(HISTORY_URL, params={"page_size": 5, "session_id": "session-1"}).json()
+        second = client.get(
+            HISTORY_URL, params={"page_size": 5, "session_id": "session-1", "cursor": first["next_cursor"]}
+        ).json()
+
+        assert first["total"] == 12
+        assert [c["user_message"] for c in second["conversations"]] == [f"问题{i}" for i in range(11, 21, 2)]
+
+    def test_invalid_cursor(self, client):
+        response = client.get(HISTORY_URL, params={"cursor": "not-a-cursor"})
+
+        assert response.status_code == 400
+
+
+class TestCountMode:
+    """测试总数估算"""
+
+    def test_estimate_used_above_threshold(self, client, mocker):
+        mocker.patch.object(ConversationRepository, "estimate_conversations", return_value=5_000_000)
+        count = mocker.spy(ConversationRepository, "count_conversations")
+
+        body = client.get(HISTORY_URL).json()
+
+        assert (body["total"], body["total_is_estimate"]) == (5_000_000, True)
+        count.assert_not_called()
+
+    def test_auto_counts_exactly_below_threshold(self, client, mocker):
+        mocker.patch.object(ConversationRepository, "estimate_conversations", return_value=30)
+
+        body = client.get(HISTORY_URL).json()
+
+        assert (body["total"], body["total_is_estimate"]) == (25, False)
+
+    def test_exact_mode_skips_estimate(self, client, mocker):
+        estimate = mocker.patch.object(ConversationRepository, "estimate_conversations", return_value=5_000_000)
+
+        body = client.get(HISTORY_URL, params={"count_mode": "exact"}).json()
+
+        assert (body["total"], body["total_is_estimate"]) == (25, False)
+        estimate.assert_not_called()
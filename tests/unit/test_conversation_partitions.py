@@ -0,0 +1,115 @@
+"""
+对话历史分区维护单元测试
+"""
+
+from contextlib import asynccontextmanager
+from datetime import date
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.services.conversation_partitions import (
+    ConversationPartitionManager,
+    add_months,
+    expired_partitions,
+    partition_month,
+    partition_name,
+    planned_months,
+)
+
+
+class TestPartitionCalendar:
+    """测试月份计算与分区命名"""
+
+    def test_add_months_across_years(self):
+        assert add_months(date(2026, 11, 1), 3) == date(2027, 2, 1)
+        assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+
+    def test_name_roundtrip(self):
+        assert partition_name(date(2026, 3, 1)) == "conversation_history_p202603"
+        assert partition_month("conversation_history_p202603") == date(2026, 3, 1)
+        assert partition_month("conversation_history") is None
+
+    def test_planned_months(self):
+        assert planned_months(date(2026, 12, 15), 2) == [date(2026, 12, 1), date(2027, 1, 1), date(2027, 2, 1)]
+
+    def test_expired_partitions(self):
+        names = [partition_name(date(2025, month, 1)) for month in range(1, 13)] + ["other_table"]
+
+        # 保留 6 个月：2026-03 的保留起点为 2025-09，之前的整月分区过期
+        assert expired_partitions(names, date(2026, 3, 10), 6) == [
+            partition_name(date(2025, month, 1)) for month in range(1, 9)
+        ]
+        assert expired_partitions(names, date(2026, 3, 10), 0) == []
+
+
+def make_session(dialect="postgresql"):
+    session = MagicMock()
+    session.get_bind.return_value.dialect.name = dialect
+    session.execute = AsyncMock(return_value=MagicMock(scalar=MagicMock(return_value=True)))
+    session.commit = AsyncMock()
+
+    @asynccontextmanager
+    async def begin_nested():
+        yield
+
+    session.begin_nested = begin_nested
+    return session
+
+
+def make_manager(session, existing, **kwargs):
+    @asynccontextmanager
+    async def get_session():
+        yield session
+
+    manager = ConversationPartitionManager(MagicMock(get_session=get_session), **kwargs)
+    manager._is_partitioned = AsyncMock(return_value=True)
+    manager._existing_partitions = AsyncMock(return_value=existing)
+    return manager
+
+
+def executed_sql(session) -> list[str]:
+    return [str(call.args[0]) for call in session.execute.call_args_list]
+
+
+class TestPartitionMaintenance:
+    """测试维护任务执行的 DDL"""
+
+    @pytest.mark.asyncio
+    async def test_creates_missing_and_drops_expired(self):
+        session = make_session()
+        existing = [partition_name(date(2025, month, 1)) for month in (1, 2, 3)] + [partition_name(date(2026, 3, 1))]
+        manager = make_manager(session, existing, premake_months=2, retention_months=12)
+
+        result = await manager.run_once(today=date(2026, 3, 20))
+
+        assert result == {
+            "created": ["conversation_history_p202604", "conversation_history_p202605"],
+            "dropped": ["conversation_history_p202501", "conversation_history_p202502"],
+        }
+        sql = executed_sql(session)
+        assert any(
+            "PARTITION OF conversation_history FOR VALUES FROM ('2026-04-01') TO ('2026-05-01')" in s for s in sql
+        )
+        assert any("DROP TABLE IF EXISTS conversation_history_p202501" in s for s in sql)
+        assert not any("DELETE FROM conversation_history " in s for s in sql)
+        session.commit.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_skipped_when_lock_held_by_other_process(self):
+        session = make_session()
+        session.execute.return_value = MagicMock(scalar=MagicMock(return_value=False))
+        manager = make_manager(session, [], retention_months=1)
+
+        result = await manager.run_once(today=date(2026, 3, 20))
+
+        assert result == {"created": [], "dropped": []}
+        manager._existing_partitions.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_noop_on_other_dialects(self):
+        session = make_session(dialect="sqlite")
+        manager = make_manager(session, [])
+
+        assert await manager.run_once() == {"created": [], "dropped": []}
+        session.execute.assert_not_awaited()
@@ -1,16 +1,19 @@
 """
 ConversationRepository 单元测试
 
-测试对话历史 Repository 的 create_conversation 方法。
+测试对话历史 Repository 的写入方法和基于汇总表的统计。
 """
 
-from datetime import datetime
+import uuid
+from datetime import datetime, timedelta
 
 import pytest
 import pytest_asyncio
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from src.db.base import Base
+from src.db.models import ConversationHistory, ConversationStatsDaily
 from src.db.repositories.conversation_repository import ConversationRepository
 
 
@@ -188,3 +191,126 @@ async def test_create_conversation_with_special_characters(db_session):
     assert conversation.id is not None
     assert conversation.user_message == special_message
 
+
+
+def _make_rows(now: datetime) -> list[dict]:
+    """构造跨多天、多会话的对话记录"""
+    rows = []
+    for day in range(3):
+        for i in range(6):
+            rows.append({
+                "id": uuid.uuid4(),
+                "session_id": f"session-{(day + i) % 4}",
+                "user_message": "问题",
+                "ai_response": "回答",
+                "retrieved_docs": None,
+                "confidence_score": None if i % 3 == 0 else 0.5 + i / 10,
+                "created_at": now - timedelta(days=2 - day, minutes=i * 20),
+            })
+    return rows
+
+
+async def _raw_stats(db_session, today) -> dict:
+    """直接在对话历史上聚合（汇总表的对照）"""
+    total = (await db_session.execute(select(func.count(func.distinct(ConversationHistory.session_id))))).scalar()
+    today_sessions = (await db_session.execute(
+        select(func.count(func.distinct(ConversationHistory.session_id))).where(func.date(ConversationHistory.created_at) == str(today))
+    )).scalar()
+    avg = (await db_session.execute(select(func.avg(ConversationHistory.confidence_score)))).scalar()
+    return {"total_sessions": total, "today_sessions": today_sessions, "avg_confidence": round(avg, 3)}
+
+
+@pytest.mark.asyncio
+async def test_rollup_stats_match_raw_aggregates(db_session):
+    """分多批写入后，汇总表统计与全表聚合一致"""
+    repo = ConversationRepository(db_session)
+    now = datetime.utcnow().replace(hour=12)
+    rows = _make_rows(now)
+
+    await repo.bulk_create_conversations(rows[:7])
+    await repo.bulk_create_conversations(rows[7:])
+    await repo.create_conversation(session_id="session-new", user_message="问题", ai_response="回答", confidence_score=0.9)
+
+    assert await repo.get_session_stats() == await _raw_stats(db_session, datetime.utcnow().date())
+
+    daily = await repo.get_daily_stats(days=7)
+    assert [stat["count"] for stat in daily] == [6, 6, 7]
+    assert daily[-1]["date"] == str(datetime.utcnow().date())
+
+    hourly = await repo.get_hourly_stats(hours=72)
+    assert sum(stat["count"] for stat in hourly) == 19
+
+
+@pytest.mark.asyncio
+async def test_rollup_counts_session_once(db_session):
+    """同一会话跨批次、跨天只计一次累计会话，每天各计一次活跃会话"""
+    repo = ConversationRepository(db_session)
+    now = datetime.utcnow()
+    for created_at in (now - timedelta(days=1), now - timedelta(days=1), now):
+        await repo.bulk_create_conversations([{
+            "id": uuid.uuid4(),
+            "session_id": "same-session",
+            "user_message": "问题",
+            "ai_response": "回答",
+            "retrieved_docs": None,
+            "confidence_score": 0.8,
+            "created_at": created_at,
+        }])
+
+    stats = await repo.get_session_stats()
+    assert (stats["total_sessions"], stats["today_sessions"], stats["avg_confidence"]) == (1, 1, 0.8)
+
+    days = (await db_session.execute(select(ConversationStatsDaily).order_by(ConversationStatsDaily.stat_date))).scalars().all()
+    assert [(d.conversation_count, d.active_sessions, d.new_sessions) for d in days] == [(2, 1, 1), (1, 1, 0)]
+
+
+@pytest.mark.asyncio
+async def test_session_stats_empty(db_session):
+    """没有对话时返回 0"""
+    repo = ConversationRepository(db_session)
+
+    assert await repo.get_session_stats() == {"total_sessions": 0, "today_sessions": 0, "avg_confidence": 0.0}
+    assert await repo.get_daily_stats() == []
+
+
+@pytest.mark.asyncio
+async def test_keyset_pagination_walks_all_rows(db_session):
+    """游标分页逐页遍历与一次性按时间倒序查询结果一致（包括相同时间戳）"""
+    repo = ConversationRepository(db_session)
+    now = datetime.utcnow()
+    rows = [
+        {
+            "id": uuid.uuid4(),
+            "session_id": f"session-{i % 3}",
+            "user_message": f"问题{i}",
+            "ai_response": "回答",
+            "retrieved_docs": None,
+            "confidence_score": None,
+            "created_at": now.replace(microsecond=0) - timedelta(seconds=i // 2),
+        }
+        for i in range(11)
+    ]
+    await repo.bulk_create_conversations(rows)
+
+    expected = [c.id for c in await repo.get_conversations(limit=100)]
+    walked, cursor = [], None
+    while True:
+        page = await repo.get_conversations(limit=4, cursor=cursor)
+        walked += [c.id for c in page]
+        if len(page) < 4:
+            break
+        cursor = (page[-1].created_at, page[-1].id)
+
+    assert walked == expected
+    assert len(set(walked)) == 11
+
+    # 游标与筛选条件组合
+    filtered = await repo.get_conversations(limit=100, session_id="session-1", cursor=(rows[0]["created_at"], rows[0]["id"]))
+    assert all(c.session_id == "session-1" for c in filtered)
+    assert await repo.count_conversations(session_id="session-1") == 4
+
+
+@pytest.mark.asyncio
+async def test_estimate_not_supported_on_sqlite(db_session):
+    """非 PostgreSQL 不提供估计值，由调用方回退到精确计数"""
+    assert await ConversationRepository(db_session).estimate_conversations() is None
@@ -0,0 +1,269 @@
+"""
+对话历史写后批量写入器单元测试
+"""
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+from sqlalchemy.exc import DataError
+
+from src.db.base import Base, DatabaseService
+from src.db.models import ConversationHistory
+from src.services.conversation_writer import ConversationWriter
+
+
+class FailingDatabaseService:
+    """模拟 PostgreSQL 不可用"""
+
+    def __init__(self):
+        self.attempts = 0
+
+    def get_session(self):
+        self.attempts += 1
+        raise ConnectionRefusedError("postgres down")
+
+
+@pytest_asyncio.fixture
+async def db_service(tmp_path):
+    service = DatabaseService(f"sqlite+aiosqlite:///{tmp_path / 'chat.db'}")
+    async with service.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield service
+    await service.close()
+
+
+async def count_rows(db_service) -> int:
+    async with db_service.get_session() as session:
+        return (await session.execute(select(func.count(ConversationHistory.id)))).scalar()
+
+
+def make_writer(db_service, tmp_path, **kwargs) -> ConversationWriter:
+    options = {
+        "batch_size": 50,
+        "flush_interval": 0.05,
+        "queue_size": 1000,
+        "enqueue_timeout": 0.01,
+        "spill_dir": str(tmp_path / "spill"),
+        "spill_retry_seconds": 60,
+    }
+    options.update(kwargs)
+    return ConversationWriter(db_service, **options)
+
+
+async def submit_many(writer, count, prefix="s"):
+    for i in range(count):
+        await writer.submit(
+            session_id=f"{prefix}-{i}",
+            user_message=f"问题{i}",
+            ai_response=f"回答{i}",
+            retrieved_docs=[{"content": "文档", "score": 0.9}],
+            confidence_score=0.8,
+        )
+
+
+async def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached"
+        await asyncio.sleep(0.01)
+
+
+def spilled_lines(tmp_path) -> list[dict]:
+    return [
+        json.loads(line)
+        for path in sorted((tmp_path / "spill").glob("*.jsonl"))
+        for line in path.read_text(encoding="utf-8").splitlines()
+    ]
+
+
+class TestBatching:
+    """测试按条数和时间批量写入"""
+
+    @pytest.mark.asyncio
+    async def test_flush_by_size(self, db_service, tmp_path):
+        writer = make_writer(db_service, tmp_path, flush_interval=5.0)
+
+        await submit_many(writer, 120)
+        await wait_for(lambda: writer.flushed == 100)
+
+        assert writer.batches == 2
+        assert await count_rows(db_service) == 100
+        await writer.close()
+        assert await count_rows(db_service) == 120
+
+    @pytest.mark.asyncio
+    async def test_flush_by_interval(self, db_service, tmp_path):
+        writer = make_writer(db_service, tmp_path)
+
+        await submit_many(writer, 3)
+        await wait_for(lambda: writer.flushed == 3)
+
+        assert writer.batches == 1
+        async with db_service.get_session() as session:
+            row = (await session.execute(select(ConversationHistory).where(ConversationHistory.session_id == "s-1"))).scalar_one()
+        assert (row.user_message, row.ai_response, row.confidence_score) == ("问题1", "回答1", 0.8)
+        assert row.retrieved_docs == [{"content": "文档", "score": 0.9}]
+        await writer.close()
+
+    @pytest.mark.asyncio
+    async def test_close_drains_pending(self, db_service, tmp_path):
+        writer = make_writer(db_service, tmp_path, flush_interval=10.0)
+
+        await submit_many(writer, 7)
+        await asyncio.sleep(0)
+        await writer.close()
+
+        assert await count_rows(db_service) == 7
+        assert writer.stats()["flushed"] == 7
+
+
+class TestSpill:
+    """测试背压与落盘降级"""
+
+    @pytest.mark.asyncio
+    async def test_db_failure_spills_batch(self, tmp_path):
+        writer = make_writer(FailingDatabaseService(), tmp_path)
+
+        await submit_many(writer, 5)
+        await wait_for(lambda: writer.spilled == 5)
+        await writer.close()
+
+        lines = spilled_lines(tmp_path)
+        assert [line["session_id"] for line in lines] == [f"s-{i}" for i in range(5)]
+        assert writer.stats()["failed_batches"] == 1
+
+    @pytest.mark.asyncio
+    async def test_full_queue_spills_without_blocking(self, tmp_path, mocker):
+        writer = make_writer(FailingDatabaseService(), tmp_path, queue_size=2)
+        # 后台任务不取数据，模拟写入跟不上
+        mocker.patch.object(writer, "_run", lambda: asyncio.sleep(3600))
+
+        # 写入阻塞时会一直等待后台任务取数据，超时即失败
+        await asyncio.wait_for(submit_many(writer, 5), timeout=5)
+
+        assert writer.stats()["queued"] == 2
+        assert [line["session_id"] for line in spilled_lines(tmp_path)] == ["s-2", "s-3", "s-4"]
+        await writer.close()
+
+    @pytest.mark.asyncio
+    async def test_replay_after_recovery(self, db_service, tmp_path):
+        down = make_writer(FailingDatabaseService(), tmp_path)
+        await submit_many(down, 4, prefix="down")
+        await down.close()
+        first_ids = {line["id"] for line in spilled_lines(tmp_path)}
+
+        writer = make_writer(db_service, tmp_path, batch_size=3)
+        assert await writer.replay_spilled() == 4
+
+        assert await count_rows(db_service) == 4
+        assert spilled_lines(tmp_path) == []
+        async with db_service.get_session() as session:
+            ids = {str(row_id) for row_id in (await session.execute(select(ConversationHistory.id))).scalars()}
+        assert ids == first_ids
+
+    @pytest.mark.asyncio
+    async def test_partial_replay_keeps_remaining(self, db_service, tmp_path, mocker):
+        down = make_writer(FailingDatabaseService(), tmp_path)
+        await submit_many(down, 5)
+        await down.close()
+
+        writer = make_writer(db_service, tmp_path, batch_size=2)
+        original_write = writer._write
+        calls = []
+
+        async def flaky_write(rows):
+            calls.append(len(rows))
+            if len(calls) == 2:
+                raise ConnectionRefusedError("postgres down")
+            await original_write(rows)
+
+        mocker.patch.object(writer, "_write", flaky_write)
+
+        assert await writer.replay_spilled() == 2
+        assert [line["session_id"] for line in spilled_lines(tmp_path)] == ["s-2", "s-3", "s-4"]
+
+        assert await writer.replay_spilled() == 3
+        assert await count_rows(db_service) == 5
+        assert spilled_lines(tmp_path) == []
+
+
+class TestRecovery:
+    """测试进程重启后的回放和无法写入记录的隔离"""
+
+    @pytest.mark.asyncio
+    async def test_replay_reclaims_files_of_exited_process(self, db_service, tmp_path):
+        down = make_writer(FailingDatabaseService(), tmp_path)
+        await submit_many(down, 3, prefix="dead")
+        await down.close()
+
+        exited = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"], capture_output=True)
+        dead_pid = int(exited.stdout)
+        spill_dir = tmp_path / "spill"
+        (pending,) = spill_dir.glob("pending-*.jsonl")
+        pending.rename(spill_dir / f"replay-{dead_pid}-1-{pending.name}")
+        # 仍在运行的进程认领的文件不能抢
+        live_claim = spill_dir / f"replay-{os.getppid()}-1-pending-0.jsonl"
+        live_claim.write_text("", encoding="utf-8")
+
+        writer = make_writer(db_service, tmp_path)
+        assert await writer.replay_spilled() == 3
+
+        assert await count_rows(db_service) == 3
+        assert sorted(path.name for path in spill_dir.iterdir()) == [live_claim.name]
+
+    @pytest.mark.asyncio
+    async def test_bad_rows_quarantined_rest_written(self, db_service, tmp_path, mocker):
+        writer = make_writer(db_service, tmp_path, batch_size=8, flush_interval=10.0)
+        original_write = writer._write
+        calls = []
+
+        async def strict_write(rows):
+            calls.append(len(rows))
+            if any("\x00" in row["user_message"] for row in rows):
+                raise DataError("INSERT", {}, Exception('invalid byte sequence for encoding "UTF8": 0x00'))
+            await original_write(rows)
+
+        mocker.patch.object(writer, "_write", strict_write)
+
+        await submit_many(writer, 5)
+        await writer.submit(session_id="bad", user_message="问题\x00", ai_response="回答")
+        await submit_many(writer, 2, prefix="t")
+        await writer.close()
+
+        assert await count_rows(db_service) == 7
+        assert [line["session_id"] for line in spilled_lines(tmp_path)] == ["bad"]
+        assert list((tmp_path / "spill").glob("quarantine-*.jsonl"))
+        assert writer.stats()["quarantined"] == 1
+        assert writer.stats()["spilled"] == 0
+        # 8 条：整批失败后二分，只有包含坏记录的一半继续拆分
+        assert calls == [8, 4, 4, 2, 1, 1, 2]
+
+    @pytest.mark.asyncio
+    async def test_connection_error_during_bisect_spills_unwritten_rows(self, db_service, tmp_path, mocker):
+        writer = make_writer(db_service, tmp_path, batch_size=4, flush_interval=10.0)
+        original_write = writer._write
+        calls = []
+
+        async def failing_write(rows):
+            calls.append(len(rows))
+            if len(calls) == 1:
+                raise DataError("INSERT", {}, Exception("value too long"))
+            if len(calls) == 3:
+                raise ConnectionRefusedError("postgres down")
+            await original_write(rows)
+
+        mocker.patch.object(writer, "_write", failing_write)
+
+        await submit_many(writer, 4)
+        await writer.close()
+
+        assert await count_rows(db_service) == 2
+        assert [line["session_id"] for line in spilled_lines(tmp_path)] == ["s-2", "s-3"]
+        assert writer.stats()["spilled"] == 2
@@ -0,0 +1,125 @@
+"""
+测试查询向量缓存
+
+验证规范化缓存键、LRU 淘汰、TTL 过期、Redis 二级缓存和命中统计。
+"""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import fakeredis.aioredis
+import pytest
+
+from src.core.config import settings
+from src.services.embedding_cache import CachedEmbeddings, EmbeddingCache, normalize_query
+
+
+def _make_embeddings(vector=None) -> MagicMock:
+    embeddings = MagicMock()
+    embeddings.aembed_query = AsyncMock(return_value=vector or [0.1, 0.2, 0.3])
+    embeddings.embed_query.return_value = vector or [0.1, 0.2, 0.3]
+    return embeddings
+
+
+def test_normalize_query():
+    """全角/大小写/多余空白规范化后得到相同文本"""
+    assert normalize_query("  退货   政策 ") == "退货 政策"
+    assert normalize_query("ＡＰＩ Key") == normalize_query("api key")
+
+
+def test_make_key_includes_model():
+    """相同文本不同模型生成不同缓存键"""
+    assert EmbeddingCache.make_key("退货", "model-a") != EmbeddingCache.make_key("退货", "model-b")
+    assert EmbeddingCache.make_key("退货 ", "model-a") == EmbeddingCache.make_key(" 退货", "model-a")
+
+
+def test_lru_evicts_least_recently_used():
+    """超过上限时淘汰最久未使用的条目"""
+    cache = EmbeddingCache(max_entries=2, ttl=0)
+    cache.set_local("a", [1.0])
+    cache.set_local("b", [2.0])
+    cache.get_local("a")
+    cache.set_local("c", [3.0])
+
+    assert cache.get_local("a") == [1.0]
+    assert cache.get_local("b") is None
+    assert cache.get_local("c") == [3.0]
+
+
+def test_ttl_expiry():
+    """过期条目不再返回"""
+    cache = EmbeddingCache(max_entries=10, ttl=60)
+    with patch("src.services.embedding_cache.time.monotonic", return_value=1000.0):
+        cache.set_local("a", [1.0])
+    with patch("src.services.embedding_cache.time.monotonic", return_value=1059.0):
+        assert cache.get_local("a") == [1.0]
+    with patch("src.services.embedding_cache.time.monotonic", return_value=1061.0):
+        assert cache.get_local("a") is None
+
+
+@pytest.mark.asyncio
+async def test_cached_embeddings_hits_after_first_call():
+    """重复查询只请求一次 Embedding API，并记录命中/未命中"""
+    cache = EmbeddingCache(max_entries=10, ttl=300)
+    embeddings = _make_embeddings()
+    cached = CachedEmbeddings(embeddings, cache=cache)
+
+    first = await cached.aembed_query("怎么付款")
+    second = await cached.aembed_query("  怎么付款 ")
+
+    assert first == second == [0.1, 0.2, 0.3]
+    embeddings.aembed_query.assert_awaited_once_with("怎么付款")
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hit_rate"] == 0.5
+
+
+@pytest.mark.asyncio
+async def test_cached_embeddings_disabled():
+    """关闭缓存时每次都请求 Embedding API"""
+    cache = EmbeddingCache(max_entries=10, ttl=300)
+    embeddings = _make_embeddings()
+    cached = CachedEmbeddings(embeddings, cache=cache)
+
+    with patch.object(settings, "embedding_cache_enabled", False):
+        await cached.aembed_query("退货")
+        await cached.aembed_query("退货")
+
+    assert embeddings.aembed_query.await_count == 2
+    assert cache.stats()["entries"] == 0
+
+
+@pytest.mark.asyncio
+async def test_redis_tier_shared_between_instances():
+    """Redis 二级缓存可被其他进程（实例）复用"""
+    fake_redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    writer = EmbeddingCache(max_entries=10, ttl=300, redis_enabled=True)
+    reader = EmbeddingCache(max_entries=10, ttl=300, redis_enabled=True)
+    writer._redis_client = fake_redis
+    reader._redis_client = fake_redis
+
+    await CachedEmbeddings(_make_embeddings(), cache=writer).aembed_query("退货政策")
+
+    embeddings = _make_embeddings()
+    vector = await CachedEmbeddings(embeddings, cache=reader).aembed_query("退货政策")
+
+    assert vector == [0.1, 0.2, 0.3]
+    embeddings.aembed_query.assert_not_awaited()
+    assert reader.stats()["redis_hits"] == 1
+    assert await fake_redis.ttl(EmbeddingCache.make_key("退货政策", settings.embedding_model_name)) > 0
+
+
+@pytest.mark.asyncio
+async def test_redis_failure_falls_back_to_api():
+    """Redis 不可用时退化为直接请求 Embedding API"""
+    cache = EmbeddingCache(max_entries=10, ttl=300, redis_enabled=True)
+    broken_redis = MagicMock()
+    broken_redis.get = AsyncMock(side_effect=ConnectionError("redis down"))
+    broken_redis.setex = AsyncMock(side_effect=ConnectionError("redis down"))
+    cache._redis_client = broken_redis
+
+    embeddings = _make_embeddings()
+    vector = await CachedEmbeddings(embeddings, cache=cache).aembed_query("退货")
+
+    assert vector == [0.1, 0.2, 0.3]
+    embeddings.aembed_query.assert_awaited_once()
+    assert cache.stats()["misses"] == 1
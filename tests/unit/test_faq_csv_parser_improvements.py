@@ -112,3 +112,61 @@ class TestFileValidation:
         assert result["preview_rows"] == []
         assert result["total_rows"] == 0
 
+
+
+class FakeEmbeddingService:
+    """批量 Embedding 服务桩（可指定失败的文本）"""
+
+    def __init__(self, fail_on: set[str] | None = None, dim: int = 8):
+        self.fail_on = fail_on or set()
+        self.dim = dim
+        self.batch_sizes = []
+
+    async def get_embeddings(self, texts):
+        self.batch_sizes.append(len(texts))
+        if self.fail_on & set(texts):
+            raise RuntimeError("provider error")
+        return [[0.1] * self.dim for _ in texts]
+
+    async def get_embedding(self, text):
+        if text in self.fail_on:
+            raise RuntimeError("provider error")
+        return [0.1] * self.dim
+
+
+def build_csv(rows: int, encoding: str = "utf-8") -> bytes:
+    lines = ["question,answer"] + [f"问题{i},答案{i}" for i in range(rows)]
+    return "\n".join(lines).encode(encoding)
+
+
+class TestStreamingImport:
+    """测试流式分批处理"""
+
+    @pytest.mark.asyncio
+    async def test_batches(self):
+        parser = FAQCSVParser()
+        parser._embedding_service = FakeEmbeddingService()
+
+        batches = [
+            (len(faqs), consumed)
+            async for faqs, consumed in parser.iter_faq_batches(
+                build_csv(25, "gbk"), ["question", "answer"], ["question"], batch_size=10
+            )
+        ]
+
+        assert batches == [(10, 10), (10, 10), (5, 5)]
+        assert parser._embedding_service.batch_sizes == [10, 10, 5]
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_retried_per_row(self):
+        parser = FAQCSVParser()
+        parser._embedding_service = FakeEmbeddingService(fail_on={"问题3"})
+
+        faqs = await parser.process_csv(build_csv(10), ["question", "answer"], ["question"])
+
+        assert len(faqs) == 9
+        assert all(faq["metadata"]["question"] != "问题3" for faq in faqs)
+        assert faqs[0]["text"] == "问题0\n答：答案0"
+
+    def test_count_rows(self):
+        assert FAQCSVParser().count_rows(build_csv(123, "gbk")) == 123
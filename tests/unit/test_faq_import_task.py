@@ -0,0 +1,154 @@
+"""
+FAQ 流式导入任务单元测试
+"""
+
+import tracemalloc
+from unittest.mock import AsyncMock, MagicMock
+
+import fakeredis
+import pytest
+
+from src.api.admin import faq as faq_module
+from src.api.admin.faq import FAQ_IMPORT_JOB
+from src.services import job_queue as job_queue_module
+from src.services.job_queue import JobQueue, JobWorker
+
+
+class FakeEmbeddingService:
+    async def get_embeddings(self, texts):
+        return [[0.1] * 8 for _ in texts]
+
+
+def build_csv(rows: int) -> bytes:
+    lines = ["question,answer"] + [f"问题{i},答案{i}" for i in range(rows)]
+    return "\n".join(lines).encode("utf-8")
+
+
+@pytest.fixture
+def faq_repo(mocker):
+    repo = MagicMock()
+    repo.initialize = AsyncMock()
+    repo.insert_faqs = AsyncMock(side_effect=lambda faqs: len(faqs))
+    mocker.patch.object(faq_module, "get_milvus_client", AsyncMock())
+    mocker.patch.object(faq_module, "FAQRepository", return_value=repo)
+    mocker.patch(
+        "src.services.faq_csv_parser.get_embedding_service",
+        return_value=FakeEmbeddingService(),
+    )
+    return repo
+
+
+@pytest.fixture
+def queue(mocker):
+    queue = JobQueue(fakeredis.aioredis.FakeRedis(), "faq-test", blocking=False)
+    mocker.patch.object(faq_module, "get_job_queue", return_value=queue)
+    mocker.patch.object(job_queue_module.settings, "job_retry_backoff_seconds", 0.0)
+    return queue
+
+
+@pytest.fixture
+def batch_settings(mocker):
+    mocker.patch.object(faq_module.settings, "ingest_embedding_batch_size", 10)
+    mocker.patch.object(faq_module.settings, "ingest_insert_batch_size", 30)
+
+
+async def run_import(queue: JobQueue, content: bytes) -> dict:
+    """提交导入任务并由 worker 执行，返回任务记录"""
+    task_id = await queue.enqueue(
+        FAQ_IMPORT_JOB,
+        {
+            "text_columns": ["question", "answer"],
+            "embedding_columns": ["question"],
+            "text_template": "{question}\n答：{answer}",
+            "language": "zh",
+        },
+        blob=content,
+        state={"progress": 0, "total": 0, "processed": 0, "imported_count": 0, "message": ""},
+    )
+    await JobWorker(queue).drain()
+    return await queue.get(task_id)
+
+
+class TestFAQImportTask:
+    """测试流式导入"""
+
+    @pytest.mark.asyncio
+    async def test_batched_flush_and_progress(self, faq_repo, queue, batch_settings):
+        progress = []
+        original = faq_repo.insert_faqs.side_effect
+
+        async def record(faqs):
+            task_id = (await queue.client.lrange(queue.processing_key, 0, 0))[0].decode()
+            progress.append((await queue.get(task_id))["progress"])
+            return original(faqs)
+
+        faq_repo.insert_faqs.side_effect = record
+
+        task = await run_import(queue, build_csv(95))
+
+        assert [len(call.args[0]) for call in faq_repo.insert_faqs.call_args_list] == [30, 30, 30, 5]
+        assert progress == sorted(progress) and progress[-1] < 100
+        assert task["status"] == "completed"
+        assert (task["total"], task["processed"], task["imported_count"], task["progress"]) == (95, 95, 95, 100)
+        assert await queue.get_blob(task["task_id"]) is None
+
+    @pytest.mark.asyncio
+    async def test_failure_keeps_completed_batches_without_retry(self, faq_repo, queue, batch_settings):
+        faq_repo.insert_faqs.side_effect = [30, 30, RuntimeError("milvus down")]
+
+        task = await run_import(queue, build_csv(95))
+
+        assert task["status"] == "failed"
+        assert task["attempts"] == 1
+        assert task["imported_count"] == 60
+        assert "已导入 60 条" in task["message"]
+
+    @pytest.mark.asyncio
+    async def test_failure_before_any_insert_is_retried(self, faq_repo, queue, batch_settings):
+        faq_repo.insert_faqs.side_effect = [RuntimeError("milvus down"), 30, 30, 30, 5]
+
+        task = await run_import(queue, build_csv(95))
+
+        assert task["status"] == "completed"
+        assert task["attempts"] == 2
+        assert task["imported_count"] == 95
+
+    @pytest.mark.asyncio
+    async def test_empty_csv(self, faq_repo, queue):
+        task = await run_import(queue, b"question,answer\n")
+
+        assert task["status"] == "failed"
+        assert task["attempts"] == 1
+        faq_repo.insert_faqs.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_memory_flat_for_large_files(self, faq_repo, queue, mocker):
+        """10 万行导入的峰值内存不随行数增长"""
+        mocker.patch.object(faq_module.settings, "ingest_embedding_batch_size", 64)
+        mocker.patch.object(faq_module.settings, "ingest_insert_batch_size", 1000)
+
+        # AsyncMock 会保留每次调用的参数，这里使用只计数的写入函数
+        async def insert_faqs(faqs):
+            return len(faqs)
+
+        faq_repo.insert_faqs = insert_faqs
+
+        async def peak_for(rows: int) -> tuple[int, dict]:
+            # 直接执行导入流水线（CSV 内容在测量前已加载，与任务队列传输无关）
+            content = build_csv(rows)
+            task_id = await queue.enqueue(FAQ_IMPORT_JOB, {}, state={"imported_count": 0})
+            tracemalloc.start()
+            try:
+                await faq_module.process_faq_import_task(
+                    task_id, content, ["question", "answer"], ["question"], "{question}\n答：{answer}", "zh"
+                )
+                return tracemalloc.get_traced_memory()[1], await queue.get(task_id)
+            finally:
+                tracemalloc.stop()
+
+        small, _ = await peak_for(10_000)
+        large, task = await peak_for(100_000)
+        print(f"\n导入峰值内存: 1万行 {small / 1024:.0f}KB  10万行 {large / 1024:.0f}KB")
+
+        assert task["imported_count"] == 100_000
+        assert large < small * 2
@@ -0,0 +1,123 @@
+"""
+FAQ 倒排索引单元测试
+"""
+
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.repositories.milvus.faq_repository import FAQRepository
+from src.services.faq_index import FAQLexicalIndex, get_faq_index, tokenize
+
+
+@pytest.fixture
+def index():
+    index = FAQLexicalIndex()
+    index.add("1", "退货政策是什么？", {"question": "退货政策是什么？", "answer": "30天无理由退货"})
+    index.add("2", "如何修改收货地址？", {"question": "如何修改收货地址？", "answer": "在订单详情页修改"})
+    index.add("3", "Do you ship internationally?", {"question": "Do you ship internationally?", "answer": "Yes"})
+    return index
+
+
+class TestTokenize:
+    """测试分词"""
+
+    def test_chinese_bigrams(self):
+        assert tokenize("退货政策") == ["退货", "货政", "政策"]
+
+    def test_english_words_normalized(self):
+        assert tokenize("Ｓhip  Internationally?") == ["ship", "internationally"]
+
+    def test_single_chinese_char(self):
+        assert tokenize("a 货") == ["a", "货"]
+
+
+class TestFAQLexicalIndex:
+    """测试倒排索引"""
+
+    def test_exact_match_ignores_trailing_punctuation(self, index):
+        matches = index.search("退货政策是什么")
+
+        assert matches[0].exact
+        assert matches[0].faq.faq_id == "1"
+        assert matches[0].score == 1.0
+
+    def test_partial_match_scored_by_coverage(self, index):
+        matches = index.search("收货地址怎么改")
+
+        assert matches[0].faq.faq_id == "2"
+        assert not matches[0].exact
+        assert 0 < matches[0].score < 1
+
+    def test_english(self, index):
+        assert index.search("ship internationally")[0].faq.faq_id == "3"
+
+    def test_no_match(self, index):
+        assert index.search("xyz") == []
+        assert index.search("") == []
+
+    def test_remove(self, index):
+        index.remove("1")
+
+        assert all(match.faq.faq_id != "1" for match in index.search("退货政策是什么"))
+        assert len(index) == 2
+        assert "退货" not in index._postings
+
+    def test_update_replaces_terms(self, index):
+        index.add("2", "发票怎么开？", {"question": "发票怎么开？"})
+
+        assert index.search("发票怎么开")[0].faq.faq_id == "2"
+        assert index.search("收货地址") == []
+
+    @pytest.mark.asyncio
+    async def test_build(self):
+        async def iter_faqs(batch_size=1000):
+            yield [{"id": "a", "text": "问题一", "metadata": {}}]
+            yield [{"id": "b", "text": "问题二", "metadata": {}}]
+
+        repository = MagicMock()
+        repository.iter_faqs = iter_faqs
+        index = FAQLexicalIndex()
+        index.add("stale", "旧数据", {})
+
+        count = await index.build(repository)
+
+        assert count == 2
+        assert index.ready
+        assert index.stats()["faqs"] == 2
+
+
+class TestRepositoryIncrementalUpdate:
+    """测试 FAQRepository 写入后增量更新索引"""
+
+    @pytest.fixture
+    def repository(self):
+        client = MagicMock()
+        client.insert = AsyncMock(return_value={"insert_count": 1})
+        client.delete = AsyncMock()
+        return FAQRepository(client)
+
+    @pytest.mark.asyncio
+    async def test_insert_and_delete(self, repository):
+        await repository.insert([
+            {"id": "faq-1", "text": "怎么开发票？", "embedding": [0.1], "metadata": {"question": "怎么开发票？"}},
+        ])
+        assert get_faq_index().search("怎么开发票")[0].faq.faq_id == "faq-1"
+
+        assert await repository.delete_faq("faq-1")
+        assert get_faq_index().search("怎么开发票") == []
+
+    @pytest.mark.asyncio
+    async def test_iter_faqs_pages(self, repository):
+        repository.client.query = AsyncMock(side_effect=[
+            [{"id": "1", "text": "a", "metadata": {}}, {"id": "2", "text": "b", "metadata": {}}],
+            [{"id": "3", "text": "c", "metadata": {}}],
+        ])
+
+        batches = [batch async for batch in repository.iter_faqs(batch_size=2)]
+
+        assert [len(batch) for batch in batches] == [2, 1]
+        first, second = (call.kwargs for call in repository.client.query.call_args_list)
+        assert "offset" not in first and "offset" not in second
+        assert first["filter"] == "created_at > 0"
+        assert second["filter"] == 'created_at > 0 and id > "2"'
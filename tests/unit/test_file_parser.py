@@ -2,11 +2,42 @@
 文件解析服务单元测试
 """
 
+import time
 from unittest.mock import MagicMock, patch
 
 import pytest
 
-from src.services.file_parser import FileParser
+from src.services import file_parser as parser_module
+from src.services.file_parser import FileParser, StreamingChunker, smart_chunk
+
+
+def build_pdf(pages: int, lines_per_page: int = 40) -> bytes:
+    """生成每页若干行文本的 PDF"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page in range(pages):
+        body = "".join(
+            f"BT /F1 10 Tf 40 {800 - line * 18} Td (Page {page} line {line} lorem ipsum dolor sit amet.) Tj ET\n"
+            for line in range(lines_per_page)
+        ).encode()
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(body), body))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects)
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % kid for kid in kids), pages)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, obj)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
 
 
 class TestFileParser:
@@ -191,7 +222,7 @@ Third paragraph also with content that meets the minimum size requirement."""
 
         with patch.object(self.parser, '_detect_file_type', return_value='pdf'), \
              patch.object(self.parser, '_parse_pdf', return_value='Parsed PDF content'), \
-             patch.object(self.parser, '_smart_chunk', return_value=['chunk1', 'chunk2']):
+             patch('src.services.file_parser.smart_chunk', return_value=['chunk1', 'chunk2']):
 
             result = await self.parser.parse_file(pdf_content, filename)
 
@@ -233,7 +264,162 @@ Third paragraph also with content that meets the minimum size requirement."""
         max_size = self.parser.get_max_file_size()
 
         assert max_size == self.parser.MAX_FILE_SIZE
-        assert max_size == 10 * 1024 * 1024  # 10MB
+        assert max_size == parser_module.settings.knowledge_max_file_size_mb * 1024 * 1024
 
 
+class TestSplitPageRanges:
+    """测试 PDF 页段划分"""
 
+    def test_even_split(self):
+        assert parser_module._split_page_ranges(0, 40, 4, 5) == [(0, 10), (10, 20), (20, 30), (30, 40)]
+
+    def test_min_pages_limits_parts(self):
+        assert parser_module._split_page_ranges(8, 20, 4, 8) == [(8, 20)]
+
+    def test_empty(self):
+        assert parser_module._split_page_ranges(10, 10, 4, 8) == []
+
+
+@pytest.fixture
+def process_pool(mocker):
+    """启用真实的解析进程池"""
+    mocker.patch.object(parser_module.settings, "parser_process_workers", 2)
+    mocker.patch.object(parser_module.settings, "parser_pdf_pages_per_task", 4)
+    mocker.patch.object(parser_module.settings, "parser_task_timeout_seconds", 30)
+    parser_module.shutdown_parser_pool()
+    yield parser_module.settings
+    parser_module.shutdown_parser_pool()
+
+
+class TestProcessPool:
+    """测试进程池中的解析与超时"""
+
+    @pytest.mark.asyncio
+    async def test_pdf_pages_parallel_in_order(self, process_pool):
+        content = build_pdf(pages=18, lines_per_page=3)
+
+        result = await FileParser().parse_file(content, "manual.pdf")
+
+        lines = result['raw_content'].split("\n")
+        assert [int(line.split()[1]) for line in lines if line.endswith("line 0 lorem ipsum dolor sit amet.")] == list(range(18))
+        assert result['metadata']['file_type'] == 'pdf'
+        assert result['chunks'] == smart_chunk(result['raw_content'], FileParser.MAX_CHUNK_SIZE, FileParser.MIN_CHUNK_SIZE)
+
+    @pytest.mark.asyncio
+    async def test_markdown_in_pool(self, process_pool):
+        result = await FileParser()._parse_markdown("# 标题\n\n这是 **加粗** 文本。".encode('gbk'))
+
+        assert "标题" in result
+        assert "<strong>" not in result
+
+    @pytest.mark.asyncio
+    async def test_timeout_terminates_and_recreates_pool(self, process_pool):
+        process_pool.parser_task_timeout_seconds = 1
+        parser = FileParser()
+        pool = parser_module.get_parser_pool()
+
+        with pytest.raises(ValueError, match="解析超时"):
+            await parser._run_in_pool(time.sleep, 30)
+
+        assert parser_module.get_parser_pool() is not pool
+        assert await parser._run_in_pool(len, "abc") == 3
+
+
+class TestStreamingChunker:
+    """测试增量分块与整体分块一致"""
+
+    TEXT = (
+        "First paragraph that is long enough to be kept as a single chunk by itself.\n\n"
+        + "A fairly long sentence that keeps going across pages. " * 40
+        + "\n\nLast paragraph with enough content to pass the minimum chunk size."
+    )
+
+    @pytest.mark.parametrize("segment_size", [7, 64, 333])
+    def test_matches_smart_chunk(self, segment_size):
+        segments = [self.TEXT[i:i + segment_size] for i in range(0, len(self.TEXT), segment_size)]
+        chunker = StreamingChunker(500, 50, carry_limit=600)
+
+        chunks = []
+        for segment in segments:
+            chunks.extend(chunker.feed(segment))
+        chunks.extend(chunker.close())
+
+        assert chunks == smart_chunk("\n".join(segments), 500, 50)
+
+    def test_buffer_bounded_for_long_paragraph(self):
+        chunker = StreamingChunker(500, 50, carry_limit=1000)
+        emitted = []
+
+        for _ in range(200):
+            emitted.extend(chunker.feed("Sentence without paragraph breaks in a long PDF page."))
+            assert len(chunker._buffer) <= 1000 + 60
+
+        assert emitted
+        assert all(len(chunk) <= 500 for chunk in emitted)
+
+
+class TestIterChunks:
+    """测试流式解析"""
+
+    @pytest.mark.asyncio
+    async def test_pdf_stream_matches_parse_file(self, tmp_path, mocker):
+        mocker.patch.object(parser_module.settings, "parser_pdf_pages_per_task", 3)
+        content = build_pdf(pages=10, lines_per_page=20)
+        path = tmp_path / "manual.pdf"
+        path.write_bytes(content)
+        parser = FileParser()
+
+        batches = [batch async for batch in parser.iter_chunks(str(path), "manual.pdf")]
+
+        progress = [parsed for _, parsed in batches]
+        assert len(batches) > 2
+        assert progress == sorted(progress) and progress[-1] == 1.0
+        streamed = [chunk for chunks, _ in batches for chunk in chunks]
+        assert streamed == (await parser.parse_file(content, "manual.pdf"))['chunks']
+
+    @pytest.mark.asyncio
+    async def test_pdf_in_flight_bounded(self, mocker):
+        mocker.patch.object(parser_module.settings, "parser_pdf_pages_per_task", 2)
+        mocker.patch.object(parser_module.settings, "parser_process_workers", 0)
+        calls = []
+
+        def fake_extract(source, start=0, end=None):
+            calls.append(start)
+            return 40, [f"page {page} " * 20 for page in range(start, min(end, 40))]
+
+        mocker.patch.object(parser_module, "extract_pdf_pages", fake_extract)
+        mocker.patch.object(FileParser, "_detect_file_type", return_value="pdf")
+        stream = FileParser().iter_chunks(b"%PDF", "manual.pdf")
+
+        await stream.__anext__()
+        await stream.__anext__()
+        # 只提交了下一段，没有提前提取整个文件
+        assert len(calls) <= 3
+        await stream.aclose()
+
+    @pytest.mark.asyncio
+    async def test_text_file_from_path(self, tmp_path):
+        path = tmp_path / "notes.txt"
+        text = "中文段落内容，" * 20
+        path.write_bytes(text.encode('gbk'))
+
+        batches = [batch async for batch in FileParser().iter_chunks(str(path), "notes.txt")]
+
+        assert batches == [(smart_chunk(text, 500, 50), 1.0)]
+
+    @pytest.mark.asyncio
+    async def test_empty_pdf_raises(self, mocker):
+        mocker.patch.object(parser_module, "extract_pdf_pages", lambda source, start=0, end=None: (1, [""]))
+        mocker.patch.object(FileParser, "_detect_file_type", return_value="pdf")
+
+        with pytest.raises(ValueError, match="没有可提取的文本内容"):
+            async for _ in FileParser().iter_chunks(b"%PDF", "empty.pdf"):
+                pass
+
+    @pytest.mark.asyncio
+    async def test_size_limit(self, mocker):
+        mocker.patch.object(FileParser, "MAX_FILE_SIZE", 10)
+
+        with pytest.raises(ValueError, match="文件大小超过限制"):
+            async for _ in FileParser().iter_chunks(b"x" * 11, "big.txt"):
+                pass
@@ -2,6 +2,7 @@
 文件上传 API 单元测试（最终修复版）
 """
 
+from contextlib import contextmanager
 from io import BytesIO
 from unittest.mock import AsyncMock, MagicMock, patch
 
@@ -23,12 +24,22 @@ class TestFileUploadAPI:
 
         # 使用 dependency_overrides 来 mock 认证
         from src.api.admin.dependencies import verify_admin_token
+        from src.db.dependencies import get_db_service
 
         def mock_verify_admin_token():
             return {"sub": "admin"}
 
         app.dependency_overrides[verify_admin_token] = mock_verify_admin_token
 
+        # 注入模拟的全局 DatabaseService（TestClient 未触发 lifespan）
+        self.db_service = MagicMock()
+        app.dependency_overrides[get_db_service] = lambda: self.db_service
+
+    @contextmanager
+    def override_db_service(self):
+        """返回注入的模拟全局 DatabaseService"""
+        yield self.db_service
+
     def teardown_method(self):
         """测试后清理"""
         # 清理依赖覆盖
@@ -61,14 +72,23 @@ class TestFileUploadAPI:
 
     def test_upload_files_success(self, mock_admin_token, mock_upload_file):
         """测试文件上传成功"""
-        with patch('src.api.admin.knowledge.DatabaseService') as mock_db_service, \
+        with self.override_db_service() as mock_db_service, \
              patch('src.api.admin.knowledge.FileUploadRepository') as mock_repo, \
              patch('src.api.admin.knowledge.FileUploadProcessor'), \
+             patch('src.api.admin.knowledge.get_job_queue') as mock_queue, \
              patch('src.api.admin.knowledge._detect_file_type', return_value='txt'):
+            staged = {}
+
+            async def stage_blob(chunks, max_size):
+                staged["content"] = b"".join([chunk async for chunk in chunks])
+                return "staging-1", len(staged["content"])
+
+            mock_queue.return_value.stage_blob = stage_blob
+            mock_queue.return_value.enqueue = AsyncMock()
 
             # 模拟数据库服务
             mock_session = AsyncMock()
-            mock_db_service.return_value.get_session.return_value.__aenter__.return_value = mock_session
+            mock_db_service.get_session.return_value.__aenter__.return_value = mock_session
 
             # 模拟上传记录创建
             mock_upload_record = MagicMock()
@@ -90,21 +110,32 @@ class TestFileUploadAPI:
             assert data[0]["filename"] == "test.txt"
             assert data[0]["status"] == "pending"
 
+            # 文件内容随任务存入队列，worker 不依赖 API 主机的本地文件
+            enqueue = mock_queue.return_value.enqueue
+            enqueue.assert_awaited_once()
+            assert enqueue.call_args.kwargs["job_id"] == "test-upload-id"
+            assert enqueue.call_args.kwargs["staged_blob"] == "staging-1"
+            assert staged["content"] == b"Sample file content"
+            upload_data = mock_repo.return_value.create_upload_record.call_args.args[0]
+            assert upload_data["file_size"] == len(b"Sample file content")
+            assert upload_data["file_path"] is None
+
     def test_upload_files_size_limit(self, mock_admin_token):
         """测试文件大小限制"""
         # 创建超过限制的文件
-        large_content = b"x" * (10 * 1024 * 1024 + 1)  # 超过 10MB
+        large_content = b"x" * (1024 * 1024 + 1)  # 超过 1MB
         large_file = UploadFile(
             file=BytesIO(large_content),
             filename="large.txt",
             size=len(large_content)
         )
 
-        response = self.client.post(
-            "/api/admin/knowledge/upload",
-            files={"files": ("large.txt", large_file.file, "text/plain")},
-            headers={"Authorization": f"Bearer {mock_admin_token}"}
-        )
+        with patch('src.api.admin.knowledge.FileParser.MAX_FILE_SIZE', 1024 * 1024):
+            response = self.client.post(
+                "/api/admin/knowledge/upload",
+                files={"files": ("large.txt", large_file.file, "text/plain")},
+                headers={"Authorization": f"Bearer {mock_admin_token}"}
+            )
 
         # 验证响应
         assert response.status_code == 200
@@ -113,6 +144,24 @@ class TestFileUploadAPI:
         assert data[0]["status"] == "failed"
         assert "文件大小超过限制" in data[0]["message"]
 
+    def test_upload_files_blob_size_limit(self, mock_admin_token):
+        """测试存入任务队列的文件大小上限（与解析上限分开配置）"""
+        content = b"x" * (1024 * 1024 + 1)
+
+        with patch('src.api.admin.knowledge.get_settings') as mock_settings, \
+             patch('src.api.admin.knowledge.FileUploadRepository') as mock_repo:
+            mock_settings.return_value.job_max_blob_size_mb = 1
+            response = self.client.post(
+                "/api/admin/knowledge/upload",
+                files={"files": ("large.txt", BytesIO(content), "text/plain")},
+                headers={"Authorization": f"Bearer {mock_admin_token}"}
+            )
+
+        data = response.json()
+        assert data[0]["status"] == "failed"
+        assert "1MB" in data[0]["message"]
+        mock_repo.return_value.create_upload_record.assert_not_called()
+
     def test_upload_files_invalid_type(self, mock_admin_token):
         """测试不支持的文件类型"""
         content = b"Some content"
@@ -138,12 +187,12 @@ class TestFileUploadAPI:
 
     def test_get_upload_records_success(self, mock_admin_token):
         """测试获取上传记录成功"""
-        with patch('src.api.admin.knowledge.DatabaseService') as mock_db_service, \
+        with self.override_db_service() as mock_db_service, \
              patch('src.api.admin.knowledge.FileUploadRepository') as mock_repo:
 
             # 模拟数据库服务
             mock_session = AsyncMock()
-            mock_db_service.return_value.get_session.return_value.__aenter__.return_value = mock_session
+            mock_db_service.get_session.return_value.__aenter__.return_value = mock_session
 
             # 模拟上传记录
             mock_upload = MagicMock()
@@ -178,12 +227,12 @@ class TestFileUploadAPI:
         """测试获取上传状态成功"""
         upload_id = "test-upload-id"
 
-        with patch('src.api.admin.knowledge.DatabaseService') as mock_db_service, \
+        with self.override_db_service() as mock_db_service, \
              patch('src.api.admin.knowledge.FileUploadRepository') as mock_repo:
 
             # 模拟数据库服务
             mock_session = AsyncMock()
-            mock_db_service.return_value.get_session.return_value.__aenter__.return_value = mock_session
+            mock_db_service.get_session.return_value.__aenter__.return_value = mock_session
 
             # 模拟上传记录
             mock_upload = MagicMock()
@@ -217,12 +266,12 @@ class TestFileUploadAPI:
         """测试获取不存在的上传状态"""
         upload_id = "non-existent-id"
 
-        with patch('src.api.admin.knowledge.DatabaseService') as mock_db_service, \
+        with self.override_db_service() as mock_db_service, \
              patch('src.api.admin.knowledge.FileUploadRepository') as mock_repo:
 
             # 模拟数据库服务
             mock_session = AsyncMock()
-            mock_db_service.return_value.get_session.return_value.__aenter__.return_value = mock_session
+            mock_db_service.get_session.return_value.__aenter__.return_value = mock_session
 
             # 模拟找不到记录
             mock_repo.return_value.get_upload_by_id = AsyncMock(return_value=None)
@@ -241,14 +290,12 @@ class TestFileUploadAPI:
         """测试重试上传成功"""
         upload_id = "test-upload-id"
 
-        with patch('src.api.admin.knowledge.DatabaseService') as mock_db_service, \
-             patch('src.api.admin.knowledge.FileUploadProcessor') as mock_processor:
+        with self.override_db_service() as mock_db_service, \
+             patch('src.api.admin.knowledge.FileUploadProcessor') as mock_processor, \
+             patch('src.api.admin.knowledge.get_job_queue') as mock_queue:
 
-            # 模拟数据库服务
-            mock_db_service.return_value = MagicMock()
-
-            # 模拟处理器
-            mock_processor.return_value.retry_upload.return_value = True
+            mock_queue.return_value.retry = AsyncMock(return_value=True)
+            mock_processor.return_value.reset_upload = AsyncMock()
 
             # 执行请求
             response = self.client.post(
@@ -259,17 +306,33 @@ class TestFileUploadAPI:
             # 验证响应
             assert response.status_code == 200
             assert "重试任务已启动" in response.json()["message"]
+            mock_queue.return_value.retry.assert_awaited_once_with(upload_id)
+            mock_processor.assert_called_once_with(mock_db_service)
+            mock_processor.return_value.reset_upload.assert_awaited_once_with(upload_id)
+
+    def test_retry_upload_conflict(self, mock_admin_token):
+        """处理中、等待自动重试或文件已过期的上传不能重试"""
+        with self.override_db_service(), \
+             patch('src.api.admin.knowledge.FileUploadProcessor') as mock_processor, \
+             patch('src.api.admin.knowledge.get_job_queue') as mock_queue:
+
+            mock_queue.return_value.retry = AsyncMock(return_value=False)
+
+            response = self.client.post(
+                "/api/admin/knowledge/uploads/test-upload-id/retry",
+                headers={"Authorization": f"Bearer {mock_admin_token}"}
+            )
+
+            assert response.status_code == 409
+            mock_processor.return_value.reset_upload.assert_not_called()
 
     def test_rollback_upload_success(self, mock_admin_token):
         """测试回滚上传成功"""
         upload_id = "test-upload-id"
 
-        with patch('src.api.admin.knowledge.DatabaseService') as mock_db_service, \
+        with self.override_db_service() as mock_db_service, \
              patch('src.api.admin.knowledge.FileUploadProcessor') as mock_processor:
 
-            # 模拟数据库服务
-            mock_db_service.return_value = MagicMock()
-
             # 模拟处理器
             mock_processor.return_value.rollback_upload.return_value = True
 
@@ -282,6 +345,7 @@ class TestFileUploadAPI:
             # 验证响应
             assert response.status_code == 200
             assert "回滚成功" in response.json()["message"]
+            mock_processor.assert_called_once_with(mock_db_service)
 
     def test_preview_file_success(self, mock_admin_token, mock_upload_file):
         """测试文件预览成功"""
@@ -313,18 +377,19 @@ class TestFileUploadAPI:
     def test_preview_file_size_limit(self, mock_admin_token):
         """测试文件预览大小限制"""
         # 创建超过限制的文件
-        large_content = b"x" * (10 * 1024 * 1024 + 1)
+        large_content = b"x" * (1024 * 1024 + 1)
         large_file = UploadFile(
             file=BytesIO(large_content),
             filename="large.txt",
             size=len(large_content)
         )
 
-        response = self.client.post(
-            "/api/admin/knowledge/preview",
-            files={"file": ("large.txt", large_file.file, "text/plain")},
-            headers={"Authorization": f"Bearer {mock_admin_token}"}
-        )
+        with patch('src.api.admin.knowledge.FileParser.MAX_FILE_SIZE', 1024 * 1024):
+            response = self.client.post(
+                "/api/admin/knowledge/preview",
+                files={"file": ("large.txt", large_file.file, "text/plain")},
+                headers={"Authorization": f"Bearer {mock_admin_token}"}
+            )
 
         # 验证响应
         assert response.status_code == 400
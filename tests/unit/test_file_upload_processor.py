@@ -0,0 +1,322 @@
+"""
+文件入库流水线单元测试
+"""
+
+import asyncio
+import os
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.services import file_upload_processor as processor_module
+from src.services.file_upload_processor import FileUploadProcessor
+from src.services.job_queue import PermanentJobError
+
+EMBEDDING_LATENCY = 0.01
+
+
+class FakeEmbeddingService:
+    """模拟固定网络延迟的 Embedding 服务，记录并发数"""
+
+    def __init__(self, fail_on: str | None = None):
+        self.fail_on = fail_on
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def get_embedding(self, text):
+        return (await self.get_embeddings([text]))[0]
+
+    async def get_embeddings(self, texts):
+        self.calls.append(list(texts))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(EMBEDDING_LATENCY)
+            if self.fail_on in texts:
+                raise RuntimeError("provider error")
+            return [[float(len(text))] for text in texts]
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.fixture
+def upload_record():
+    record = MagicMock()
+    record.id = "upload-1"
+    record.filename = "manual.pdf"
+    record.file_type = "pdf"
+    record.source = "docs"
+    record.version = "1.0"
+    record.uploader = "admin"
+    return record
+
+
+@pytest.fixture
+def knowledge_repo(mocker):
+    repo = MagicMock()
+    repo.insert = AsyncMock(side_effect=lambda documents: len(documents))
+    repo.add_document = AsyncMock(side_effect=lambda text, metadata, embedding: f"doc-{metadata['chunk_index']}")
+    mocker.patch.object(processor_module, "get_milvus_client", AsyncMock())
+    mocker.patch.object(processor_module, "KnowledgeRepository", return_value=repo)
+    return repo
+
+
+@pytest.fixture
+def ingest_settings(mocker):
+    settings = mocker.patch.object(processor_module, "settings")
+    settings.ingest_embedding_batch_size = 8
+    settings.ingest_embedding_concurrency = 2
+    settings.ingest_insert_batch_size = 20
+    return settings
+
+
+@pytest.fixture
+def processor(mocker):
+    processor = FileUploadProcessor(MagicMock())
+    mocker.patch.object(processor, "_update_status", AsyncMock())
+    return processor
+
+
+def use_embedding_service(mocker, service):
+    mocker.patch.object(processor_module, "get_embedding_service", return_value=service)
+    return service
+
+
+async def _chunks(*chunks):
+    """模拟任务队列逐块返回的文件内容"""
+    for chunk in chunks:
+        yield chunk
+
+
+class TestStorePipeline:
+    """测试批量向量化与批量写入"""
+
+    @pytest.mark.asyncio
+    async def test_batches_and_bulk_insert(self, mocker, processor, upload_record, knowledge_repo, ingest_settings):
+        embedding_service = use_embedding_service(mocker, FakeEmbeddingService())
+        chunks = [f"分块{i}" for i in range(50)]
+
+        milvus_ids = await processor._store_to_milvus(chunks, upload_record, {})
+
+        assert [len(batch) for batch in embedding_service.calls] == [8] * 6 + [2]
+        assert embedding_service.max_in_flight <= 2
+        knowledge_repo.add_document.assert_not_called()
+
+        inserted = [doc for call in knowledge_repo.insert.call_args_list for doc in call.args[0]]
+        assert all(len(call.args[0]) <= 20 + 8 for call in knowledge_repo.insert.call_args_list)
+        assert sorted(doc["metadata"]["chunk_index"] for doc in inserted) == list(range(50))
+        assert len(milvus_ids) == 50
+
+        by_index = {doc["metadata"]["chunk_index"]: doc for doc in inserted}
+        assert milvus_ids == [by_index[i]["id"] for i in range(50)]
+        assert by_index[3]["text"] == "分块3"
+        assert by_index[3]["metadata"]["total_chunks"] == 50
+        assert by_index[3]["metadata"]["upload_id"] == "upload-1"
+
+    @pytest.mark.asyncio
+    async def test_progress_reported_per_batch(self, mocker, processor, upload_record, knowledge_repo, ingest_settings):
+        use_embedding_service(mocker, FakeEmbeddingService())
+
+        await processor._store_to_milvus([f"分块{i}" for i in range(40)], upload_record, {})
+
+        progress = [call.kwargs["progress"] for call in processor._update_status.call_args_list]
+        assert len(progress) == 5
+        assert progress == sorted(progress)
+        assert progress[-1] == 90
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_skipped(self, mocker, processor, upload_record, knowledge_repo, ingest_settings):
+        use_embedding_service(mocker, FakeEmbeddingService(fail_on="分块10"))
+
+        milvus_ids = await processor._store_to_milvus([f"分块{i}" for i in range(24)], upload_record, {})
+
+        inserted = [doc for call in knowledge_repo.insert.call_args_list for doc in call.args[0]]
+        assert len(milvus_ids) == 16
+        assert all(not 8 <= doc["metadata"]["chunk_index"] < 16 for doc in inserted)
+
+    @pytest.mark.asyncio
+    async def test_all_failed_raises(self, mocker, processor, upload_record, knowledge_repo, ingest_settings):
+        knowledge_repo.insert.side_effect = RuntimeError("milvus down")
+        use_embedding_service(mocker, FakeEmbeddingService())
+
+        with pytest.raises(ValueError):
+            await processor._store_to_milvus(["分块"], upload_record, {})
+
+
+class TestStreamPipeline:
+    """测试解析与向量化重叠执行"""
+
+    @pytest.mark.asyncio
+    async def test_embedding_starts_before_parsing_finishes(self, mocker, processor, upload_record, knowledge_repo, ingest_settings):
+        embedding_service = use_embedding_service(mocker, FakeEmbeddingService())
+        events = []
+
+        async def parsed_batches():
+            for segment in range(5):
+                events.append(("parsed", segment, len(embedding_service.calls)))
+                yield [f"段{segment}-{i}" for i in range(8)], (segment + 1) / 5
+                await asyncio.sleep(EMBEDDING_LATENCY * 2)
+
+        milvus_ids = await processor._store_chunk_stream(parsed_batches(), upload_record)
+
+        # 最后一段解析前已经有分块完成向量化请求
+        assert events[-1][2] > 0
+        assert len(milvus_ids) == 40
+        inserted = [doc for call in knowledge_repo.insert.call_args_list for doc in call.args[0]]
+        assert "total_chunks" not in inserted[0]["metadata"]
+        progress = [call.kwargs["progress"] for call in processor._update_status.call_args_list]
+        assert progress == sorted(progress) and progress[-1] == 90
+
+    @pytest.mark.asyncio
+    async def test_parse_failure_removes_stored_chunks(self, mocker, processor, upload_record, knowledge_repo, ingest_settings):
+        use_embedding_service(mocker, FakeEmbeddingService())
+        knowledge_repo.delete_document = AsyncMock(return_value=True)
+        ingest_settings.ingest_insert_batch_size = 1
+
+        async def parsed_batches():
+            yield [f"分块{i}" for i in range(8)], 0.5
+            await asyncio.sleep(EMBEDDING_LATENCY * 3)
+            raise ValueError("PDF 文件解析失败")
+
+        with pytest.raises(ValueError, match="PDF 文件解析失败"):
+            await processor._store_chunk_stream(parsed_batches(), upload_record)
+
+        assert knowledge_repo.delete_document.await_count == 8
+
+    @pytest.mark.asyncio
+    async def test_no_chunks_raises(self, mocker, processor, upload_record, knowledge_repo, ingest_settings):
+        use_embedding_service(mocker, FakeEmbeddingService())
+
+        async def parsed_batches():
+            yield [], 1.0
+
+        with pytest.raises(ValueError, match="没有有效内容"):
+            await processor._store_chunk_stream(parsed_batches(), upload_record)
+
+
+class TestFileUploadJob:
+    """测试任务队列处理函数"""
+
+    @pytest.fixture
+    def db_service(self, mocker):
+        db_service = MagicMock()
+        db_service.close = AsyncMock()
+        mocker.patch.object(processor_module, "get_database_service", return_value=db_service)
+        return db_service
+
+    @pytest.fixture
+    def queue(self):
+        queue = MagicMock()
+        queue.has_blob = AsyncMock(return_value=True)
+        queue.iter_blob = MagicMock(return_value=_chunks(b"file content"))
+        return queue
+
+    @pytest.fixture
+    def job(self):
+        return {"task_id": "upload-1", "payload": {"upload_id": "upload-1"}, "attempts": 3, "max_attempts": 3}
+
+    @pytest.mark.asyncio
+    async def test_success(self, mocker, db_service, queue, job):
+        process_file = mocker.patch.object(FileUploadProcessor, "process_file", AsyncMock())
+
+        await processor_module.run_file_upload_job(job, queue)
+
+        # 文件内容来自任务队列，不依赖 API 主机上的临时文件
+        queue.iter_blob.assert_called_once_with("upload-1")
+        process_file.assert_awaited_once_with("upload-1", queue.iter_blob.return_value)
+        # 共享连接池，任务结束时不关闭
+        db_service.close.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_failure_raises_for_retry(self, mocker, db_service, queue, job):
+        mocker.patch.object(FileUploadProcessor, "process_file", AsyncMock(side_effect=RuntimeError("milvus down")))
+        mark_failed = mocker.patch.object(FileUploadProcessor, "mark_failed", AsyncMock())
+
+        with pytest.raises(RuntimeError):
+            await processor_module.run_file_upload_job(job, queue)
+
+        mark_failed.assert_awaited_once_with("upload-1", "milvus down")
+
+    @pytest.mark.asyncio
+    async def test_failure_before_last_attempt_stays_pending(self, mocker, db_service, queue, job):
+        """任务队列还会自动重试时不标记为失败，避免等待重试期间被手动重试"""
+        job["attempts"] = 1
+        mocker.patch.object(FileUploadProcessor, "process_file", AsyncMock(side_effect=RuntimeError("milvus down")))
+        mark_failed = mocker.patch.object(FileUploadProcessor, "mark_failed", AsyncMock())
+        update_status = mocker.patch.object(FileUploadProcessor, "_update_status", AsyncMock())
+
+        with pytest.raises(RuntimeError):
+            await processor_module.run_file_upload_job(job, queue)
+
+        mark_failed.assert_not_awaited()
+        assert update_status.call_args.kwargs["status"] == "pending"
+        assert "milvus down" in update_status.call_args.kwargs["error_message"]
+
+    @pytest.mark.asyncio
+    async def test_permanent_error_marks_failed_immediately(self, mocker, db_service, queue, job):
+        job["attempts"] = 1
+        queue.has_blob.return_value = False
+        process_file = mocker.patch.object(
+            FileUploadProcessor, "process_file", AsyncMock(side_effect=PermanentJobError("过期"))
+        )
+        mark_failed = mocker.patch.object(FileUploadProcessor, "mark_failed", AsyncMock())
+
+        with pytest.raises(PermanentJobError):
+            await processor_module.run_file_upload_job(job, queue)
+
+        process_file.assert_awaited_once_with("upload-1", None)
+        mark_failed.assert_awaited_once_with("upload-1", "过期")
+
+
+class TestProcessUploadedContent:
+    """测试 worker 使用任务中的文件内容处理上传"""
+
+    @pytest.fixture
+    def upload_repo(self, mocker, upload_record):
+        upload_record.file_path = None
+        repo = MagicMock()
+        repo.get_upload_by_id = AsyncMock(return_value=upload_record)
+        repo.update_status = AsyncMock()
+        mocker.patch.object(processor_module, "FileUploadRepository", return_value=repo)
+        return repo
+
+    @pytest.fixture
+    def processor(self, mocker):
+        processor = FileUploadProcessor(MagicMock())
+        mocker.patch.object(processor, "_update_status", AsyncMock())
+        mocker.patch.object(processor, "_update_result", AsyncMock())
+        mocker.patch.object(processor, "_store_chunk_stream", AsyncMock(return_value=["doc-1"]))
+        return processor
+
+    @pytest.mark.asyncio
+    async def test_content_parsed_from_local_temp_file(self, processor, upload_repo):
+        seen = {}
+
+        def iter_chunks(path, filename):
+            with open(path, "rb") as f:
+                seen.update(path=path, content=f.read(), filename=filename)
+            return MagicMock()
+
+        processor.file_parser.iter_chunks = iter_chunks
+
+        await processor.process_file("upload-1", _chunks(b"%PDF-1.4 ", b"content"))
+
+        assert seen["content"] == b"%PDF-1.4 content"
+        assert seen["path"].endswith(".pdf") and seen["filename"] == "manual.pdf"
+        assert not os.path.exists(seen["path"])
+        processor._update_result.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_missing_content_is_permanent(self, processor, upload_repo):
+        with pytest.raises(PermanentJobError, match="重新上传"):
+            await processor.process_file("upload-1", None)
+
+        processor._store_chunk_stream.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_missing_record_is_permanent(self, processor, upload_repo):
+        upload_repo.get_upload_by_id.return_value = None
+
+        with pytest.raises(PermanentJobError, match="上传记录不存在"):
+            await processor.process_file("upload-1", _chunks(b"content"))
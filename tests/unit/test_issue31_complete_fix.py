@@ -30,7 +30,7 @@ class TestIssue31CompleteFix:
             Knowledge(text="测试文档", score=0.9, metadata={})
         ]
 
-        with patch('src.agent.main.tools.create_embeddings', return_value=mock_embeddings), \
+        with patch('src.agent.main.tools.get_shared_embeddings', return_value=mock_embeddings), \
              patch('src.repositories.get_knowledge_repository', return_value=mock_knowledge_repo), \
              patch('src.agent.main.tools.logger') as mock_logger:
 
@@ -67,7 +67,7 @@ class TestIssue31CompleteFix:
         mock_embeddings.aembed_query.return_value = [0.1] * 1536
 
         mock_llm_factory = MagicMock()
-        mock_llm_factory.create_embeddings.return_value = mock_embeddings
+        mock_llm_factory.get_shared_embeddings.return_value = mock_embeddings
 
         mock_knowledge_repo = AsyncMock()
         mock_knowledge_repo.search.return_value = [
@@ -107,7 +107,7 @@ class TestIssue31CompleteFix:
             Knowledge(text="测试文档", score=0.9, metadata={})
         ]
 
-        with patch('src.agent.main.tools.create_embeddings', return_value=mock_embeddings), \
+        with patch('src.agent.main.tools.get_shared_embeddings', return_value=mock_embeddings), \
              patch('src.repositories.get_knowledge_repository', return_value=mock_knowledge_repo), \
              patch('src.agent.main.tools.logger') as mock_logger:
 
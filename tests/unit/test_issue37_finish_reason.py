@@ -11,6 +11,7 @@ from fastapi.testclient import TestClient
 
 from src.main import app
 from src.models.openai_schema import ChatCompletionChoice, ChatMessage
+from src.services.message_filter import FilterVerdict
 
 
 class TestIssue37FinishReason:
@@ -65,9 +66,11 @@ class TestIssue37FinishReason:
         client = TestClient(app)
 
         # 模拟消息过滤场景，应该返回 content_filter
-        with patch("src.api.v1.openai_compat._validate_message_source") as mock_validate:
+        with patch("src.api.v1.openai_compat.get_message_filter") as mock_filter:
             # 模拟消息被过滤
-            mock_validate.return_value = False
+            mock_filter.return_value.check.return_value = FilterVerdict(
+                allowed=False, reason="system_message_detected"
+            )
 
             response = client.post(
                 "/v1/chat/completions",
@@ -91,9 +94,11 @@ class TestIssue37FinishReason:
         client = TestClient(app)
 
         # 模拟消息过滤场景
-        with patch("src.api.v1.openai_compat._validate_message_source") as mock_validate:
+        with patch("src.api.v1.openai_compat.get_message_filter") as mock_filter:
             # 模拟消息被过滤
-            mock_validate.return_value = False
+            mock_filter.return_value.check.return_value = FilterVerdict(
+                allowed=False, reason="system_message_detected"
+            )
 
             response = client.post(
                 "/v1/chat/completions",
@@ -4,14 +4,17 @@ Issue #41 修复测试
 测试SiliconFlow Embedding API调用格式错误修复。
 """
 
+import asyncio
 from unittest.mock import AsyncMock, Mock, patch
 
 import httpx
 import pytest
 
+from src.services.providers import siliconflow_provider
 from src.services.providers.siliconflow_provider import (
     SiliconFlowEmbeddingProvider,
     SiliconFlowEmbeddings,
+    close_siliconflow_embeddings,
 )
 
 
@@ -46,8 +49,10 @@ class TestIssue41SiliconFlowEmbeddingFix:
         }
         mock_response.raise_for_status.return_value = None
 
-        with patch("httpx.AsyncClient") as mock_client:
-            mock_client.return_value.__aenter__.return_value.post = AsyncMock(return_value=mock_response)
+        mock_client = Mock()
+
+        with patch.object(embeddings, "_get_client", return_value=mock_client):
+            mock_client.post = AsyncMock(return_value=mock_response)
 
             result = await embeddings.aembed_query("退货")
 
@@ -55,7 +60,7 @@ class TestIssue41SiliconFlowEmbeddingFix:
             assert result == [0.1, 0.2, 0.3]
 
             # 验证API调用参数
-            call_args = mock_client.return_value.__aenter__.return_value.post.call_args
+            call_args = mock_client.post.call_args
             assert call_args[1]["json"]["input"] == "退货"  # 文本格式
             assert call_args[1]["json"]["model"] == "BAAI/bge-large-zh-v1.5"
             assert "input" in call_args[1]["json"]
@@ -79,8 +84,10 @@ class TestIssue41SiliconFlowEmbeddingFix:
         }
         mock_response.raise_for_status.return_value = None
 
-        with patch("httpx.AsyncClient") as mock_client:
-            mock_client.return_value.__aenter__.return_value.post = AsyncMock(return_value=mock_response)
+        mock_client = Mock()
+
+        with patch.object(embeddings, "_get_client", return_value=mock_client):
+            mock_client.post = AsyncMock(return_value=mock_response)
 
             result = await embeddings.aembed_documents(["退货", "退款"])
 
@@ -90,7 +97,7 @@ class TestIssue41SiliconFlowEmbeddingFix:
             assert result[1] == [0.4, 0.5, 0.6]
 
             # 验证API调用参数
-            call_args = mock_client.return_value.__aenter__.return_value.post.call_args
+            call_args = mock_client.post.call_args
             assert call_args[1]["json"]["input"] == ["退货", "退款"]  # 文本列表格式
             assert call_args[1]["json"]["model"] == "BAAI/bge-large-zh-v1.5"
             assert "input" in call_args[1]["json"]
@@ -181,8 +188,9 @@ class TestIssue41SiliconFlowEmbeddingFix:
         # 模拟API错误
         mock_response = Mock()
         mock_response.status_code = 500
-        with patch("httpx.AsyncClient") as mock_client:
-            mock_client.return_value.__aenter__.return_value.post = AsyncMock(
+        mock_client = Mock()
+        with patch.object(embeddings, "_get_client", return_value=mock_client):
+            mock_client.post = AsyncMock(
                 side_effect=httpx.HTTPStatusError("500 Internal Server Error", request=Mock(), response=mock_response)
             )
 
@@ -204,9 +212,11 @@ class TestIssue41SiliconFlowEmbeddingFix:
         }
         mock_response.raise_for_status.return_value = None
 
-        with patch("httpx.AsyncClient") as mock_client:
+        mock_client = Mock()
+
+        with patch.object(embeddings, "_get_client", return_value=mock_client):
             mock_post = AsyncMock(return_value=mock_response)
-            mock_client.return_value.__aenter__.return_value.post = mock_post
+            mock_client.post = mock_post
 
             await embeddings.aembed_query("退货")
 
@@ -242,13 +252,15 @@ class TestIssue41SiliconFlowEmbeddingFix:
         mock_5xx_response = Mock()
         mock_5xx_response.status_code = 500
 
-        with patch("httpx.AsyncClient") as mock_client:
+        mock_client = Mock()
+
+        with patch.object(embeddings, "_get_client", return_value=mock_client):
             # 第一次调用失败，第二次成功
             mock_post = AsyncMock(side_effect=[
                 httpx.HTTPStatusError("500 Internal Server Error", request=Mock(), response=mock_5xx_response),
                 mock_response_success
             ])
-            mock_client.return_value.__aenter__.return_value.post = mock_post
+            mock_client.post = mock_post
 
             result = await embeddings.aembed_query("退货")
 
@@ -269,10 +281,12 @@ class TestIssue41SiliconFlowEmbeddingFix:
         mock_4xx_response = Mock()
         mock_4xx_response.status_code = 400
 
-        with patch("httpx.AsyncClient") as mock_client:
+        mock_client = Mock()
+
+        with patch.object(embeddings, "_get_client", return_value=mock_client):
             # 模拟4xx错误
             mock_post = AsyncMock(side_effect=httpx.HTTPStatusError("400 Bad Request", request=Mock(), response=mock_4xx_response))
-            mock_client.return_value.__aenter__.return_value.post = mock_post
+            mock_client.post = mock_post
 
             with pytest.raises(httpx.HTTPStatusError):
                 await embeddings.aembed_query("退货")
@@ -295,13 +309,15 @@ class TestIssue41SiliconFlowEmbeddingFix:
         }
         mock_response_success.raise_for_status.return_value = None
 
-        with patch("httpx.AsyncClient") as mock_client:
+        mock_client = Mock()
+
+        with patch.object(embeddings, "_get_client", return_value=mock_client):
             # 第一次网络错误，第二次成功
             mock_post = AsyncMock(side_effect=[
                 httpx.TimeoutException("Request timeout"),
                 mock_response_success
             ])
-            mock_client.return_value.__aenter__.return_value.post = mock_post
+            mock_client.post = mock_post
 
             result = await embeddings.aembed_query("退货")
 
@@ -318,10 +334,12 @@ class TestIssue41SiliconFlowEmbeddingFix:
             model="BAAI/bge-large-zh-v1.5"
         )
 
-        with patch("httpx.AsyncClient") as mock_client:
+        mock_client = Mock()
+
+        with patch.object(embeddings, "_get_client", return_value=mock_client):
             # 模拟持续的网络错误
             mock_post = AsyncMock(side_effect=httpx.TimeoutException("Request timeout"))
-            mock_client.return_value.__aenter__.return_value.post = mock_post
+            mock_client.post = mock_post
 
             with pytest.raises(httpx.TimeoutException):
                 await embeddings.aembed_query("退货")
@@ -329,81 +347,163 @@ class TestIssue41SiliconFlowEmbeddingFix:
             # 验证重试了最大次数 + 1 次（初始调用 + 重试次数）
             assert mock_post.call_count == embeddings.max_retries + 1
 
-    def test_sync_methods_in_event_loop(self):
-        """测试同步方法在事件循环中的行为"""
+    def test_sync_methods_use_shared_loop_thread(self):
+        """测试同步方法复用常驻的后台事件循环线程"""
         embeddings = SiliconFlowEmbeddings(
             api_key="test-key",
             model="BAAI/bge-large-zh-v1.5"
         )
 
-        # 模拟异步方法返回结果
-        with patch.object(embeddings, 'aembed_query', return_value=[0.1, 0.2, 0.3]):
-            # 模拟在事件循环中调用同步方法
-            with patch('asyncio.get_running_loop') as mock_get_loop:
-                # 模拟已有事件循环
-                mock_loop = Mock()
-                mock_get_loop.return_value = mock_loop
-
-                # 模拟 ThreadPoolExecutor
-                with patch('concurrent.futures.ThreadPoolExecutor') as mock_executor:
-                    mock_future = Mock()
-                    mock_future.result.return_value = [0.1, 0.2, 0.3]
-                    mock_executor.return_value.__enter__.return_value.submit.return_value = mock_future
-
-                    result = embeddings.embed_query("退货")
-
-                    # 验证结果
-                    assert result == [0.1, 0.2, 0.3]
-                    # 验证使用了 ThreadPoolExecutor
-                    mock_executor.assert_called_once()
-
-    def test_sync_methods_outside_event_loop(self):
-        """测试同步方法在事件循环外的行为"""
+        loop_ids = []
+
+        async def fake_aembed_query(text):
+            loop_ids.append(id(asyncio.get_running_loop()))
+            return [0.1, 0.2, 0.3]
+
+        with patch.object(embeddings, "aembed_query", side_effect=fake_aembed_query):
+            first = embeddings.embed_query("退货")
+            second = embeddings.embed_query("换货")
+
+        assert first == [0.1, 0.2, 0.3]
+        assert second == [0.1, 0.2, 0.3]
+        # 两次同步调用在同一个事件循环中执行
+        assert len(set(loop_ids)) == 1
+
+    @pytest.mark.asyncio
+    async def test_sync_methods_in_async_context(self):
+        """测试在异步上下文中调用同步方法不会嵌套 asyncio.run"""
         embeddings = SiliconFlowEmbeddings(
             api_key="test-key",
             model="BAAI/bge-large-zh-v1.5"
         )
 
-        # 模拟异步方法返回结果
-        with patch.object(embeddings, 'aembed_query', return_value=[0.1, 0.2, 0.3]):
-            # 模拟没有事件循环
-            with patch('asyncio.get_running_loop', side_effect=RuntimeError("No running event loop")):
-                with patch('asyncio.run') as mock_asyncio_run:
-                    mock_asyncio_run.return_value = [0.1, 0.2, 0.3]
-
-                    result = embeddings.embed_query("退货")
-
-                    # 验证结果
-                    assert result == [0.1, 0.2, 0.3]
-                    # 验证使用了 asyncio.run，传入的是协程对象
-                    mock_asyncio_run.assert_called_once()
-                    # 验证调用参数是协程对象
-                    call_args = mock_asyncio_run.call_args[0]
-                    assert len(call_args) == 1
-                    # 验证传入的是协程对象（通过检查类型）
-                    import inspect
-                    assert inspect.iscoroutine(call_args[0])
+        with patch.object(embeddings, "aembed_documents", AsyncMock(return_value=[[0.1], [0.2]])):
+            result = embeddings.embed_documents(["退货", "换货"])
+
+        assert result == [[0.1], [0.2]]
 
     @pytest.mark.asyncio
-    async def test_sync_methods_in_async_context(self):
-        """测试在异步上下文中调用同步方法"""
+    async def test_client_reused_within_event_loop(self):
+        """测试同一事件循环内复用 httpx 客户端"""
         embeddings = SiliconFlowEmbeddings(
             api_key="test-key",
-            model="BAAI/bge-large-zh-v1.5"
+            model="BAAI/bge-large-zh-v1.5",
+            max_connections=5,
+            max_keepalive_connections=2,
         )
 
-        # 模拟异步方法返回结果
-        with patch.object(embeddings, 'aembed_query', return_value=[0.1, 0.2, 0.3]):
-            # 在异步上下文中调用同步方法
-            with patch('concurrent.futures.ThreadPoolExecutor') as mock_executor:
-                mock_future = Mock()
-                mock_future.result.return_value = [0.1, 0.2, 0.3]
-                mock_executor.return_value.__enter__.return_value.submit.return_value = mock_future
+        first = embeddings._get_client()
+        second = embeddings._get_client()
+        assert first is second
+
+        await embeddings.aclose()
+        assert first.is_closed
+        assert embeddings._get_client() is not first
+        await embeddings.aclose()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_queries_coalesced_into_one_request(self):
+        """测试合并窗口内的并发查询只发送一次请求，并对重复文本去重"""
+        embeddings = SiliconFlowEmbeddings(
+            api_key="test-key",
+            model="BAAI/bge-large-zh-v1.5",
+            batch_window_ms=5,
+        )
+
+        mock_response = Mock()
+        mock_response.json.return_value = {
+            "data": [
+                {"embedding": [0.1]},
+                {"embedding": [0.2]},
+            ]
+        }
+        mock_response.raise_for_status.return_value = None
+
+        mock_client = Mock()
+        mock_client.post = AsyncMock(return_value=mock_response)
+
+        with patch.object(embeddings, "_get_client", return_value=mock_client):
+            results = await asyncio.gather(
+                embeddings.aembed_query("退货"),
+                embeddings.aembed_query("换货"),
+                embeddings.aembed_query("退货"),
+            )
+
+        assert results == [[0.1], [0.2], [0.1]]
+        mock_client.post.assert_called_once()
+        assert mock_client.post.call_args.kwargs["json"]["input"] == ["退货", "换货"]
 
-                result = embeddings.embed_query("退货")
+    @pytest.mark.asyncio
+    async def test_batch_flushes_when_max_size_reached(self):
+        """测试达到批次上限时立即发送，不等待合并窗口"""
+        embeddings = SiliconFlowEmbeddings(
+            api_key="test-key",
+            model="BAAI/bge-large-zh-v1.5",
+            batch_window_ms=100,
+            batch_max_size=2,
+        )
+
+        mock_response = Mock()
+        mock_response.json.return_value = {"data": [{"embedding": [0.1]}, {"embedding": [0.2]}]}
+        mock_response.raise_for_status.return_value = None
+
+        mock_client = Mock()
+        mock_client.post = AsyncMock(return_value=mock_response)
+
+        with patch.object(embeddings, "_get_client", return_value=mock_client):
+            results = await asyncio.wait_for(
+                asyncio.gather(embeddings.aembed_query("退货"), embeddings.aembed_query("换货")),
+                timeout=0.05,
+            )
+
+        assert results == [[0.1], [0.2]]
+
+    @pytest.mark.asyncio
+    async def test_batch_error_propagates_to_all_callers(self):
+        """测试合并请求失败时所有调用方都收到异常"""
+        embeddings = SiliconFlowEmbeddings(
+            api_key="test-key",
+            model="BAAI/bge-large-zh-v1.5",
+            batch_window_ms=5,
+        )
+
+        mock_response = Mock()
+        mock_response.status_code = 400
+        mock_response.raise_for_status.side_effect = httpx.HTTPStatusError(
+            "Bad Request", request=Mock(), response=mock_response
+        )
+
+        mock_client = Mock()
+        mock_client.post = AsyncMock(return_value=mock_response)
+
+        with patch.object(embeddings, "_get_client", return_value=mock_client):
+            results = await asyncio.gather(
+                embeddings.aembed_query("退货"),
+                embeddings.aembed_query("换货"),
+                return_exceptions=True,
+            )
+
+        assert all(isinstance(r, httpx.HTTPStatusError) for r in results)
+        mock_client.post.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_close_releases_clients_on_all_loops(self):
+        """测试关闭时释放当前事件循环和后台线程上的客户端，并停止后台线程"""
+        embeddings = SiliconFlowEmbeddings(
+            api_key="test-key",
+            model="BAAI/bge-large-zh-v1.5",
+        )
+
+        async def open_client():
+            return embeddings._get_client()
+
+        loop_client = embeddings._get_client()
+        thread_client = await asyncio.to_thread(
+            siliconflow_provider._sync_loop_thread.run, open_client()
+        )
 
-                # 验证结果
-                assert result == [0.1, 0.2, 0.3]
-                # 验证使用了 ThreadPoolExecutor
-                mock_executor.assert_called_once()
+        await close_siliconflow_embeddings()
 
+        assert loop_client.is_closed
+        assert thread_client.is_closed
+        assert not siliconflow_provider._sync_loop_thread.is_running
@@ -0,0 +1,379 @@
+"""
+后台任务队列单元测试
+"""
+
+import asyncio
+import time
+
+import fakeredis
+import pytest
+import redis
+
+from src.services import job_queue as job_queue_module
+from src.services.job_queue import (
+    JOB_COMPLETED,
+    JOB_FAILED,
+    JOB_PENDING,
+    JOB_PROCESSING,
+    JobQueue,
+    JobWorker,
+    PermanentJobError,
+    register_job_handler,
+)
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def queue(server):
+    return JobQueue(fakeredis.aioredis.FakeRedis(server=server), "test", blocking=False)
+
+
+@pytest.fixture(autouse=True)
+def job_settings(mocker):
+    mocker.patch.object(job_queue_module.settings, "job_retry_backoff_seconds", 0.0)
+    mocker.patch.object(job_queue_module.settings, "job_max_attempts", 3)
+    mocker.patch.object(job_queue_module.settings, "job_result_ttl", 3600)
+    mocker.patch.dict(job_queue_module._JOB_HANDLERS, clear=True)
+    mocker.patch.dict(job_queue_module._JOB_CONCURRENCY, clear=True)
+    return job_queue_module.settings
+
+
+class TestJobQueue:
+    """测试队列基本操作"""
+
+    @pytest.mark.asyncio
+    async def test_lifecycle(self, queue):
+        job_id = await queue.enqueue("echo", {"value": 1}, blob=b"csv", state={"progress": 0})
+
+        job = await queue.get(job_id)
+        assert job["status"] == JOB_PENDING
+        assert job["payload"] == {"value": 1}
+        assert job["progress"] == 0
+        assert await queue.get_blob(job_id) == b"csv"
+
+        assert await queue.dequeue(timeout=0.01) == job_id
+        job = await queue.get(job_id)
+        assert (job["status"], job["attempts"]) == (JOB_PROCESSING, 1)
+        assert await queue.stats() == {"pending": 0, "processing": 1, "delayed": 0}
+
+        await queue.update(job_id, progress=50)
+        await queue.complete(job_id)
+
+        job = await queue.get(job_id)
+        assert (job["status"], job["progress"]) == (JOB_COMPLETED, 50)
+        assert await queue.get_blob(job_id) is None
+        assert await queue.stats() == {"pending": 0, "processing": 0, "delayed": 0}
+        assert await queue.client.ttl(queue._job_key(job_id)) > 0
+
+    @pytest.mark.asyncio
+    async def test_fifo_and_empty(self, queue):
+        first = await queue.enqueue("echo", {})
+        second = await queue.enqueue("echo", {})
+
+        assert await queue.dequeue(timeout=0.01) == first
+        assert await queue.dequeue(timeout=0.01) == second
+        assert await queue.dequeue(timeout=0.01) is None
+
+    @pytest.mark.asyncio
+    async def test_status_visible_from_other_instance(self, server, queue):
+        """不同进程（不同连接）都能查询任务状态"""
+        job_id = await queue.enqueue("echo", {})
+        await queue.update(job_id, progress=42)
+
+        other = JobQueue(fakeredis.aioredis.FakeRedis(server=server), "test", blocking=False)
+
+        assert (await other.get(job_id))["progress"] == 42
+
+    @pytest.mark.asyncio
+    async def test_retry_with_exponential_backoff(self, queue, job_settings):
+        job_settings.job_retry_backoff_seconds = 10.0
+        job_id = await queue.enqueue("echo", {})
+
+        await queue.dequeue(timeout=0.01)
+        assert await queue.fail(job_id, "boom") is True
+        first_delay = await queue.client.zscore(queue.delayed_key, job_id) - time.time()
+
+        # 未到重试时间时不会被取出
+        assert await queue.dequeue(timeout=0.01) is None
+
+        await queue.client.zadd(queue.delayed_key, {job_id: 0})
+        assert await queue.dequeue(timeout=0.01) == job_id
+        assert await queue.fail(job_id, "boom") is True
+        second_delay = await queue.client.zscore(queue.delayed_key, job_id) - time.time()
+
+        assert 9 < first_delay <= 10
+        assert 19 < second_delay <= 20
+        job = await queue.get(job_id)
+        assert (job["status"], job["error"]) == (JOB_PENDING, "boom")
+
+    @pytest.mark.asyncio
+    async def test_fail_after_max_attempts(self, queue):
+        job_id = await queue.enqueue("echo", {}, blob=b"csv", max_attempts=1)
+
+        await queue.dequeue(timeout=0.01)
+
+        assert await queue.fail(job_id, "boom") is False
+        assert (await queue.get(job_id))["status"] == JOB_FAILED
+        # 失败任务保留输入，便于以同一任务 ID 重新提交
+        assert await queue.get_blob(job_id) == b"csv"
+        assert await queue.client.ttl(queue._blob_key(job_id)) > 0
+
+    @pytest.mark.asyncio
+    async def test_resubmit_failed_job(self, queue):
+        """最终失败的任务重新提交：记录重置，记录和输入不再过期"""
+        job_id = await queue.enqueue("echo", {"value": 1}, blob=b"csv", max_attempts=1)
+        await queue.dequeue(timeout=0.01)
+        await queue.update(job_id, retry_at=123.0)
+        await queue.fail(job_id, "boom")
+
+        assert await queue.retry(job_id) is True
+
+        job = await queue.get(job_id)
+        assert (job["status"], job["attempts"], job["error"], job["payload"]) == (JOB_PENDING, 0, None, {"value": 1})
+        assert "retry_at" not in job
+        assert await queue.client.ttl(queue._job_key(job_id)) == -1
+        assert await queue.client.ttl(queue._blob_key(job_id)) == -1
+        assert await queue.client.lrange(queue.pending_key, 0, -1) == [job_id.encode()]
+        # 已重新提交的任务不能再次提交
+        assert await queue.retry(job_id) is False
+
+    @pytest.mark.asyncio
+    async def test_resubmit_rejected_while_waiting_for_retry(self, queue, job_settings):
+        """等待自动重试的任务不能手动重试，避免同时出现在待执行队列和延迟集合中"""
+        job_settings.job_retry_backoff_seconds = 10.0
+        job_id = await queue.enqueue("echo", {}, blob=b"csv")
+        await queue.dequeue(timeout=0.01)
+        await queue.fail(job_id, "boom")
+
+        assert await queue.retry(job_id) is False
+        assert await queue.client.llen(queue.pending_key) == 0
+        assert await queue.client.zcard(queue.delayed_key) == 1
+
+    @pytest.mark.asyncio
+    async def test_resubmit_rejected_without_blob(self, queue):
+        """输入已过期的任务不能重新提交"""
+        job_id = await queue.enqueue("echo", {}, blob=b"csv", max_attempts=1)
+        await queue.dequeue(timeout=0.01)
+        await queue.fail(job_id, "boom")
+        await queue.client.delete(queue._blob_key(job_id))
+
+        assert await queue.retry(job_id) is False
+        assert await queue.retry("missing") is False
+        assert await queue.client.llen(queue.pending_key) == 0
+
+    @pytest.mark.asyncio
+    async def test_enqueue_replaces_previous_record(self, queue):
+        job_id = await queue.enqueue("echo", {}, max_attempts=1)
+        await queue.dequeue(timeout=0.01)
+        await queue.fail(job_id, "boom")
+
+        await queue.enqueue("echo", {}, job_id=job_id)
+
+        job = await queue.get(job_id)
+        assert (job["status"], job["error"]) == (JOB_PENDING, None)
+        assert await queue.client.ttl(queue._job_key(job_id)) == -1
+
+    @pytest.mark.asyncio
+    async def test_blob_stored_in_chunks(self, queue, mocker):
+        mocker.patch.object(job_queue_module, "BLOB_CHUNK_SIZE", 4)
+        job_id = await queue.enqueue("echo", {}, blob=b"0123456789")
+
+        assert await queue.client.llen(queue._blob_key(job_id)) == 3
+        assert await queue.get_blob(job_id) == b"0123456789"
+        assert [chunk async for chunk in queue.iter_blob(job_id)] == [b"0123", b"4567", b"89"]
+
+    @pytest.mark.asyncio
+    async def test_enqueue_staged_blob(self, queue, mocker):
+        """分块暂存的输入在提交任务时转为任务输入，不再过期"""
+        mocker.patch.object(job_queue_module, "BLOB_CHUNK_SIZE", 4)
+
+        async def chunks():
+            yield b"012345"
+            yield b"6789"
+
+        staging_id, size = await queue.stage_blob(chunks(), max_size=10)
+        assert size == 10
+        assert await queue.client.ttl(queue._staging_key(staging_id)) > 0
+
+        job_id = await queue.enqueue("echo", {}, staged_blob=staging_id)
+
+        assert await queue.client.exists(queue._staging_key(staging_id)) == 0
+        assert await queue.get_blob(job_id) == b"0123456789"
+        assert await queue.client.ttl(queue._blob_key(job_id)) == -1
+        assert await queue.dequeue(timeout=0.01) == job_id
+
+    @pytest.mark.asyncio
+    async def test_stage_blob_over_limit(self, queue):
+        read = []
+
+        async def chunks():
+            for chunk in (b"12345", b"67890", b"abcde"):
+                read.append(chunk)
+                yield chunk
+
+        staging_id, size = await queue.stage_blob(chunks(), max_size=8)
+
+        # 超过上限立即停止读取，已写入的内容被删除
+        assert (staging_id, size) == (None, 10)
+        assert len(read) == 2
+        assert await queue.client.keys(f"{queue.prefix}:staging:*") == []
+
+    @pytest.mark.asyncio
+    async def test_enqueue_expired_staged_blob_fails(self, queue):
+        with pytest.raises(redis.ResponseError):
+            await queue.enqueue("echo", {}, staged_blob="expired")
+
+        assert await queue.client.llen(queue.pending_key) == 0
+
+    @pytest.mark.asyncio
+    async def test_recover_only_expired_leases(self, queue):
+        job_id = await queue.enqueue("echo", {})
+        await queue.dequeue(timeout=0.01)
+
+        assert await queue.recover_stale() == 0
+        assert await queue.renew_lease(job_id)
+
+        await queue.client.zadd(queue.leases_key, {job_id: 0})
+        assert await queue.recover_stale() == 1
+        # 被回收后旧 worker 不能再续租
+        assert not await queue.renew_lease(job_id)
+        assert await queue.dequeue(timeout=0.01) == job_id
+        assert (await queue.get(job_id))["attempts"] == 2
+
+    @pytest.mark.asyncio
+    async def test_job_without_lease_gets_grace_period(self, queue):
+        """取出后尚未登记租约的任务先补登租约，不立即回收"""
+        job_id = await queue.enqueue("echo", {})
+        await queue.dequeue(timeout=0.01)
+        await queue.client.zrem(queue.leases_key, job_id)
+
+        assert await queue.recover_stale() == 0
+        assert await queue.client.zscore(queue.leases_key, job_id) > time.time()
+
+    @pytest.mark.asyncio
+    async def test_promote_delayed_once_across_workers(self, server, queue, job_settings):
+        job_settings.job_retry_backoff_seconds = 10.0
+        job_ids = [await queue.enqueue("echo", {}) for _ in range(3)]
+        for job_id in job_ids:
+            assert await queue.dequeue(timeout=0.01) == job_id
+            await queue.fail(job_id, "boom")
+        await queue.client.zadd(queue.delayed_key, {job_id: i for i, job_id in enumerate(job_ids)})
+        other = JobQueue(fakeredis.aioredis.FakeRedis(server=server), "test", blocking=False)
+
+        moved = await asyncio.gather(queue.promote_delayed(), other.promote_delayed())
+
+        assert sum(moved) == 3
+        assert await queue.stats() == {"pending": 3, "processing": 0, "delayed": 0}
+        assert [await queue.dequeue(timeout=0.01) for _ in range(3)] == job_ids
+
+
+class TestJobWorker:
+    """测试 worker 执行、重试与并发限制"""
+
+    @pytest.mark.asyncio
+    async def test_retries_until_success(self, queue):
+        attempts = []
+
+        @register_job_handler("flaky")
+        async def flaky(job, q):
+            attempts.append(job["attempts"])
+            await q.update(job["task_id"], progress=len(attempts) * 10)
+            if len(attempts) < 3:
+                raise RuntimeError("temporary")
+
+        job_id = await queue.enqueue("flaky", {})
+
+        await JobWorker(queue).drain()
+
+        job = await queue.get(job_id)
+        assert attempts == [1, 2, 3]
+        assert (job["status"], job["progress"], job["error"]) == (JOB_COMPLETED, 30, None)
+
+    @pytest.mark.asyncio
+    async def test_permanent_error_not_retried(self, queue):
+        calls = []
+
+        @register_job_handler("bad_input")
+        async def bad_input(job, q):
+            calls.append(job["task_id"])
+            raise PermanentJobError("invalid")
+
+        job_id = await queue.enqueue("bad_input", {})
+
+        await JobWorker(queue).drain()
+
+        assert len(calls) == 1
+        job = await queue.get(job_id)
+        assert (job["status"], job["error"]) == (JOB_FAILED, "invalid")
+
+    @pytest.mark.asyncio
+    async def test_unknown_job_type(self, queue):
+        job_id = await queue.enqueue("missing", {})
+
+        await JobWorker(queue).drain()
+
+        assert (await queue.get(job_id))["status"] == JOB_FAILED
+
+    @pytest.mark.asyncio
+    async def test_concurrency_limits(self, queue):
+        running = {"all": 0, "heavy": 0}
+        peak = {"all": 0, "heavy": 0}
+
+        async def track(kind):
+            running["all"] += 1
+            running[kind] = running.get(kind, 0) + 1
+            peak["all"] = max(peak["all"], running["all"])
+            peak[kind] = max(peak.get(kind, 0), running[kind])
+            await asyncio.sleep(0.02)
+            running["all"] -= 1
+            running[kind] -= 1
+
+        @register_job_handler("heavy", max_concurrency=1)
+        async def heavy(job, q):
+            await track("heavy")
+
+        @register_job_handler("light")
+        async def light(job, q):
+            await track("light")
+
+        job_ids = [await queue.enqueue("heavy", {}) for _ in range(3)]
+        job_ids += [await queue.enqueue("light", {}) for _ in range(5)]
+
+        worker = JobWorker(queue, concurrency=3)
+        run = asyncio.create_task(worker.run(poll_timeout=0.01))
+        for _ in range(200):
+            jobs = [await queue.get(job_id) for job_id in job_ids]
+            if all(job["status"] == JOB_COMPLETED for job in jobs):
+                break
+            await asyncio.sleep(0.01)
+        worker.stop()
+        await asyncio.wait_for(run, timeout=2)
+
+        assert all(job["status"] == JOB_COMPLETED for job in jobs)
+        assert peak["all"] == 3
+        assert peak["heavy"] == 1
+
+    @pytest.mark.asyncio
+    async def test_long_running_job_keeps_lease(self, server):
+        """执行时间超过租约的任务持续续租，其他 worker 不会回收"""
+        queue = JobQueue(fakeredis.aioredis.FakeRedis(server=server), "test", blocking=False, lease_seconds=0.15)
+        other = JobQueue(fakeredis.aioredis.FakeRedis(server=server), "test", blocking=False, lease_seconds=0.15)
+        recovered = []
+
+        @register_job_handler("slow")
+        async def slow(job, q):
+            for _ in range(6):
+                await asyncio.sleep(0.1)
+                recovered.append(await other.recover_stale())
+
+        job_id = await queue.enqueue("slow", {})
+        await JobWorker(queue).drain()
+
+        assert recovered == [0] * 6
+        job = await queue.get(job_id)
+        assert (job["status"], job["attempts"]) == (JOB_COMPLETED, 1)
+        assert await queue.client.zcard(queue.leases_key) == 0
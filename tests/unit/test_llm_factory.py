@@ -376,3 +376,36 @@ class TestEmbeddingFactory:
                 assert embeddings is not None
                 assert hasattr(embeddings, "embed_query")
 
+
+
+class TestSharedEmbeddings:
+    """共享 Embeddings 实例测试"""
+
+    def test_same_instance_reused(self, mocker):
+        """同一配置只创建一次实例（共用连接池和查询合并）"""
+        from src.services import llm_factory
+
+        create = mocker.patch.object(llm_factory, "create_embeddings", side_effect=lambda: object())
+
+        assert llm_factory.get_shared_embeddings() is llm_factory.get_shared_embeddings()
+        create.assert_called_once()
+
+    def test_new_instance_after_config_change(self, mocker):
+        from src.services import llm_factory
+
+        mocker.patch.object(llm_factory, "create_embeddings", side_effect=lambda: object())
+        first = llm_factory.get_shared_embeddings()
+
+        mocker.patch.object(llm_factory.settings, "siliconflow_api_key", "rotated-key")
+        assert llm_factory.settings.embedding_api_key == "rotated-key"
+        assert llm_factory.get_shared_embeddings() is not first
+
+    def test_reset(self, mocker):
+        from src.services import llm_factory
+
+        create = mocker.patch.object(llm_factory, "create_embeddings", side_effect=lambda: object())
+        llm_factory.get_shared_embeddings()
+        llm_factory.reset_shared_embeddings()
+        llm_factory.get_shared_embeddings()
+
+        assert create.call_count == 2
@@ -0,0 +1,82 @@
+"""
+测试 LLM 客户端池
+
+验证共享实例复用、按配置区分缓存以及连接池关闭。
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+from src.core.config import settings
+from src.services.llm_registry import LLMClientRegistry
+
+
+def test_registry_reuses_instance_for_same_config():
+    """相同配置只创建一次 LLM 实例，并共享 httpx 客户端"""
+    registry = LLMClientRegistry()
+
+    first = registry.get()
+    second = registry.get()
+
+    assert first is second
+    assert len(registry) == 1
+    assert first.async_client is not None
+    assert first.root_async_client._client is registry._client_options()["http_async_client"]
+
+
+def test_registry_creates_new_instance_when_temperature_changes():
+    """温度变化时按新键创建实例，连接池仍然共享"""
+    registry = LLMClientRegistry()
+
+    first = registry.get()
+    with patch.object(settings, "llm_temperature", 0.1):
+        second = registry.get()
+
+    assert first is not second
+    assert len(registry) == 2
+    assert first.root_async_client._client is second.root_async_client._client
+
+
+def test_registry_creates_new_instance_when_endpoint_or_key_changes():
+    """切换 Base URL 或轮换 API Key 时不复用旧实例"""
+    registry = LLMClientRegistry()
+
+    first = registry.get()
+    with patch.object(settings, "llm_base_url_field", "https://gateway.example.com/v1"):
+        second = registry.get()
+    with patch.object(settings, "deepseek_api_key", "rotated-key"):
+        third = registry.get()
+
+    assert len({id(first), id(second), id(third)}) == 3
+    assert second.openai_api_base == "https://gateway.example.com/v1"
+    assert third.openai_api_key.get_secret_value() == "rotated-key"
+    assert all("rotated-key" not in key for key in registry._clients)
+
+
+def test_registry_respects_pool_limits():
+    """连接池参数来自配置"""
+    with patch.object(settings, "llm_pool_max_connections", 7), \
+         patch.object(settings, "llm_pool_max_keepalive", 3), \
+         patch.object(settings, "llm_http2_enabled", False):
+        registry = LLMClientRegistry()
+        client = registry._client_options()["http_async_client"]
+
+    pool = client._transport._pool
+    assert pool._max_connections == 7
+    assert pool._max_keepalive_connections == 3
+    assert pool._http2 is False
+
+
+@pytest.mark.asyncio
+async def test_registry_aclose_releases_clients():
+    """关闭后清空缓存并关闭共享连接"""
+    registry = LLMClientRegistry()
+    registry.get()
+    async_client = registry._http_async_client
+
+    await registry.aclose()
+
+    assert len(registry) == 0
+    assert async_client.is_closed
+    assert registry._http_async_client is None
@@ -0,0 +1,143 @@
+"""
+Token 计量服务单元测试
+"""
+
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from src.agent.main.nodes import call_llm_node
+from src.api.v1.openai_compat import _build_usage
+from src.services.token_accounting import (
+    MESSAGE_OVERHEAD_TOKENS,
+    REPLY_PRIMING_TOKENS,
+    TokenUsage,
+    TokenUsageMetrics,
+    encoding_name_for_model,
+    get_token_counter,
+    get_token_metrics,
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    get_token_metrics().clear()
+    yield
+    get_token_metrics().clear()
+
+
+class TestTokenCounter:
+    """测试计数器"""
+
+    def test_model_specific_encoding(self):
+        assert encoding_name_for_model("gpt-4o") == "o200k_base"
+        assert encoding_name_for_model("gpt-4") == "cl100k_base"
+        assert encoding_name_for_model("deepseek-chat") == "cl100k_base"
+
+    def test_counter_cached_per_encoding(self):
+        assert get_token_counter("gpt-4") is get_token_counter("deepseek-chat")
+
+    def test_count_batch_matches_count(self):
+        counter = get_token_counter("deepseek-chat")
+        texts = ["退货政策是什么？", "How long is the warranty?", ""]
+
+        assert counter.count_batch(texts) == [counter.count(text) for text in texts]
+
+    def test_chinese_not_underestimated(self):
+        """中文按 len // 4 估算会严重偏低"""
+        text = "请问你们的退货政策是什么？"
+
+        assert get_token_counter().count(text) > len(text) // 4
+
+    def test_count_messages(self):
+        counter = get_token_counter()
+        messages = [SystemMessage(content="系统提示"), HumanMessage(content="你好")]
+
+        expected = counter.count("系统提示") + counter.count("你好") + 2 * MESSAGE_OVERHEAD_TOKENS + REPLY_PRIMING_TOKENS
+        assert counter.count_messages(messages) == expected
+
+    def test_usage_prefers_provider_metadata(self):
+        response = AIMessage(
+            content="回复",
+            usage_metadata={"input_tokens": 120, "output_tokens": 30, "total_tokens": 150},
+        )
+
+        usage = get_token_counter().usage_for([HumanMessage(content="你好")], response)
+
+        assert usage == TokenUsage(prompt_tokens=120, completion_tokens=30, source="provider")
+
+    def test_usage_counted_without_metadata(self):
+        counter = get_token_counter()
+        prompt = [HumanMessage(content="你好")]
+
+        usage = counter.usage_for(prompt, AIMessage(content="您好，有什么可以帮您？"))
+
+        assert usage.source == "tiktoken"
+        assert usage.prompt_tokens == counter.count_messages(prompt)
+        assert usage.completion_tokens == counter.count("您好，有什么可以帮您？")
+
+
+class TestTokenUsageMetrics:
+    """测试累计指标"""
+
+    def test_record_and_stats(self):
+        metrics = TokenUsageMetrics()
+        metrics.record(TokenUsage(100, 20), model="deepseek-chat")
+        metrics.record(TokenUsage(300, 40, source="provider"), model="deepseek-chat")
+
+        stats = metrics.stats()
+
+        assert stats["calls"] == 2
+        assert stats["total_tokens"] == 460
+        assert stats["avg_prompt_tokens"] == 200.0
+        assert stats["by_model"]["deepseek-chat"]["prompt_tokens"] == 400
+        assert stats["by_source"] == {"tiktoken": 1, "provider": 1}
+
+
+class TestCallLLMUsage:
+    """测试 LLM 节点记录实际 prompt 用量"""
+
+    @pytest.fixture
+    def llm(self, mocker):
+        llm = MagicMock()
+        llm.ainvoke = AsyncMock(return_value=AIMessage(content="根据我们的退货政策，30天内可退货。"))
+        mocker.patch("src.agent.main.nodes.get_llm", return_value=llm)
+        return llm
+
+    @pytest.mark.asyncio
+    async def test_prompt_includes_rag_context(self, llm):
+        base_state = {"messages": [HumanMessage(content="退货政策是什么？")], "tool_calls": []}
+
+        direct = await call_llm_node({**base_state, "retrieved_docs": []})
+        rag = await call_llm_node({**base_state, "retrieved_docs": ["[文档1] 退货政策\n" + "30天无理由退货。" * 50]})
+
+        assert rag["token_usage"]["prompt_tokens"] > direct["token_usage"]["prompt_tokens"]
+        sent = llm.ainvoke.call_args.args[0]
+        assert rag["token_usage"]["prompt_tokens"] == get_token_counter().count_messages(sent)
+        assert get_token_metrics().stats()["calls"] == 2
+
+    @pytest.mark.asyncio
+    async def test_llm_failure_clears_usage(self, llm):
+        llm.ainvoke.side_effect = RuntimeError("down")
+
+        result = await call_llm_node({"messages": [HumanMessage(content="你好")], "retrieved_docs": []})
+
+        assert result["token_usage"] is None
+
+
+class TestBuildUsage:
+    """测试 usage 字段构建"""
+
+    def test_from_llm_usage(self):
+        usage = _build_usage({"prompt_tokens": 500, "completion_tokens": 50}, "你好", "您好")
+
+        assert (usage.prompt_tokens, usage.completion_tokens, usage.total_tokens) == (500, 50, 550)
+
+    def test_counted_when_llm_not_called(self):
+        counter = get_token_counter()
+
+        usage = _build_usage(None, "你好", "您好，有什么可以帮您？")
+
+        assert usage.prompt_tokens == counter.count("你好")
+        assert usage.completion_tokens == counter.count("您好，有什么可以帮您？")
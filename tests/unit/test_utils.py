@@ -2,7 +2,57 @@
 工具函数单元测试
 """
 
-from src.core.utils import chunk_text_for_embedding, generate_trace_id, truncate_text_to_tokens
+import pytest
+
+from src.core import utils as utils_module
+from src.core.utils import (
+    chunk_text_by_tokens,
+    chunk_text_for_embedding,
+    chunk_texts_by_tokens,
+    generate_trace_id,
+    get_encoding,
+    truncate_text_to_tokens,
+    truncate_texts_to_tokens,
+)
+
+
+class CharEncoding:
+    """每个字符一个 token 的编码器，用于验证窗口逻辑"""
+
+    def encode(self, text, disallowed_special=()):
+        return [ord(char) for char in text]
+
+    def encode_batch(self, texts, disallowed_special=()):
+        return [self.encode(text) for text in texts]
+
+    def decode(self, tokens):
+        return "".join(chr(token) for token in tokens)
+
+    def decode_batch(self, batch):
+        return [self.decode(tokens) for tokens in batch]
+
+
+class ByteEncoding(CharEncoding):
+    """每个 UTF-8 字节一个 token 的编码器（字节级 BPE 的最坏情况，中文每字 3 个 token）"""
+
+    def encode(self, text, disallowed_special=()):
+        return list(text.encode("utf-8"))
+
+    def decode(self, tokens):
+        return bytes(tokens).decode("utf-8", errors="ignore")
+
+
+@pytest.fixture
+def char_encoding(mocker):
+    return mocker.patch.object(utils_module, "get_encoding", return_value=CharEncoding())
+
+
+@pytest.fixture
+def real_encoding():
+    encoding = get_encoding()
+    if encoding is None:
+        pytest.skip("tiktoken encoding unavailable")
+    return encoding
 
 
 class TestGenerateTraceId:
@@ -86,3 +136,80 @@ class TestChunkTextForEmbedding:
 
         assert len(chunks) == 1
         assert chunks[0] == ""
+
+
+class TestSlidingWindowChunker:
+    """测试按 token 滑动窗口分块"""
+
+    def test_overlap(self, char_encoding):
+        chunks = chunk_text_by_tokens("abcdefghij", chunk_size=4, overlap=1)
+
+        assert chunks == ["abcd", "defg", "ghij"]
+
+    def test_no_overlap(self, char_encoding):
+        assert chunk_text_by_tokens("abcdefghij", chunk_size=4, overlap=0) == ["abcd", "efgh", "ij"]
+
+    def test_overlap_not_smaller_than_size_still_advances(self, char_encoding):
+        assert chunk_text_by_tokens("abcde", chunk_size=2, overlap=5) == ["ab", "bc", "cd", "de"]
+
+    def test_defaults_from_settings(self, char_encoding, mocker):
+        settings = mocker.patch("src.core.config.settings")
+        settings.vector_chunk_size = 6
+        settings.vector_chunk_overlap = 2
+
+        assert chunk_text_by_tokens("abcdefghij") == ["abcdef", "efghij"]
+
+    def test_batch_matches_single(self, char_encoding):
+        texts = ["abcdefghij", "", "abc"]
+
+        batched = chunk_texts_by_tokens(texts, chunk_size=4, overlap=1)
+
+        assert batched == [chunk_text_by_tokens(text, chunk_size=4, overlap=1) for text in texts]
+        assert batched[1:] == [[""], ["abc"]]
+
+    def test_fallback_without_encoding(self, mocker):
+        mocker.patch.object(utils_module, "get_encoding", return_value=None)
+
+        chunks = chunk_text_by_tokens("a" * 30, chunk_size=5, overlap=1)
+
+        assert all(len(chunk) <= 10 for chunk in chunks)
+        assert chunks[0][-2:] == chunks[1][:2]
+
+    def test_truncate_batch_matches_single(self, char_encoding):
+        texts = ["abcdefghij", "ab", ""]
+
+        assert truncate_texts_to_tokens(texts, max_tokens=4) == ["abcd", "ab", ""]
+
+    def test_cjk_multi_token_characters_are_truncated(self, mocker):
+        """字符数不超过上限但 token 数超过时仍需截断"""
+        mocker.patch.object(utils_module, "get_encoding", return_value=ByteEncoding())
+        text = "退货政策"  # 4 个字符，12 个 token
+
+        assert truncate_text_to_tokens(text, max_tokens=6) == "退货"
+        assert truncate_texts_to_tokens([text, "ab"], max_tokens=6) == ["退货", "ab"]
+        assert chunk_text_for_embedding(text, max_tokens=6) == ["退货", "政策"]
+
+    def test_short_query_skips_encoding(self, mocker):
+        """短查询（字符数不超过上限）无需编码"""
+        get_encoding_mock = mocker.patch.object(utils_module, "get_encoding")
+
+        assert truncate_text_to_tokens("退货政策是什么？", max_tokens=512) == "退货政策是什么？"
+        get_encoding_mock.assert_not_called()
+
+    def test_encoding_is_cached(self, real_encoding):
+        """编码器只加载一次"""
+        assert get_encoding() is real_encoding
+
+    def test_batch_matches_single_with_real_encoding(self, real_encoding):
+        documents = ["退货政策：自收货之日起30天内可无理由退货。" * 40 + str(i) for i in range(20)]
+
+        assert chunk_texts_by_tokens(documents, 500, 50) == [
+            chunk_text_by_tokens(text, 500, 50) for text in documents
+        ]
+
+    def test_special_tokens_in_text(self, real_encoding):
+        """用户文本中的特殊 token 字面量不应导致编码失败"""
+        text = "<|endoftext|>" * 100
+
+        assert len(truncate_text_to_tokens(text, max_tokens=10)) < len(text)
+        assert len(chunk_text_by_tokens(text, chunk_size=10, overlap=2)) > 1